@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Mesure du débit de chaque niveau de qualité du suivi facial.
+
+Chaque niveau analyse la même séquence (un portrait légèrement déplacé d'une image à
+l'autre) dans un seul processus, avec le suivi de la région du visage et sans saut
+d'images : le résultat est le coût d'une analyse. Rapporté à la fréquence visée par le
+niveau, il donne le nombre de sessions qu'un cœur peut suivre, pour choisir le niveau
+par défaut de chaque classe d'appareils.
+
+Usage :
+    python benchmark/quality_tiers.py [--image portrait.png] [--frames 300]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "workspace", "essayage"))
+
+from app.config import settings  # noqa: E402
+from app.services.face_detector import FaceDetectorService, create_face_mesh  # noqa: E402
+from app.services.quality_tiers import QUALITY_TIERS  # noqa: E402
+
+DEFAULT_IMAGE = os.path.join(ROOT, "workspace", "recommandation", "images-test", "Ovale.png")
+
+
+def make_frames(path: str, count: int, width: int = 640) -> list:
+    """Séquence RGB : le portrait, réduit à ``width`` pixels, oscille de quelques pixels."""
+    image = cv2.imread(path)
+    if image is None:
+        raise SystemExit(f"Image illisible : {path}")
+    height = round(image.shape[0] * width / image.shape[1])
+    image = cv2.cvtColor(cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2RGB)
+    frames = []
+    for index in range(count):
+        shift = np.float32([[1, 0, 6 * np.sin(index / 10)], [0, 1, 3 * np.cos(index / 7)]])
+        frames.append(cv2.warpAffine(image, shift, (width, height), borderMode=cv2.BORDER_REPLICATE))
+    return frames
+
+
+def benchmark_tier(tier, frames: list, warm_up: int = 20) -> dict:
+    """Analyse la séquence avec un niveau et renvoie débit et latences."""
+    options = {**settings.detector_options, **tier.detector_options(), "frame_skipping": False}
+    detector = FaceDetectorService(face_mesh=create_face_mesh(refine_landmarks=tier.refine_landmarks), **options)
+    landmarks = 0
+    try:
+        for frame in frames[:warm_up]:
+            detector.process_rgb_image(frame)
+        latencies = []
+        for index, frame in enumerate(frames):
+            started = time.perf_counter()
+            result, _ = detector.process_rgb_image(frame, timestamp=index / tier.target_fps)
+            latencies.append(time.perf_counter() - started)
+            landmarks = len(result)
+    finally:
+        detector.face_mesh.close()
+    latencies = np.array(latencies) * 1000
+    return {
+        "fps": len(frames) / (latencies.sum() / 1000),
+        "p50": float(np.percentile(latencies, 50)),
+        "p95": float(np.percentile(latencies, 95)),
+        "landmarks": landmarks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--image", default=DEFAULT_IMAGE, help="Portrait analysé")
+    parser.add_argument("--frames", type=int, default=300, help="Nombre d'images mesurées par niveau")
+    parser.add_argument("--tiers", nargs="+", default=list(QUALITY_TIERS), choices=list(QUALITY_TIERS))
+    args = parser.parse_args()
+
+    frames = make_frames(args.image, args.frames)
+    print(f"{'niveau':<10}{'images/s':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'visé':>7}{'sessions':>10}{'points':>8}")
+    for name in args.tiers:
+        tier = QUALITY_TIERS[name]
+        result = benchmark_tier(tier, frames)
+        print(f"{name:<10}{result['fps']:>10.1f}{result['p50']:>10.2f}{result['p95']:>10.2f}"
+              f"{tier.target_fps:>7.0f}{result['fps'] / tier.target_fps:>10.1f}{result['landmarks']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import os
+import time
+
+# Instant d'import du paquet : référence de la mesure du démarrage à froid (``/ready``)
+STARTED_AT = time.perf_counter()
+
+
+def uptime() -> float:
+    """Durée (s) écoulée depuis le démarrage du processus (ou sa création par ``fork``)."""
+    return time.perf_counter() - STARTED_AT
+
+
+def _reset_started_at() -> None:
+    # Un worker créé par le superviseur (voir ``supervisor``) démarre à sa création
+    global STARTED_AT
+    STARTED_AT = time.perf_counter()
+
+
+os.register_at_fork(after_in_child=_reset_started_at)
@@ -0,0 +1,97 @@
+"""
+Configuration du service d'essayage.
+
+Les paramètres sont lus depuis les variables d'environnement préfixées par
+``ESSAYAGE_`` (par exemple ``ESSAYAGE_MAX_SESSIONS=32``).
+"""
+
+import os
+import tempfile
+
+from pydantic import BaseSettings, Field
+
+
+class Settings(BaseSettings):
+    max_sessions: int = Field(16, gt=0, description="Nombre maximum de sessions de suivi simultanées")
+    session_idle_timeout: float = Field(60.0, gt=0, description="Durée d'inactivité (s) avant éviction d'une session")
+    inference_workers: int = Field(2, ge=0, description="Nombre de processus d'inférence (0 : thread local)")
+    inference_start_method: str = Field("spawn", description="Méthode de démarrage des processus d'inférence")
+    inference_timeout: float = Field(10.0, gt=0, description="Délai maximum (s) d'une inférence")
+    inference_max_timeouts: int = Field(3, ge=1,
+                                        description="Inférences expirées consécutives au-delà desquelles "
+                                                    "un processus d'inférence bloqué est remplacé")
+    stream_target_fps: float = Field(30.0, gt=0, description="Fréquence d'images visée pour le flux d'essayage")
+    stream_hint_interval: float = Field(2.0, gt=0, description="Délai minimum (s) entre deux suggestions au client")
+    default_quality_tier: str = Field("precise", regex="^(lite|standard|precise)$",
+                                      description="Niveau de qualité des sessions WebSocket qui n'en choisissent pas")
+    static_frame_threshold: float = Field(3.0, ge=0,
+                                          description="Écart maximal (niveaux de gris) de la vignette d'une image inchangée (0 : désactivé)")
+    static_frame_max_age: float = Field(0.5, ge=0,
+                                        description="Âge maximum (s) d'un résultat réutilisé pour une image inchangée")
+    session_store: str = Field("memory", regex="^(none|memory|sqlite)$",
+                               description="Stockage des états de suivi pour la reprise des sessions")
+    session_store_path: str = Field(os.path.join(tempfile.gettempdir(), "essayage-sessions.sqlite3"),
+                                    description="Fichier SQLite partagé des états de suivi (stockage sqlite)")
+    session_state_ttl: float = Field(120.0, gt=0, description="Durée (s) pendant laquelle une session peut être reprise")
+    session_checkpoint_interval: float = Field(1.0, ge=0,
+                                               description="Délai (s) entre deux enregistrements de l'état d'une session (0 : à la déconnexion seulement)")
+    stream_keyframe_interval: int = Field(30, ge=1, description="Messages entre deux images clés en mode delta")
+    stream_landmark_precision: float = Field(0.5, gt=0, description="Précision (pixels) des points de repère en mode delta")
+    stream_pose_precision: float = Field(0.001, gt=0, description="Précision de la position des lunettes en mode delta")
+    roi_tracking: bool = Field(True, description="Analyser uniquement la région du visage suivi")
+    roi_size: int = Field(256, gt=0, description="Côté (pixels) de la région du visage passée à Face Mesh")
+    roi_padding: float = Field(0.3, ge=0, description="Marge autour du visage, relative à sa taille")
+    detection_max_side: int = Field(640, gt=0, description="Plus grand côté de l'image lors d'une détection complète")
+    decode_target_side: int = Field(960, ge=0,
+                                    description="Plus grand côté conservé lors du décodage réduit d'une image JPEG (0 : pleine résolution)")
+    max_image_bytes: int = Field(16 * 1024 * 1024, gt=0,
+                                 description="Taille maximale (octets) d'une image encodée envoyée à /detect ou sur le WebSocket")
+    max_image_pixels: int = Field(40_000_000, gt=0, description="Nombre maximum de pixels d'une image, lu avant son décodage")
+    frame_skipping: bool = Field(True, description="Prédire la pose entre deux analyses lorsque la tête bouge peu")
+    max_skip_frames: int = Field(3, ge=0, description="Nombre maximum d'images prédites entre deux analyses")
+    motion_threshold: float = Field(4.0, gt=0, description="Écart moyen (niveaux de gris) du visage imposant une analyse")
+    velocity_threshold: float = Field(0.01, gt=0, description="Vitesse (fraction du visage par image) imposant une analyse")
+    max_faces: int = Field(1, ge=1, le=8, description="Nombre maximum de visages suivis par session (1 : mono-visage)")
+    batch_max_wait_ms: float = Field(4.0, ge=0, description="Attente maximale (ms) d'une image avant l'envoi de son lot")
+    batch_max_size: int = Field(16, gt=0, description="Nombre maximum d'images par lot")
+    detect_cache_entries: int = Field(256, ge=0, description="Nombre maximum de résultats de /detect en cache (0 : désactivé)")
+    detect_cache_bytes: int = Field(64 * 1024 * 1024, ge=0, description="Mémoire maximale (octets) du cache de /detect")
+    detect_cache_ttl: float = Field(300.0, gt=0, description="Durée de vie (s) d'un résultat de /detect en cache")
+    detect_batch_max_images: int = Field(1000, gt=0, description="Nombre maximum d'images par requête /detect/batch")
+    detect_batch_max_image_bytes: int = Field(16 * 1024 * 1024, gt=0, description="Taille maximale (octets) d'une image d'un lot")
+    detect_batch_concurrency: int = Field(0, ge=0, description="Images d'un lot analysées simultanément (0 : deux par processus)")
+    face_shape_min_samples: int = Field(30, gt=0, description="Images retenues avant la convergence de la forme du visage estimée sur le flux")
+    face_shape_tolerance: float = Field(0.01, gt=0, description="Erreur absolue maximale (en unités de ratio) de la moyenne de chaque ratio du visage à la convergence")
+    face_shape_max_yaw: float = Field(0.3, gt=0, description="Lacet maximal (radians) d'une image retenue pour la forme du visage")
+    landmark_ticket_secret: str = Field("", description="Secret partagé avec le service de recommandation pour signer les tickets de points de repère (vide : pas de ticket)")
+    landmark_ticket_ttl: float = Field(300.0, gt=0, description="Durée de validité (s) d'un ticket de points de repère")
+    video_max_bytes: int = Field(512 * 1024 * 1024, gt=0, description="Taille maximale (octets) d'une vidéo envoyée à /detect/video")
+    video_pipeline_depth: int = Field(2, gt=0, description="Images d'une vidéo soumises d'avance à l'inférence")
+    warm_up: bool = Field(True, description="Préchauffer les instances Face Mesh au démarrage")
+    warm_face_meshes: int = Field(1, ge=0, description="Instances Face Mesh préchauffées par processus d'inférence")
+    warm_up_timeout: float = Field(120.0, gt=0, description="Délai maximum (s) du préchauffage d'un processus")
+    frame_slot_bytes: int = Field(8 * 1024 * 1024, gt=0, description="Taille d'un emplacement de mémoire partagée")
+
+    class Config:
+        env_prefix = "ESSAYAGE_"
+
+
+    @property
+    def detector_options(self) -> dict:
+        """Paramètres transmis à chaque ``FaceDetectorService``."""
+        return {
+            "roi_tracking": self.roi_tracking,
+            "roi_size": self.roi_size,
+            "roi_padding": self.roi_padding,
+            "detection_max_side": self.detection_max_side,
+            "frame_skipping": self.frame_skipping,
+            "max_skip_frames": self.max_skip_frames,
+            "motion_threshold": self.motion_threshold,
+            "velocity_threshold": self.velocity_threshold,
+            "max_faces": self.max_faces,
+            "decode_target_side": self.decode_target_side,
+            "max_image_pixels": self.max_image_pixels,
+        }
+
+
+settings = Settings()
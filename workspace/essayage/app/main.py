@@ -1,6 +1,6 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import face_detection
+from .routers import face_detection, health
 
 app = FastAPI()
 
@@ -15,6 +15,7 @@ app.add_middleware(
 
 # Inclure les routes
 app.include_router(face_detection.router, prefix="/api/v1/face", tags=["face"])
+app.include_router(health.router)
 
 @app.get("/")
 async def root():
@@ -1,7 +1,19 @@
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional
+from typing import List, NamedTuple, Optional, Sequence, Union
 import numpy as np
 
+# Formats de sérialisation des points de repère
+LANDMARK_FORMAT_COMPACT = "compact"
+LANDMARK_FORMAT_LEGACY = "legacy"
+LANDMARK_FORMAT_BINARY = "binary"
+LANDMARK_FORMATS = (LANDMARK_FORMAT_COMPACT, LANDMARK_FORMAT_LEGACY, LANDMARK_FORMAT_BINARY)
+
+# Projections nommées des points de repère (sinon liste d'indices)
+PROJECTION_NONE = "none"
+PROJECTION_GLASSES = "glasses"
+PROJECTION_CONTOUR = "contour"
+PROJECTION_FULL = "full"
+
 class Point2D(BaseModel):
     x: float = Field(..., description="Coordonnée X du point")
     y: float = Field(..., description="Coordonnée Y du point")
@@ -34,6 +46,119 @@ class FaceLandmarks(BaseModel):
             raise ValueError('Nombre insuffisant de points de repère détectés')
         return v
 
+class CompactLandmarks:
+    """
+    Points de repère stockés dans un unique tableau float32.
+
+    Chaque ligne contient (x, y, z) en pixels : x et y dans le repère de l'image,
+    z à l'échelle de la largeur de l'image (convention MediaPipe). La validation
+    est vectorisée et la sérialisation évite de créer un objet par point ;
+    ``to_face_landmarks`` fournit le format ``FaceLandmarks`` historique.
+
+    ``measured`` vaut False lorsque les points ne proviennent pas d'une analyse de
+    l'image courante (prédiction entre deux analyses, dernière position connue).
+    """
+
+    __slots__ = ("points", "image_width", "image_height", "measured")
+
+    def __init__(self, points: np.ndarray, image_width: int, image_height: int, measured: bool = True):
+        points = np.asarray(points, dtype=np.float32)
+        if points.ndim != 2 or points.shape[1] != 3:
+            raise ValueError('Les points de repère doivent former un tableau (N, 3)')
+        if len(points) < 10:  # Minimum de points requis pour une détection valide
+            raise ValueError('Nombre insuffisant de points de repère détectés')
+        if not np.isfinite(points).all():
+            raise ValueError('Les coordonnées doivent être des nombres finis')
+        if image_width <= 0 or image_height <= 0:
+            raise ValueError("Les dimensions de l'image doivent être positives")
+        self.points = points
+        self.image_width = int(image_width)
+        self.image_height = int(image_height)
+        self.measured = measured
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def select(self, indices: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        Retourne les points sélectionnés (tous si ``indices`` vaut None).
+
+        Raises:
+            ValueError: Si un indice dépasse le nombre de points détectés
+        """
+        if indices is None:
+            return self.points
+        if indices and max(indices) >= len(self.points):
+            raise ValueError(f"Landmark index out of range (only {len(self.points)} landmarks)")
+        return self.points[list(indices)]
+
+    def to_flat_list(self, dims: int = 2, decimals: int = 2, indices: Optional[Sequence[int]] = None) -> List[float]:
+        """Retourne les coordonnées à plat [x0, y0, x1, y1, ...]."""
+        return np.round(self.select(indices)[:, :dims].astype(np.float64), decimals).ravel().tolist()
+
+    def to_bytes(self, dims: int = 2, indices: Optional[Sequence[int]] = None) -> bytes:
+        """Retourne les coordonnées à plat en float32 petit-boutiste."""
+        return np.ascontiguousarray(self.select(indices)[:, :dims], dtype="<f4").tobytes()
+
+    def to_dict(self, dims: int = 2, indices: Optional[Sequence[int]] = None) -> dict:
+        """Sérialisation JSON compacte."""
+        result = self.metadata(dims, indices)
+        result["format"] = LANDMARK_FORMAT_COMPACT
+        result["points"] = self.to_flat_list(dims, indices=indices)
+        return result
+
+    def metadata(self, dims: int = 2, indices: Optional[Sequence[int]] = None) -> dict:
+        """Description des points transmis séparément en binaire."""
+        result = {
+            "format": LANDMARK_FORMAT_BINARY,
+            "dims": dims,
+            "count": len(self.points) if indices is None else len(indices),
+            "image_width": self.image_width,
+            "image_height": self.image_height
+        }
+        if indices is not None:
+            result["indices"] = list(indices)
+        return result
+
+    def to_legacy_dict(self, indices: Optional[Sequence[int]] = None) -> dict:
+        """Sérialisation JSON identique à ``FaceLandmarks.dict()``, sans modèles intermédiaires."""
+        return {
+            "landmarks": [{"x": x, "y": y} for x, y in self.select(indices)[:, :2].tolist()],
+            "image_width": self.image_width,
+            "image_height": self.image_height
+        }
+
+    def serialize(self, landmark_format: str = LANDMARK_FORMAT_COMPACT,
+                  indices: Optional[Sequence[int]] = None) -> Optional[dict]:
+        """
+        Sérialise les points de repère dans le format demandé.
+
+        Pour le format binaire, seule la description est renvoyée : les coordonnées
+        sont obtenues avec ``to_bytes``. Une projection vide ne renvoie rien.
+        """
+        if indices is not None and len(indices) == 0:
+            return None
+        if landmark_format == LANDMARK_FORMAT_LEGACY:
+            return self.to_legacy_dict(indices)
+        if landmark_format == LANDMARK_FORMAT_BINARY:
+            return self.metadata(indices=indices)
+        if landmark_format == LANDMARK_FORMAT_COMPACT:
+            return self.to_dict(indices=indices)
+        raise ValueError(f"Format de points de repère inconnu: {landmark_format}")
+
+    def to_face_landmarks(self) -> "FaceLandmarks":
+        """
+        Convertit vers le format ``FaceLandmarks`` historique.
+
+        Les points ayant déjà été validés, les modèles sont construits sans
+        nouvelle validation.
+        """
+        return FaceLandmarks.construct(
+            landmarks=[Point2D.construct(x=x, y=y) for x, y in self.points[:, :2].tolist()],
+            image_width=self.image_width,
+            image_height=self.image_height
+        )
+
 class GlassesPosition(BaseModel):
     position: Point3D = Field(..., description="Position des lunettes")
     rotation: Point3D = Field(..., description="Rotation des lunettes")
@@ -45,14 +170,60 @@ class GlassesPosition(BaseModel):
             raise ValueError('Les valeurs d\'échelle doivent être positives')
         return v
 
+class TrackedFace(NamedTuple):
+    """Visage suivi en mode multi-visages."""
+    track_id: int
+    landmarks: CompactLandmarks
+    glasses_position: GlassesPosition
+
+    def serialize(self, landmark_format: str = LANDMARK_FORMAT_COMPACT,
+                  indices: Optional[Sequence[int]] = None) -> dict:
+        """Sérialisation JSON du visage, points de repère au format demandé."""
+        return {
+            "track_id": self.track_id,
+            "measured": self.landmarks.measured,
+            "landmarks": self.landmarks.serialize(landmark_format, indices),
+            "glasses_position": self.glasses_position.dict()
+        }
+
+
+class CompactLandmarksResponse(BaseModel):
+    """Points de repère au format compact (voir ``CompactLandmarks.to_dict``)."""
+    format: str = Field(LANDMARK_FORMAT_COMPACT, description="Format des points de repère")
+    dims: int = Field(..., gt=0, description="Nombre de coordonnées par point")
+    count: int = Field(..., ge=0, description="Nombre de points renvoyés")
+    image_width: int = Field(..., gt=0, description="Largeur de l'image")
+    image_height: int = Field(..., gt=0, description="Hauteur de l'image")
+    indices: Optional[List[int]] = Field(None, description="Indices des points renvoyés, pour une projection")
+    points: List[float] = Field(..., description="Coordonnées à plat [x0, y0, x1, y1, ...]")
+
+
+# Points de repère au format ``landmark_format`` demandé
+LandmarksResponse = Union[CompactLandmarksResponse, FaceLandmarks]
+
+
+class TrackedFaceResponse(BaseModel):
+    """Visage suivi en mode multi-visages (voir ``TrackedFace.serialize``)."""
+    track_id: int = Field(..., description="Identifiant du visage, stable d'une image à l'autre")
+    measured: bool = Field(..., description="Points mesurés sur l'image (sinon prédits)")
+    landmarks: Optional[LandmarksResponse] = Field(None, description="Points de repère du visage")
+    glasses_position: GlassesPosition = Field(..., description="Position des lunettes")
+
+
 class FaceAnalysisResponse(BaseModel):
     success: bool = Field(..., description="Indique si l'analyse a réussi")
     message: str = Field(..., description="Message décrivant le résultat")
-    landmarks: Optional[FaceLandmarks] = Field(None, description="Points de repère du visage")
+    landmarks: Optional[LandmarksResponse] = Field(
+        None, description="Points de repère du visage, au format demandé (absents pour la projection none)"
+    )
     glasses_position: Optional[GlassesPosition] = Field(None, description="Position des lunettes")
+    faces: Optional[List[TrackedFaceResponse]] = Field(None, description="Visages suivis, en mode multi-visages")
+    landmark_ticket: Optional[str] = Field(
+        None, description="Points de repère signés, analysés par /recommend sans relancer Face Mesh"
+    )
 
-    @validator('landmarks', 'glasses_position')
+    @validator('glasses_position')
     def check_optional_fields(cls, v, values):
         if values.get('success') and v is None:
-            raise ValueError('Les champs landmarks et glasses_position sont requis lorsque success est True')
+            raise ValueError('Le champ glasses_position est requis lorsque success est True')
         return v 
\ No newline at end of file
@@ -1,66 +1,262 @@
-from fastapi import APIRouter, UploadFile, File, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
-from ..models.face import FaceLandmarks, FaceAnalysisResponse, GlassesPosition
+from fastapi import APIRouter, UploadFile, File, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from .. import uptime
+from ..config import settings
+from ..models.face import (
+    FaceAnalysisResponse, LANDMARK_FORMAT_BINARY, LANDMARK_FORMAT_COMPACT, LANDMARK_FORMAT_LEGACY, LANDMARK_FORMATS,
+    PROJECTION_FULL
+)
+from ..services.batch_detection import analyze_concurrently, iter_uploaded_images
 from ..services.face_detector import FaceDetectorService
-import base64
-import numpy as np
-import cv2
+from ..services.inference_executor import InferenceExecutor
+from ..services.landmark_ticket import LandmarkTicketSigner
+from ..services.quality_tiers import resolve_quality_tier
+from ..services.result_cache import ResultCache, content_key
+from ..services.session_manager import SessionLimitError
+from ..services.session_store import RESUME_KEY_PATTERN, create_session_store
+from ..services.try_on_stream import TryOnStream
+from ..services.video_processing import VideoReader, remove_file, spool_upload, track_video
+from ..utils.frame_change import StaticFrameDetector
+from ..utils.frame_protocol import PROTOCOL_BINARY, negotiate_protocol
+from ..utils.image_decoding import check_image_bytes
+from ..utils.metrics import SESSION_RESUMES, STAGE_SECONDS
+from typing import List, Optional
+import asyncio
 import json
+import os
+import signal
+import threading
+import time
+import uuid
 
 router = APIRouter()
-face_detector = FaceDetectorService()
+
+# Délai (s) laissé à l'arrêt propre d'un worker dont le thread d'inférence est bloqué
+HUNG_WORKER_EXIT_TIMEOUT = 10.0
+
+
+def _stop_worker():
+    """Arrête ce worker, dont le thread d'inférence est bloqué : le superviseur le remplace."""
+    os.kill(os.getpid(), signal.SIGTERM)
+    # Une connexion WebSocket ouverte peut retenir l'arrêt propre
+    timer = threading.Timer(HUNG_WORKER_EXIT_TIMEOUT, os._exit, args=(1,))
+    timer.daemon = True
+    timer.start()
+
+
+inference_executor = InferenceExecutor(
+    num_workers=settings.inference_workers,
+    max_sessions=settings.max_sessions,
+    idle_timeout=settings.session_idle_timeout,
+    slot_size=settings.frame_slot_bytes,
+    timeout=settings.inference_timeout,
+    max_timeouts=settings.inference_max_timeouts,
+    on_hung=_stop_worker,
+    start_method=settings.inference_start_method,
+    detector_options=settings.detector_options,
+    batch_max_wait=settings.batch_max_wait_ms / 1000,
+    batch_max_size=settings.batch_max_size,
+    warm_face_meshes=settings.warm_face_meshes
+)
+detect_cache = ResultCache(
+    max_entries=settings.detect_cache_entries,
+    max_bytes=settings.detect_cache_bytes,
+    ttl=settings.detect_cache_ttl
+)
+# Tickets de points de repère, repris par le service de recommandation sans nouvelle inférence
+landmark_tickets = (LandmarkTicketSigner(settings.landmark_ticket_secret, settings.landmark_ticket_ttl)
+                    if settings.landmark_ticket_secret else None)
+# États de suivi des sessions, pour les reprendre sur un autre worker ou une autre réplique
+session_store = create_session_store(settings.session_store, settings.session_store_path,
+                                     settings.session_state_ttl)
+
+# Durées du démarrage, renseignées par le préchauffage (voir ``/ready``)
+startup_report = {}
+_warm_up_task = None
+
+@router.on_event("startup")
+async def warm_up_inference_executor():
+    """
+    Préchauffe l'inférence en arrière-plan : le serveur accepte les connexions pendant
+    ce temps, et ``/ready`` répond 503 jusqu'à la fin du préchauffage.
+    """
+    global _warm_up_task
+    if not settings.warm_up:
+        inference_executor.ready = True
+        return
+    _warm_up_task = asyncio.ensure_future(_warm_up())
+
+async def _warm_up():
+    started = time.perf_counter()
+    try:
+        workers = await inference_executor.warm_up(settings.warm_up_timeout)
+    except Exception as e:
+        print(f"Inference warm-up failed: {e}")
+        startup_report["error"] = str(e)
+        return
+    finished, cold_start = time.perf_counter(), uptime()
+    startup_report.update({
+        "warm_up_seconds": finished - started,
+        "cold_start_seconds": cold_start,
+        "workers": workers,
+    })
+    print(f"Inference ready in {cold_start:.2f}s (warm-up {finished - started:.2f}s)")
+
+@router.on_event("shutdown")
+def shutdown_inference_executor():
+    if _warm_up_task is not None:
+        _warm_up_task.cancel()
+    inference_executor.shutdown()
+    if session_store is not None:
+        session_store.close()
 
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, protocol: Optional[str] = None,
+                             landmark_format: Optional[str] = None, projection: Optional[str] = None,
+                             delta: bool = False, quality: Optional[str] = None,
+                             session: Optional[str] = None, face_shape: bool = False):
+    # Négocier le protocole : data URL base64 (historique) ou images binaires
+    protocol, subprotocol = negotiate_protocol(websocket.scope.get("subprotocols", []), protocol)
+    # Les clients historiques reçoivent par défaut le format FaceLandmarks
+    if landmark_format is None:
+        landmark_format = LANDMARK_FORMAT_COMPACT if protocol == PROTOCOL_BINARY else LANDMARK_FORMAT_LEGACY
     try:
-        await websocket.accept()
-        while True:
-            try:
-                # Recevoir l'image en base64 du client
-                data = await websocket.receive_text()
-                
-                try:
-                    # Décoder l'image base64
-                    img_data = base64.b64decode(data.split(',')[1])
-                    nparr = np.frombuffer(img_data, np.uint8)
-                    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                    
-                    # Détecter les landmarks
-                    landmarks, glasses_position = face_detector.process_image(img)
-                    
-                    # Envoyer les résultats
-                    await websocket.send_json({
-                        "success": True,
-                        "landmarks": landmarks.dict(),
-                        "glasses_position": glasses_position.dict()
-                    })
-                    
-                except Exception as e:
-                    print(f"Error processing image: {e}")
-                    await websocket.send_json({
-                        "success": False,
-                        "error": str(e)
-                    })
-                    
-            except WebSocketDisconnect:
-                print("Client disconnected")
-                break
-                
+        if landmark_format not in LANDMARK_FORMATS:
+            raise ValueError(f"Invalid landmark format: {landmark_format}")
+        if delta and landmark_format == LANDMARK_FORMAT_BINARY:
+            raise ValueError("Delta mode is not available with the binary landmark format")
+        # Le niveau de qualité fixe la projection par défaut et la fréquence visée
+        tier = resolve_quality_tier(quality or settings.default_quality_tier)
+        landmark_indices = FaceDetectorService.resolve_landmark_projection(projection or tier.projection)
+        if session is not None and not RESUME_KEY_PATTERN.match(session):
+            raise ValueError("Invalid session resume key")
+    except ValueError as e:
+        print(f"WebSocket refused: {e}")
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    # Chaque connexion dispose de sa propre session de suivi ; une clé de reprise
+    # (``session``) y restaure l'état de suivi enregistré par une connexion précédente
+    session_id = uuid.uuid4().hex
+    resume_key = session if session_store is not None else None
+    stream = None
+    try:
+        await websocket.accept(subprotocol=subprotocol)
+        state = await run_in_threadpool(session_store.load, resume_key) if resume_key else None
+        try:
+            inference_executor.open_session(session_id, tier.name, state)
+        except SessionLimitError as e:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            print(f"WebSocket refused: {e}")
+            return
+        stream = TryOnStream(
+            websocket, inference_executor, session_id, protocol, landmark_format, landmark_indices,
+            target_fps=min(settings.stream_target_fps, tier.target_fps),
+            hint_interval=settings.stream_hint_interval,
+            delta_options={
+                "keyframe_interval": settings.stream_keyframe_interval,
+                "landmark_precision": settings.stream_landmark_precision,
+                "pose_precision": settings.stream_pose_precision,
+            },
+            delta=delta,
+            static_frames=StaticFrameDetector(settings.static_frame_threshold, settings.static_frame_max_age),
+            session_store=session_store,
+            resume_key=resume_key,
+            max_frame_bytes=settings.max_image_bytes,
+            max_frame_pixels=settings.max_image_pixels,
+            checkpoint_interval=settings.session_checkpoint_interval,
+            face_shape=face_shape,
+            face_shape_options={
+                "min_samples": settings.face_shape_min_samples,
+                "tolerance": settings.face_shape_tolerance,
+                "max_yaw": settings.face_shape_max_yaw,
+            },
+            landmark_tickets=landmark_tickets
+        )
+        if resume_key:
+            SESSION_RESUMES.inc("resumed" if state is not None else "new")
+            await websocket.send_json({"type": "session", "session": resume_key, "resumed": state is not None})
+        await stream.run()
+    except WebSocketDisconnect:
+        print("Client disconnected")
     except Exception as e:
         print(f"WebSocket error: {e}")
+    finally:
+        if stream is not None:
+            try:
+                await stream.save_state()
+            except Exception as e:
+                print(f"Session state not saved: {e}")
+        inference_executor.close_session(session_id)
 
-@router.post("/detect", response_model=FaceAnalysisResponse)
-async def detect_face_landmarks(image: UploadFile = File(...)):
+@router.post("/detect", response_model=FaceAnalysisResponse, responses={
+    400: {"model": FaceAnalysisResponse, "description": "Image invalide ou sans visage"},
+    503: {"model": FaceAnalysisResponse, "description": "Nombre maximum de sessions atteint"},
+})
+async def detect_face_landmarks(image: UploadFile = File(...),
+                                landmark_format: str = Query(LANDMARK_FORMAT_LEGACY,
+                                                             regex=f"^({LANDMARK_FORMAT_LEGACY}|{LANDMARK_FORMAT_COMPACT})$"),
+                                projection: str = Query(PROJECTION_FULL),
+                                cache: bool = Query(True)):
     """
     Détecte les points de repère du visage et calcule la position optimale des lunettes.
+    
+    Le paramètre ``landmark_format=compact`` renvoie les points de repère sous forme
+    d'une liste plate [x0, y0, x1, y1, ...] plutôt qu'une liste d'objets. Le paramètre
+    ``projection`` (``none``, ``glasses``, ``contour``, ``full`` ou liste d'indices)
+    limite les points renvoyés. Les résultats sont mis en cache selon le contenu de
+    l'image ; ``cache=false`` force une nouvelle analyse sans consulter ni remplir le cache.
+    
+    L'en-tête ``Server-Timing`` détaille la durée de la recherche dans le cache, de
+    l'analyse et de la sérialisation.
+    
+    Si un secret est partagé avec le service de recommandation, la réponse porte un
+    ``landmark_ticket`` : tous les points de repère, normalisés et signés, que
+    ``/recommend`` analyse sans relancer Face Mesh.
     """
     try:
-        landmarks, glasses_position = await face_detector.detect_landmarks(image)
-        return FaceAnalysisResponse(
-            success=True,
-            message="Face landmarks and glasses position calculated successfully",
-            landmarks=landmarks,
-            glasses_position=glasses_position
+        landmark_indices = FaceDetectorService.resolve_landmark_projection(projection)
+        # Requête ponctuelle : elle ne touche à aucun état de suivi
+        contents = await image.read(settings.max_image_bytes + 1)
+        check_image_bytes(len(contents), settings.max_image_bytes)
+        timings = {}
+        started = time.perf_counter()
+        use_cache = cache and detect_cache.enabled
+        key = content_key(contents) if use_cache else None
+        outcome = detect_cache.get(key) if use_cache else None
+        timings["cache"] = time.perf_counter() - started
+        if outcome is None:
+            started = time.perf_counter()
+            outcome = await inference_executor.process_once(contents)
+            timings["inference"] = time.perf_counter() - started
+            if use_cache:
+                detect_cache.put(key, outcome)
+        started = time.perf_counter()
+        landmarks, glasses_position = outcome[:2]
+        # Les points étant déjà validés, la réponse est sérialisée directement
+        content = {
+            "success": True,
+            "message": "Face landmarks and glasses position calculated successfully",
+            "landmarks": landmarks.serialize(landmark_format, landmark_indices),
+            "glasses_position": glasses_position.dict()
+        }
+        if len(outcome) > 2:
+            content["faces"] = [face.serialize(landmark_format, landmark_indices) for face in outcome[2]]
+        if landmark_tickets is not None:
+            size = (landmarks.image_width, landmarks.image_height)
+            content["landmark_ticket"] = landmark_tickets.issue(landmarks.points[:, :2] / size, *size)
+        timings["serialize"] = time.perf_counter() - started
+        STAGE_SECONDS.observe("serialize", timings["serialize"])
+        return JSONResponse(content=content, headers={"Server-Timing": server_timing(timings)})
+    except SessionLimitError as e:
+        return JSONResponse(
+            status_code=503,
+            content={
+                "success": False,
+                "message": str(e),
+                "landmarks": None,
+                "glasses_position": None
+            }
         )
     except Exception as e:
         return JSONResponse(
@@ -73,6 +269,129 @@ async def detect_face_landmarks(image: UploadFile = File(...)):
             }
         )
 
+@router.post("/detect/batch")
+async def detect_face_landmarks_batch(images: List[UploadFile] = File(...),
+                                      landmark_format: str = Query(LANDMARK_FORMAT_LEGACY,
+                                                                   regex=f"^({LANDMARK_FORMAT_LEGACY}|{LANDMARK_FORMAT_COMPACT})$"),
+                                      projection: str = Query(PROJECTION_FULL),
+                                      cache: bool = Query(True)):
+    """
+    Analyse un lot de portraits envoyés en multipart (champ ``images`` répété) ou dans
+    une archive zip.
+    
+    Les images sont analysées en parallèle par les processus d'inférence, Face Mesh en
+    mode image fixe. La réponse est un flux NDJSON : une ligne par image, dans l'ordre
+    de fin des analyses, portant son rang (``index``), son nom (``filename``) et soit le
+    résultat, soit l'erreur (``error``).
+    """
+    try:
+        landmark_indices = FaceDetectorService.resolve_landmark_projection(projection)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "message": str(e)})
+    concurrency = settings.detect_batch_concurrency or 2 * max(settings.inference_workers, 1)
+    use_cache = cache and detect_cache.enabled
+    
+    async def analyze(contents: bytes):
+        key = content_key(contents) if use_cache else None
+        outcome = detect_cache.get(key) if use_cache else None
+        if outcome is None:
+            outcome = await inference_executor.process_still(contents)
+            if use_cache:
+                detect_cache.put(key, outcome)
+        return outcome
+    
+    async def lines():
+        uploaded = iter_uploaded_images(images, settings.detect_batch_max_images,
+                                        settings.detect_batch_max_image_bytes)
+        async for index, filename, outcome, error in analyze_concurrently(uploaded, analyze, concurrency):
+            line = {"index": index, "filename": filename, "success": error is None}
+            if error is not None:
+                line["error"] = str(error)
+            else:
+                line["landmarks"] = outcome[0].serialize(landmark_format, landmark_indices)
+                line["glasses_position"] = outcome[1].dict()
+                if len(outcome) > 2:
+                    line["faces"] = [face.serialize(landmark_format, landmark_indices) for face in outcome[2]]
+            yield json.dumps(line) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.post("/detect/video")
+async def detect_face_landmarks_video(video: UploadFile = File(...),
+                                      stride: int = Query(1, ge=1),
+                                      max_side: int = Query(0, ge=0),
+                                      start_frame: int = Query(0, ge=0),
+                                      landmark_format: str = Query(LANDMARK_FORMAT_COMPACT,
+                                                                   regex=f"^({LANDMARK_FORMAT_LEGACY}|{LANDMARK_FORMAT_COMPACT})$"),
+                                      projection: str = Query(PROJECTION_FULL)):
+    """
+    Calcule la position des lunettes pour chaque image d'une vidéo enregistrée.
+    
+    La vidéo est analysée en mode suivi, dans une session dédiée dont le filtre de
+    Kalman suit la chronologie du clip. ``stride`` n'analyse qu'une image sur ``stride``,
+    ``max_side`` limite la résolution analysée et ``start_frame`` reprend le traitement
+    à une image donnée. La réponse est un flux NDJSON : une ligne ``metadata``, une
+    ligne ``frame`` par image analysée (rang, instant en secondes, résultat ou
+    erreur), puis une ligne ``end``.
+    """
+    try:
+        landmark_indices = FaceDetectorService.resolve_landmark_projection(projection)
+        suffix = os.path.splitext(video.filename or "")[1]
+        path = await run_in_threadpool(spool_upload, video.file, settings.video_max_bytes, suffix)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "message": str(e)})
+    try:
+        reader = await run_in_threadpool(VideoReader, path, stride, max_side, start_frame)
+    except ValueError as e:
+        remove_file(path)
+        return JSONResponse(status_code=400, content={"success": False, "message": str(e)})
+    # La vidéo a son propre état de suivi, comme une connexion WebSocket
+    session_id = f"video-{uuid.uuid4().hex}"
+    try:
+        inference_executor.open_session(session_id)
+    except SessionLimitError as e:
+        reader.close()
+        remove_file(path)
+        return JSONResponse(status_code=503, content={"success": False, "message": str(e)})
+    
+    async def lines():
+        frames = 0
+        try:
+            yield json.dumps({"type": "metadata", **reader.metadata()}) + "\n"
+            async for frame, timestamp, outcome, error in track_video(
+                    inference_executor, session_id, reader, settings.video_pipeline_depth):
+                line = {"type": "frame", "frame": frame, "timestamp": timestamp, "success": error is None}
+                if error is not None:
+                    line["error"] = str(error)
+                else:
+                    line["measured"] = outcome[0].measured
+                    line["landmarks"] = outcome[0].serialize(landmark_format, landmark_indices)
+                    line["glasses_position"] = outcome[1].dict()
+                    if len(outcome) > 2:
+                        line["faces"] = [face.serialize(landmark_format, landmark_indices) for face in outcome[2]]
+                frames += 1
+                yield json.dumps(line) + "\n"
+            yield json.dumps({"type": "end", "frames": frames, "next_frame": reader.next_frame}) + "\n"
+        finally:
+            inference_executor.close_session(session_id)
+            # La fermeture attend la lecture éventuellement en cours (client déconnecté)
+            await run_in_threadpool(reader.close)
+            remove_file(path)
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def server_timing(timings: dict) -> str:
+    """Valeur de l'en-tête ``Server-Timing`` pour des durées exprimées en secondes."""
+    return ", ".join(f"{name};dur={duration * 1000:.2f}" for name, duration in timings.items())
+
+@router.get("/stats")
+async def inference_stats():
+    """
+    Statistiques de l'inférence : sessions, profondeur de file, taille des micro-lots
+    et cache de ``/detect``.
+    """
+    return {**inference_executor.stats(), "detect_cache": detect_cache.stats()}
+
 @router.get("/test")
 async def test_face_detection():
     """
@@ -0,0 +1,48 @@
+"""
+Sondes et métriques du service d'essayage.
+
+``/ready`` ne répond 200 qu'une fois les processus d'inférence démarrés et leurs
+instances Face Mesh préchauffées : un réplica ne reçoit ainsi aucune image avant de
+pouvoir la traiter à pleine vitesse. ``/metrics`` expose les métriques au format
+Prometheus.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, Response
+
+from .. import uptime
+from ..utils.metrics import CONTENT_TYPE, registry
+from ..utils.process_memory import process_memory, total_memory
+from . import face_detection
+
+router = APIRouter()
+
+
+@router.get("/ready")
+async def ready():
+    """
+    Sonde de disponibilité : 503 tant que le préchauffage de l'inférence n'est pas terminé.
+    """
+    report = face_detection.startup_report
+    content = {"ready": face_detection.inference_executor.ready, **report}
+    if not content["ready"]:
+        content["elapsed_seconds"] = uptime()
+    return JSONResponse(status_code=200 if content["ready"] else 503, content=content)
+
+
+@router.get("/metrics")
+async def metrics():
+    """
+    Métriques au format texte Prometheus : durée de chaque étape, échecs de détection,
+    état de l'inférence, du cache de ``/detect`` et du démarrage, mémoire du processus
+    (RSS, PSS, USS) et de ses processus d'inférence.
+    """
+    gauges = {
+        "essayage_inference": face_detection.inference_executor.stats(),
+        "essayage_detect_cache": face_detection.detect_cache.stats(),
+        "essayage": {key: value for key, value in face_detection.startup_report.items()
+                     if key.endswith("_seconds")},
+        "essayage_process": process_memory(),
+        "essayage_inference_processes": total_memory(face_detection.inference_executor.worker_pids()),
+    }
+    return Response(registry.render(gauges), media_type=CONTENT_TYPE)
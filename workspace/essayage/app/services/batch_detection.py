@@ -0,0 +1,133 @@
+"""
+Analyse par lot de portraits (endpoint ``/detect/batch``).
+
+Les images d'un lot, envoyées en multipart ou dans une archive zip, sont lues une à
+une et soumises aux processus d'inférence par une fenêtre glissante : au plus
+``concurrency`` images sont en mémoire à la fois, quelle que soit la taille du lot.
+Les résultats sont rendus dans l'ordre où les analyses se terminent.
+
+Functions:
+    iter_uploaded_images: Parcourt les images d'un envoi multipart ou d'une archive zip.
+    analyze_concurrently: Analyse des images avec un nombre borné d'analyses en cours.
+"""
+
+import asyncio
+import logging
+import zipfile
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, List, Optional, Tuple, Union
+
+from fastapi import UploadFile
+
+logger = logging.getLogger(__name__)
+
+# Types MIME d'une archive zip
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+
+
+def is_zip_upload(upload: UploadFile) -> bool:
+    """Indique si un fichier envoyé est une archive zip."""
+    return upload.content_type in ZIP_CONTENT_TYPES or (upload.filename or "").lower().endswith(".zip")
+
+
+def iter_uploaded_images(uploads: List[UploadFile], max_images: int,
+                         max_image_bytes: int) -> Iterator[Tuple[str, Union[bytes, Exception]]]:
+    """
+    Parcourt les images d'un envoi, une à la fois.
+
+    Les archives zip sont lues entrée par entrée (les répertoires sont ignorés). Une
+    image trop volumineuse, ou au-delà de ``max_images``, est signalée par une erreur
+    sans être lue. Les lectures sont bloquantes : le parcours s'effectue hors de la
+    boucle d'événements.
+
+    Args:
+        uploads: Fichiers envoyés
+        max_images: Nombre maximum d'images analysées
+        max_image_bytes: Taille maximale (octets) d'une image
+
+    Returns:
+        Un itérateur de couples (nom du fichier, octets de l'image ou erreur)
+    """
+    count = 0
+    for upload in uploads:
+        if is_zip_upload(upload):
+            try:
+                archive = zipfile.ZipFile(upload.file)
+            except zipfile.BadZipFile as e:
+                yield upload.filename, ValueError(f"Invalid zip archive: {e}")
+                continue
+            with archive:
+                for entry in archive.infolist():
+                    if entry.is_dir():
+                        continue
+                    count += 1
+                    if count > max_images:
+                        yield entry.filename, ValueError(f"Batch limited to {max_images} images")
+                        continue
+                    if entry.file_size > max_image_bytes:
+                        yield entry.filename, ValueError(f"Image larger than {max_image_bytes} bytes")
+                        continue
+                    try:
+                        yield entry.filename, archive.read(entry)
+                    except (zipfile.BadZipFile, OSError, RuntimeError) as e:
+                        yield entry.filename, ValueError(f"Unreadable zip entry: {e}")
+            continue
+        count += 1
+        if count > max_images:
+            yield upload.filename, ValueError(f"Batch limited to {max_images} images")
+            continue
+        contents = upload.file.read(max_image_bytes + 1)
+        if len(contents) > max_image_bytes:
+            yield upload.filename, ValueError(f"Image larger than {max_image_bytes} bytes")
+            continue
+        yield upload.filename, contents
+
+
+async def analyze_concurrently(images: Iterator[Tuple[str, Union[bytes, Exception]]],
+                               analyze: Callable[[bytes], Awaitable[Any]],
+                               concurrency: int) -> AsyncIterator[Tuple[int, str, Any, Optional[Exception]]]:
+    """
+    Analyse des images avec au plus ``concurrency`` analyses en cours.
+
+    Args:
+        images: Couples (nom du fichier, octets de l'image ou erreur), parcourus hors
+            de la boucle d'événements
+        analyze: Analyse d'une image
+        concurrency: Nombre maximum d'images en cours d'analyse
+
+    Returns:
+        Un itérateur asynchrone de tuples (rang de l'image, nom du fichier, résultat,
+        erreur), dans l'ordre de fin des analyses
+    """
+    loop = asyncio.get_running_loop()
+    pending = set()
+    exhausted = False
+    index = 0
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                item = await loop.run_in_executor(None, next, images, None)
+                if item is None:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(_analyze_one(index, *item, analyze)))
+                index += 1
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # Client déconnecté : les analyses restantes sont abandonnées
+        for task in pending:
+            task.cancel()
+
+
+async def _analyze_one(index: int, filename: str, contents: Union[bytes, Exception],
+                       analyze: Callable[[bytes], Awaitable[Any]]) -> Tuple[int, str, Any, Optional[Exception]]:
+    if isinstance(contents, Exception):
+        return index, filename, None, contents
+    try:
+        return index, filename, await analyze(contents), None
+    except Exception as e:
+        logger.debug("Échec de l'analyse de %s: %s", filename, e)
+        return index, filename, None, e
@@ -0,0 +1,110 @@
+"""
+Regroupement des images des sessions d'essayage en micro-lots.
+
+Les images des différentes connexions WebSocket attachées à un même processus
+d'inférence sont rassemblées pendant une courte fenêtre (``max_wait``) puis envoyées
+ensemble : un seul message par lot dans chaque sens, et une seule mise à jour des
+filtres de Kalman pour toutes les sessions du lot. Un lot part dès que chaque session
+du processus y a déposé une image, si bien qu'une session seule n'attend jamais.
+
+Classes:
+    BatchScheduler: Constitution et envoi des lots.
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, Hashable, List
+
+
+class BatchScheduler:
+    """
+    Constitue des lots par destination et les envoie au plus tard après ``max_wait``.
+
+    Doit être utilisé depuis la boucle d'événements.
+
+    Attributes:
+        max_wait: Attente maximale (s) d'une image avant l'envoi de son lot
+        max_batch_size: Taille maximale d'un lot
+        batches: Nombre de lots envoyés
+        frames: Nombre d'images envoyées
+        largest_batch: Taille du plus grand lot envoyé
+        last_batch_size: Taille du dernier lot envoyé
+    """
+
+    def __init__(self, dispatch: Callable[[Hashable, List[Any]], None], max_wait: float = 0.004,
+                 max_batch_size: int = 16):
+        """
+        Initialise le planificateur.
+
+        Args:
+            dispatch: Fonction appelée avec la destination et les éléments de chaque lot
+            max_wait: Attente maximale (s) d'une image avant l'envoi de son lot
+            max_batch_size: Taille maximale d'un lot
+        """
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+        self._dispatch = dispatch
+        self._batches: Dict[Hashable, List[Any]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self.batches = 0
+        self.frames = 0
+        self.largest_batch = 0
+        self.last_batch_size = 0
+
+    @property
+    def queued(self) -> int:
+        """Nombre d'éléments en attente d'envoi."""
+        return sum(len(batch) for batch in self._batches.values())
+
+    def submit(self, key: Hashable, item: Any, expected: int = 0) -> None:
+        """
+        Ajoute un élément au lot d'une destination.
+
+        Args:
+            key: Destination du lot (processus d'inférence)
+            item: Élément à envoyer
+            expected: Nombre d'éléments attendus au plus pour cette destination ; le lot
+                part dès qu'il est atteint
+        """
+        batch = self._batches.setdefault(key, [])
+        batch.append(item)
+        if self.max_wait <= 0 or len(batch) >= min(self.max_batch_size, max(expected, 1)):
+            self.flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = asyncio.get_running_loop().call_later(self.max_wait, self.flush, key)
+
+    def flush(self, key: Hashable) -> None:
+        """Envoie immédiatement le lot d'une destination."""
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._batches.pop(key, None)
+        if not batch:
+            return
+        self.batches += 1
+        self.frames += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.last_batch_size = len(batch)
+        self._dispatch(key, batch)
+
+    def discard(self, key: Hashable) -> List[Any]:
+        """
+        Abandonne le lot en attente d'une destination.
+
+        Returns:
+            Les éléments abandonnés
+        """
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        return self._batches.pop(key, [])
+
+    def stats(self) -> dict:
+        """Statistiques des lots envoyés."""
+        return {
+            "queued_frames": self.queued,
+            "batches": self.batches,
+            "batched_frames": self.frames,
+            "mean_batch_size": self.frames / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "last_batch_size": self.last_batch_size,
+        }
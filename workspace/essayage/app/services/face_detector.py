@@ -7,15 +7,145 @@ de repère du visage et calcule la position, la rotation et l'échelle des lunet
 
 Classes:
     FaceDetectorService: Service principal de détection faciale.
+
+Functions:
+    create_face_mesh: Construit une instance MediaPipe Face Mesh configurée pour le suivi.
+    scale_result: Ramène un résultat aux dimensions de l'image d'origine.
 """
 
-import mediapipe as mp
 import numpy as np
 from fastapi import UploadFile
 import cv2
-from ..models.face import FaceLandmarks, Point2D, Point3D, GlassesPosition
-from .kalman_filter import KalmanFilter3D
+from ..models.face import (
+    CompactLandmarks, Point3D, GlassesPosition, TrackedFace,
+    PROJECTION_CONTOUR, PROJECTION_FULL, PROJECTION_GLASSES, PROJECTION_NONE
+)
+from ..utils.image_decoding import MAX_IMAGE_BYTES, MAX_IMAGE_PIXELS, check_image_bytes, decode_image
+from ..utils.metrics import DETECTION_FAILURES, FALLBACK_RESPONSES, PREDICTED_FRAMES, STAGE_SECONDS
+from .face_tracker import FaceTrack, FaceTracker
+from .kalman_filter import KalmanFilterBank, PoseFilter
+import struct
 import time
+from typing import List, Optional, Union
+
+# Nombre de points de repère produits avec refine_landmarks=True
+MAX_LANDMARKS = 478
+
+# État de suivi exporté : version, indicateurs (filtre initialisé, région du visage),
+# échecs consécutifs, instant (horloge murale) de l'export, âges (s) de la dernière
+# mesure du filtre et de la dernière détection, région du visage (x0, y0, x1, y1) ;
+# suivi de l'état du filtre de Kalman en float32
+TRACKING_STATE_VERSION = 1
+TRACKING_STATE_HEADER = struct.Struct("<BBHddd4f")
+_STATE_FILTER_INITIALIZED = 1
+_STATE_FACE_BOX = 2
+
+
+def create_face_mesh(max_num_faces: int = 1, static_image_mode: bool = False, refine_landmarks: bool = True):
+    """
+    Construit une instance MediaPipe Face Mesh configurée pour le suivi vidéo.
+
+    Args:
+        max_num_faces: Nombre maximum de visages détectés par image
+        static_image_mode: Traiter chaque image indépendamment (images fixes), sans
+            réutiliser le visage suivi dans l'image précédente
+        refine_landmarks: Affiner les yeux et les lèvres et ajouter les 10 points de
+            l'iris (modèle supplémentaire, 478 points au lieu de 468)
+
+    Returns:
+        Instance de MediaPipe Face Mesh
+    """
+    # Import différé : près d'une seconde, inutile au processus principal lorsque
+    # l'inférence a lieu dans des processus de travail
+    import mediapipe as mp
+    return mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=static_image_mode,
+        max_num_faces=max_num_faces,
+        min_detection_confidence=0.7,
+        min_tracking_confidence=0.7,
+        refine_landmarks=refine_landmarks
+    )
+
+
+def _as_landmark_array(landmarks) -> np.ndarray:
+    """Convertit des points de repère (tableau ou objets ``x``/``y``/``z``) en tableau (N, 3)."""
+    if isinstance(landmarks, np.ndarray):
+        return landmarks.astype(np.float64, copy=False)
+    return np.array([(landmark.x, landmark.y, landmark.z) for landmark in landmarks], dtype=np.float64)
+
+
+def pose_to_glasses_position(pose: np.ndarray) -> GlassesPosition:
+    """Construit une ``GlassesPosition`` à partir d'une pose (position, rotation, échelle)."""
+    x, y, z, rotation_x, rotation_y, rotation_z, scale_x, scale_y, scale_z = pose.tolist()
+    return GlassesPosition(
+        position=Point3D(x=x, y=y, z=z),
+        rotation=Point3D(x=rotation_x, y=rotation_y, z=rotation_z),
+        scale=Point3D(x=scale_x, y=scale_y, z=scale_z)
+    )
+
+
+def scale_result(result: tuple, width: int, height: int) -> tuple:
+    """
+    Ramène un résultat obtenu sur une image décodée à résolution réduite aux dimensions
+    de l'image d'origine.
+
+    Les coordonnées des points de repère, la position et l'échelle des lunettes sont
+    proportionnelles à la taille de l'image ; la profondeur et la rotation n'en dépendent pas.
+
+    Args:
+        result: Tuple (points de repère, position des lunettes[, visages suivis])
+        width: Largeur de l'image d'origine
+        height: Hauteur de l'image d'origine
+
+    Returns:
+        Le résultat, inchangé si l'image a été analysée à sa taille d'origine
+    """
+    landmarks = result[0]
+    if (landmarks.image_width, landmarks.image_height) == (width, height):
+        return result
+    scale_x, scale_y = width / landmarks.image_width, height / landmarks.image_height
+    factors = np.array([scale_x, scale_y, scale_x], dtype=np.float32)
+
+    def scale_landmarks(item: CompactLandmarks) -> CompactLandmarks:
+        return CompactLandmarks(item.points * factors, width, height, measured=item.measured)
+
+    def scale_position(item: GlassesPosition) -> GlassesPosition:
+        return GlassesPosition(
+            position=Point3D(x=item.position.x * scale_x, y=item.position.y * scale_y, z=item.position.z),
+            rotation=item.rotation,
+            scale=Point3D(x=item.scale.x * scale_x, y=item.scale.y * scale_x, z=item.scale.z * scale_x)
+        )
+
+    scaled = (scale_landmarks(landmarks), scale_position(result[1]))
+    if len(result) > 2:
+        scaled += ([TrackedFace(face.track_id, scale_landmarks(face.landmarks), scale_position(face.glasses_position))
+                    for face in result[2]],)
+    return scaled
+
+
+def _predict_face(landmarks: CompactLandmarks, pose_filter: PoseFilter, measured_pose: np.ndarray,
+                  timestamp: float) -> tuple[CompactLandmarks, GlassesPosition]:
+    """
+    Prédit la pose d'un visage et translate ses derniers points de repère d'autant.
+
+    Args:
+        landmarks: Derniers points de repère mesurés
+        pose_filter: Filtre de Kalman du visage
+        measured_pose: Pose filtrée lors de la dernière mesure
+        timestamp: Instant (s) de l'image
+
+    Returns:
+        Tuple contenant les points de repère prédits et la position prédite
+    """
+    pose = pose_filter.predict(timestamp)
+    points = landmarks.points.copy()
+    points[:, :2] += (pose[0:2] - measured_pose[0:2]).astype(np.float32)
+    # L'échelle prédite reste positive même en cas de mouvement brusque
+    pose[6:9] = np.maximum(pose[6:9], measured_pose[6:9] * 0.5)
+    glasses_position = pose_to_glasses_position(pose)
+    return (CompactLandmarks(points, landmarks.image_width, landmarks.image_height, measured=False),
+            glasses_position)
+
 
 class FaceDetectorService:
     """
@@ -27,15 +157,24 @@ class FaceDetectorService:
     
     Attributes:
         face_mesh: Instance de MediaPipe Face Mesh
-        kalman_filter: Filtre de Kalman pour le lissage des mouvements
+        kalman_filter: Filtre de Kalman lissant la pose (position, rotation, échelle)
         last_position: Dernière position connue des lunettes
+        last_landmarks: Derniers points de repère détectés
         smoothing_factor: Facteur de lissage pour les mouvements
         detection_history: Historique des détections
         consecutive_failures: Nombre d'échecs consécutifs de détection
         max_consecutive_failures: Nombre maximum d'échecs consécutifs tolérés
         recovery_delay: Délai de récupération en secondes
         last_detection_time: Temps de la dernière détection
+        face_box: Boîte englobante (x0, y0, x1, y1) du dernier visage détecté, en pixels
+        motion: Dernière estimation du mouvement (0 : immobile, 1 : seuil atteint)
+        skipped_frames: Nombre d'images prédites depuis la dernière analyse
+        max_faces: Nombre maximum de visages suivis
+        tracker: Suivi des visages en mode multi-visages (None en mode mono-visage)
     """
+
+    # Côté (pixels) de la vignette du visage comparée d'une image à l'autre
+    THUMBNAIL_SIZE = 32
     
     # Points clés pour les lunettes (indices des points MediaPipe)
     # Points des yeux
@@ -75,34 +214,197 @@ class FaceDetectorService:
     LEFT_CHEEK = 123
     RIGHT_CHEEK = 352
 
-    def __init__(self):
+    # Points nécessaires au rendu des lunettes
+    GLASSES_KEYPOINTS = (
+        LEFT_EYE_OUTER, LEFT_EYE_INNER, RIGHT_EYE_OUTER, RIGHT_EYE_INNER,
+        LEFT_EYE_TOP, LEFT_EYE_BOTTOM, RIGHT_EYE_TOP, RIGHT_EYE_BOTTOM,
+        NOSE_BRIDGE, NOSE_TIP, NOSE_BOTTOM, NOSE_LEFT, NOSE_RIGHT,
+        LEFT_TEMPLE, RIGHT_TEMPLE,
+        FACE_LEFT, FACE_RIGHT, FACE_TOP, FACE_BOTTOM,
+        LEFT_EYEBROW_INNER, LEFT_EYEBROW_OUTER, RIGHT_EYEBROW_INNER, RIGHT_EYEBROW_OUTER,
+        LEFT_CHEEK, RIGHT_CHEEK
+    )
+
+    # Points utilisés par le calcul de la pose, dans l'ordre de ``estimate_glasses_poses``
+    _GEOMETRY_INDEX = np.array([
+        LEFT_EYE_OUTER, LEFT_EYE_INNER, RIGHT_EYE_OUTER, RIGHT_EYE_INNER,
+        LEFT_EYE_TOP, LEFT_EYE_BOTTOM, RIGHT_EYE_TOP, RIGHT_EYE_BOTTOM,
+        NOSE_BRIDGE, NOSE_TIP, NOSE_BOTTOM, LEFT_TEMPLE, RIGHT_TEMPLE,
+        LEFT_EYEBROW_INNER, RIGHT_EYEBROW_INNER, LEFT_EYEBROW_OUTER, RIGHT_EYEBROW_OUTER,
+        LEFT_CHEEK, RIGHT_CHEEK
+    ])
+
+    # Contour du visage, dans l'ordre du tracé MediaPipe (FACEMESH_FACE_OVAL)
+    FACE_CONTOUR = (
+        10, 338, 297, 332, 284, 251, 389, 356, 454, 323, 361, 288, 397, 365, 379, 378, 400, 377,
+        152, 148, 176, 149, 150, 136, 172, 58, 132, 93, 234, 127, 162, 21, 54, 103, 67, 109
+    )
+
+    @classmethod
+    def resolve_landmark_projection(cls, projection: Optional[str]) -> Optional[tuple]:
+        """
+        Traduit une projection de points de repère en liste d'indices.
+        
+        Args:
+            projection: ``none``, ``glasses``, ``contour``, ``full`` ou une liste
+                d'indices séparés par des virgules (``33,263,168``)
+            
+        Returns:
+            Les indices à renvoyer, ou None pour l'ensemble des points
+            
+        Raises:
+            ValueError: Si la projection est invalide
+        """
+        if projection is None or projection == PROJECTION_FULL:
+            return None
+        if projection == PROJECTION_NONE:
+            return ()
+        if projection == PROJECTION_GLASSES:
+            return cls.GLASSES_KEYPOINTS
+        if projection == PROJECTION_CONTOUR:
+            return cls.FACE_CONTOUR
+        try:
+            indices = tuple(int(index) for index in projection.split(","))
+        except ValueError:
+            raise ValueError(f"Invalid landmark projection: {projection}")
+        if not all(0 <= index < MAX_LANDMARKS for index in indices):
+            raise ValueError(f"Landmark indices must be between 0 and {MAX_LANDMARKS - 1}")
+        return indices
+
+    def __init__(self, face_mesh=None, roi_tracking: bool = True, roi_size: int = 256,
+                 roi_padding: float = 0.3, detection_max_side: int = 640,
+                 pose_filter: Optional[PoseFilter] = None, frame_skipping: bool = True,
+                 max_skip_frames: int = 3, motion_threshold: float = 4.0, velocity_threshold: float = 0.01,
+                 max_faces: int = 1, decode_target_side: int = 0, max_image_pixels: int = MAX_IMAGE_PIXELS):
         """
         Initialise le service de détection faciale.
         
         Configure MediaPipe Face Mesh avec les paramètres optimaux pour la détection
         et le suivi en temps réel. Initialise également le filtre de Kalman et les
         variables de suivi.
+        
+        Args:
+            face_mesh: Instance Face Mesh à utiliser (par exemple empruntée à un pool).
+                Une nouvelle instance est créée si absente.
+            roi_tracking: Analyser uniquement la région du visage suivi
+            roi_size: Côté (pixels) de la région du visage passée à Face Mesh
+            roi_padding: Marge ajoutée de chaque côté du visage, relative à sa taille
+            detection_max_side: Plus grand côté de l'image lors d'une détection complète
+            pose_filter: Filtre de pose à utiliser (par exemple un emplacement de la banque
+                des sessions). Un filtre indépendant est créé si absent.
+            frame_skipping: Prédire la pose au lieu d'analyser l'image lorsque la tête bouge peu
+            max_skip_frames: Nombre maximum d'images prédites entre deux analyses
+            motion_threshold: Écart moyen (niveaux de gris) de la vignette du visage au-delà
+                duquel chaque image est analysée
+            velocity_threshold: Vitesse (fraction de la largeur du visage, ou radians, par
+                image) au-delà de laquelle chaque image est analysée
+            max_faces: Nombre maximum de visages suivis. Au-delà de 1, chaque visage reçoit
+                un identifiant de piste et son propre filtre de Kalman pris dans la banque
+                de ``pose_filter`` ; l'analyse de la région du visage et le saut d'images
+                sont alors désactivés.
+            decode_target_side: Plus grand côté (pixels) conservé lors du décodage réduit
+                d'une image JPEG (0 : pleine résolution)
+            max_image_pixels: Nombre maximum de pixels d'une image encodée
         """
-        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=1,
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.7,
-            refine_landmarks=True
-        )
-        self.kalman_filter = KalmanFilter3D()
+        self.max_faces = max_faces
+        self.face_mesh = face_mesh if face_mesh is not None else create_face_mesh(max_faces)
+        if pose_filter is None:
+            pose_filter = PoseFilter(KalmanFilterBank(max_faces + 1)) if max_faces > 1 else PoseFilter()
+        self.kalman_filter = pose_filter
+        self.tracker = FaceTracker(pose_filter.bank, max_faces) if max_faces > 1 else None
         self.last_position = None
+        self.last_landmarks = None
         self.smoothing_factor = 0.05
         self.detection_history = []
         self.consecutive_failures = 0
         self.max_consecutive_failures = 3
         self.recovery_delay = 0.3
         self.last_detection_time = 0
+        self.roi_tracking = roi_tracking and self.tracker is None
+        self.roi_size = roi_size
+        self.roi_padding = roi_padding
+        self.detection_max_side = detection_max_side
+        self.decode_target_side = decode_target_side
+        self.max_image_pixels = max_image_pixels
+        self.face_box = None
+        self.frame_skipping = frame_skipping and self.tracker is None
+        self.max_skip_frames = max_skip_frames
+        self.motion_threshold = motion_threshold
+        self.velocity_threshold = velocity_threshold
+        self.motion = 1.0
+        self.skipped_frames = 0
+        self._thumbnail = None
+        self._measured_pose = np.zeros(9)
+        self._timestamp = 0.0
+
+    def release_filters(self) -> None:
+        """Rend à leur banque les filtres de Kalman du détecteur et de ses pistes."""
+        if self.tracker is not None:
+            self.tracker.reset()
+        self.kalman_filter.release()
+
+    def export_state(self) -> Optional[bytes]:
+        """
+        Sérialise l'état de suivi, pour reprendre la session dans un autre processus.
+
+        L'état comprend le filtre de Kalman, la région du visage suivi et le compteur
+        d'échecs, soit un peu plus de 200 octets ; les instants y sont exprimés en âges,
+        si bien qu'il reste valable sur une autre machine. Les points de repère n'en font
+        pas partie : la reprise analyse directement la région du visage, et le saut
+        d'images reprend après la première analyse.
+
+        Returns:
+            L'état sérialisé, ou None en mode multi-visages (non exporté)
+        """
+        if self.tracker is not None:
+            return None
+        pose_filter = self.kalman_filter
+        flags = (_STATE_FILTER_INITIALIZED if pose_filter.initialized else 0) | \
+            (_STATE_FACE_BOX if self.face_box is not None else 0)
+        header = TRACKING_STATE_HEADER.pack(
+            TRACKING_STATE_VERSION, flags, min(self.consecutive_failures, 0xFFFF), time.time(),
+            time.monotonic() - pose_filter.last_time, time.time() - self.last_detection_time,
+            *(self.face_box if self.face_box is not None else (0.0,) * 4)
+        )
+        return header + pose_filter.export_state().tobytes()
+
+    def restore_state(self, state: bytes) -> None:
+        """
+        Restaure un état de suivi exporté par ``export_state``.
+
+        Les âges sont prolongés du temps écoulé depuis l'export.
+
+        Args:
+            state: État sérialisé
 
-    async def detect_landmarks(self, image: UploadFile) -> tuple[FaceLandmarks, GlassesPosition]:
+        Raises:
+            ValueError: Si l'état est invalide, d'une autre version ou si le détecteur
+                est en mode multi-visages
+        """
+        dims = self.kalman_filter.bank.dims
+        if self.tracker is not None:
+            raise ValueError("Tracking state cannot be restored in multi-face mode")
+        if len(state) != TRACKING_STATE_HEADER.size + 5 * dims * 4 or state[0] != TRACKING_STATE_VERSION:
+            raise ValueError("Invalid or unsupported tracking state")
+        _, flags, failures, exported_at, filter_age, detection_age, *face_box = \
+            TRACKING_STATE_HEADER.unpack_from(state)
+        elapsed = max(time.time() - exported_at, 0.0)
+        self.kalman_filter.reset()
+        if flags & _STATE_FILTER_INITIALIZED:
+            filter_state = np.frombuffer(state, np.float32, offset=TRACKING_STATE_HEADER.size).reshape(5, dims)
+            self.kalman_filter.restore_state(filter_state, time.monotonic() - filter_age - elapsed)
+            self._measured_pose[:] = self.kalman_filter.value
+        self.face_box = tuple(face_box) if flags & _STATE_FACE_BOX else None
+        self.consecutive_failures = failures
+        self.last_detection_time = time.time() - detection_age - elapsed
+
+    async def detect_landmarks(self, image: UploadFile) -> tuple[CompactLandmarks, GlassesPosition]:
         """
         Détecte les points de repère du visage dans une image.
         
+        Une image JPEG peut être décodée à résolution réduite (``decode_target_side``) ;
+        les coordonnées renvoyées sont celles de l'image d'origine.
+        
         Args:
             image: Fichier image à analyser
             
@@ -110,14 +412,15 @@ class FaceDetectorService:
             Tuple contenant les points de repère du visage et la position des lunettes
             
         Raises:
-            ValueError: Si aucun visage n'est détecté ou si la qualité de détection est insuffisante
+            ValueError: Si l'image est trop volumineuse ou illisible, si aucun visage n'est
+                détecté ou si la qualité de détection est insuffisante
         """
-        contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        return self.process_image(img)
+        contents = await image.read(MAX_IMAGE_BYTES + 1)
+        check_image_bytes(len(contents))
+        decoded = decode_image(contents, self.decode_target_side, self.max_image_pixels, STAGE_SECONDS.observe)
+        return scale_result(self.process_rgb_image(decoded.rgb), decoded.width, decoded.height)
 
-    def process_image(self, img: np.ndarray) -> tuple[FaceLandmarks, GlassesPosition]:
+    def process_image(self, img: np.ndarray) -> tuple[CompactLandmarks, GlassesPosition]:
         """
         Traite une image pour détecter les points de repère du visage.
         
@@ -131,205 +434,582 @@ class FaceDetectorService:
             ValueError: Si aucun visage n'est détecté ou si la qualité de détection est insuffisante
         """
         # Convertir en RGB
-        rgb_image = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        return self.process_rgb_image(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+
+    def process_rgb_image(self, rgb_image: np.ndarray, timestamp: Optional[float] = None,
+                          load: float = 0.0) -> tuple[CompactLandmarks, GlassesPosition]:
+        """
+        Traite une image déjà au format RGB pour détecter les points de repère du visage.
+        
+        Lorsque la tête bouge peu, seule une image sur plusieurs est analysée : les
+        autres reçoivent la pose prédite par le filtre de Kalman, et leurs points de
+        repère portent ``measured=False``. L'intervalle entre deux analyses s'allonge
+        avec la charge du serveur.
+        
+        En mode multi-visages, le tuple comporte un troisième élément : la liste des
+        visages suivis (``TrackedFace``), le premier étant le visage principal.
+        
+        Args:
+            rgb_image: Image RGB de forme (hauteur, largeur, 3)
+            timestamp: Instant (s) de capture de l'image, pour le filtre de Kalman.
+                L'instant de traitement est utilisé si absent.
+            load: Charge du serveur, de 0 (libre) à 1 (saturé)
+            
+        Returns:
+            Tuple contenant les points de repère du visage et la position des lunettes
+            
+        Raises:
+            ValueError: Si aucun visage n'est détecté ou si la qualité de détection est insuffisante
+        """
+        result = self.process_batch([self], [rgb_image], [timestamp], load)[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    @classmethod
+    def process_batch(cls, detectors: list, rgb_images: list, timestamps: Optional[list] = None,
+                      load: float = 0.0) -> list:
+        """
+        Traite un lot d'images, une par détecteur.
+        
+        Face Mesh s'exécute image par image, chaque session ayant son propre graphe ;
+        la géométrie des lunettes est en revanche calculée pour tout le lot à la fois,
+        et les filtres de Kalman des sessions partageant une banque sont mis à jour en
+        une seule opération.
+        
+        Args:
+            detectors: Détecteurs, un par image et sans doublon
+            rgb_images: Images RGB à traiter
+            timestamps: Instants (s) de capture des images (None : instant de traitement)
+            load: Charge du serveur, de 0 (libre) à 1 (saturé)
+            
+        Returns:
+            Pour chaque image, le tuple (points de repère, position des lunettes[, visages
+            suivis]) ou l'exception levée par son traitement
+        """
+        timestamps = [time.monotonic() if timestamp is None else timestamp
+                      for timestamp in (timestamps or [None] * len(detectors))]
+        results = [None] * len(detectors)
+        
+        # Détection des points de repère
+        detected = []
+        for index, (detector, rgb_image, timestamp) in enumerate(zip(detectors, rgb_images, timestamps)):
+            try:
+                outcome = detector._detect(rgb_image, timestamp, load)
+            except Exception as e:
+                results[index] = e
+                continue
+            if isinstance(outcome, np.ndarray):
+                detected.append(index)
+            results[index] = outcome
+        
+        # Géométrie des lunettes pour tous les visages de toutes les images, groupés par
+        # nombre de points
+        by_count = {}
+        for index in detected:
+            by_count.setdefault(results[index].shape[1], []).append(index)
+        measured = []
+        for indices in by_count.values():
+            counts = [len(results[index]) for index in indices]
+            sizes = np.repeat(np.array([rgb_images[index].shape[1::-1] for index in indices], dtype=np.float32),
+                              counts, axis=0)
+            scale = np.column_stack([sizes, sizes[:, 0]])[:, None, :]
+            points = np.concatenate([results[index] for index in indices])
+            started = time.perf_counter()
+            poses, quality = cls.estimate_glasses_poses(points / scale, sizes[:, 0], sizes[:, 1])
+            STAGE_SECONDS.observe("geometry", time.perf_counter() - started)
+            rows = np.cumsum([0] + counts)
+            for start, end, index in zip(rows[:-1], rows[1:], indices):
+                try:
+                    results[index] = detectors[index]._accept(
+                        rgb_images[index], points[start:end], poses[start:end], quality[start:end],
+                        timestamps[index]
+                    )
+                except Exception as e:
+                    results[index] = e
+                    continue
+                if isinstance(results[index], (CompactLandmarks, list)):
+                    measured.append(index)
+        
+        # Lisser les poses mesurées : une seule mise à jour par banque de filtres
+        started = time.perf_counter()
+        banks = {id(detectors[index].kalman_filter.bank): detectors[index].kalman_filter.bank for index in measured}
+        for bank in banks.values():
+            bank.update_staged()
+        filtered = time.perf_counter()
+        STAGE_SECONDS.observe("kalman", filtered - started)
+        for index in measured:
+            results[index] = detectors[index]._finish(results[index])
+        if measured:
+            STAGE_SECONDS.observe("response", time.perf_counter() - filtered)
+        return results
+
+    def _detect(self, rgb_image: np.ndarray, timestamp: float, load: float) -> Union[np.ndarray, tuple]:
+        """
+        Détecte les points de repère du visage dans une image.
+        
+        Args:
+            rgb_image: Image RGB de forme (hauteur, largeur, 3)
+            timestamp: Instant (s) de capture de l'image
+            load: Charge du serveur, de 0 à 1
+            
+        Returns:
+            Les points (visages, N, 3) en pixels, ou directement la réponse (pose prédite
+            ou dernière position connue)
+            
+        Raises:
+            ValueError: Si aucun visage n'est détecté
+        """
         height, width = rgb_image.shape[:2]
         
-        # Utiliser l'image en pleine résolution
-        results = self.face_mesh.process(rgb_image)
+        if self._can_skip(width, height) and self._should_skip(self._face_thumbnail(rgb_image), load):
+            return self._create_predicted_response(width, height, timestamp)
+        
+        # Analyser la région du visage suivi, puis l'image réduite si le visage est perdu
+        points = None
+        if self.roi_tracking and self.face_box is not None:
+            points = self._detect_in_roi(rgb_image)
+        if points is None:
+            points = self._detect_in_frame(rgb_image)
         
         current_time = time.time()
         
-        if not results.multi_face_landmarks:
+        if points is None:
+            if self.tracker is not None:
+                self.tracker.update(np.zeros((0, 4)))
+            self.face_box = None
             self.consecutive_failures += 1
             if (self.last_position and 
                 self.consecutive_failures < self.max_consecutive_failures and
                 current_time - self.last_detection_time < self.recovery_delay):
-                return self._create_response_from_last_position(width, height)
+                return self._fallback(width, height, timestamp)
+            self.kalman_filter.reset()
+            DETECTION_FAILURES.inc("no_face")
             raise ValueError("No face detected in the image")
             
         # Réinitialiser le compteur d'échecs et mettre à jour le temps
         self.consecutive_failures = 0
         self.last_detection_time = current_time
+        return points
+
+    def _accept(self, rgb_image: np.ndarray, points: np.ndarray, poses: np.ndarray, quality: np.ndarray,
+                timestamp: float) -> Union[CompactLandmarks, List[FaceTrack], tuple]:
+        """
+        Valide une détection et dépose sa pose dans le filtre de Kalman.
+        
+        Args:
+            rgb_image: Image RGB analysée
+            points: Points (visages, N, 3) détectés, en pixels
+            poses: Poses des lunettes calculées pour chaque visage
+            quality: Verdict de qualité de chaque visage
+            timestamp: Instant (s) de capture de l'image
+            
+        Returns:
+            Les points de repère mesurés (ou, en mode multi-visages, les pistes mises à
+            jour), à compléter par ``_finish`` une fois les filtres mis à jour, ou la
+            dernière position connue si la qualité est insuffisante
+            
+        Raises:
+            ValueError: Si la qualité de détection est insuffisante
+        """
+        height, width = rgb_image.shape[:2]
         
-        # Convertir les landmarks en Point2D
-        landmarks = []
-        face_landmarks = results.multi_face_landmarks[0].landmark
+        if self.tracker is not None:
+            return self._accept_faces(points, poses, quality, width, height, timestamp)
         
         # Vérifier la qualité de la détection
-        if not self._is_detection_quality_good(face_landmarks):
-            self.consecutive_failures += 1
-            if (self.last_position and 
-                self.consecutive_failures < self.max_consecutive_failures and
-                current_time - self.last_detection_time < self.recovery_delay):
-                return self._create_response_from_last_position(width, height)
-            raise ValueError("Poor face detection quality")
-        
-        for landmark in face_landmarks:
-            landmarks.append(Point2D(
-                x=landmark.x * width,
-                y=landmark.y * height
-            ))
-        
-        # Calculer la position des lunettes
-        glasses_position = self._calculate_glasses_position(face_landmarks, width, height)
-        
-        # Mettre à jour le filtre de Kalman
-        position_array = np.array([
-            glasses_position.position.x,
-            glasses_position.position.y,
-            glasses_position.position.z
-        ])
-        
-        # Mettre à jour le filtre
-        filtered_position = self.kalman_filter.update(position_array)
-        
-        # Mettre à jour la position des lunettes
-        glasses_position.position = Point3D(
-            x=filtered_position[0],
-            y=filtered_position[1],
-            z=filtered_position[2]
-        )
+        if not quality[0]:
+            return self._reject(width, height, timestamp)
+        
+        points = points[0]
+        landmarks = CompactLandmarks(points, width, height)
+        self.face_box = (*points[:, :2].min(axis=0), *points[:, :2].max(axis=0))
+        self._thumbnail = self._face_thumbnail(rgb_image) if self.frame_skipping else None
+        self.kalman_filter.stage(poses[0], timestamp)
+        return landmarks
+
+    def _accept_faces(self, points: np.ndarray, poses: np.ndarray, quality: np.ndarray, width: int,
+                      height: int, timestamp: float) -> Union[List[FaceTrack], tuple]:
+        """
+        Associe les visages de bonne qualité aux pistes et dépose leurs poses.
+        
+        Args:
+            points: Points (visages, N, 3) détectés, en pixels
+            poses: Poses des lunettes calculées pour chaque visage
+            quality: Verdict de qualité de chaque visage
+            width: Largeur de l'image
+            height: Hauteur de l'image
+            timestamp: Instant (s) de capture de l'image
+            
+        Returns:
+            Les pistes mesurées dans cette image, ou la dernière position connue si aucun
+            visage n'est de qualité suffisante
+            
+        Raises:
+            ValueError: Si aucun visage n'est de qualité suffisante
+        """
+        good = np.flatnonzero(quality)
+        boxes = np.concatenate([points[good, :, :2].min(axis=1), points[good, :, :2].max(axis=1)], axis=1)
+        assignments = self.tracker.update(boxes)
+        if not assignments:
+            return self._reject(width, height, timestamp)
+        
+        tracks = []
+        for face, track in assignments:
+            row = good[face]
+            track.landmarks = CompactLandmarks(points[row], width, height)
+            track.pose_filter.stage(poses[row], timestamp)
+            tracks.append(track)
+        self._timestamp = timestamp
+        return tracks
+
+    def _reject(self, width: int, height: int, timestamp: float) -> tuple:
+        """
+        Traite une détection de qualité insuffisante.
+        
+        Returns:
+            La dernière position connue (voir ``_fallback``), si elle est assez récente
+            
+        Raises:
+            ValueError: Si aucune position récente n'est disponible
+        """
+        self.face_box = None
+        self.consecutive_failures += 1
+        if (self.last_position and 
+            self.consecutive_failures < self.max_consecutive_failures and
+            time.time() - self.last_detection_time < self.recovery_delay):
+            return self._fallback(width, height, timestamp)
+        DETECTION_FAILURES.inc("poor_quality")
+        raise ValueError("Poor face detection quality")
+
+    def _finish(self, landmarks: Union[CompactLandmarks, List[FaceTrack]]) -> tuple:
+        """
+        Construit la réponse d'une image mesurée à partir de la pose filtrée.
+        
+        Args:
+            landmarks: Points de repère (ou pistes) acceptés par ``_accept``
+            
+        Returns:
+            Tuple contenant les points de repère du visage et la position lissée des
+            lunettes, suivis en mode multi-visages de la liste des visages suivis
+        """
+        if self.tracker is not None:
+            return self._finish_faces(landmarks)
+        filtered = self.kalman_filter.value
+        self._measured_pose[:] = filtered
+        self.skipped_frames = 0
+        glasses_position = pose_to_glasses_position(filtered)
         
         # Stocker la dernière position
         self.last_position = glasses_position
+        self.last_landmarks = landmarks
             
-        return (
-            FaceLandmarks(
-                landmarks=landmarks,
-                image_width=width,
-                image_height=height
-            ),
-            glasses_position
-        )
+        return landmarks, glasses_position
 
-    def _is_detection_quality_good(self, landmarks) -> bool:
+    def _finish_faces(self, measured: List[FaceTrack]) -> tuple:
         """
-        Vérifie la qualité de la détection faciale.
+        Construit la réponse multi-visages une fois les filtres des pistes mis à jour.
+        
+        Les pistes non retrouvées dans cette image, mais pas encore abandonnées, reçoivent
+        leur pose prédite et des points de repère marqués ``measured=False``.
         
         Args:
-            landmarks: Points de repère détectés
+            measured: Pistes mesurées dans cette image
             
         Returns:
-            True si la qualité de détection est suffisante, False sinon
+            Tuple (points de repère, position des lunettes, visages suivis) dont les deux
+            premiers éléments décrivent le visage principal (plus petit identifiant)
         """
-        # Vérifier si les points clés sont présents
-        key_points = [
-            self.LEFT_EYE_OUTER, self.LEFT_EYE_INNER,
-            self.RIGHT_EYE_OUTER, self.RIGHT_EYE_INNER,
-            self.NOSE_BRIDGE, self.NOSE_TIP,
-            self.LEFT_TEMPLE, self.RIGHT_TEMPLE
-        ]
+        faces = []
+        for track_id in sorted(self.tracker.tracks):
+            track = self.tracker.tracks[track_id]
+            if track.landmarks is None:
+                continue
+            if track in measured:
+                track.measured_pose[:] = track.pose_filter.value
+                faces.append(TrackedFace(track_id, track.landmarks, pose_to_glasses_position(track.measured_pose)))
+            else:
+                faces.append(TrackedFace(track_id, *_predict_face(
+                    track.landmarks, track.pose_filter, track.measured_pose, self._timestamp
+                )))
         
-        for point in key_points:
-            if not (0 <= point < len(landmarks)):
-                return False
+        primary = faces[0]
+        self.skipped_frames = 0
+        self.last_position = primary.glasses_position
+        self.last_landmarks = primary.landmarks
+        return primary.landmarks, primary.glasses_position, faces
+
+    def _can_skip(self, width: int, height: int) -> bool:
+        """Indique si l'image courante peut être prédite plutôt qu'analysée."""
+        return (self.frame_skipping and self._thumbnail is not None and self.face_box is not None and
+                self.consecutive_failures == 0 and self.skipped_frames < self.max_skip_frames and
+                (self.last_landmarks.image_width, self.last_landmarks.image_height) == (width, height))
+
+    def _should_skip(self, thumbnail: np.ndarray, load: float) -> bool:
+        """
+        Estime le mouvement de la tête et décide de sauter l'analyse de l'image.
+        
+        Le mouvement combine l'écart entre la vignette du visage et celle de la dernière
+        analyse, et la vitesse estimée par le filtre de Kalman.
+        
+        Args:
+            thumbnail: Vignette du visage dans l'image courante
+            load: Charge du serveur, de 0 à 1
+            
+        Returns:
+            True si la pose peut être prédite
+        """
+        difference = cv2.absdiff(thumbnail, self._thumbnail).mean() / self.motion_threshold
+        velocity = self.kalman_filter.velocity
+        face_width = max(self.face_box[2] - self.face_box[0], 1.0)
+        speed = np.hypot(velocity[0], velocity[1]) / face_width + np.abs(velocity[3:6]).max()
+        self.motion = float(max(difference, speed / self.velocity_threshold))
         
-        # Vérifier la symétrie des yeux
-        left_eye_width = abs(landmarks[self.LEFT_EYE_OUTER].x - landmarks[self.LEFT_EYE_INNER].x)
-        right_eye_width = abs(landmarks[self.RIGHT_EYE_OUTER].x - landmarks[self.RIGHT_EYE_INNER].x)
-        eye_width_ratio = min(left_eye_width, right_eye_width) / max(left_eye_width, right_eye_width)
+        # Plus la tête est immobile et le serveur chargé, plus l'intervalle est long
+        stillness = max(0.0, 1.0 - self.motion)
+        budget = int(self.max_skip_frames * stillness * (0.5 + 0.5 * min(max(load, 0.0), 1.0)) + 0.5)
+        return self.skipped_frames < budget
+
+    def _face_thumbnail(self, rgb_image: np.ndarray) -> np.ndarray:
+        """Vignette en niveaux de gris de la région du dernier visage détecté."""
+        height, width = rgb_image.shape[:2]
+        x0, y0, x1, y1 = self.face_box
+        left, top = max(int(x0), 0), max(int(y0), 0)
+        right, bottom = min(int(x1) + 1, width), min(int(y1) + 1, height)
+        if right <= left or bottom <= top:
+            left, top, right, bottom = 0, 0, width, height
+        size = (self.THUMBNAIL_SIZE, self.THUMBNAIL_SIZE)
+        thumbnail = cv2.resize(rgb_image[top:bottom, left:right], size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(thumbnail, cv2.COLOR_RGB2GRAY)
+
+    def _create_predicted_response(self, width: int, height: int,
+                                   timestamp: float) -> tuple[CompactLandmarks, GlassesPosition]:
+        """
+        Crée une réponse à partir de la pose prédite par le filtre de Kalman.
         
-        if eye_width_ratio < 0.2:
-            return False
+        Les derniers points de repère sont translatés du déplacement prédit.
         
-        return True
+        Args:
+            width: Largeur de l'image
+            height: Hauteur de l'image
+            timestamp: Instant (s) de l'image
+            
+        Returns:
+            Tuple contenant les points de repère prédits et la position prédite
+        """
+        self.skipped_frames += 1
+        PREDICTED_FRAMES.inc()
+        return _predict_face(self.last_landmarks, self.kalman_filter, self._measured_pose, timestamp)
+
+    def _detect_in_roi(self, rgb_image: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Analyse la région carrée entourant le visage suivi.
+        
+        La région est agrandie de ``roi_padding``, ramenée à ``roi_size`` pixels de
+        côté, puis les points détectés sont replacés dans le repère de l'image.
+        
+        Args:
+            rgb_image: Image RGB complète
+            
+        Returns:
+            Points (1, N, 3) en pixels de l'image complète, ou None si aucun visage
+        """
+        height, width = rgb_image.shape[:2]
+        x0, y0, x1, y1 = self.face_box
+        side = max(x1 - x0, y1 - y0) * (1 + 2 * self.roi_padding)
+        side = int(min(side, width, height))
+        if side <= 0:
+            return None
+        # Centrer la région sur le visage en la gardant dans l'image
+        left = int(np.clip((x0 + x1 - side) / 2, 0, width - side))
+        top = int(np.clip((y0 + y1 - side) / 2, 0, height - side))
+        roi = rgb_image[top:top + side, left:left + side]
+        if side != self.roi_size:
+            interpolation = cv2.INTER_AREA if side > self.roi_size else cv2.INTER_LINEAR
+            roi = cv2.resize(roi, (self.roi_size, self.roi_size), interpolation=interpolation)
+        else:
+            roi = np.ascontiguousarray(roi)
+        points = self._run_face_mesh(roi)
+        if points is None:
+            return None
+        # Seul le visage suivi intéresse la région
+        points = points[:1] * side
+        points[..., 0] += left
+        points[..., 1] += top
+        return points
+
+    def _detect_in_frame(self, rgb_image: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Analyse l'image complète, réduite à ``detection_max_side`` pixels au plus.
+        
+        Args:
+            rgb_image: Image RGB complète
+            
+        Returns:
+            Points (visages, N, 3) en pixels de l'image complète, ou None si aucun visage
+        """
+        height, width = rgb_image.shape[:2]
+        scale = self.detection_max_side / max(height, width)
+        if scale < 1:
+            rgb_image = cv2.resize(rgb_image, (round(width * scale), round(height * scale)),
+                                   interpolation=cv2.INTER_AREA)
+        points = self._run_face_mesh(rgb_image)
+        if points is None:
+            return None
+        points *= np.array([width, height, width], dtype=np.float32)
+        return points
+
+    def _run_face_mesh(self, rgb_image: np.ndarray) -> Optional[np.ndarray]:
+        """Exécute Face Mesh et retourne les points normalisés (visages, N, 3), ou None."""
+        started = time.perf_counter()
+        results = self.face_mesh.process(rgb_image)
+        STAGE_SECONDS.observe("face_mesh", time.perf_counter() - started)
+        if not results.multi_face_landmarks:
+            return None
+        return np.array(
+            [[(landmark.x, landmark.y, landmark.z) for landmark in face.landmark]
+             for face in results.multi_face_landmarks[:self.max_faces]],
+            dtype=np.float32
+        )
+
+    def _is_detection_quality_good(self, landmarks) -> bool:
+        """
+        Vérifie la qualité de la détection faciale.
+        
+        Args:
+            landmarks: Points de repère détectés, normalisés (tableau (N, 3) ou
+                séquence d'objets ``x``/``y``/``z``)
+            
+        Returns:
+            True si la qualité de détection est suffisante, False sinon
+        """
+        _, quality = self.estimate_glasses_poses(_as_landmark_array(landmarks)[None], 1, 1)
+        return bool(quality[0])
 
     def _calculate_glasses_position(self, face_landmarks, width: int, height: int) -> GlassesPosition:
         """
         Calcule la position, la rotation et l'échelle des lunettes.
         
         Args:
-            face_landmarks: Points de repère du visage
+            face_landmarks: Points de repère du visage, normalisés (tableau (N, 3) ou
+                séquence d'objets ``x``/``y``/``z``)
             width: Largeur de l'image
             height: Hauteur de l'image
             
         Returns:
             Position, rotation et échelle des lunettes
         """
-        # Extraire les points clés
-        left_eye_outer = face_landmarks[self.LEFT_EYE_OUTER]
-        left_eye_inner = face_landmarks[self.LEFT_EYE_INNER]
-        right_eye_outer = face_landmarks[self.RIGHT_EYE_OUTER]
-        right_eye_inner = face_landmarks[self.RIGHT_EYE_INNER]
-        nose_bridge = face_landmarks[self.NOSE_BRIDGE]
-        nose_tip = face_landmarks[self.NOSE_TIP]
-        left_temple = face_landmarks[self.LEFT_TEMPLE]
-        right_temple = face_landmarks[self.RIGHT_TEMPLE]
-        
-        # Calculer le centre des yeux avec plus de points
-        left_eye_center_x = (left_eye_outer.x + left_eye_inner.x + 
-                           face_landmarks[self.LEFT_EYE_TOP].x + 
-                           face_landmarks[self.LEFT_EYE_BOTTOM].x) / 4
-        left_eye_center_y = (left_eye_outer.y + left_eye_inner.y + 
-                           face_landmarks[self.LEFT_EYE_TOP].y + 
-                           face_landmarks[self.LEFT_EYE_BOTTOM].y) / 4
-        right_eye_center_x = (right_eye_outer.x + right_eye_inner.x + 
-                            face_landmarks[self.RIGHT_EYE_TOP].x + 
-                            face_landmarks[self.RIGHT_EYE_BOTTOM].x) / 4
-        right_eye_center_y = (right_eye_outer.y + right_eye_inner.y + 
-                            face_landmarks[self.RIGHT_EYE_TOP].y + 
-                            face_landmarks[self.RIGHT_EYE_BOTTOM].y) / 4
-        
-        # Position X : centre entre les yeux
-        pos_x = (left_eye_center_x + right_eye_center_x) / 2 * width
-        
-        # Position Y : ajustée en fonction de la hauteur du nez et des sourcils
-        eye_center_y = (left_eye_center_y + right_eye_center_y) / 2
-        nose_height = nose_bridge.y - face_landmarks[self.NOSE_BOTTOM].y
-        eyebrow_height = (face_landmarks[self.LEFT_EYEBROW_INNER].y + 
-                         face_landmarks[self.RIGHT_EYEBROW_INNER].y) / 2
-        pos_y = (eye_center_y + (nose_height * 0.2) + (eyebrow_height - eye_center_y) * 0.3) * height
-        
-        # Position Z : améliorée avec la profondeur du nez et des joues
-        eye_distance = abs(right_eye_center_x - left_eye_center_x) * width
-        nose_depth = abs(nose_tip.z - nose_bridge.z)
-        cheek_depth = (face_landmarks[self.LEFT_CHEEK].z + face_landmarks[self.RIGHT_CHEEK].z) / 2
-        base_distance = width * 0.2
-        pos_z = -(base_distance / (eye_distance * (1 + nose_depth + cheek_depth))) * 100
-        
-        # Rotation X (pitch) : améliorée avec plus de points
-        dx_nose = nose_tip.x - nose_bridge.x
-        dy_nose = nose_tip.y - nose_bridge.y
-        dz_nose = nose_tip.z - nose_bridge.z
-        rotation_x = np.arctan2(dy_nose, np.sqrt(dx_nose**2 + dz_nose**2))
-        
-        # Rotation Y (yaw) : améliorée avec les tempes et les joues
-        eye_depth_diff = (right_eye_outer.z - left_eye_outer.z)
-        temple_depth_diff = (right_temple.z - left_temple.z)
-        cheek_depth_diff = (face_landmarks[self.RIGHT_CHEEK].z - face_landmarks[self.LEFT_CHEEK].z)
-        rotation_y = np.arctan2((eye_depth_diff + temple_depth_diff + cheek_depth_diff) / 3, 
-                              right_eye_center_x - left_eye_center_x)
-        
-        # Rotation Z (roll) : améliorée avec les tempes et les sourcils
-        dy_eyes = right_eye_center_y - left_eye_center_y
-        dx_eyes = right_eye_center_x - left_eye_center_x
-        dy_temples = right_temple.y - left_temple.y
-        dx_temples = right_temple.x - left_temple.x
-        dy_eyebrows = (face_landmarks[self.RIGHT_EYEBROW_INNER].y - 
-                      face_landmarks[self.LEFT_EYEBROW_INNER].y)
-        dx_eyebrows = (face_landmarks[self.RIGHT_EYEBROW_INNER].x - 
-                      face_landmarks[self.LEFT_EYEBROW_INNER].x)
-        rotation_z = np.arctan2((dy_eyes + dy_temples + dy_eyebrows) / 3, 
-                              (dx_eyes + dx_temples + dx_eyebrows) / 3)
-        
-        # Échelle basée sur la distance entre les yeux et la largeur du visage
-        eye_width = abs(right_eye_outer.x - left_eye_outer.x) * width
-        face_width = abs(right_temple.x - left_temple.x) * width
-        eyebrow_width = abs(face_landmarks[self.RIGHT_EYEBROW_OUTER].x - 
-                          face_landmarks[self.LEFT_EYEBROW_OUTER].x) * width
-        scale_base = (eye_width + face_width * 0.2 + eyebrow_width * 0.1) / 100
-        
-        scale_x = scale_base
-        scale_y = scale_base * 0.4
-        scale_z = scale_base * 0.6
+        poses, _ = self.estimate_glasses_poses(_as_landmark_array(face_landmarks)[None], width, height)
+        return pose_to_glasses_position(poses[0])
+
+    @classmethod
+    def estimate_glasses_poses(cls, landmarks: np.ndarray, width, height) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Calcule la pose des lunettes et la qualité de détection pour un lot d'images.
         
-        return GlassesPosition(
-            position=Point3D(x=pos_x, y=pos_y, z=pos_z),
-            rotation=Point3D(x=rotation_x, y=rotation_y, z=rotation_z),
-            scale=Point3D(x=scale_x, y=scale_y, z=scale_z)
-        )
+        Tous les points clés sont extraits en une seule indexation, puis chaque grandeur
+        est calculée pour l'ensemble du lot.
+        
+        Args:
+            landmarks: Points de repère normalisés, de forme (images, points, 3)
+            width: Largeur de chaque image (scalaire ou tableau (images,))
+            height: Hauteur de chaque image (scalaire ou tableau (images,))
+            
+        Returns:
+            Tuple (poses de forme (images, 9) : position, rotation et échelle ;
+            qualité suffisante de forme (images,))
+        """
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        count = len(landmarks)
+        if landmarks.ndim != 3 or landmarks.shape[1] <= cls._GEOMETRY_INDEX.max():
+            return np.full((count, 9), np.nan), np.zeros(count, dtype=bool)
+        width = np.broadcast_to(np.asarray(width, dtype=np.float64), (count,))
+        height = np.broadcast_to(np.asarray(height, dtype=np.float64), (count,))
+        
+        # Extraire les points clés : un tableau (images, 3) par point
+        keypoints = landmarks[:, cls._GEOMETRY_INDEX]
+        (left_eye_outer, left_eye_inner, right_eye_outer, right_eye_inner,
+         left_eye_top, left_eye_bottom, right_eye_top, right_eye_bottom,
+         nose_bridge, nose_tip, nose_bottom, left_temple, right_temple,
+         left_eyebrow_inner, right_eyebrow_inner, left_eyebrow_outer, right_eyebrow_outer,
+         left_cheek, right_cheek) = keypoints.transpose(1, 2, 0)
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Centre des yeux à partir des quatre points de chaque œil
+            left_eye_center_x = (left_eye_outer[0] + left_eye_inner[0] + left_eye_top[0] + left_eye_bottom[0]) / 4
+            left_eye_center_y = (left_eye_outer[1] + left_eye_inner[1] + left_eye_top[1] + left_eye_bottom[1]) / 4
+            right_eye_center_x = (right_eye_outer[0] + right_eye_inner[0] + right_eye_top[0] + right_eye_bottom[0]) / 4
+            right_eye_center_y = (right_eye_outer[1] + right_eye_inner[1] + right_eye_top[1] + right_eye_bottom[1]) / 4
+            
+            # Position X : centre entre les yeux
+            pos_x = (left_eye_center_x + right_eye_center_x) / 2 * width
+            
+            # Position Y : ajustée en fonction de la hauteur du nez et des sourcils
+            eye_center_y = (left_eye_center_y + right_eye_center_y) / 2
+            nose_height = nose_bridge[1] - nose_bottom[1]
+            eyebrow_height = (left_eyebrow_inner[1] + right_eyebrow_inner[1]) / 2
+            pos_y = (eye_center_y + (nose_height * 0.2) + (eyebrow_height - eye_center_y) * 0.3) * height
+            
+            # Position Z : profondeur du nez et des joues
+            eye_distance = np.abs(right_eye_center_x - left_eye_center_x) * width
+            nose_depth = np.abs(nose_tip[2] - nose_bridge[2])
+            cheek_depth = (left_cheek[2] + right_cheek[2]) / 2
+            base_distance = width * 0.2
+            pos_z = -(base_distance / (eye_distance * (1 + nose_depth + cheek_depth))) * 100
+            
+            # Rotation X (pitch) : axe du nez
+            nose_axis = nose_tip - nose_bridge
+            rotation_x = np.arctan2(nose_axis[1], np.hypot(nose_axis[0], nose_axis[2]))
+            
+            # Rotation Y (yaw) : profondeur des yeux, des tempes et des joues
+            depth_diff = ((right_eye_outer[2] - left_eye_outer[2]) + (right_temple[2] - left_temple[2]) +
+                          (right_cheek[2] - left_cheek[2])) / 3
+            rotation_y = np.arctan2(depth_diff, right_eye_center_x - left_eye_center_x)
+            
+            # Rotation Z (roll) : yeux, tempes et sourcils
+            dy = ((right_eye_center_y - left_eye_center_y) + (right_temple[1] - left_temple[1]) +
+                  (right_eyebrow_inner[1] - left_eyebrow_inner[1])) / 3
+            dx = ((right_eye_center_x - left_eye_center_x) + (right_temple[0] - left_temple[0]) +
+                  (right_eyebrow_inner[0] - left_eyebrow_inner[0])) / 3
+            rotation_z = np.arctan2(dy, dx)
+            
+            # Échelle basée sur la distance entre les yeux et la largeur du visage
+            eye_width = np.abs(right_eye_outer[0] - left_eye_outer[0]) * width
+            face_width = np.abs(right_temple[0] - left_temple[0]) * width
+            eyebrow_width = np.abs(right_eyebrow_outer[0] - left_eyebrow_outer[0]) * width
+            scale_base = (eye_width + face_width * 0.2 + eyebrow_width * 0.1) / 100
+            
+            poses = np.stack([pos_x, pos_y, pos_z, rotation_x, rotation_y, rotation_z,
+                              scale_base, scale_base * 0.4, scale_base * 0.6], axis=1)
+            
+            # Qualité : symétrie des yeux et pose exploitable
+            left_eye_width = np.abs(left_eye_outer[0] - left_eye_inner[0])
+            right_eye_width = np.abs(right_eye_outer[0] - right_eye_inner[0])
+            eye_width_ratio = (np.minimum(left_eye_width, right_eye_width) /
+                               np.maximum(left_eye_width, right_eye_width))
+        quality = (eye_width_ratio >= 0.2) & np.isfinite(poses).all(axis=1) & (scale_base > 0)
+        return poses, quality
 
-    def _create_response_from_last_position(self, width: int, height: int) -> tuple[FaceLandmarks, GlassesPosition]:
+    def _fallback(self, width: int, height: int, timestamp: float) -> tuple:
+        """
+        Répond à une image sans visage exploitable par la dernière position connue.
+        
+        En mode multi-visages, les pistes que le suivi conserve encore reçoivent leur pose
+        prédite (points de repère marqués ``measured=False``) : un échec d'une image ne
+        fait pas disparaître les autres visages.
+        
+        Returns:
+            Tuple contenant les points de repère et la position des lunettes, suivis en
+            mode multi-visages de la liste des visages suivis
+        """
+        if self.tracker is not None and any(track.landmarks is not None
+                                            for track in self.tracker.tracks.values()):
+            FALLBACK_RESPONSES.inc()
+            self._timestamp = timestamp
+            return self._finish_faces([])
+        return self._create_response_from_last_position(width, height)
+
+    def _create_response_from_last_position(self, width: int, height: int) -> tuple[CompactLandmarks, GlassesPosition]:
         """
         Crée une réponse avec la dernière position connue.
         
@@ -338,17 +1018,14 @@ class FaceDetectorService:
             height: Hauteur de l'image
             
         Returns:
-            Tuple contenant des landmarks factices et la dernière position connue
-        """
-        # Créer des landmarks factices basés sur la dernière position connue
-        landmarks = [
-            Point2D(x=width/2, y=height/2)  # Point central
-        ]
-        return (
-            FaceLandmarks(
-                landmarks=landmarks,
-                image_width=width,
-                image_height=height
-            ),
-            self.last_position
-        ) 
\ No newline at end of file
+            Tuple contenant les derniers landmarks détectés et la dernière position connue
+        """
+        FALLBACK_RESPONSES.inc()
+        landmarks = self.last_landmarks
+        points = landmarks.points
+        if (landmarks.image_width, landmarks.image_height) != (width, height):
+            # Ramener les derniers landmarks aux dimensions de l'image courante
+            scale = np.array([width / landmarks.image_width, height / landmarks.image_height,
+                              width / landmarks.image_width], dtype=np.float32)
+            points = points * scale
+        return CompactLandmarks(points, width, height, measured=False), self.last_position
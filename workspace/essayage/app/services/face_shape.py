@@ -0,0 +1,146 @@
+"""
+Mesures du visage et classification de sa forme.
+
+Les mesures sont des distances entre paires de points de repère Face Mesh, en pixels ;
+la forme du visage est déduite de cinq ratios rapportés à la largeur des pommettes
+(ou à la hauteur du visage), par un barème de points par forme. Les ratios ne
+dépendant pas de l'échelle de l'image, ils peuvent être moyennés sur plusieurs images.
+
+Functions:
+    face_measurements: Calcule les mesures du visage.
+    face_ratios: Calcule les ratios utilisés par la classification.
+    face_shape_scores: Calcule la probabilité (%) de chaque forme de visage.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+# Paires de points de repère Face Mesh de chaque mesure
+MEASUREMENT_LANDMARKS = {
+    "face_height": (10, 152),
+    "cheekbone_width": (123, 352),
+    "jaw_width": (172, 397),
+    "temple_width": (93, 323),
+    "forehead_width": (8, 9),
+    "jaw_corner_width": (136, 365),
+}
+
+# Ratios utilisés par la classification, dans cet ordre
+RATIO_NAMES = (
+    "jaw_to_cheekbone",
+    "face_width_to_height",
+    "temple_to_cheekbone",
+    "forehead_to_cheekbone",
+    "jaw_corner_to_cheekbone",
+)
+
+FACE_SHAPES = ("rond", "ovale", "carré", "rectangulaire")
+
+
+def face_measurements(points: np.ndarray) -> Dict[str, float]:
+    """
+    Calcule les mesures du visage.
+
+    Args:
+        points: Coordonnées (x, y) en pixels des points de repère Face Mesh, de forme
+            (points, 2) ou plus de colonnes
+
+    Returns:
+        Distance (pixels) de chaque mesure de ``MEASUREMENT_LANDMARKS``
+    """
+    return {
+        name: float(np.hypot(*(points[second, :2] - points[first, :2])))
+        for name, (first, second) in MEASUREMENT_LANDMARKS.items()
+    }
+
+
+def face_ratios(measurements: Dict[str, float]) -> Dict[str, float]:
+    """
+    Calcule les ratios utilisés par la classification.
+
+    Raises:
+        ZeroDivisionError: Si la largeur des pommettes ou la hauteur du visage est nulle
+    """
+    cheekbone_width = measurements["cheekbone_width"]
+    return {
+        "jaw_to_cheekbone": measurements["jaw_width"] / cheekbone_width,
+        "face_width_to_height": cheekbone_width / measurements["face_height"],
+        "temple_to_cheekbone": measurements["temple_width"] / cheekbone_width,
+        "forehead_to_cheekbone": measurements["forehead_width"] / cheekbone_width,
+        "jaw_corner_to_cheekbone": measurements["jaw_corner_width"] / cheekbone_width,
+    }
+
+
+def face_shape_scores(ratios: Dict[str, float]) -> Dict[str, int]:
+    """
+    Calcule la probabilité (%) de chaque forme de visage.
+
+    Args:
+        ratios: Ratios du visage (voir ``face_ratios``)
+
+    Returns:
+        Probabilité de chaque forme de ``FACE_SHAPES``, normalisée à 100 (toutes nulles
+        si aucun critère n'est rempli)
+    """
+    jaw_to_cheekbone_ratio = ratios["jaw_to_cheekbone"]
+    face_width_to_height_ratio = ratios["face_width_to_height"]
+    temple_to_cheekbone_ratio = ratios["temple_to_cheekbone"]
+    forehead_to_cheekbone_ratio = ratios["forehead_to_cheekbone"]
+    jaw_corner_to_cheekbone_ratio = ratios["jaw_corner_to_cheekbone"]
+    scores = {shape: 0.0 for shape in FACE_SHAPES}
+
+    # Score pour rond (visage équilibré)
+    if 0.95 <= jaw_to_cheekbone_ratio <= 1.05:  # Mâchoire et pommettes très similaires
+        scores["rond"] += 20
+    if 0.95 <= face_width_to_height_ratio <= 1.05:  # Ratio largeur/hauteur très proche de 1
+        scores["rond"] += 20
+    if 0.9 <= temple_to_cheekbone_ratio <= 1.1:  # Tempes et pommettes similaires
+        scores["rond"] += 15
+    if 0.9 <= forehead_to_cheekbone_ratio <= 1.1:  # Front et pommettes similaires
+        scores["rond"] += 15
+    if 0.9 <= jaw_corner_to_cheekbone_ratio <= 1.1:  # Coins de mâchoire et pommettes similaires
+        scores["rond"] += 15
+
+    # Score pour ovale (visage allongé)
+    if 0.8 <= jaw_to_cheekbone_ratio < 0.9:  # Mâchoire légèrement plus étroite
+        scores["ovale"] += 15
+    if 0.8 <= face_width_to_height_ratio < 0.9:  # Visage légèrement plus haut
+        scores["ovale"] += 15
+    if temple_to_cheekbone_ratio < 0.9:  # Tempes plus étroites
+        scores["ovale"] += 15
+    if forehead_to_cheekbone_ratio < 0.9:  # Front plus étroit
+        scores["ovale"] += 15
+    if jaw_corner_to_cheekbone_ratio < 0.9:  # Coins de mâchoire plus étroits
+        scores["ovale"] += 15
+
+    # Score pour carré (visage anguleux)
+    if 0.95 <= jaw_to_cheekbone_ratio <= 1.05:  # Mâchoire et pommettes très similaires
+        scores["carré"] += 15
+    if 0.7 <= face_width_to_height_ratio < 0.8:  # Visage plus haut que large
+        scores["carré"] += 20
+    if temple_to_cheekbone_ratio > 1.1:  # Tempes plus larges
+        scores["carré"] += 15
+    if forehead_to_cheekbone_ratio > 1.1:  # Front plus large
+        scores["carré"] += 15
+    if jaw_corner_to_cheekbone_ratio > 1.1:  # Coins de mâchoire plus larges
+        scores["carré"] += 15
+
+    # Score pour rectangulaire (visage très allongé)
+    if jaw_to_cheekbone_ratio < 0.85:  # Mâchoire plus étroite
+        scores["rectangulaire"] += 15
+    if face_width_to_height_ratio < 0.75:  # Visage beaucoup plus haut
+        scores["rectangulaire"] += 20
+    if temple_to_cheekbone_ratio < 0.85:  # Tempes beaucoup plus étroites
+        scores["rectangulaire"] += 15
+    if forehead_to_cheekbone_ratio < 0.85:  # Front beaucoup plus étroit
+        scores["rectangulaire"] += 15
+    if jaw_corner_to_cheekbone_ratio < 0.85:  # Coins de mâchoire beaucoup plus étroits
+        scores["rectangulaire"] += 15
+
+    # Normaliser les scores
+    total = sum(scores.values())
+    if total > 0:
+        for shape in scores:
+            scores[shape] = int(round((scores[shape] / total) * 100))
+    return scores
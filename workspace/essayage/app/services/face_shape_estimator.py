@@ -0,0 +1,180 @@
+"""
+Estimation de la forme du visage sur le flux d'essayage.
+
+Le service de recommandation classe la forme du visage d'après cinq ratios mesurés
+sur une seule photo (voir ``face_shape``). Le flux d'essayage fournit plusieurs
+dizaines de jeux de points de repère par seconde : les ratios y sont moyennés au fil
+des images, ce qui évite au client d'envoyer une photo supplémentaire et au service de
+recommandation une nouvelle inférence.
+
+Seules les images réellement analysées (ni prédites, ni réutilisées) et prises à peu
+près de face (lacet d'au plus ``max_yaw`` radians) sont retenues : une tête tournée
+raccourcit les largeurs mais pas la hauteur du visage. Chaque ratio est suivi par une
+moyenne glissante robuste : moyenne cumulée sur les ``warmup`` premières images, puis
+exponentielle (poids ``alpha``) d'une valeur écrêtée à ``clip`` écarts absolus moyens
+autour de la moyenne, ce qui borne l'effet d'un clignement ou d'une main devant le
+visage. L'estimation est convergée lorsque au moins ``min_samples`` images ont été
+retenues et que l'erreur de chaque moyenne (écart absolu moyen rapporté à la racine du
+nombre d'images effectivement moyennées) ne dépasse pas ``tolerance`` : les seuils de
+classification étant des valeurs absolues des ratios (0,85, 0,9...), l'erreur l'est
+aussi, d'autant que le ratio du front, mesuré entre deux points de la ligne médiane,
+est petit.
+
+La confiance est la part des images récentes (moyenne exponentielle des votes) dont
+la forme, classée image par image, est celle de l'estimation ; elle doit atteindre
+``min_confidence`` pour que l'estimation soit convergée. Lorsqu'une autre personne se
+place devant la caméra, la moyenne glisse d'une forme à l'autre et peut traverser une
+forme intermédiaire qu'aucune image ne présente : la confiance l'écarte.
+
+L'estimateur conserve aussi les points de repère de l'image dont les ratios sont les
+plus proches de l'estimation, que le flux transmet au service de recommandation dans
+un ticket.
+
+Classes:
+    FaceShapeEstimate: Forme du visage estimée sur le flux.
+    FaceShapeEstimator: Moyennes robustes des ratios du visage.
+"""
+
+import math
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+
+from ..models.face import CompactLandmarks, GlassesPosition
+from .face_shape import FACE_SHAPES, RATIO_NAMES, face_measurements, face_ratios, face_shape_scores
+
+# Nombre de points de repère du maillage Face Mesh
+MIN_LANDMARKS = 468
+
+# Écart absolu moyen minimal d'un ratio, pour l'écrêtage
+MIN_DEVIATION = 0.005
+
+
+class FaceShapeEstimate(NamedTuple):
+    """Forme du visage estimée sur le flux."""
+    face_shape: str
+    confidence: float
+    probabilities: Dict[str, int]
+    ratios: Dict[str, float]
+    samples: int
+    converged: bool
+
+    def to_dict(self) -> dict:
+        return {
+            "face_shape": self.face_shape,
+            "confidence": round(self.confidence, 3),
+            "probabilities": self.probabilities,
+            "ratios": {name: round(value, 4) for name, value in self.ratios.items()},
+            "samples": self.samples,
+        }
+
+
+class FaceShapeEstimator:
+    """
+    Moyennes robustes des ratios du visage, mises à jour image par image.
+
+    Attributes:
+        min_samples: Nombre minimum d'images retenues avant la convergence
+        tolerance: Erreur maximale de la moyenne de chaque ratio à la convergence
+        max_yaw: Lacet maximal (radians) d'une image retenue
+        min_confidence: Confiance minimale à la convergence
+        alpha: Poids d'une image dans les moyennes exponentielles
+        warmup: Images moyennées sans écrêtage
+        clip: Écrêtage, en écarts absolus moyens
+        samples: Nombre d'images retenues
+        rejected: Nombre d'images écartées (tête tournée, points incomplets)
+        emitted: Dernière forme convergée signalée au client
+    """
+
+    def __init__(self, min_samples: int = 30, tolerance: float = 0.01, max_yaw: float = 0.3,
+                 min_confidence: float = 0.5, alpha: float = 0.05, warmup: int = 5, clip: float = 2.5):
+        self.min_samples = min_samples
+        self.tolerance = tolerance
+        self.max_yaw = max_yaw
+        self.min_confidence = min_confidence
+        self.alpha = alpha
+        self.warmup = warmup
+        self.clip = clip
+        self.samples = 0
+        self.rejected = 0
+        self.emitted: Optional[str] = None
+        self._mean = np.zeros(len(RATIO_NAMES))
+        self._deviation = np.zeros(len(RATIO_NAMES))
+        self._votes = np.zeros(len(FACE_SHAPES))
+        # Image la plus proche de l'estimation : ratios, points normalisés (x, y) et dimensions
+        self._best_ratios: Optional[np.ndarray] = None
+        self._best_landmarks: Optional[tuple] = None
+
+    def update(self, landmarks: CompactLandmarks, glasses_position: GlassesPosition) -> Optional[FaceShapeEstimate]:
+        """
+        Intègre les points de repère d'une image analysée.
+
+        Returns:
+            L'estimation, si elle vient de converger ou si la forme convergée a changé
+            depuis le dernier signalement ; None sinon
+        """
+        if len(landmarks) < MIN_LANDMARKS or abs(glasses_position.rotation.y) > self.max_yaw:
+            self.rejected += 1
+            return None
+        try:
+            ratios = np.array(list(face_ratios(face_measurements(landmarks.points)).values()))
+        except ZeroDivisionError:
+            self.rejected += 1
+            return None
+        if not np.isfinite(ratios).all():
+            self.rejected += 1
+            return None
+
+        self.samples += 1
+        weight = max(1.0 / self.samples, self.alpha)
+        if self.samples > self.warmup:
+            spread = self.clip * np.maximum(self._deviation, MIN_DEVIATION)
+            ratios = np.clip(ratios, self._mean - spread, self._mean + spread)
+        if self.samples > 1:
+            self._deviation += weight * (np.abs(ratios - self._mean) - self._deviation)
+        self._mean += weight * (ratios - self._mean)
+
+        # Vote de l'image, classée seule
+        scores = face_shape_scores(dict(zip(RATIO_NAMES, ratios)))
+        vote = np.zeros(len(FACE_SHAPES))
+        vote[FACE_SHAPES.index(max(scores.items(), key=lambda x: x[1])[0])] = 1.0
+        self._votes += weight * (vote - self._votes)
+
+        self._keep_if_closest(ratios, landmarks)
+        estimate = self.estimate()
+        if not estimate.converged or estimate.face_shape == self.emitted:
+            return None
+        self.emitted = estimate.face_shape
+        return estimate
+
+    def _keep_if_closest(self, ratios: np.ndarray, landmarks: CompactLandmarks) -> None:
+        distance = np.abs(ratios - self._mean).max()
+        if self._best_ratios is not None and distance >= np.abs(self._best_ratios - self._mean).max():
+            return
+        size = (landmarks.image_width, landmarks.image_height)
+        self._best_ratios = ratios
+        self._best_landmarks = (landmarks.points[:, :2] / size, *size)
+
+    def standard_error(self) -> float:
+        """Plus grande erreur des moyennes des ratios."""
+        if self.samples == 0:
+            return math.inf
+        effective = min(self.samples, 1.0 / self.alpha)
+        return float(self._deviation.max() / math.sqrt(effective))
+
+    def estimate(self) -> Optional[FaceShapeEstimate]:
+        """Estimation courante (None tant qu'aucune image n'a été retenue)."""
+        if self.samples == 0:
+            return None
+        ratios = dict(zip(RATIO_NAMES, self._mean.tolist()))
+        probabilities = face_shape_scores(ratios)
+        face_shape = max(probabilities.items(), key=lambda x: x[1])[0]
+        confidence = float(self._votes[FACE_SHAPES.index(face_shape)])
+        converged = (self.samples >= self.min_samples and self.standard_error() <= self.tolerance
+                     and confidence >= self.min_confidence)
+        return FaceShapeEstimate(face_shape, confidence, probabilities, ratios, self.samples, converged)
+
+    @property
+    def representative_landmarks(self) -> Optional[tuple]:
+        """Points normalisés (x, y) et dimensions de l'image la plus proche de l'estimation."""
+        return self._best_landmarks
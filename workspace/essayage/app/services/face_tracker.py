@@ -0,0 +1,140 @@
+"""
+Suivi de plusieurs visages avec des identifiants stables.
+
+En mode multi-visages, chaque visage détecté est associé à une piste existante en
+comparant sa boîte englobante à celles de l'image précédente (association gloutonne
+par recouvrement décroissant). Chaque piste possède son propre filtre de Kalman ;
+une piste non retrouvée est conservée quelques images (sa pose est alors prédite)
+avant d'être abandonnée.
+
+Classes:
+    FaceTrack: Piste d'un visage suivi.
+    FaceTracker: Association des détections aux pistes.
+"""
+
+import itertools
+import logging
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .kalman_filter import KalmanFilterBank, PoseFilter
+
+logger = logging.getLogger(__name__)
+
+
+class FaceTrack:
+    """
+    Piste d'un visage suivi.
+
+    Attributes:
+        track_id: Identifiant stable de la piste
+        pose_filter: Filtre de Kalman de la pose de ce visage
+        box: Dernière boîte englobante (x0, y0, x1, y1), en pixels
+        landmarks: Derniers points de repère mesurés
+        measured_pose: Pose filtrée lors de la dernière mesure
+        missed: Nombre d'images consécutives sans détection
+    """
+
+    def __init__(self, track_id: int, pose_filter: PoseFilter, box: np.ndarray):
+        self.track_id = track_id
+        self.pose_filter = pose_filter
+        self.box = box
+        self.landmarks = None
+        self.measured_pose = np.zeros(9)
+        self.missed = 0
+
+
+class FaceTracker:
+    """
+    Associe les visages détectés à des pistes, d'une image à l'autre.
+
+    Attributes:
+        bank: Banque de filtres de Kalman fournissant un emplacement par piste
+        max_faces: Nombre maximum de pistes simultanées
+        max_missed: Nombre d'images sans détection avant l'abandon d'une piste
+        min_iou: Recouvrement minimum pour associer une détection à une piste
+        tracks: Pistes actives, par identifiant
+    """
+
+    def __init__(self, bank: KalmanFilterBank, max_faces: int, max_missed: int = 5, min_iou: float = 0.3):
+        self.bank = bank
+        self.max_faces = max_faces
+        self.max_missed = max_missed
+        self.min_iou = min_iou
+        self.tracks: Dict[int, FaceTrack] = {}
+        self._track_ids = itertools.count(1)
+
+    def update(self, boxes: np.ndarray) -> List[Tuple[int, FaceTrack]]:
+        """
+        Associe les boîtes détectées aux pistes et met à jour ces dernières.
+
+        Les détections sans piste correspondante ouvrent une nouvelle piste (dans la
+        limite de ``max_faces``) ; les pistes non retrouvées vieillissent et sont
+        abandonnées après ``max_missed`` images.
+
+        Args:
+            boxes: Boîtes englobantes détectées, de forme (visages, 4)
+
+        Returns:
+            Les couples (indice de la détection, piste associée)
+        """
+        tracks = list(self.tracks.values())
+        assignments = []
+        unmatched = set(range(len(boxes)))
+        if tracks and len(boxes):
+            overlaps = _iou(np.array([track.box for track in tracks]), boxes)
+            matched_tracks = set()
+            # Association gloutonne, du plus fort au plus faible recouvrement
+            for flat in np.argsort(overlaps, axis=None)[::-1]:
+                row, column = divmod(int(flat), len(boxes))
+                if overlaps[row, column] < self.min_iou:
+                    break
+                if row in matched_tracks or column not in unmatched:
+                    continue
+                matched_tracks.add(row)
+                unmatched.discard(column)
+                assignments.append((column, tracks[row]))
+
+        for index in sorted(unmatched):
+            if len(self.tracks) >= self.max_faces:
+                break
+            try:
+                track = FaceTrack(next(self._track_ids), PoseFilter(self.bank), boxes[index])
+            except RuntimeError:
+                logger.debug("Aucun filtre disponible pour un visage supplémentaire")
+                break
+            self.tracks[track.track_id] = track
+            assignments.append((index, track))
+
+        assigned = {track.track_id for _, track in assignments}
+        for track in list(self.tracks.values()):
+            if track.track_id in assigned:
+                track.missed = 0
+                continue
+            track.missed += 1
+            if track.missed > self.max_missed:
+                self._drop(track)
+        for index, track in assignments:
+            track.box = boxes[index]
+        return assignments
+
+    def reset(self) -> None:
+        """Abandonne toutes les pistes."""
+        for track in list(self.tracks.values()):
+            self._drop(track)
+
+    def _drop(self, track: FaceTrack) -> None:
+        del self.tracks[track.track_id]
+        track.pose_filter.release()
+
+
+def _iou(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Recouvrement (intersection sur union) de chaque paire de boîtes, de forme (len(first), len(second))."""
+    first, second = first[:, None, :], second[None, :, :]
+    width = np.clip(np.minimum(first[..., 2], second[..., 2]) - np.maximum(first[..., 0], second[..., 0]), 0, None)
+    height = np.clip(np.minimum(first[..., 3], second[..., 3]) - np.maximum(first[..., 1], second[..., 1]), 0, None)
+    intersection = width * height
+    area_first = (first[..., 2] - first[..., 0]) * (first[..., 3] - first[..., 1])
+    area_second = (second[..., 2] - second[..., 0]) * (second[..., 3] - second[..., 1])
+    return intersection / np.maximum(area_first + area_second - intersection, 1e-9)
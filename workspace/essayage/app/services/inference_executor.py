@@ -0,0 +1,814 @@
+"""
+Exécution de l'inférence MediaPipe hors de la boucle d'événements.
+
+Les appels à ``face_mesh.process`` (20 à 40 ms) bloqueraient toutes les autres
+connexions d'un worker uvicorn. Ce module délègue donc le décodage et l'inférence
+à un pool de processus : chaque processus possède son propre gestionnaire de
+sessions (et donc ses propres instances Face Mesh), reçoit les images via un bloc
+de mémoire partagée découpé en emplacements, et renvoie les résultats par son propre
+tube. Une session reste attachée au même processus afin de conserver son état de suivi.
+
+Les images des sessions sont regroupées en micro-lots par processus (voir
+``BatchScheduler``) : chaque message de la file des tâches et du tube des
+résultats porte une liste de tâches. Les messages de résultats portent aussi, au
+plus toutes les ``METRICS_INTERVAL`` secondes, les variations des métriques du
+processus de travail.
+
+Les images JPEG sont décodées à la résolution réduite la plus petite que permet le
+détecteur de la session (``decode_target_side``) ; les résultats sont ramenés aux
+dimensions de l'image d'origine avant d'être renvoyés (voir ``image_decoding``).
+
+Un processus qui ne répond plus sans s'arrêter (boucle infinie, blocage dans
+MediaPipe) garde ses emplacements de mémoire partagée réservés par les requêtes
+expirées : après ``max_timeouts`` expirations consécutives, ou dès qu'il n'a plus
+d'emplacement libre, il est tué et remplacé comme un processus arrêté, ce qui fait
+échouer ses requêtes en attente et libère ses emplacements. Un tube des résultats par
+processus garantit qu'un processus tué au milieu d'un envoi n'emporte aucun verrou
+partagé avec les autres.
+
+Sans processus de travail, l'inférence s'exécute dans un thread qui ne peut pas être
+remplacé : après ``max_timeouts`` expirations consécutives, il est déclaré bloqué,
+l'exécuteur n'est plus prêt (``/ready``), ses requêtes échouent immédiatement et
+``on_hung`` est appelée pour arrêter le processus courant (un worker du superviseur
+est alors remplacé).
+
+L'état de suivi d'une session reprise est transmis à son processus à l'ouverture
+(``OP_RESTORE``) et s'en exporte à la demande (``export_session``) : une session peut
+ainsi continuer dans un autre processus, voire un autre serveur.
+
+Classes:
+    InferenceRunner: Exécute les tâches d'inférence dans un processus.
+    InferenceExecutor: Répartit les tâches entre les processus de travail.
+"""
+
+import asyncio
+import atexit
+import gc
+import itertools
+import logging
+import multiprocessing
+import multiprocessing.connection
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..utils.frame_protocol import FrameDescriptor, FrameFormat, decode_frame
+from ..utils.image_decoding import DecodedImage
+from ..utils.metrics import registry
+from .batch_scheduler import BatchScheduler
+from .face_detector import FaceDetectorService, create_face_mesh, scale_result
+from .quality_tiers import QUALITY_TIERS, resolve_quality_tier
+from .session_manager import SessionManager, SessionLimitError
+
+logger = logging.getLogger(__name__)
+
+# Opérations transmises aux processus de travail
+OP_PROCESS = "process"
+OP_PROCESS_ONCE = "process_once"
+OP_PROCESS_STILL = "process_still"
+OP_CLOSE = "close"
+OP_WARM_UP = "warm_up"
+# Déclaration d'une session ; la charge utile est le nom de son niveau de qualité
+OP_OPEN = "open"
+# État de suivi d'une session reprise ; la charge utile est l'état sérialisé
+OP_RESTORE = "restore"
+OP_EXPORT = "export"
+
+# Intervalle minimum (s) entre deux envois des métriques d'un processus de travail
+METRICS_INTERVAL = 1.0
+
+# Exceptions pouvant être reconstruites côté boucle d'événements
+_REMOTE_ERRORS = {
+    "ValueError": ValueError,
+    "SessionLimitError": SessionLimitError,
+}
+
+
+class InferenceRunner:
+    """
+    Exécute les tâches d'inférence pour un ensemble de sessions.
+
+    Attributes:
+        session_manager: Sessions de suivi hébergées par ce runner
+        detector_options: Paramètres transmis à chaque ``FaceDetectorService``
+        warm_face_meshes: Nombre d'instances Face Mesh préparées par ``warm_up``
+    """
+
+    def __init__(self, max_sessions: int, idle_timeout: float, detector_options: Optional[dict] = None,
+                 warm_face_meshes: int = 1):
+        self.session_manager = SessionManager(max_sessions=max_sessions, idle_timeout=idle_timeout,
+                                              detector_options=detector_options)
+        self.detector_options = detector_options or {}
+        self.warm_face_meshes = warm_face_meshes
+        self._still_mesh = None
+        self._warm_up_report: Optional[dict] = None
+
+    def run(self, op: str, session_id: Optional[str], buffer, frame: Tuple[int, int, int] = (FrameFormat.JPEG, 0, 0),
+            backlog: int = 0, timestamp: Optional[float] = None):
+        """
+        Exécute une tâche.
+
+        Args:
+            op: Opération à effectuer
+            session_id: Session concernée (None pour une requête ponctuelle)
+            buffer: Octets de l'image (bytes ou memoryview)
+            frame: Format, largeur et hauteur de l'image
+            backlog: Nombre de tâches en attente derrière celle-ci
+            timestamp: Instant (s) de capture de l'image (None : instant de traitement)
+
+        Returns:
+            Le résultat de l'opération
+        """
+        if op == OP_CLOSE:
+            self.session_manager.close_session(session_id)
+            return None
+        if op == OP_WARM_UP:
+            return self.warm_up()
+        if op == OP_OPEN:
+            self.session_manager.set_tier(session_id, buffer)
+            return None
+        if op == OP_RESTORE:
+            self.session_manager.restore_state(session_id, bytes(buffer))
+            return None
+        if op == OP_EXPORT:
+            return self.session_manager.export_state(session_id)
+        if op == OP_PROCESS:
+            # Charge : part des sessions dont une image attend déjà
+            load = min(1.0, backlog / max(len(self.session_manager), 1))
+            detector = self.session_manager.acquire(session_id).detector
+            image = _decode(buffer, frame, detector)
+            return scale_result(detector.process_rgb_image(image.rgb, timestamp=timestamp, load=load),
+                                image.width, image.height)
+        if op == OP_PROCESS_ONCE:
+            with self.session_manager.one_shot() as detector:
+                image = _decode(buffer, frame, detector)
+                return scale_result(detector.process_rgb_image(image.rgb), image.width, image.height)
+        if op == OP_PROCESS_STILL:
+            detector = self._still_detector()
+            image = _decode(buffer, frame, detector)
+            return scale_result(detector.process_rgb_image(image.rgb), image.width, image.height)
+        raise ValueError(f"Unknown operation: {op}")
+
+    def warm_up(self) -> dict:
+        """
+        Importe MediaPipe et prépare les instances Face Mesh du pool de chaque niveau de
+        qualité sur des images synthétiques ; les appels suivants renvoient le résultat
+        du premier.
+
+        Les images reprennent les tailles analysées en suivi par chaque niveau : l'image
+        complète réduite et la région du visage.
+
+        Returns:
+            Le nombre d'instances préparées (au total et par niveau) et la durée (s) du
+            préchauffage
+        """
+        if self._warm_up_report is not None:
+            return self._warm_up_report
+        started = time.perf_counter()
+        import mediapipe  # noqa: F401
+        tiers = {}
+        for name, tier in QUALITY_TIERS.items():
+            options = {**self.detector_options, **tier.detector_options()}
+            max_side = options.get("detection_max_side", 640)
+            roi_size = options.get("roi_size", 256)
+            frames = [
+                np.full((max_side * 3 // 4, max_side, 3), 128, dtype=np.uint8),
+                np.full((roi_size, roi_size, 3), 128, dtype=np.uint8),
+            ]
+            tiers[name] = self.session_manager.pools[name].prefill(self.warm_face_meshes, frames)
+        self._warm_up_report = {
+            "face_meshes": sum(tiers.values()),
+            "tiers": tiers,
+            "seconds": time.perf_counter() - started,
+        }
+        return self._warm_up_report
+
+    def _still_detector(self) -> FaceDetectorService:
+        """
+        Détecteur neuf pour une image fixe.
+
+        Le graphe Face Mesh, en mode image fixe, est partagé par toutes les images fixes
+        de ce runner ; l'état de suivi (filtre de Kalman, dernière position) ne l'est pas.
+        """
+        options = {**self.detector_options, "roi_tracking": False, "frame_skipping": False}
+        if self._still_mesh is None:
+            self._still_mesh = create_face_mesh(options.get("max_faces", 1), static_image_mode=True)
+        return FaceDetectorService(face_mesh=self._still_mesh, **options)
+
+    def run_batch(self, tasks: List[tuple], backlog: int = 0) -> List[tuple]:
+        """
+        Exécute un lot de tâches.
+
+        Les images de sessions distinctes sont traitées ensemble par
+        ``FaceDetectorService.process_batch`` ; les autres tâches une à une, dans l'ordre.
+
+        Args:
+            tasks: Tâches (identifiant de requête, opération, session, image, octets, instant
+                de capture)
+            backlog: Nombre de tâches en attente derrière ce lot
+
+        Returns:
+            Les résultats (identifiant de requête, succès, résultat ou erreur) des tâches
+            portant un identifiant de requête
+        """
+        # Charge : part des sessions dont une image attend déjà
+        load = min(1.0, (backlog + len(tasks) - 1) / max(len(self.session_manager), 1))
+        results = []
+        batch = []
+        for request_id, op, session_id, frame, buffer, timestamp in tasks:
+            if op != OP_PROCESS or any(session_id == item[1] for item in batch):
+                # Conserver l'ordre : le lot en cours passe avant cette tâche
+                results.extend(self._process_sessions(batch, load))
+                batch = []
+            if op == OP_PROCESS:
+                try:
+                    detector = self.session_manager.acquire(session_id).detector
+                    batch.append((request_id, session_id, detector, _decode(buffer, frame, detector), timestamp))
+                except Exception as e:
+                    results.append(_failure(request_id, e))
+                continue
+            try:
+                results.append((request_id, True, self.run(op, session_id, buffer, frame, backlog, timestamp)))
+            except Exception as e:
+                results.append(_failure(request_id, e))
+        results.extend(self._process_sessions(batch, load))
+        return [result for result in results if result[0] is not None]
+
+    @staticmethod
+    def _process_sessions(batch: List[tuple], load: float) -> List[tuple]:
+        if not batch:
+            return []
+        outcomes = FaceDetectorService.process_batch(
+            [item[2] for item in batch], [item[3].rgb for item in batch], [item[4] for item in batch], load=load
+        )
+        return [
+            _failure(item[0], outcome) if isinstance(outcome, Exception)
+            else (item[0], True, scale_result(outcome, item[3].width, item[3].height))
+            for item, outcome in zip(batch, outcomes)
+        ]
+
+    def close(self) -> None:
+        self.session_manager.close()
+        if self._still_mesh is not None:
+            self._still_mesh.close()
+            self._still_mesh = None
+
+
+def _decode(buffer, frame: Tuple[int, int, int], detector: FaceDetectorService) -> DecodedImage:
+    """Décode une image à la résolution réduite que permet le détecteur qui l'analyse."""
+    return decode_frame(buffer, *frame, target_side=detector.decode_target_side,
+                        max_pixels=detector.max_image_pixels)
+
+
+def _failure(request_id: Optional[int], error: Exception) -> tuple:
+    return request_id, False, (type(error).__name__, str(error))
+
+
+def _worker_main(task_queue, result_pipe, shm_name: str, slot_size: int,
+                 max_sessions: int, idle_timeout: float, detector_options: Optional[dict] = None,
+                 warm_face_meshes: int = 1) -> None:
+    """Boucle principale d'un processus de travail."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    runner = InferenceRunner(max_sessions, idle_timeout, detector_options, warm_face_meshes)
+    metrics_sent = time.monotonic()
+    try:
+        # Préchauffage avant toute tâche : l'import de MediaPipe conserve des références
+        # aux cadres d'exécution en cours, qui retiendraient sinon la vue d'une tâche sur
+        # la mémoire partagée et empêcheraient sa fermeture
+        runner.warm_up()
+        while True:
+            tasks = task_queue.get()
+            if tasks is None:
+                break
+            resolved = []
+            try:
+                for request_id, op, session_id, frame, slot, size, inline, timestamp in tasks:
+                    if inline is not None:
+                        buffer = inline
+                    elif slot is not None:
+                        buffer = shm.buf[slot * slot_size:slot * slot_size + size]
+                    else:
+                        buffer = None
+                    resolved.append((request_id, op, session_id, frame, buffer, timestamp))
+                results = runner.run_batch(resolved, _queue_size(task_queue))
+            except Exception as e:
+                results = [_failure(task[0], e) for task in tasks if task[0] is not None]
+            finally:
+                # Ne conserver aucune vue sur la mémoire partagée
+                resolved.clear()
+                buffer = None
+            metrics = None
+            if time.monotonic() - metrics_sent >= METRICS_INTERVAL:
+                metrics, metrics_sent = registry.drain(), time.monotonic()
+            if results or metrics:
+                result_pipe.send((results, metrics))
+    finally:
+        runner.close()
+        result_pipe.close()
+        # Une erreur prise dans un cycle de références (exception, trace, cadre
+        # d'exécution) retient la vue de sa tâche sur la mémoire partagée jusqu'au
+        # passage du ramasse-miettes
+        gc.collect()
+        shm.close()
+
+
+def _queue_size(task_queue) -> int:
+    try:
+        return task_queue.qsize()
+    except NotImplementedError:
+        # qsize n'est pas disponible sur macOS
+        return 0
+
+
+class _Worker:
+    def __init__(self, index: int, slots: int, slot_size: int):
+        self.index = index
+        self.process = None
+        self.task_queue = None
+        # Extrémité de lecture du tube des résultats du processus
+        self.results = None
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_size)
+        self.free_slots: List[int] = list(range(slots))
+        self.sessions = set()
+        # Requêtes expirées consécutives, sans réponse du processus entre-temps
+        self.timeouts = 0
+
+
+class InferenceExecutor:
+    """
+    Pool de processus d'inférence avec affinité de session.
+
+    Avec ``num_workers=0``, l'inférence s'exécute dans un thread dédié du processus
+    courant, ce qui libère tout de même la boucle d'événements.
+
+    Attributes:
+        num_workers: Nombre de processus de travail
+        max_sessions: Nombre maximum de sessions de suivi simultanées
+        slot_size: Taille (octets) d'un emplacement de mémoire partagée
+        timeout: Délai maximum (s) d'attente d'un résultat
+        max_timeouts: Requêtes expirées consécutives au-delà desquelles un processus est
+            considéré bloqué et remplacé (ou le thread d'inférence déclaré bloqué)
+        on_hung: Appelée lorsque le thread d'inférence (``num_workers=0``) est déclaré bloqué
+        detector_options: Paramètres transmis à chaque ``FaceDetectorService``
+        scheduler: Regroupement des images des sessions en micro-lots
+        warm_face_meshes: Instances Face Mesh préchauffées par processus
+        ready: Indique si le préchauffage est terminé
+        warm_up_report: Résultat du préchauffage de chaque processus
+    """
+
+    def __init__(self, num_workers: int = 2, max_sessions: int = 16, idle_timeout: float = 60.0,
+                 slot_size: int = 8 * 1024 * 1024, timeout: float = 10.0,
+                 start_method: str = "spawn", detector_options: Optional[dict] = None,
+                 batch_max_wait: float = 0.004, batch_max_size: int = 16, warm_face_meshes: int = 1,
+                 max_timeouts: int = 3, on_hung: Optional[Callable[[], None]] = None):
+        self.num_workers = num_workers
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.slot_size = slot_size
+        self.timeout = timeout
+        self.max_timeouts = max_timeouts
+        self.on_hung = on_hung
+        self.start_method = start_method
+        self.detector_options = detector_options
+        # Capacité de chaque processus, arrondie au supérieur
+        self.sessions_per_worker = -(-max_sessions // max(num_workers, 1))
+        self._workers: List[_Worker] = []
+        self._session_workers: Dict[str, _Worker] = {}
+        self._session_tiers: Dict[str, str] = {}
+        self._pending: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Future, _Worker, Optional[int]]] = {}
+        self._request_ids = itertools.count()
+        self._round_robin = itertools.count()
+        self._lock = threading.Lock()
+        self._started = False
+        self._context = None
+        # Tube de réveil du thread des résultats : True après un remplacement, False à l'arrêt
+        self._wakeup = self._wakeup_sender = None
+        self._result_thread = None
+        self._runner: Optional[InferenceRunner] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._inline_pending = 0
+        # Requêtes expirées consécutives du thread d'inférence, et blocage déclaré
+        self._inline_timeouts = 0
+        self._inline_hung = False
+        self.scheduler = BatchScheduler(self._send, batch_max_wait, batch_max_size)
+        self.warm_face_meshes = warm_face_meshes
+        self.ready = False
+        self.warm_up_report: List[dict] = []
+
+    def start(self) -> None:
+        """Démarre les processus de travail (idempotent)."""
+        with self._lock:
+            if self._started:
+                return
+            if self.num_workers == 0:
+                self._runner = InferenceRunner(self.max_sessions, self.idle_timeout, self.detector_options,
+                                               self.warm_face_meshes)
+                self._thread_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+            else:
+                self._context = multiprocessing.get_context(self.start_method)
+                self._wakeup, self._wakeup_sender = multiprocessing.Pipe(duplex=False)
+                for index in range(self.num_workers):
+                    # Un emplacement par session plus une marge pour les requêtes ponctuelles
+                    worker = _Worker(index, self.sessions_per_worker + 2, self.slot_size)
+                    self._spawn(worker)
+                    self._workers.append(worker)
+                self._result_thread = threading.Thread(
+                    target=self._dispatch_results, name="inference-results", daemon=True
+                )
+                self._result_thread.start()
+            self._started = True
+        atexit.register(self.shutdown)
+        logger.info("Exécuteur d'inférence démarré avec %d processus", self.num_workers)
+
+    def shutdown(self) -> None:
+        """Arrête les processus de travail et libère la mémoire partagée."""
+        with self._lock:
+            if not self._started:
+                return
+            self._started = False
+            for worker in [None, *self._workers]:
+                self.scheduler.discard(worker)
+            if self._thread_pool is not None:
+                # Un thread bloqué ne se termine pas, et utilise encore ses graphes
+                self._thread_pool.shutdown(wait=not self._inline_hung)
+                if not self._inline_hung:
+                    self._runner.close()
+                self._thread_pool = self._runner = None
+            for worker in self._workers:
+                worker.task_queue.put(None)
+            for worker in self._workers:
+                worker.process.join(timeout=5)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+                    worker.process.join(timeout=1)
+                worker.shm.close()
+                worker.shm.unlink()
+            self._workers = []
+            self._session_workers.clear()
+            if self._result_thread is not None:
+                self._wakeup_sender.send(False)
+                self._result_thread.join(timeout=5)
+                self._wakeup.close()
+                self._wakeup_sender.close()
+                self._wakeup = self._wakeup_sender = self._result_thread = None
+            self._fail_pending(RuntimeError("Inference executor stopped"))
+        atexit.unregister(self.shutdown)
+
+    def open_session(self, session_id: str, tier: Optional[str] = None, state: Optional[bytes] = None) -> None:
+        """
+        Attache une session au processus le moins chargé.
+
+        Args:
+            session_id: Identifiant de la session
+            tier: Niveau de qualité de la session (None : niveau par défaut)
+            state: État de suivi à reprendre (voir ``export_session``)
+
+        Raises:
+            SessionLimitError: Si tous les processus sont à pleine capacité
+            ValueError: Si le niveau de qualité est inconnu
+        """
+        if tier is not None:
+            tier = resolve_quality_tier(tier).name
+        self.start()
+        with self._lock:
+            if self.num_workers == 0:
+                # Le runner local applique lui-même la limite
+                if len(self._session_workers) >= self.max_sessions:
+                    raise SessionLimitError("Maximum number of tracking sessions reached")
+                self._session_workers[session_id] = None
+                if tier is not None:
+                    self._session_tiers[session_id] = tier
+                    self._thread_pool.submit(self._runner.run, OP_OPEN, session_id, tier)
+                if state is not None:
+                    self._thread_pool.submit(self._runner.run, OP_RESTORE, session_id, state)
+                return
+            worker = min(self._workers, key=lambda w: len(w.sessions))
+            if len(worker.sessions) >= self.sessions_per_worker:
+                raise SessionLimitError("Maximum number of tracking sessions reached")
+            worker.sessions.add(session_id)
+            self._session_workers[session_id] = worker
+            tasks = []
+            if tier is not None:
+                self._session_tiers[session_id] = tier
+                tasks.append((None, OP_OPEN, session_id, None, None, 0, tier, None))
+            if state is not None:
+                tasks.append((None, OP_RESTORE, session_id, None, None, 0, state, None))
+            if tasks:
+                # Les tâches d'un processus sont exécutées dans l'ordre : le niveau et
+                # l'état sont connus avant la première image de la session
+                worker.task_queue.put(tasks)
+
+    def close_session(self, session_id: str) -> None:
+        """Détache une session et libère son état de suivi."""
+        with self._lock:
+            if session_id not in self._session_workers:
+                return
+            worker = self._session_workers.pop(session_id)
+            self._session_tiers.pop(session_id, None)
+            if worker is None:
+                self._thread_pool.submit(self._runner.run, OP_CLOSE, session_id, None)
+                return
+            worker.sessions.discard(session_id)
+            worker.task_queue.put([(None, OP_CLOSE, session_id, None, None, 0, None, None)])
+
+    async def process(self, session_id: str, payload, frame: Optional[FrameDescriptor] = None,
+                      timestamp: Optional[float] = None):
+        """
+        Analyse une image dans le contexte de suivi d'une session.
+
+        Args:
+            session_id: Session ouverte par ``open_session``
+            payload: Octets de l'image (bytes ou memoryview)
+            frame: Description de l'image (image encodée par défaut)
+            timestamp: Instant (s) de capture de l'image, pour le filtre de Kalman
+                (None : instant de traitement)
+
+        Returns:
+            Tuple contenant les points de repère du visage et la position des lunettes
+        """
+        if session_id not in self._session_workers:
+            self.open_session(session_id)
+        return await self._submit(OP_PROCESS, session_id, payload, frame, self._session_workers.get(session_id),
+                                  timestamp)
+
+    async def export_session(self, session_id: str) -> Optional[bytes]:
+        """
+        Sérialise l'état de suivi d'une session, pour la reprendre ailleurs.
+
+        Returns:
+            L'état sérialisé (voir ``FaceDetectorService.export_state``), ou None si la
+            session n'est pas attachée ou n'a pas encore reçu d'image
+        """
+        if session_id not in self._session_workers:
+            return None
+        return await self._submit(OP_EXPORT, session_id, b"", None, self._session_workers[session_id])
+
+    def worker_pids(self) -> List[int]:
+        """Identifiants des processus de travail en cours d'exécution."""
+        return [worker.process.pid for worker in self._workers
+                if worker.process is not None and worker.process.pid is not None]
+
+    def stats(self) -> dict:
+        """
+        Statistiques de l'exécuteur : profondeur de file et taille des lots.
+
+        ``queue_depth`` compte les images soumises et pas encore traitées, dont
+        ``queued_frames`` attendent encore l'envoi de leur lot.
+        """
+        return {
+            "workers": self.num_workers,
+            "sessions": len(self._session_workers),
+            "queue_depth": len(self._pending),
+            "batch_max_wait_ms": self.scheduler.max_wait * 1000,
+            **self.scheduler.stats(),
+        }
+
+    async def process_once(self, payload, frame: Optional[FrameDescriptor] = None):
+        """
+        Analyse une image isolée, sans état de suivi.
+
+        Args:
+            payload: Octets de l'image (bytes ou memoryview)
+            frame: Description de l'image (image encodée par défaut)
+
+        Returns:
+            Tuple contenant les points de repère du visage et la position des lunettes
+        """
+        self.start()
+        worker = None
+        if self.num_workers:
+            worker = self._workers[next(self._round_robin) % len(self._workers)]
+        return await self._submit(OP_PROCESS_ONCE, None, payload, frame, worker)
+
+    async def process_still(self, payload, frame: Optional[FrameDescriptor] = None):
+        """
+        Analyse une image fixe (portrait d'un lot), Face Mesh en mode image fixe.
+
+        Les images sont réparties à tour de rôle entre les processus de travail, si bien
+        que les images d'un lot soumises ensemble sont analysées en parallèle.
+
+        Args:
+            payload: Octets de l'image (bytes ou memoryview)
+            frame: Description de l'image (image encodée par défaut)
+
+        Returns:
+            Tuple contenant les points de repère du visage et la position des lunettes
+        """
+        self.start()
+        worker = None
+        if self.num_workers:
+            worker = self._workers[next(self._round_robin) % len(self._workers)]
+        return await self._submit(OP_PROCESS_STILL, None, payload, frame, worker)
+
+    async def warm_up(self, timeout: float = 120.0) -> List[dict]:
+        """
+        Démarre les processus de travail et attend la fin de leur préchauffage.
+
+        Chaque processus importe MediaPipe et prépare ses instances Face Mesh dès son
+        lancement ; ``ready`` passe à True une fois tous les processus préparés.
+
+        Args:
+            timeout: Délai maximum (s) du préchauffage d'un processus
+
+        Returns:
+            Le résultat du préchauffage de chaque processus
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self.start)
+        workers = self._workers or [None]
+        self.warm_up_report = list(await asyncio.gather(
+            *(self._submit(OP_WARM_UP, None, b"", None, worker, timeout=timeout) for worker in workers)
+        ))
+        self.ready = True
+        return self.warm_up_report
+
+    async def _submit(self, op: str, session_id: Optional[str], payload, frame: Optional[FrameDescriptor],
+                      worker: Optional[_Worker], timestamp: Optional[float] = None,
+                      timeout: Optional[float] = None):
+        if worker is None and self._inline_hung:
+            raise RuntimeError("Inference thread stuck")
+        loop = asyncio.get_running_loop()
+        frame = (FrameFormat.JPEG, 0, 0) if frame is None else (int(frame.format), frame.width, frame.height)
+        future = loop.create_future()
+        with self._lock:
+            if worker is not None and not worker.process.is_alive():
+                self._respawn(worker)
+            request_id = next(self._request_ids)
+            slot = None
+            # Une tâche sans image (préchauffage) ne mobilise pas d'emplacement
+            if worker is not None and worker.free_slots and 0 < len(payload) <= self.slot_size:
+                slot = worker.free_slots.pop()
+            self._pending[request_id] = (loop, future, worker, slot)
+        if worker is None:
+            # Même processus : l'image est transmise sans copie
+            task = (request_id, op, session_id, frame, None, len(payload), payload, timestamp)
+        elif slot is not None:
+            offset = slot * self.slot_size
+            worker.shm.buf[offset:offset + len(payload)] = payload
+            task = (request_id, op, session_id, frame, slot, len(payload), None, timestamp)
+        else:
+            # Aucun emplacement libre : l'image est transmise par la file
+            task = (request_id, op, session_id, frame, None, len(payload), bytes(payload), timestamp)
+
+        if op == OP_PROCESS:
+            sessions = len(worker.sessions) if worker is not None else len(self._session_workers)
+            self.scheduler.submit(worker, task, expected=sessions)
+        else:
+            self._send(worker, [task])
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            if worker is not None:
+                self._record_timeout(worker, request_id)
+            else:
+                self._record_inline_timeout(request_id)
+            raise RuntimeError("Inference timed out")
+
+    def _record_timeout(self, worker: _Worker, request_id: int) -> None:
+        """Remplace un processus qui semble bloqué après une requête expirée."""
+        with self._lock:
+            if self._pending.get(request_id, (None, None, None))[2] is not worker:
+                # Réponse arrivée entre-temps, ou processus déjà remplacé
+                return
+            worker.timeouts += 1
+            if worker.timeouts < self.max_timeouts and worker.free_slots:
+                return
+            logger.error("Processus d'inférence %d bloqué (%d requêtes expirées, %d emplacements libres)",
+                         worker.index, worker.timeouts, len(worker.free_slots))
+            worker.process.kill()
+            worker.process.join(timeout=1)
+            self._respawn(worker)
+
+    def _record_inline_timeout(self, request_id: int) -> None:
+        """Déclare le thread d'inférence bloqué après ``max_timeouts`` requêtes expirées."""
+        with self._lock:
+            if request_id not in self._pending or self._inline_hung:
+                return
+            self._inline_timeouts += 1
+            if self._inline_timeouts < self.max_timeouts:
+                return
+            self._inline_hung = True
+            self.ready = False
+            pending = [self._pending.pop(key) for key, entry in list(self._pending.items()) if entry[2] is None]
+        logger.error("Thread d'inférence bloqué (%d requêtes expirées)", self._inline_timeouts)
+        for entry in pending:
+            self._resolve(entry, False, ("RuntimeError", "Inference thread stuck"))
+        if self.on_hung is not None:
+            self.on_hung()
+
+    def _send(self, worker: Optional[_Worker], tasks: List[tuple]) -> None:
+        if worker is not None:
+            worker.task_queue.put(tasks)
+            return
+        with self._lock:
+            self._inline_pending += len(tasks)
+        self._thread_pool.submit(self._run_inline, tasks)
+
+    def _run_inline(self, tasks: List[tuple]) -> None:
+        with self._lock:
+            backlog = self._inline_pending - len(tasks)
+        try:
+            results = self._runner.run_batch([task[:4] + task[6:] for task in tasks], backlog)
+        except Exception as e:
+            results = [_failure(task[0], e) for task in tasks]
+        finally:
+            with self._lock:
+                self._inline_pending -= len(tasks)
+        self._deliver(results)
+
+    def _spawn(self, worker: _Worker) -> None:
+        worker.task_queue = self._context.Queue()
+        worker.results, result_pipe = self._context.Pipe(duplex=False)
+        worker.process = self._context.Process(
+            target=_worker_main,
+            args=(worker.task_queue, result_pipe, worker.shm.name, self.slot_size,
+                  self.sessions_per_worker, self.idle_timeout, self.detector_options, self.warm_face_meshes),
+            name=f"inference-worker-{worker.index}",
+            daemon=True,
+        )
+        worker.process.start()
+        # Seul le processus garde l'extrémité d'écriture : sa fin se lit comme EOF
+        result_pipe.close()
+
+    def _respawn(self, worker: _Worker) -> None:
+        logger.error("Processus d'inférence %d arrêté, redémarrage", worker.index)
+        self.scheduler.discard(worker)
+        for request_id, entry in list(self._pending.items()):
+            if entry[2] is worker:
+                del self._pending[request_id]
+                self._resolve(entry, False, ("RuntimeError", "Inference worker died"))
+        worker.free_slots = list(range(self.sessions_per_worker + 2))
+        worker.timeouts = 0
+        # Le processus remplaçant se préchauffe avant de lire ses premières tâches
+        self._spawn(worker)
+        self._wakeup_sender.send(True)
+        tiers = [(None, OP_OPEN, session_id, None, None, 0, self._session_tiers[session_id], None)
+                 for session_id in worker.sessions if session_id in self._session_tiers]
+        if tiers:
+            worker.task_queue.put(tiers)
+
+    def _dispatch_results(self) -> None:
+        # Sans verrou : l'arrêt attend ce thread en le détenant
+        wakeup, connections = self._wakeup, set()
+        while True:
+            # Les tubes des processus remplaçants s'ajoutent à ceux encore ouverts
+            connections.update(worker.results for worker in self._workers if not worker.results.closed)
+            for connection in multiprocessing.connection.wait([wakeup, *connections]):
+                if connection is wakeup:
+                    if not wakeup.recv():
+                        for pipe in connections:
+                            pipe.close()
+                        return
+                    continue
+                try:
+                    results, metrics = connection.recv()
+                except (EOFError, OSError):
+                    # Processus arrêté : ses requêtes échouent à son remplacement
+                    connections.discard(connection)
+                    connection.close()
+                    continue
+                if metrics:
+                    registry.merge(metrics)
+                self._deliver(results)
+
+    def _deliver(self, results: List[tuple]) -> None:
+        for request_id, ok, payload in results:
+            with self._lock:
+                entry = self._pending.pop(request_id, None)
+                if entry is not None and entry[2] is not None:
+                    entry[2].timeouts = 0
+                elif entry is not None:
+                    self._inline_timeouts = 0
+                if entry is not None and entry[3] is not None:
+                    entry[2].free_slots.append(entry[3])
+            if entry is not None:
+                self._resolve(entry, ok, payload)
+
+    def _fail_pending(self, error: Exception) -> None:
+        pending, self._pending = self._pending, {}
+        for entry in pending.values():
+            self._resolve(entry, False, error)
+
+    @staticmethod
+    def _resolve(entry, ok: bool, payload) -> None:
+        loop, future = entry[0], entry[1]
+        if not ok and not isinstance(payload, Exception):
+            name, message = payload
+            payload = _REMOTE_ERRORS.get(name, RuntimeError)(message)
+        try:
+            loop.call_soon_threadsafe(_set_future, future, ok, payload)
+        except RuntimeError:
+            # La boucle d'événements du demandeur est déjà fermée
+            pass
+
+
+def _set_future(future: asyncio.Future, ok: bool, payload) -> None:
+    if future.done():
+        return
+    if ok:
+        future.set_result(payload)
+    else:
+        future.set_exception(payload)
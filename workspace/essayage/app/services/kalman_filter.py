@@ -1,59 +1,388 @@
+"""
+Filtres de Kalman pour le lissage de la pose des lunettes.
+
+Chaque composante de la pose (position, rotation et échelle, soit 9 valeurs) suit un
+modèle à vitesse constante indépendant : l'état d'un axe est (valeur, vitesse) et sa
+covariance une matrice 2x2 symétrique. Le gain se calcule donc en forme fermée, sans
+inversion de matrice.
+
+``KalmanFilterBank`` empile les filtres de nombreuses sessions dans des tableaux
+NumPy de forme (capacité, dimensions) et les met à jour en une seule opération, en
+place et sans allocation : les mesures de chaque session sont d'abord déposées
+(``stage``), puis intégrées toutes ensemble (``update_staged``). L'intervalle entre deux mesures est déduit de leurs
+horodatages, exprimé en nombre d'images à ``frame_interval`` secondes.
+
+L'état d'un emplacement (valeurs, vitesses et covariances) s'exporte en un tableau
+``float32`` de forme (5, dimensions), pour reprendre une session dans un autre processus.
+
+Classes:
+    KalmanFilterBank: Banque de filtres mise à jour par lots.
+    PoseFilter: Filtre d'une session, adossé à un emplacement de la banque.
+    KalmanFilter3D: Filtre de position seule, conservé pour compatibilité.
+"""
+
+from typing import Optional
+
 import numpy as np
 from app.models.face import Point3D
 
+# Composantes de la pose : position (x, y, z), rotation (x, y, z), échelle (x, y, z)
+POSE_DIMS = 9
+POSE_ROTATION = slice(3, 6)
+
+
+class KalmanFilterBank:
+    """
+    Banque de filtres de Kalman à vitesse constante, un par emplacement.
+
+    Attributes:
+        capacity: Nombre d'emplacements
+        dims: Nombre de composantes filtrées par emplacement
+        value: Valeurs filtrées, de forme (capacité, dimensions)
+        velocity: Vitesses estimées (par image), de forme (capacité, dimensions)
+        last_time: Horodatage de la dernière mesure de chaque emplacement
+        active: Emplacements attribués
+        initialized: Emplacements ayant reçu au moins une mesure
+    """
+
+    def __init__(self, capacity: int, dims: int = POSE_DIMS, process_noise=0.01, measurement_noise=0.01,
+                 frame_interval: float = 1 / 30, max_gap: float = 0.5,
+                 angular_dims: Optional[slice] = POSE_ROTATION):
+        """
+        Initialise la banque.
+
+        Args:
+            capacity: Nombre d'emplacements
+            dims: Nombre de composantes filtrées
+            process_noise: Bruit de processus par image (scalaire ou une valeur par composante)
+            measurement_noise: Bruit de mesure (scalaire ou une valeur par composante)
+            frame_interval: Durée (s) d'une image, unité du modèle de mouvement
+            max_gap: Intervalle maximum (s) extrapolé entre deux mesures
+            angular_dims: Composantes exprimées en radians, dont l'écart est ramené à [-π, π]
+        """
+        self.capacity = capacity
+        self.dims = dims
+        self.frame_interval = frame_interval
+        self.max_gap = max_gap
+        self.angular_dims = angular_dims
+        self.process_noise = np.broadcast_to(np.asarray(process_noise, dtype=np.float64), (dims,)).copy()
+        self.measurement_noise = np.broadcast_to(np.asarray(measurement_noise, dtype=np.float64), (dims,)).copy()
+
+        shape = (capacity, dims)
+        self.value = np.zeros(shape)
+        self.velocity = np.zeros(shape)
+        # Covariance symétrique de chaque axe : [[p_vv, p_vd], [p_vd, p_dd]]
+        self._p_vv = np.ones(shape)
+        self._p_vd = np.zeros(shape)
+        self._p_dd = np.ones(shape)
+        self.last_time = np.zeros(capacity)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.initialized = np.zeros(capacity, dtype=bool)
+
+        # Tampons de travail réutilisés à chaque mise à jour
+        self._dt = np.zeros((capacity, 1))
+        self._rows = np.zeros((capacity, 1), dtype=bool)
+        self._fresh = np.zeros((capacity, 1), dtype=bool)
+        self._steady = np.zeros((capacity, 1), dtype=bool)
+        self._innovation = np.zeros(shape)
+        self._gain_value = np.zeros(shape)
+        self._gain_velocity = np.zeros(shape)
+        self._tmp = np.zeros(shape)
+
+        # Mesures en attente d'intégration
+        self._staged_measurements = np.zeros(shape)
+        self._staged_timestamps = np.zeros(capacity)
+        self._staged = np.zeros(capacity, dtype=bool)
+
+    def allocate(self) -> int:
+        """
+        Attribue un emplacement libre.
+
+        Returns:
+            L'indice de l'emplacement
+
+        Raises:
+            RuntimeError: Si tous les emplacements sont utilisés
+        """
+        free = np.flatnonzero(~self.active)
+        if free.size == 0:
+            raise RuntimeError("No free Kalman filter slot")
+        slot = int(free[0])
+        self.active[slot] = True
+        self.reset(slot)
+        return slot
+
+    def release(self, slot: int) -> None:
+        """Libère un emplacement."""
+        self.active[slot] = False
+        self.initialized[slot] = False
+        self._staged[slot] = False
+
+    def reset(self, slot: int) -> None:
+        """Oublie l'état d'un emplacement : la prochaine mesure le réinitialise."""
+        self.initialized[slot] = False
+        self.value[slot] = 0.0
+        self.velocity[slot] = 0.0
+
+    def export_slot(self, slot: int) -> np.ndarray:
+        """
+        Exporte l'état d'un emplacement.
+
+        Returns:
+            Valeurs, vitesses et covariances (p_vv, p_vd, p_dd), de forme (5, dimensions)
+        """
+        return np.stack([self.value[slot], self.velocity[slot], self._p_vv[slot], self._p_vd[slot],
+                         self._p_dd[slot]]).astype(np.float32)
+
+    def restore_slot(self, slot: int, state: np.ndarray, last_time: float) -> None:
+        """
+        Restaure l'état d'un emplacement exporté par ``export_slot``.
+
+        Args:
+            slot: Emplacement (attribué)
+            state: État de forme (5, dimensions)
+            last_time: Horodatage de la dernière mesure, dans l'horloge de la banque
+        """
+        self.value[slot], self.velocity[slot], self._p_vv[slot], self._p_vd[slot], self._p_dd[slot] = state
+        self.last_time[slot] = last_time
+        self.initialized[slot] = True
+        self._staged[slot] = False
+
+    def update(self, measurements: np.ndarray, timestamps: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """
+        Intègre une mesure pour chaque emplacement sélectionné, en une seule opération.
+
+        Les emplacements non sélectionnés ou inactifs sont laissés intacts. La première
+        mesure d'un emplacement initialise directement son état.
+
+        Args:
+            measurements: Mesures de forme (capacité, dimensions)
+            timestamps: Horodatages (s) des mesures, de forme (capacité,)
+            mask: Emplacements à mettre à jour, de forme (capacité,)
+
+        Returns:
+            Les valeurs filtrées de toute la banque (vue sur ``value``)
+        """
+        rows, fresh, steady, dt = self._rows, self._fresh, self._steady, self._dt
+        np.logical_and(mask, self.active, out=rows[:, 0])
+        np.logical_and(rows, self.initialized[:, None], out=steady)
+        np.not_equal(rows, steady, out=fresh)
+
+        # Intervalle en images, nul pour les emplacements ignorés ou nouveaux
+        np.subtract(timestamps, self.last_time, out=dt[:, 0])
+        np.clip(dt, 0.0, self.max_gap, out=dt)
+        dt /= self.frame_interval
+        dt *= steady
+
+        self._predict(dt)
+        self._correct(measurements, steady)
+
+        # Premières mesures : l'état part de la mesure, à vitesse nulle
+        np.copyto(self.value, measurements, where=fresh)
+        np.copyto(self.velocity, 0.0, where=fresh)
+        np.copyto(self._p_vv, self.measurement_noise, where=fresh)
+        np.copyto(self._p_vd, 0.0, where=fresh)
+        np.copyto(self._p_dd, 1.0, where=fresh)
+
+        np.copyto(self.last_time, timestamps, where=rows[:, 0])
+        self.initialized |= rows[:, 0]
+        if self.angular_dims is not None:
+            _wrap_angles(self.value[:, self.angular_dims])
+        return self.value
+
+    def stage(self, slot: int, measurement: np.ndarray, timestamp: float) -> None:
+        """
+        Dépose la mesure d'un emplacement, intégrée au prochain ``update_staged``.
+
+        Args:
+            slot: Emplacement
+            measurement: Mesure de forme (dimensions,)
+            timestamp: Horodatage (s) de la mesure
+        """
+        self._staged_measurements[slot] = measurement
+        self._staged_timestamps[slot] = timestamp
+        self._staged[slot] = True
+
+    def update_staged(self) -> np.ndarray:
+        """
+        Intègre en une seule opération toutes les mesures déposées.
+
+        Returns:
+            Les valeurs filtrées de toute la banque (vue sur ``value``)
+        """
+        values = self.update(self._staged_measurements, self._staged_timestamps, self._staged)
+        self._staged[:] = False
+        return values
+
+    def predict(self, slot: int, timestamp: float) -> np.ndarray:
+        """
+        Extrapole l'état d'un emplacement à un instant donné, sans le modifier.
+
+        Args:
+            slot: Emplacement
+            timestamp: Instant (s) de l'extrapolation
+
+        Returns:
+            Les valeurs extrapolées (nouveau tableau)
+        """
+        gap = min(max(timestamp - self.last_time[slot], 0.0), self.max_gap) / self.frame_interval
+        predicted = self.value[slot] + self.velocity[slot] * gap
+        if self.angular_dims is not None:
+            _wrap_angles(predicted[self.angular_dims])
+        return predicted
+
+    def _predict(self, dt: np.ndarray) -> None:
+        # x = F x, avec F = [[1, dt], [0, 1]]
+        np.multiply(self.velocity, dt, out=self._tmp)
+        self.value += self._tmp
+        # P = F P Fᵀ + Q dt : p_vv += dt (2 p_vd + dt p_dd), p_vd += dt p_dd
+        np.multiply(self._p_dd, dt, out=self._tmp)
+        np.add(self._tmp, self._p_vd, out=self._innovation)
+        self._innovation += self._p_vd
+        self._innovation *= dt
+        self._p_vv += self._innovation
+        self._p_vd += self._tmp
+        np.multiply(self.process_noise, dt, out=self._tmp)
+        self._p_vv += self._tmp
+        self._p_dd += self._tmp
+
+    def _correct(self, measurements: np.ndarray, steady: np.ndarray) -> None:
+        # Innovation y = z - x, nulle pour les emplacements ignorés ou nouveaux
+        innovation = self._innovation
+        np.subtract(measurements, self.value, out=innovation)
+        if self.angular_dims is not None:
+            _wrap_angles(innovation[:, self.angular_dims])
+        innovation *= steady
+
+        # Gain K = P Hᵀ / S, avec S = p_vv + r (scalaire par axe)
+        np.add(self._p_vv, self.measurement_noise, out=self._tmp)
+        np.divide(self._p_vv, self._tmp, out=self._gain_value)
+        np.divide(self._p_vd, self._tmp, out=self._gain_velocity)
+        self._gain_value *= steady
+        self._gain_velocity *= steady
+
+        # x = x + K y
+        np.multiply(self._gain_value, innovation, out=self._tmp)
+        self.value += self._tmp
+        np.multiply(self._gain_velocity, innovation, out=self._tmp)
+        self.velocity += self._tmp
+
+        # P = (I - K H) P
+        np.multiply(self._gain_velocity, self._p_vd, out=self._tmp)
+        self._p_dd -= self._tmp
+        np.subtract(1.0, self._gain_value, out=self._tmp)
+        self._p_vv *= self._tmp
+        self._p_vd *= self._tmp
+
+
+def _wrap_angles(angles: np.ndarray) -> None:
+    """Ramène des angles (radians) dans [-π, π], en place."""
+    angles += np.pi
+    np.mod(angles, 2 * np.pi, out=angles)
+    angles -= np.pi
+
+
+class PoseFilter:
+    """
+    Filtre de pose d'une session, adossé à un emplacement d'une ``KalmanFilterBank``.
+
+    Attributes:
+        bank: Banque portant l'état du filtre
+        slot: Emplacement attribué dans la banque
+    """
+
+    def __init__(self, bank: Optional[KalmanFilterBank] = None):
+        self.bank = bank if bank is not None else KalmanFilterBank(1)
+        self.slot = self.bank.allocate()
+
+    def stage(self, measurement: np.ndarray, timestamp: float) -> None:
+        """Dépose une mesure, intégrée avec celles des autres sessions par ``bank.update_staged``."""
+        self.bank.stage(self.slot, measurement, timestamp)
+
+    def update(self, measurement: np.ndarray, timestamp: float) -> np.ndarray:
+        """
+        Intègre immédiatement une mesure de la session.
+
+        Args:
+            measurement: Mesure de forme (dimensions,)
+            timestamp: Horodatage (s) de la mesure
+
+        Returns:
+            Les valeurs filtrées de la session (vue sur la banque)
+        """
+        self.stage(measurement, timestamp)
+        return self.bank.update_staged()[self.slot]
+
+    @property
+    def value(self) -> np.ndarray:
+        """Valeurs filtrées de la session (vue sur la banque)."""
+        return self.bank.value[self.slot]
+
+    def predict(self, timestamp: float) -> np.ndarray:
+        """Extrapole la pose de la session à l'instant donné."""
+        return self.bank.predict(self.slot, timestamp)
+
+    @property
+    def velocity(self) -> np.ndarray:
+        """Vitesse estimée (par image) de chaque composante."""
+        return self.bank.velocity[self.slot]
+
+    def export_state(self) -> np.ndarray:
+        """État du filtre, de forme (5, dimensions) (voir ``KalmanFilterBank.export_slot``)."""
+        return self.bank.export_slot(self.slot)
+
+    def restore_state(self, state: np.ndarray, last_time: float) -> None:
+        """Restaure un état exporté par ``export_state``."""
+        self.bank.restore_slot(self.slot, state, last_time)
+
+    @property
+    def initialized(self) -> bool:
+        """Indique si le filtre a reçu au moins une mesure."""
+        return bool(self.bank.initialized[self.slot])
+
+    @property
+    def last_time(self) -> float:
+        """Horodatage de la dernière mesure."""
+        return float(self.bank.last_time[self.slot])
+
+    def reset(self) -> None:
+        """Oublie l'état de la session."""
+        self.bank.reset(self.slot)
+
+    def release(self) -> None:
+        """Rend l'emplacement à la banque."""
+        self.bank.release(self.slot)
+
+
 class KalmanFilter3D:
+    """
+    Filtre de la position seule, à intervalle fixe d'une image entre deux mesures.
+
+    Conservé pour compatibilité ; le service de détection utilise ``PoseFilter``.
+    """
+
     def __init__(self, process_noise=0.01, measurement_noise=0.01):
+        self._filter = PoseFilter(KalmanFilterBank(1, dims=3, process_noise=process_noise,
+                                                   measurement_noise=measurement_noise, frame_interval=1.0,
+                                                   max_gap=float("inf"), angular_dims=None))
+        self._frames = 0
+
+    @property
+    def state(self) -> np.ndarray:
         # État : [x, y, z, vx, vy, vz]
-        self.state = np.zeros(6)
-        self.covariance = np.eye(6)
-        
-        # Matrice de transition (modèle de mouvement constant)
-        self.F = np.array([
-            [1, 0, 0, 1, 0, 0],
-            [0, 1, 0, 0, 1, 0],
-            [0, 0, 1, 0, 0, 1],
-            [0, 0, 0, 1, 0, 0],
-            [0, 0, 0, 0, 1, 0],
-            [0, 0, 0, 0, 0, 1]
-        ])
-        
-        # Matrice d'observation (on observe uniquement la position)
-        self.H = np.array([
-            [1, 0, 0, 0, 0, 0],
-            [0, 1, 0, 0, 0, 0],
-            [0, 0, 1, 0, 0, 0]
-        ])
-        
-        # Bruit de processus et de mesure
-        self.Q = np.eye(6) * process_noise
-        self.R = np.eye(3) * measurement_noise
-        
+        return np.concatenate([self._filter.bank.value[0], self._filter.velocity])
+
     def predict(self):
-        # Prédiction de l'état
-        self.state = self.F @ self.state
-        self.covariance = self.F @ self.covariance @ self.F.T + self.Q
-        return self.state[:3]  # Retourne uniquement la position
-        
+        return self._filter.predict(self._frames + 1)
+
     def update(self, measurement):
-        # Prédiction avant mise à jour
-        self.predict()
-        
-        # Innovation
-        y = measurement - self.H @ self.state
-        S = self.H @ self.covariance @ self.H.T + self.R
-        
-        # Gain de Kalman
-        K = self.covariance @ self.H.T @ np.linalg.inv(S)
-        
-        # Mise à jour
-        self.state = self.state + K @ y
-        self.covariance = (np.eye(6) - K @ self.H) @ self.covariance
-        
-        return self.state[:3]  # Retourne uniquement la position
-        
+        self._frames += 1
+        return self._filter.update(measurement, self._frames).copy()
+
     def get_position(self):
+        position = self._filter.bank.value[0]
         return Point3D(
-            x=float(self.state[0]),
-            y=float(self.state[1]),
-            z=float(self.state[2])
-        ) 
\ No newline at end of file
+            x=float(position[0]),
+            y=float(position[1]),
+            z=float(position[2])
+        )
@@ -0,0 +1,80 @@
+"""
+Niveaux de qualité du suivi facial, choisis par session.
+
+Un niveau regroupe la configuration de Face Mesh (modèle d'affinage de l'iris), la
+résolution analysée, la fréquence d'images visée et la projection des points de repère
+renvoyés par défaut. Un téléphone d'entrée de gamme qui n'a besoin que d'une pose
+approximative choisit ``lite`` et ne paie ni le modèle de l'iris ni la pleine
+résolution ; ``precise`` correspond au comportement historique du service.
+
+Débit mesuré par ``benchmark/quality_tiers.py`` (un cœur, portrait 640x480, suivi de
+la région du visage, sans saut d'images). Face Mesh analyse la région du visage à
+192x192 quelle que soit sa taille : l'essentiel du gain par image vient de l'abandon du
+modèle de l'iris, celui par session de la fréquence visée.
+
+=========  ========  ============  =====================
+Niveau     Images/s  Médiane (ms)  Sessions par cœur
+=========  ========  ============  =====================
+lite       ~89       9             ~6 (15 images/s)
+standard   ~90       9             ~3,7 (24 images/s)
+precise    ~72       12            ~2,4 (30 images/s)
+=========  ========  ============  =====================
+
+Classes:
+    QualityTier: Paramètres d'un niveau de qualité.
+
+Functions:
+    resolve_quality_tier: Retrouve un niveau de qualité par son nom.
+"""
+
+from typing import NamedTuple, Optional
+
+from ..models.face import PROJECTION_CONTOUR, PROJECTION_FULL, PROJECTION_GLASSES
+
+
+class QualityTier(NamedTuple):
+    """
+    Paramètres d'un niveau de qualité.
+
+    Une résolution à None reprend la configuration du service.
+    """
+    name: str
+    refine_landmarks: bool
+    detection_max_side: Optional[int]
+    roi_size: Optional[int]
+    target_fps: float
+    projection: str
+
+    def detector_options(self) -> dict:
+        """Paramètres du ``FaceDetectorService`` propres à ce niveau."""
+        options = {"detection_max_side": self.detection_max_side, "roi_size": self.roi_size}
+        return {key: value for key, value in options.items() if value is not None}
+
+
+QUALITY_TIERS = {tier.name: tier for tier in (
+    # Sans iris (468 points), résolution réduite : pose et monture uniquement
+    QualityTier("lite", False, 320, 192, 15.0, PROJECTION_GLASSES),
+    QualityTier("standard", False, 480, 192, 24.0, PROJECTION_CONTOUR),
+    QualityTier("precise", True, None, None, 30.0, PROJECTION_FULL),
+)}
+
+DEFAULT_QUALITY_TIER = "precise"
+
+
+def resolve_quality_tier(name: Optional[str] = None) -> QualityTier:
+    """
+    Retrouve un niveau de qualité par son nom.
+
+    Args:
+        name: Nom du niveau (None : niveau par défaut)
+
+    Returns:
+        Le niveau de qualité
+
+    Raises:
+        ValueError: Si le niveau est inconnu
+    """
+    tier = QUALITY_TIERS.get(name or DEFAULT_QUALITY_TIER)
+    if tier is None:
+        raise ValueError(f"Unknown quality tier: {name} (expected one of {', '.join(QUALITY_TIERS)})")
+    return tier
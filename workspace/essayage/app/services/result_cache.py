@@ -0,0 +1,144 @@
+"""
+Cache des résultats de l'endpoint ``/detect``.
+
+Les pages produit et les outils de recette soumettent souvent les mêmes photos. Le
+résultat de l'analyse est conservé sous l'empreinte (BLAKE2b) du contenu envoyé, si
+bien qu'une image déjà vue est servie sans décodage ni passage dans Face Mesh. Les
+requêtes ponctuelles ne touchant à aucun état de suivi, un résultat servi depuis le
+cache ne modifie ni les sessions ni les filtres de Kalman.
+
+Classes:
+    ResultCache: Cache LRU borné en nombre d'entrées, en octets et en durée de vie.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+# Surcoût estimé (octets) d'une entrée : clé, tuple, objets Python de la réponse
+ENTRY_OVERHEAD = 1024
+
+
+def content_key(contents: bytes) -> bytes:
+    """Empreinte du contenu d'une image, utilisée comme clé du cache."""
+    return hashlib.blake2b(contents, digest_size=16).digest()
+
+
+def result_size(result: tuple) -> int:
+    """Estimation (octets) de la mémoire occupée par un résultat d'analyse."""
+    landmarks = [result[0]] + [face.landmarks for face in (result[2] if len(result) > 2 else [])]
+    return ENTRY_OVERHEAD * len(landmarks) + sum(item.points.nbytes for item in landmarks)
+
+
+class ResultCache:
+    """
+    Cache LRU des résultats d'analyse, indexé par le contenu des images.
+
+    Doit être utilisé depuis la boucle d'événements.
+
+    Attributes:
+        max_entries: Nombre maximum d'entrées (0 : cache désactivé)
+        max_bytes: Mémoire maximale (octets) occupée par les entrées
+        ttl: Durée de vie (s) d'une entrée
+        size_bytes: Mémoire occupée par les entrées
+        hits: Nombre de résultats servis depuis le cache
+        misses: Nombre de résultats absents ou expirés
+        evictions: Nombre d'entrées évincées faute de place
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024, ttl: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialise le cache.
+
+        Args:
+            max_entries: Nombre maximum d'entrées (0 : cache désactivé)
+            max_bytes: Mémoire maximale (octets) occupée par les entrées
+            ttl: Durée de vie (s) d'une entrée
+            clock: Horloge utilisée pour l'expiration des entrées
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[bytes, Tuple[float, int, Any]]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Indique si le cache conserve des résultats."""
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: bytes) -> Optional[tuple]:
+        """
+        Cherche le résultat associé à une image.
+
+        Args:
+            key: Empreinte du contenu de l'image (``content_key``)
+
+        Returns:
+            Le résultat mis en cache, ou None s'il est absent ou expiré
+        """
+        entry = self._entries.get(key)
+        if entry is None or self._clock() >= entry[0]:
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def put(self, key: bytes, result: tuple) -> None:
+        """
+        Conserve le résultat de l'analyse d'une image.
+
+        Les entrées les moins récemment utilisées sont évincées pour respecter les
+        limites ; un résultat plus grand que ``max_bytes`` n'est pas conservé.
+
+        Args:
+            key: Empreinte du contenu de l'image (``content_key``)
+            result: Résultat de l'analyse
+        """
+        size = result_size(result)
+        if not self.enabled or size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        while self._entries and (len(self._entries) >= self.max_entries or
+                                 self.size_bytes + size > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        self._entries[key] = (self._clock() + self.ttl, size, result)
+        self.size_bytes += size
+
+    def clear(self) -> None:
+        """Vide le cache."""
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def stats(self) -> dict:
+        """Statistiques du cache."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, key: bytes) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.size_bytes -= size
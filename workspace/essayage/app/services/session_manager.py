@@ -0,0 +1,461 @@
+"""
+Gestion des sessions de suivi facial.
+
+Chaque client du WebSocket dispose de son propre état de suivi (filtre de Kalman,
+dernière position, compteur d'échecs) et d'un graphe MediaPipe Face Mesh dédié,
+emprunté à un pool borné. Ainsi, les indices de suivi de MediaPipe ne proviennent
+jamais du visage d'un autre utilisateur. Chaque niveau de qualité (voir
+``quality_tiers``) dispose de son propre pool, ses graphes n'étant pas configurés de
+la même façon ; le nombre total de graphes reste borné par ``max_sessions + 1``, un
+pool qui manque de place fermant un graphe inactif d'un autre (voir ``FaceMeshBudget``).
+
+L'état de suivi d'une session s'exporte (``export_state``) et se restaure à son
+ouverture (``restore_state``), ce qui permet de la reprendre dans un autre processus
+(voir ``session_store``).
+
+Classes:
+    SessionLimitError: Levée lorsque la capacité maximale est atteinte.
+    FaceMeshBudget: Nombre maximum de graphes Face Mesh, tous pools confondus.
+    FaceMeshPool: Pool borné d'instances Face Mesh réutilisables.
+    TrackingSession: Session de suivi propre à une connexion.
+    SessionManager: Création, réutilisation et éviction des sessions.
+"""
+
+import functools
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from .face_detector import FaceDetectorService, create_face_mesh
+from .kalman_filter import KalmanFilterBank, PoseFilter
+from .quality_tiers import DEFAULT_QUALITY_TIER, QUALITY_TIERS, resolve_quality_tier
+
+logger = logging.getLogger(__name__)
+
+
+class SessionLimitError(RuntimeError):
+    """Levée lorsqu'aucune session ou instance Face Mesh n'est disponible."""
+
+
+class FaceMeshBudget:
+    """
+    Nombre maximum de graphes Face Mesh créés, tous pools confondus.
+
+    Lorsque la limite est atteinte, un pool qui doit créer un graphe ferme un graphe
+    inactif d'un autre pool, dont il reprend la place.
+
+    Attributes:
+        size: Nombre maximum de graphes
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._pools: List["FaceMeshPool"] = []
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @property
+    def created(self) -> int:
+        """Nombre de graphes existants, tous pools confondus."""
+        with self._lock:
+            return self._created
+
+    def attach(self, pool: "FaceMeshPool") -> None:
+        """Soumet les créations de graphes de ``pool`` à la limite."""
+        pool._budget = self
+        self._pools.append(pool)
+
+    def available(self, pool: "FaceMeshPool") -> int:
+        """Nombre de graphes que ``pool`` peut encore créer, en fermant ceux des autres pools."""
+        with self._lock:
+            free = self.size - self._created
+        return free + sum(other.idle for other in self._pools if other is not pool)
+
+    def reserve(self, pool: "FaceMeshPool", reclaim: bool = True) -> bool:
+        """
+        Réserve la création d'un graphe par ``pool``.
+
+        Args:
+            pool: Pool qui crée le graphe
+            reclaim: Fermer au besoin un graphe inactif d'un autre pool
+
+        Returns:
+            True si le graphe peut être créé
+        """
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return True
+        return reclaim and any(other.discard_idle() for other in self._pools if other is not pool)
+
+    def release(self, count: int = 1) -> None:
+        """Libère la place de ``count`` graphes fermés."""
+        with self._lock:
+            self._created -= count
+
+
+class FaceMeshPool:
+    """
+    Pool borné d'instances MediaPipe Face Mesh.
+
+    Les graphes sont créés à la demande jusqu'à ``size`` instances (et dans la limite
+    d'un éventuel ``FaceMeshBudget``), puis réutilisés. Un graphe rendu au pool est
+    réinitialisé afin d'effacer son état de suivi.
+    """
+
+    def __init__(self, size: int, factory: Callable = create_face_mesh):
+        self.size = size
+        self._factory = factory
+        self._idle: List = []
+        self._created = 0
+        self._budget: Optional[FaceMeshBudget] = None
+        self._lock = threading.Lock()
+
+    @property
+    def idle(self) -> int:
+        """Nombre d'instances inactives."""
+        with self._lock:
+            return len(self._idle)
+
+    @property
+    def available(self) -> int:
+        """Nombre d'instances encore disponibles (inactives ou non créées)."""
+        with self._lock:
+            idle, creatable = len(self._idle), self.size - self._created
+        if self._budget is not None:
+            creatable = min(creatable, self._budget.available(self))
+        return idle + creatable
+
+    def acquire(self, reclaim: bool = True):
+        """
+        Emprunte une instance Face Mesh.
+
+        Args:
+            reclaim: Fermer au besoin une instance inactive d'un autre pool du budget
+
+        Raises:
+            SessionLimitError: Si toutes les instances sont déjà utilisées
+        """
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            if self._created >= self.size:
+                raise SessionLimitError("No Face Mesh instance available")
+            self._created += 1
+        if self._budget is not None and not self._budget.reserve(self, reclaim):
+            with self._lock:
+                self._created -= 1
+            raise SessionLimitError("No Face Mesh instance available")
+        try:
+            return self._factory()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            if self._budget is not None:
+                self._budget.release()
+            raise
+
+    def release(self, face_mesh) -> None:
+        """Rend une instance au pool après avoir réinitialisé son graphe."""
+        face_mesh.reset()
+        with self._lock:
+            self._idle.append(face_mesh)
+
+    def prefill(self, count: int, frames: Sequence = ()) -> int:
+        """
+        Crée à l'avance des instances et les exécute sur des images de préchauffage.
+
+        Le premier appel à ``process`` d'un graphe initialise ses calculateurs et ses
+        modèles TFLite ; préchauffées, les instances répondent dès la première image.
+
+        Args:
+            count: Nombre d'instances à préparer (dans la limite du pool)
+            frames: Images RGB traitées par chaque instance
+
+        Returns:
+            Le nombre d'instances préparées
+        """
+        meshes = []
+        try:
+            for _ in range(min(count, self.available)):
+                # Le préchauffage ne ferme pas les graphes préchauffés des autres pools
+                try:
+                    meshes.append(self.acquire(reclaim=False))
+                except SessionLimitError:
+                    break
+            for face_mesh in meshes:
+                for frame in frames:
+                    face_mesh.process(frame)
+        finally:
+            for face_mesh in meshes:
+                self.release(face_mesh)
+        return len(meshes)
+
+    def discard_idle(self) -> bool:
+        """
+        Ferme l'instance inactive la plus ancienne, dont un autre pool reprend la place.
+
+        Returns:
+            False si aucune instance n'est inactive
+        """
+        with self._lock:
+            if not self._idle:
+                return False
+            face_mesh = self._idle.pop(0)
+            self._created -= 1
+        face_mesh.close()
+        return True
+
+    def close(self) -> None:
+        """Ferme toutes les instances inactives."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+        if self._budget is not None:
+            self._budget.release(len(idle))
+        for face_mesh in idle:
+            face_mesh.close()
+
+
+class TrackingSession:
+    """
+    Session de suivi propre à un client.
+
+    Attributes:
+        session_id: Identifiant de la session
+        detector: Service de détection portant l'état de suivi de la session
+        tier: Nom du niveau de qualité de la session
+        created_at: Instant de création (horloge monotone)
+        last_activity: Instant de la dernière utilisation (horloge monotone)
+        closed: Indique si la session a été fermée ou évincée
+    """
+
+    def __init__(self, session_id: str, detector: FaceDetectorService, tier: str = DEFAULT_QUALITY_TIER):
+        self.session_id = session_id
+        self.detector = detector
+        self.tier = tier
+        self.created_at = time.monotonic()
+        self.last_activity = self.created_at
+        self.closed = False
+
+    def touch(self) -> None:
+        """Met à jour l'instant de dernière activité."""
+        self.last_activity = time.monotonic()
+
+
+class SessionManager:
+    """
+    Gestionnaire des sessions de suivi.
+
+    Attributes:
+        max_sessions: Nombre maximum de sessions simultanées
+        idle_timeout: Durée d'inactivité (s) au-delà de laquelle une session est évincée
+        pool: Pool des instances Face Mesh du niveau de qualité par défaut
+        pools: Pools des instances Face Mesh, par niveau de qualité
+        budget: Nombre maximum de graphes Face Mesh, tous niveaux confondus
+        filter_bank: Banque des filtres de Kalman, un emplacement par détecteur
+        detector_options: Paramètres transmis à chaque ``FaceDetectorService``
+    """
+
+    def __init__(self, max_sessions: int = 16, idle_timeout: float = 60.0,
+                 pool: Optional[FaceMeshPool] = None, detector_options: Optional[dict] = None,
+                 face_mesh_factory: Callable = create_face_mesh):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.detector_options = detector_options or {}
+        max_faces = self.detector_options.get("max_faces", 1)
+        # Une instance supplémentaire reste disponible pour les requêtes ponctuelles ;
+        # les graphes ne sont créés qu'à la première demande
+        self.pools: Dict[str, FaceMeshPool] = {
+            name: FaceMeshPool(max_sessions + 1, functools.partial(
+                face_mesh_factory, max_faces, refine_landmarks=tier.refine_landmarks
+            ))
+            for name, tier in QUALITY_TIERS.items()
+        }
+        if pool is not None:
+            self.pools[DEFAULT_QUALITY_TIER] = pool
+        self.pool = self.pools[DEFAULT_QUALITY_TIER]
+        # Une session par graphe, plus un graphe pour les requêtes ponctuelles
+        self.budget = FaceMeshBudget(max_sessions + 1)
+        for tier_pool in self.pools.values():
+            self.budget.attach(tier_pool)
+        # En mode multi-visages, chaque détecteur a un filtre par piste en plus du sien
+        filters_per_detector = max_faces + 1 if max_faces > 1 else 1
+        self.filter_bank = KalmanFilterBank(self.pool.size * filters_per_detector)
+        self._sessions: "OrderedDict[str, TrackingSession]" = OrderedDict()
+        # Niveau de qualité des sessions déclarées, conservé après une éviction
+        self._session_tiers: Dict[str, str] = {}
+        # États de suivi à restaurer à l'ouverture des sessions
+        self._session_states: Dict[str, bytes] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def set_tier(self, session_id: str, tier: str) -> None:
+        """
+        Déclare le niveau de qualité d'une session, appliqué à son ouverture.
+
+        Raises:
+            ValueError: Si le niveau est inconnu
+        """
+        self._session_tiers[session_id] = resolve_quality_tier(tier).name
+
+    def restore_state(self, session_id: str, state: bytes) -> None:
+        """
+        Déclare l'état de suivi d'une session reprise, restauré à son ouverture.
+
+        Args:
+            session_id: Identifiant de la session
+            state: État exporté par ``export_state``
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                self._session_states[session_id] = state
+                return
+            self._restore(session, state)
+
+    def export_state(self, session_id: str) -> Optional[bytes]:
+        """
+        Sérialise l'état de suivi d'une session.
+
+        Returns:
+            L'état sérialisé, ou None si la session n'est pas ouverte ou en mode
+            multi-visages
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session.detector.export_state() if session is not None else None
+
+    def open_session(self, session_id: Optional[str] = None, tier: Optional[str] = None) -> TrackingSession:
+        """
+        Ouvre une nouvelle session de suivi.
+
+        Args:
+            session_id: Identifiant souhaité (généré si absent)
+            tier: Niveau de qualité (None : niveau déclaré par ``set_tier``, sinon
+                niveau par défaut)
+
+        Returns:
+            La session créée
+
+        Raises:
+            SessionLimitError: Si le nombre maximum de sessions est atteint
+            ValueError: Si le niveau est inconnu
+        """
+        with self._lock:
+            self.evict_idle_sessions()
+            if len(self._sessions) >= self.max_sessions:
+                raise SessionLimitError("Maximum number of tracking sessions reached")
+            session_id = session_id or uuid.uuid4().hex
+            if session_id in self._sessions:
+                raise ValueError(f"Session {session_id} already exists")
+            quality_tier = resolve_quality_tier(tier or self._session_tiers.get(session_id))
+            detector = self._create_detector(self.pools[quality_tier.name].acquire(),
+                                             quality_tier.detector_options())
+            session = TrackingSession(session_id, detector, quality_tier.name)
+            self._sessions[session_id] = session
+            state = self._session_states.pop(session_id, None)
+            if state is not None:
+                self._restore(session, state)
+            return session
+
+    def acquire(self, session_id: str) -> TrackingSession:
+        """
+        Retourne la session demandée, en la recréant si elle a été évincée.
+
+        Args:
+            session_id: Identifiant de la session
+
+        Returns:
+            La session active correspondante
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return self.open_session(session_id)
+            session.touch()
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def close_session(self, session_id: str) -> None:
+        """Ferme une session et rend son instance Face Mesh au pool."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            self._session_tiers.pop(session_id, None)
+            self._session_states.pop(session_id, None)
+        if session is not None:
+            self._dispose(session)
+
+    def evict_idle_sessions(self, now: Optional[float] = None) -> List[str]:
+        """
+        Évince les sessions inactives depuis plus de ``idle_timeout`` secondes.
+
+        Returns:
+            Les identifiants des sessions évincées
+        """
+        now = time.monotonic() if now is None else now
+        evicted = []
+        with self._lock:
+            # Les sessions sont ordonnées de la moins à la plus récemment utilisée
+            for session_id, session in list(self._sessions.items()):
+                if now - session.last_activity < self.idle_timeout:
+                    break
+                del self._sessions[session_id]
+                evicted.append(session)
+        for session in evicted:
+            logger.info("Session %s évincée après inactivité", session.session_id)
+            self._dispose(session)
+        return [session.session_id for session in evicted]
+
+    @contextmanager
+    def one_shot(self) -> Iterator[FaceDetectorService]:
+        """
+        Fournit un détecteur temporaire, sans état partagé, pour une requête ponctuelle.
+
+        Raises:
+            SessionLimitError: Si aucune instance Face Mesh n'est disponible
+        """
+        detector = self._create_detector(self.pool.acquire())
+        try:
+            yield detector
+        finally:
+            self._release_detector(detector, self.pool)
+
+    def close(self) -> None:
+        """Ferme toutes les sessions et libère le pool."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            self._dispose(session)
+        for pool in self.pools.values():
+            pool.close()
+
+    def _create_detector(self, face_mesh, tier_options: Optional[dict] = None) -> FaceDetectorService:
+        with self._lock:
+            pose_filter = PoseFilter(self.filter_bank)
+        options = {**self.detector_options, **(tier_options or {})}
+        return FaceDetectorService(face_mesh=face_mesh, pose_filter=pose_filter, **options)
+
+    def _release_detector(self, detector: FaceDetectorService, pool: FaceMeshPool) -> None:
+        with self._lock:
+            detector.release_filters()
+        pool.release(detector.face_mesh)
+
+    @staticmethod
+    def _restore(session: TrackingSession, state: bytes) -> None:
+        try:
+            session.detector.restore_state(state)
+        except ValueError as e:
+            # Un état illisible n'empêche pas la session de démarrer sans reprise
+            logger.warning("État de suivi de la session %s ignoré : %s", session.session_id, e)
+
+    def _dispose(self, session: TrackingSession) -> None:
+        session.closed = True
+        self._release_detector(session.detector, self.pools[session.tier])
@@ -0,0 +1,218 @@
+"""
+Stockage de l'état de suivi des sessions d'essayage, pour les reprendre ailleurs.
+
+L'état de suivi d'une session (filtre de Kalman, région du visage, compteur d'échecs)
+vit dans le processus d'inférence qui l'héberge. Un client qui se reconnecte avec la
+même clé de reprise (paramètre ``session`` du WebSocket) peut arriver sur un autre
+worker uvicorn, voire un autre serveur : l'état sérialisé (environ 220 octets, voir
+``FaceDetectorService.export_state``) est enregistré périodiquement et à la
+déconnexion, puis relu en une seule lecture à la reconnexion. La session reprend alors
+directement dans la région du visage, sans nouvelle détection sur l'image complète.
+
+Deux stockages sont disponibles :
+
+- ``memory`` : dictionnaire du processus uvicorn, partagé par ses processus
+  d'inférence ;
+- ``sqlite`` : fichier SQLite (journal WAL) partagé par tous les workers uvicorn et
+  les répliques d'une même machine ou d'un même volume.
+
+Classes:
+    SessionStore: Interface d'un stockage d'états de suivi.
+    MemorySessionStore: Stockage en mémoire du processus.
+    SQLiteSessionStore: Stockage dans un fichier SQLite partagé.
+
+Functions:
+    create_session_store: Construit le stockage configuré.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+# Clé de reprise choisie par le client : assez longue pour ne pas être devinée
+RESUME_KEY_PATTERN = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+
+class SessionStore:
+    """
+    Interface d'un stockage d'états de suivi, indexés par clé de reprise.
+
+    Les états expirent ``ttl`` secondes après leur dernier enregistrement.
+
+    Attributes:
+        ttl: Durée de vie (s) d'un état enregistré
+    """
+
+    def __init__(self, ttl: float = 120.0):
+        self.ttl = ttl
+
+    def load(self, key: str) -> Optional[bytes]:
+        """
+        Lit l'état d'une session.
+
+        Returns:
+            L'état sérialisé, ou None s'il est absent ou expiré
+        """
+        raise NotImplementedError
+
+    def save(self, key: str, state: bytes) -> None:
+        """Enregistre l'état d'une session, en remplaçant le précédent."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Oublie l'état d'une session."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Libère les ressources du stockage."""
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Stockage des états en mémoire du processus, borné en nombre d'entrées.
+
+    Attributes:
+        max_entries: Nombre maximum d'états conservés (les plus anciens sont évincés)
+    """
+
+    def __init__(self, ttl: float = 120.0, max_entries: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._clock() >= entry[0]:
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def save(self, key: str, state: bytes) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            while self._entries and len(self._entries) >= self.max_entries:
+                self._entries.popitem(last=False)
+            self._entries[key] = (self._clock() + self.ttl, bytes(state))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def close(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Stockage des états dans un fichier SQLite partagé entre processus.
+
+    Le journal WAL permet aux lectures de ne pas attendre les écritures des autres
+    processus. Les états expirés sont purgés au fil des enregistrements.
+
+    Attributes:
+        path: Chemin du fichier SQLite
+    """
+
+    # Enregistrements entre deux purges des états expirés
+    PURGE_INTERVAL = 256
+
+    def __init__(self, path: str, ttl: float = 120.0, clock: Callable[[], float] = time.time):
+        super().__init__(ttl)
+        self.path = path
+        # Horloge murale : les échéances sont comparées par plusieurs processus
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._saves = 0
+        self._connection: Optional[sqlite3.Connection] = None
+        self._inherited: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Connexion du processus courant.
+
+        La connexion est ouverte à la première utilisation. Une connexion SQLite ne
+        doit être ni utilisée ni fermée après un fork : un worker créé par le
+        superviseur ouvre la sienne et conserve sans y toucher celle dont il a hérité.
+        """
+        if self._pid != os.getpid():
+            if self._connection is not None:
+                self._inherited = self._connection
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS session_state "
+                "(key TEXT PRIMARY KEY, state BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def load(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT state FROM session_state WHERE key = ? AND expires_at > ?", (key, self._clock())
+            ).fetchone()
+        return bytes(row[0]) if row is not None else None
+
+    def save(self, key: str, state: bytes) -> None:
+        now = self._clock()
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO session_state (key, state, expires_at) VALUES (?, ?, ?)",
+                (key, bytes(state), now + self.ttl)
+            )
+            self._saves += 1
+            if self._saves % self.PURGE_INTERVAL == 0:
+                connection.execute("DELETE FROM session_state WHERE expires_at <= ?", (now,))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM session_state WHERE key = ?", (key,))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = self._pid = None
+
+
+def create_session_store(backend: str, path: Optional[str] = None, ttl: float = 120.0) -> Optional[SessionStore]:
+    """
+    Construit le stockage des états de suivi.
+
+    Args:
+        backend: ``memory``, ``sqlite`` ou ``none``
+        path: Chemin du fichier SQLite (stockage ``sqlite``)
+        ttl: Durée de vie (s) d'un état enregistré
+
+    Returns:
+        Le stockage, ou None si la reprise des sessions est désactivée
+
+    Raises:
+        ValueError: Si le stockage est inconnu ou si le chemin manque
+    """
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return MemorySessionStore(ttl)
+    if backend == "sqlite":
+        if not path:
+            raise ValueError("The sqlite session store requires a path")
+        return SQLiteSessionStore(path, ttl)
+    raise ValueError(f"Unknown session store: {backend}")
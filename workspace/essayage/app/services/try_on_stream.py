@@ -0,0 +1,430 @@
+"""
+Gestion d'une connexion WebSocket d'essayage en temps réel.
+
+Chaque connexion exécute deux tâches : la réception, qui dépose chaque message dans
+une boîte aux lettres à un emplacement, et l'inférence, qui traite toujours l'image la
+plus récente. Les images devenues obsolètes sont abandonnées et comptées ; lorsque la
+connexion est saturée, le serveur suggère au client une fréquence et une résolution.
+
+Les messages texte commençant par ``{`` sont des messages de contrôle JSON, traités
+dès leur réception. ``{"type": "config", "projection": "glasses"}`` change par exemple
+les points de repère renvoyés pour la suite de la session.
+
+En mode delta (``{"type": "config", "delta": true}`` ou paramètre de connexion), les
+réponses ne portent que les valeurs modifiées depuis le message précédent, entre des
+images clés périodiques (voir ``delta_encoding``) ; ``{"type": "resync"}`` demande une
+nouvelle image clé.
+
+Une image quasi identique à la dernière image analysée (voir ``frame_change``) reçoit
+le résultat de cette dernière, marqué ``"reused": true``, sans passer par l'inférence ;
+la vignette comparée est calculée dans un thread.
+
+Une connexion ouverte avec une clé de reprise enregistre l'état de suivi de sa session
+dans le stockage des sessions (voir ``session_store``) au plus toutes les
+``checkpoint_interval`` secondes et à la déconnexion.
+
+Une image encodée de plus de ``max_frame_bytes`` octets, ou dont l'en-tête annonce plus
+de ``max_frame_pixels`` pixels, est refusée avant tout décodage (base64 compris, ainsi
+que la vignette de détection des images inchangées).
+
+Avec l'estimation de la forme du visage (``{"type": "config", "face_shape": true}`` ou
+paramètre de connexion), les ratios du visage sont moyennés sur les images analysées
+(voir ``face_shape_estimator``) ; dès que l'estimation est stable, un message
+``{"type": "face_shape", ...}`` en donne la forme et la confiance, accompagné d'un
+ticket de points de repère si les tickets sont configurés. Un nouveau message n'est
+envoyé que si la forme convergée change.
+
+Classes:
+    TryOnStream: Connexion WebSocket d'essayage.
+"""
+
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import math
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+from fastapi import WebSocket
+
+from ..models.face import LANDMARK_FORMAT_BINARY, LANDMARK_FORMAT_COMPACT
+from ..utils.delta_encoding import DeltaEncoder
+from ..utils.frame_change import StaticFrameDetector, frame_thumbnail
+from ..utils.frame_protocol import ENCODED_FORMATS, PROTOCOL_BINARY, encode_binary_result, parse_binary_frame
+from ..utils.image_decoding import MAX_IMAGE_BYTES, MAX_IMAGE_PIXELS, check_image_bytes, check_image_pixels
+from ..utils.mailbox import LatestFrameMailbox, MailboxClosed
+from ..utils.metrics import STAGE_SECONDS, STREAM_FRAMES
+from .face_detector import FaceDetectorService
+from .face_shape_estimator import FaceShapeEstimate, FaceShapeEstimator
+from .inference_executor import InferenceExecutor
+from .landmark_ticket import LandmarkTicketSigner
+from .session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+# Largeur minimale suggérée au client
+MIN_SUGGESTED_WIDTH = 320
+
+# Séparateurs JSON sans espaces, pour les messages du mode delta
+COMPACT_SEPARATORS = (",", ":")
+
+
+class TryOnStream:
+    """
+    Connexion WebSocket d'essayage.
+
+    Attributes:
+        websocket: Connexion WebSocket acceptée
+        session_id: Session de suivi attachée à la connexion
+        protocol: Protocole négocié (texte ou binaire)
+        landmark_format: Format des points de repère renvoyés (compact, legacy ou binary)
+        landmark_indices: Indices des points de repère renvoyés (None pour tous)
+        delta_encoder: Encodeur du mode delta (None : réponses complètes)
+        static_frames: Détection des images inchangées
+        session_store: Stockage des états de suivi (None : pas de reprise)
+        resume_key: Clé de reprise sous laquelle l'état de suivi est enregistré
+        checkpoint_interval: Délai (s) entre deux enregistrements de l'état (0 : à la
+            déconnexion seulement)
+        max_frame_bytes: Taille maximale (octets) d'une image encodée
+        max_frame_pixels: Nombre maximum de pixels d'une image
+        face_shape: Estimation de la forme du visage (None : désactivée)
+        landmark_tickets: Signature des tickets joints à la forme du visage (None : pas de ticket)
+        mailbox: Boîte aux lettres reliant réception et inférence
+        processed: Nombre d'images analysées
+        reused: Nombre d'images servies avec le résultat de l'image précédente
+        inference_time: Durée moyenne (s, moyenne glissante) d'une inférence
+    """
+
+    def __init__(self, websocket: WebSocket, executor: InferenceExecutor, session_id: str, protocol: str,
+                 landmark_format: str, landmark_indices: Optional[tuple] = None,
+                 target_fps: float = 30.0, hint_interval: float = 2.0,
+                 delta_options: Optional[dict] = None, delta: bool = False,
+                 static_frames: Optional[StaticFrameDetector] = None,
+                 session_store: Optional[SessionStore] = None, resume_key: Optional[str] = None,
+                 checkpoint_interval: float = 1.0, max_frame_bytes: int = MAX_IMAGE_BYTES,
+                 max_frame_pixels: int = MAX_IMAGE_PIXELS,
+                 face_shape: bool = False, face_shape_options: Optional[dict] = None,
+                 landmark_tickets: Optional[LandmarkTicketSigner] = None):
+        self.websocket = websocket
+        self.executor = executor
+        self.session_id = session_id
+        self.protocol = protocol
+        self.landmark_format = landmark_format
+        self.landmark_indices = landmark_indices
+        self.target_fps = target_fps
+        self.hint_interval = hint_interval
+        self.delta_options = delta_options or {}
+        self.delta_encoder: Optional[DeltaEncoder] = None
+        if delta:
+            self.set_delta(True)
+        self.mailbox: Optional[LatestFrameMailbox] = None
+        self.static_frames = static_frames or StaticFrameDetector(threshold=0)
+        self.session_store = session_store
+        self.resume_key = resume_key
+        self.checkpoint_interval = checkpoint_interval
+        self.max_frame_bytes = max_frame_bytes
+        self.max_frame_pixels = max_frame_pixels
+        self.face_shape_options = face_shape_options or {}
+        self.face_shape: Optional[FaceShapeEstimator] = None
+        self.set_face_shape(face_shape)
+        self.landmark_tickets = landmark_tickets
+        # Forme convergée à signaler après la réponse en cours
+        self._face_shape_update: Optional[FaceShapeEstimate] = None
+        self._checkpointed_at = time.monotonic()
+        self.processed = 0
+        self.reused = 0
+        # Résultat (ou erreur liée à l'image) de la dernière image analysée
+        self._last_outcome = None
+        self.inference_time: Optional[float] = None
+        self._sequence = 0
+        self._frame_width: Optional[int] = None
+        self._last_hint = 0.0
+        self._dropped_at_last_hint = 0
+
+    def set_delta(self, enabled: bool) -> None:
+        """
+        Active ou désactive le mode delta ; une activation commence par une image clé.
+
+        Raises:
+            ValueError: Si les points de repère sont envoyés en binaire
+        """
+        if not enabled:
+            self.delta_encoder = None
+            return
+        if self.landmark_format == LANDMARK_FORMAT_BINARY:
+            raise ValueError("Delta mode is not available with the binary landmark format")
+        if self.delta_encoder is None:
+            self.delta_encoder = DeltaEncoder(**self.delta_options)
+
+    def set_face_shape(self, enabled: bool) -> None:
+        """Active (en conservant l'estimation en cours) ou désactive l'estimation de la forme du visage."""
+        if not enabled:
+            self.face_shape = None
+        elif self.face_shape is None:
+            self.face_shape = FaceShapeEstimator(**self.face_shape_options)
+
+    async def run(self) -> None:
+        """Traite la connexion jusqu'à la déconnexion du client."""
+        self.mailbox = LatestFrameMailbox()
+        tasks = [
+            asyncio.ensure_future(self._receive_loop()),
+            asyncio.ensure_future(self._inference_loop()),
+        ]
+        try:
+            # Une déconnexion interrompt aussi l'inférence en cours
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _receive_loop(self) -> None:
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    logger.info("Client déconnecté (session %s)", self.session_id)
+                    return
+                text = message.get("text")
+                if text and text.startswith("{"):
+                    await self._handle_control(text)
+                    continue
+                self._sequence += 1
+                self.mailbox.put((self._sequence, message))
+        finally:
+            self.mailbox.close()
+
+    async def _handle_control(self, text: str) -> None:
+        """Applique un message de contrôle et en accuse réception."""
+        try:
+            control = json.loads(text)
+            if control.get("type") == "resync":
+                # Pas d'accusé de réception : la prochaine réponse est une image clé
+                if self.delta_encoder is not None:
+                    self.delta_encoder.request_keyframe()
+                return
+            if control.get("type") != "config":
+                raise ValueError(f"Unknown control message: {control.get('type')}")
+            if "projection" in control:
+                self.landmark_indices = FaceDetectorService.resolve_landmark_projection(control["projection"])
+            if "delta" in control:
+                self.set_delta(bool(control["delta"]))
+            if "face_shape" in control:
+                self.set_face_shape(bool(control["face_shape"]))
+            await self.websocket.send_json({"type": "config", "success": True})
+        except ValueError as e:
+            await self.websocket.send_json({"type": "config", "success": False, "error": str(e)})
+
+    async def _inference_loop(self) -> None:
+        while True:
+            try:
+                sequence, message = await self.mailbox.get()
+            except MailboxClosed:
+                return
+            result, points = await self._process(sequence, message)
+            if points is not None:
+                await self.websocket.send_bytes(encode_binary_result(result, points))
+            elif self.delta_encoder is not None:
+                await self.websocket.send_text(json.dumps(result, separators=COMPACT_SEPARATORS))
+            else:
+                await self.websocket.send_json(result)
+            if self._face_shape_update is not None:
+                await self.websocket.send_json(self._build_face_shape_message(self._face_shape_update))
+                self._face_shape_update = None
+            if self._is_saturated():
+                await self.websocket.send_json(self._build_hint())
+            if self.checkpoint_interval and time.monotonic() - self._checkpointed_at >= self.checkpoint_interval:
+                await self.save_state()
+
+    async def save_state(self) -> bool:
+        """
+        Enregistre l'état de suivi de la session sous sa clé de reprise.
+
+        Returns:
+            True si un état a été enregistré
+        """
+        if self.session_store is None or self.resume_key is None:
+            return False
+        self._checkpointed_at = time.monotonic()
+        state = await self.executor.export_session(self.session_id)
+        if state is None:
+            return False
+        # Le stockage SQLite écrit sur disque : hors de la boucle d'événements
+        await asyncio.get_running_loop().run_in_executor(None, self.session_store.save, self.resume_key, state)
+        return True
+
+    async def _process(self, sequence: int, message: dict) -> tuple:
+        try:
+            if message.get("bytes") is not None:
+                if self.protocol != PROTOCOL_BINARY:
+                    raise ValueError("Binary frames require the binary protocol")
+                frame, payload = parse_binary_frame(message["bytes"])
+                if frame.sequence is not None:
+                    sequence = frame.sequence
+                if frame.format in ENCODED_FORMATS:
+                    check_image_bytes(len(payload), self.max_frame_bytes)
+                    size = check_image_pixels(payload, self.max_frame_pixels)
+                else:
+                    if frame.width * frame.height > self.max_frame_pixels:
+                        raise ValueError(f"Image larger than {self.max_frame_pixels} pixels")
+                    size = (frame.width, frame.height)
+            else:
+                # Image en base64 envoyée par les clients historiques (data URL)
+                data = message.get("text") or ""
+                check_image_bytes(len(data) * 3 // 4, self.max_frame_bytes)
+                _, separator, encoded = data.partition(",")
+                if not separator:
+                    raise ValueError("Invalid data URL")
+                started = time.perf_counter()
+                try:
+                    payload = base64.b64decode(encoded, validate=True)
+                except binascii.Error:
+                    raise ValueError("Invalid data URL")
+                STAGE_SECONDS.observe("base64", time.perf_counter() - started)
+                size = check_image_pixels(payload, self.max_frame_pixels)
+                frame = None
+
+            outcome, reused = await self._analyze(payload, frame, size)
+            if isinstance(outcome, Exception):
+                raise outcome
+            landmarks, glasses_position = outcome[:2]
+            inferred = time.perf_counter()
+            self._frame_width = landmarks.image_width
+            if self.face_shape is not None and landmarks.measured and not reused:
+                self._face_shape_update = self.face_shape.update(landmarks, glasses_position)
+            # Mode multi-visages : tous les visages suivis, le principal en premier
+            faces = outcome[2] if len(outcome) > 2 else []
+            if self.delta_encoder is not None:
+                result = {"success": True, "seq": sequence}
+                result.update(self.delta_encoder.encode(landmarks, glasses_position, self.landmark_indices))
+                if reused:
+                    result["reused"] = True
+                if faces:
+                    result["faces"] = [face.serialize(LANDMARK_FORMAT_COMPACT, self.landmark_indices)
+                                       for face in faces]
+                STAGE_SECONDS.observe("serialize", time.perf_counter() - inferred)
+                return result, None
+            result = {
+                "success": True,
+                "seq": sequence,
+                "measured": landmarks.measured,
+                "landmarks": landmarks.serialize(self.landmark_format, self.landmark_indices),
+                "glasses_position": glasses_position.dict()
+            }
+            if reused:
+                result["reused"] = True
+            if faces:
+                result["faces"] = [face.serialize(self.landmark_format, self.landmark_indices) for face in faces]
+            points = None
+            if self.landmark_format == LANDMARK_FORMAT_BINARY:
+                # Les points des visages suivent ceux du visage principal, dans l'ordre de ``faces``
+                points = b"".join(
+                    item.to_bytes(indices=self.landmark_indices)
+                    for item in [landmarks] + [face.landmarks for face in faces]
+                )
+            STAGE_SECONDS.observe("serialize", time.perf_counter() - inferred)
+            return result, points
+        except Exception as e:
+            logger.warning("Erreur lors du traitement de l'image: %s", e)
+            return {
+                "success": False,
+                "seq": sequence,
+                "error": str(e)
+            }, None
+
+    async def _analyze(self, payload, frame, size: Optional[Tuple[int, int]] = None) -> tuple:
+        """
+        Analyse une image, ou réutilise le résultat de la précédente si elle est inchangée.
+
+        Args:
+            payload: Octets de l'image
+            frame: Description de l'image (None : image encodée en data URL)
+            size: Dimensions (largeur, hauteur) de l'image, lues dans l'en-tête des images encodées
+
+        Returns:
+            Tuple (résultat de l'analyse ou erreur liée à l'image, résultat réutilisé)
+        """
+        thumbnail = None
+        # Une image redimensionnée ou d'un autre format n'est jamais réutilisée
+        key = (frame.format if frame is not None else None, *(size or (None, None)))
+        if self.static_frames.enabled:
+            # Décodage réduit hors de la boucle d'événements, partagée par toutes les connexions
+            thumbnail = await asyncio.get_running_loop().run_in_executor(None, self._thumbnail, payload, frame)
+            if thumbnail is not None and self._last_outcome is not None and self.static_frames.is_static(thumbnail, key):
+                self.reused += 1
+                STREAM_FRAMES.inc("reused")
+                return self._last_outcome, True
+
+        STREAM_FRAMES.inc("analyzed")
+        started = time.perf_counter()
+        try:
+            outcome = await self.executor.process(self.session_id, payload, frame)
+        except ValueError as e:
+            # Pas de visage, qualité insuffisante : l'erreur vaut pour les images identiques
+            outcome = e
+        except Exception:
+            self._last_outcome = None
+            self.static_frames.reset()
+            raise
+        if not isinstance(outcome, Exception):
+            self._record_inference(time.perf_counter() - started)
+        if thumbnail is not None:
+            self._last_outcome = outcome
+            self.static_frames.update(thumbnail, key)
+        return outcome, False
+
+    @staticmethod
+    def _thumbnail(payload, frame) -> Optional[np.ndarray]:
+        """Vignette de l'image, ou None si elle ne peut pas être comparée (PNG, WebP, illisible)."""
+        started = time.perf_counter()
+        try:
+            return frame_thumbnail(payload, frame)
+        except ValueError:
+            return None
+        finally:
+            STAGE_SECONDS.observe("change_detection", time.perf_counter() - started)
+
+    def _record_inference(self, elapsed: float) -> None:
+        self.processed += 1
+        if self.inference_time is None:
+            self.inference_time = elapsed
+        else:
+            self.inference_time = 0.8 * self.inference_time + 0.2 * elapsed
+
+    def _build_face_shape_message(self, estimate: FaceShapeEstimate) -> dict:
+        """Construit le message signalant la forme du visage convergée."""
+        message = {"type": "face_shape"}
+        message.update(estimate.to_dict())
+        representative = self.face_shape.representative_landmarks if self.face_shape is not None else None
+        if self.landmark_tickets is not None and representative is not None:
+            message["landmark_ticket"] = self.landmark_tickets.issue(*representative)
+        return message
+
+    def _is_saturated(self) -> bool:
+        """Indique si des images ont été abandonnées depuis la dernière suggestion."""
+        now = time.monotonic()
+        if self.mailbox.dropped == self._dropped_at_last_hint or now - self._last_hint < self.hint_interval:
+            return False
+        self._last_hint = now
+        self._dropped_at_last_hint = self.mailbox.dropped
+        return True
+
+    def _build_hint(self) -> dict:
+        """Construit la suggestion de fréquence et de résolution envoyée au client."""
+        inference_time = self.inference_time or 1.0 / self.target_fps
+        suggested_fps = max(1, int(1.0 / inference_time))
+        hint = {
+            "type": "hint",
+            "dropped_frames": self.mailbox.dropped,
+            "received_frames": self.mailbox.received,
+            "suggested_fps": min(suggested_fps, int(self.target_fps)),
+        }
+        if self._frame_width and inference_time * self.target_fps > 1.0:
+            # Le coût de l'inférence croît avec le nombre de pixels
+            width = self._frame_width * math.sqrt(1.0 / (inference_time * self.target_fps))
+            hint["suggested_max_width"] = max(MIN_SUGGESTED_WIDTH, int(width) // 16 * 16)
+        return hint
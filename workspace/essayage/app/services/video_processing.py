@@ -0,0 +1,228 @@
+"""
+Traitement hors ligne de vidéos enregistrées (endpoint ``/detect/video``).
+
+La vidéo est décodée image par image avec ``cv2.VideoCapture``, hors de la boucle
+d'événements, et chaque image est analysée dans une session de suivi dédiée : le
+filtre de Kalman de la session reçoit l'instant de l'image dans la vidéo, si bien que
+le lissage suit la chronologie du clip et non celle du traitement. Quelques images
+sont soumises d'avance afin que le décodage de l'image suivante recouvre l'analyse
+de la précédente ; les résultats sont rendus dans l'ordre des images. La lecture
+s'exécutant dans un thread, la fermeture de la vidéo attend la fin de la lecture en
+cours (client déconnecté pendant le décodage d'une image).
+
+Classes:
+    VideoReader: Lecture d'une vidéo avec pas, reprise et limite de résolution.
+
+Functions:
+    spool_upload: Copie un fichier envoyé dans un fichier temporaire.
+    track_video: Analyse les images d'une vidéo dans une session de suivi.
+    remove_file: Supprime un fichier temporaire.
+"""
+
+import asyncio
+import collections
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, AsyncIterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ..utils.frame_protocol import FrameDescriptor, FrameFormat
+from .inference_executor import InferenceExecutor
+
+logger = logging.getLogger(__name__)
+
+# Taille (octets) des blocs copiés vers le fichier temporaire
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def spool_upload(source, max_bytes: int, suffix: str = "") -> str:
+    """
+    Copie un fichier envoyé dans un fichier temporaire, ``cv2.VideoCapture`` ne lisant
+    que des chemins.
+
+    Args:
+        source: Fichier ouvert en lecture binaire
+        max_bytes: Taille maximale (octets) acceptée
+        suffix: Extension du fichier temporaire
+
+    Returns:
+        Le chemin du fichier temporaire, à supprimer par l'appelant
+
+    Raises:
+        ValueError: Si le fichier dépasse ``max_bytes``
+    """
+    handle, path = tempfile.mkstemp(suffix=suffix, prefix="essayage-video-")
+    try:
+        with os.fdopen(handle, "wb") as target:
+            copied = 0
+            while True:
+                chunk = source.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                copied += len(chunk)
+                if copied > max_bytes:
+                    raise ValueError(f"Video larger than {max_bytes} bytes")
+                target.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+class VideoReader:
+    """
+    Lecture d'une vidéo image par image.
+
+    Attributes:
+        fps: Nombre d'images par seconde annoncé par le conteneur (0 si inconnu)
+        frame_count: Nombre d'images annoncé par le conteneur (0 si inconnu)
+        width: Largeur des images renvoyées
+        height: Hauteur des images renvoyées
+        stride: Une image analysée toutes les ``stride`` images
+        next_frame: Rang de la prochaine image lue
+    """
+
+    def __init__(self, path: str, stride: int = 1, max_side: int = 0, start_frame: int = 0):
+        """
+        Ouvre une vidéo.
+
+        Args:
+            path: Chemin du fichier vidéo
+            stride: Une image analysée toutes les ``stride`` images
+            max_side: Plus grand côté des images renvoyées (0 : résolution d'origine)
+            start_frame: Rang de la première image lue, pour reprendre un traitement
+
+        Raises:
+            ValueError: Si la vidéo ne peut pas être ouverte
+        """
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            self.capture.release()
+            raise ValueError("Invalid video file")
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 0.0
+        self.frame_count = max(int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT)), 0)
+        source_width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        source_height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self._scale = 1.0
+        if max_side and max(source_width, source_height) > max_side:
+            self._scale = max_side / max(source_width, source_height)
+        self.width = round(source_width * self._scale)
+        self.height = round(source_height * self._scale)
+        self.stride = max(stride, 1)
+        self.next_frame = 0
+        # Sérialise read et close : release ne doit pas libérer le décodeur en cours d'usage
+        self._lock = threading.Lock()
+        self._closed = False
+        if start_frame:
+            self._seek(start_frame)
+
+    def _seek(self, frame: int) -> None:
+        # Le positionnement direct n'est pas pris en charge par tous les conteneurs
+        if not self.capture.set(cv2.CAP_PROP_POS_FRAMES, frame):
+            for _ in range(frame):
+                if not self.capture.grab():
+                    break
+        self.next_frame = frame
+
+    def metadata(self) -> dict:
+        """Description de la vidéo et des images renvoyées."""
+        return {
+            "fps": self.fps,
+            "frame_count": self.frame_count,
+            "width": self.width,
+            "height": self.height,
+            "stride": self.stride,
+            "start_frame": self.next_frame,
+        }
+
+    def timestamp(self, frame: int) -> float:
+        """Instant (s) d'une image dans la vidéo."""
+        if self.fps > 0:
+            return frame / self.fps
+        return self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+
+    def read(self) -> Optional[Tuple[int, float, np.ndarray]]:
+        """
+        Lit l'image suivante, puis saute les ``stride - 1`` images qui la suivent sans
+        les décoder.
+
+        Returns:
+            Le rang, l'instant (s) et l'image BGR, ou None à la fin de la vidéo ou si
+            elle a été fermée
+        """
+        with self._lock:
+            if self._closed:
+                return None
+            ok, image = self.capture.read()
+            if not ok:
+                return None
+            frame = self.next_frame
+            timestamp = self.timestamp(frame)
+            for _ in range(self.stride - 1):
+                if not self.capture.grab():
+                    break
+            self.next_frame += self.stride
+        if self._scale != 1.0:
+            image = cv2.resize(image, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        return frame, timestamp, np.ascontiguousarray(image)
+
+    def close(self) -> None:
+        """Libère la vidéo, après la lecture éventuellement en cours dans un autre thread."""
+        with self._lock:
+            self._closed = True
+            self.capture.release()
+
+
+async def track_video(executor: InferenceExecutor, session_id: str, reader: VideoReader,
+                      depth: int = 2) -> AsyncIterator[Tuple[int, float, Any, Optional[Exception]]]:
+    """
+    Analyse les images d'une vidéo dans une session de suivi.
+
+    Args:
+        executor: Exécuteur d'inférence
+        session_id: Session ouverte pour cette vidéo
+        reader: Vidéo à analyser
+        depth: Nombre d'images soumises d'avance
+
+    Returns:
+        Un itérateur asynchrone de tuples (rang de l'image, instant, résultat, erreur),
+        dans l'ordre des images
+    """
+    loop = asyncio.get_running_loop()
+    pending = collections.deque()
+    try:
+        while True:
+            item = await loop.run_in_executor(None, reader.read)
+            if item is not None:
+                frame, timestamp, image = item
+                descriptor = FrameDescriptor(FrameFormat.BGR24, reader.width, reader.height)
+                future = asyncio.ensure_future(
+                    executor.process(session_id, image.reshape(-1).data, descriptor, timestamp)
+                )
+                pending.append((frame, timestamp, future))
+                if len(pending) < depth:
+                    continue
+            if not pending:
+                return
+            frame, timestamp, future = pending.popleft()
+            try:
+                outcome, error = await future, None
+            except Exception as e:
+                outcome, error = None, e
+            yield frame, timestamp, outcome, error
+    finally:
+        # Client déconnecté : les images restantes sont abandonnées
+        for _, _, future in pending:
+            future.cancel()
+
+
+def remove_file(path: str) -> None:
+    """Supprime un fichier temporaire, s'il existe encore."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,333 @@
+"""
+Superviseur des workers uvicorn, préchargés puis dupliqués par ``fork``.
+
+Chaque worker uvicorn lancé séparément importe MediaPipe, OpenCV et NumPy et construit
+ses propres objets Python : la mémoire résidente est multipliée par le nombre de
+workers. Le superviseur importe une seule fois ces modules et l'application, ouvre le
+port d'écoute, puis crée les workers par ``fork`` : le code natif et les objets Python
+chargés avant la duplication restent partagés en copie sur écriture.
+
+Les graphes Face Mesh ne sont pas construits avant la duplication : un graphe
+MediaPipe démarre ses propres threads, qui ne survivent pas à un ``fork``. Chaque worker
+construit et préchauffe les siens au démarrage (``/ready``) ; les fichiers de modèles
+TFLite, lus depuis le cache de pages du système, sont communs.
+
+Sous le superviseur, chaque worker exécute par défaut l'inférence dans son propre
+thread (``ESSAYAGE_INFERENCE_WORKERS=0``) : des processus d'inférence lancés par
+``spawn`` réimporteraient MediaPipe. Les connexions WebSocket restent attachées au
+worker qui les a acceptées ; une clé de reprise (``session``) permet de reprendre le
+suivi sur un autre worker après recyclage, les états de suivi étant par défaut
+partagés dans un fichier SQLite (``ESSAYAGE_SESSION_STORE=sqlite``). Un thread
+d'inférence bloqué ne pouvant pas être remplacé, le worker cesse d'être prêt et s'arrête
+après ``ESSAYAGE_INFERENCE_MAX_TIMEOUTS`` requêtes expirées : le superviseur le remplace.
+
+Mesure sur trois workers exécutant chacun un graphe Face Mesh : 30 Mo propres (USS)
+par worker et 218 Mo au total (somme des PSS, superviseur compris), contre 94 Mo et
+355 Mo pour trois workers indépendants.
+
+Un worker est recyclé (arrêté proprement, puis remplacé) après ``max_requests``
+requêtes, majoré d'un tirage entre 0 et ``max_requests_jitter`` pour que les workers ne
+soient pas recyclés ensemble. Le superviseur journalise périodiquement le RSS et le
+PSS de chaque worker (voir ``process_memory``).
+
+Usage :
+    python -m app.supervisor main:app --workers 4 --port 8001 --max-requests 5000
+
+Classes:
+    WorkerSupervisor: Crée, surveille et recycle les workers.
+
+Functions:
+    preload: Importe les modules lourds et l'application avant la duplication.
+    serve_uvicorn: Construit la fonction exécutée par chaque worker.
+"""
+
+import argparse
+import importlib
+import logging
+import os
+import random
+import signal
+import socket
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from .utils.process_memory import process_memory
+
+logger = logging.getLogger(__name__)
+
+# Modules importés par le superviseur avant la duplication
+DEFAULT_PRELOAD = ("numpy", "cv2", "mediapipe")
+
+# Un worker arrêté moins de CRASH_WINDOW secondes après son lancement est remplacé
+# après CRASH_BACKOFF secondes, pour ne pas boucler sur une erreur de démarrage
+CRASH_WINDOW = 1.0
+CRASH_BACKOFF = 1.0
+
+
+class WorkerInfo(NamedTuple):
+    """Worker en cours d'exécution."""
+    index: int
+    started_at: float
+    max_requests: int
+
+
+class WorkerSupervisor:
+    """
+    Crée, surveille et recycle les workers.
+
+    Attributes:
+        serve: Fonction exécutée par chaque worker, appelée avec le socket d'écoute et
+            son nombre maximum de requêtes (0 : illimité) ; le worker se termine à son retour
+        num_workers: Nombre de workers maintenus
+        max_requests: Requêtes traitées par un worker avant son recyclage (0 : jamais)
+        max_requests_jitter: Majoration aléatoire maximale de ``max_requests``
+        report_interval: Délai (s) entre deux journalisations de la mémoire (0 : jamais)
+        graceful_timeout: Délai (s) laissé aux workers pour s'arrêter avant ``SIGKILL``
+        workers: Workers en cours d'exécution, par pid
+        spawned: Nombre de workers créés depuis le démarrage
+        recycled: Nombre de workers remplacés
+    """
+
+    def __init__(self, serve: Callable[[socket.socket, int], None], num_workers: int = 2,
+                 max_requests: int = 0, max_requests_jitter: int = 0, report_interval: float = 60.0,
+                 graceful_timeout: float = 30.0):
+        self.serve = serve
+        self.num_workers = num_workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.report_interval = report_interval
+        self.graceful_timeout = graceful_timeout
+        self.workers: Dict[int, WorkerInfo] = {}
+        self.spawned = 0
+        self.recycled = 0
+        self._socket: Optional[socket.socket] = None
+        self._stopping = False
+
+    def start(self, sock: socket.socket) -> None:
+        """Crée les workers, qui acceptent les connexions sur ``sock``."""
+        self._socket = sock
+        for index in range(self.num_workers):
+            self._spawn(index)
+
+    def reap(self) -> List[int]:
+        """
+        Récupère les workers terminés et les remplace, sauf pendant l'arrêt.
+
+        Returns:
+            Les pids des workers terminés
+        """
+        exited = []
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            exited.append(pid)
+            code = os.waitstatus_to_exitcode(status)
+            if self._stopping:
+                continue
+            uptime = time.monotonic() - worker.started_at
+            if code == 0:
+                logger.info("Worker %d (pid %d) recyclé après %.0f s", worker.index, pid, uptime)
+            else:
+                logger.error("Worker %d (pid %d) arrêté (code %d) après %.0f s", worker.index, pid, code, uptime)
+                if uptime < CRASH_WINDOW:
+                    time.sleep(CRASH_BACKOFF)
+            self.recycled += 1
+            self._spawn(worker.index)
+        return exited
+
+    def report(self) -> List[dict]:
+        """
+        Mémoire de chaque worker.
+
+        Returns:
+            Pour chaque worker : rang, pid, durée d'exécution (s) et ``process_memory``
+        """
+        now = time.monotonic()
+        return [
+            {"index": worker.index, "pid": pid, "uptime_seconds": now - worker.started_at, **process_memory(pid)}
+            for pid, worker in sorted(self.workers.items(), key=lambda item: item[1].index)
+        ]
+
+    def log_report(self) -> None:
+        """Journalise le RSS et le PSS de chaque worker et du groupe."""
+        workers = self.report()
+        parent = process_memory()
+        for worker in workers:
+            logger.info("Worker %d (pid %d) : RSS %.1f Mo, PSS %.1f Mo", worker["index"], worker["pid"],
+                        worker.get("rss_bytes", 0) / 2 ** 20, worker.get("pss_bytes", 0) / 2 ** 20)
+        # La somme des PSS, parent compris, est la mémoire réellement occupée
+        logger.info("%d workers : RSS cumulé %.1f Mo, PSS total %.1f Mo (superviseur compris)", len(workers),
+                    sum(worker.get("rss_bytes", 0) for worker in workers) / 2 ** 20,
+                    (parent.get("pss_bytes", 0) + sum(worker.get("pss_bytes", 0) for worker in workers)) / 2 ** 20)
+
+    def stop(self) -> None:
+        """Arrête les workers : ``SIGTERM``, puis ``SIGKILL`` après ``graceful_timeout``."""
+        self._stopping = True
+        for pid in list(self.workers):
+            _signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            if not self.reap():
+                time.sleep(0.05)
+        for pid in list(self.workers):
+            logger.warning("Worker %d (pid %d) arrêté de force", self.workers[pid].index, pid)
+            _signal(pid, signal.SIGKILL)
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+            del self.workers[pid]
+
+    def run(self, sock: socket.socket, poll_interval: float = 0.5) -> None:
+        """
+        Exécute le superviseur jusqu'à ``SIGTERM`` ou ``SIGINT``.
+
+        Args:
+            sock: Socket d'écoute partagé par les workers
+            poll_interval: Délai (s) entre deux vérifications des workers
+        """
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self._handle_stop)
+        self.start(sock)
+        reported = time.monotonic()
+        try:
+            while not self._stopping:
+                self.reap()
+                if self.report_interval and time.monotonic() - reported >= self.report_interval:
+                    self.log_report()
+                    reported = time.monotonic()
+                time.sleep(poll_interval)
+        finally:
+            self.stop()
+
+    def _handle_stop(self, signum, frame) -> None:
+        logger.info("Arrêt des workers (signal %d)", signum)
+        self._stopping = True
+
+    def _spawn(self, index: int) -> int:
+        max_requests = self.max_requests
+        if max_requests and self.max_requests_jitter:
+            max_requests += random.randint(0, self.max_requests_jitter)
+        pid = os.fork()
+        if pid == 0:
+            _worker_main(self.serve, self._socket, max_requests)
+        self.workers[pid] = WorkerInfo(index, time.monotonic(), max_requests)
+        self.spawned += 1
+        logger.info("Worker %d démarré (pid %d)", index, pid)
+        return pid
+
+
+def _worker_main(serve: Callable[[socket.socket, int], None], sock: socket.socket, max_requests: int) -> None:
+    """Point d'entrée d'un worker, qui ne rend jamais la main au superviseur."""
+    code = 0
+    try:
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_DFL)
+        # Chaque worker tire ses propres nombres (identifiants de session, majorations)
+        random.seed()
+        serve(sock, max_requests)
+    except BaseException:
+        logger.exception("Worker arrêté sur une erreur")
+        code = 1
+    finally:
+        os._exit(code)
+
+
+def _signal(pid: int, signum: int) -> None:
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def preload(app_path: str, modules: Sequence[str] = DEFAULT_PRELOAD):
+    """
+    Importe les modules lourds puis l'application, avant la duplication.
+
+    Args:
+        app_path: Application ASGI, sous la forme ``module:attribut``
+        modules: Modules importés avant l'application
+
+    Returns:
+        L'application
+    """
+    started = time.perf_counter()
+    for name in modules:
+        importlib.import_module(name)
+    module_name, _, attribute = app_path.partition(":")
+    app = getattr(importlib.import_module(module_name), attribute or "app")
+    logger.info("Modules préchargés en %.2f s (RSS %.1f Mo)", time.perf_counter() - started,
+                process_memory().get("rss_bytes", 0) / 2 ** 20)
+    return app
+
+
+def serve_uvicorn(app, **options) -> Callable[[socket.socket, int], None]:
+    """
+    Construit la fonction exécutée par chaque worker : un serveur uvicorn sur le socket
+    partagé, arrêté proprement après son nombre maximum de requêtes.
+
+    Args:
+        app: Application ASGI préchargée
+        **options: Paramètres de ``uvicorn.Config``
+    """
+
+    def serve(sock: socket.socket, max_requests: int) -> None:
+        import uvicorn
+
+        config = uvicorn.Config(app, limit_max_requests=max_requests or None, **options)
+        uvicorn.Server(config).run(sockets=[sock])
+
+    return serve
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Ouvre le socket d'écoute, hérité par les workers."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Superviseur préchargé des workers uvicorn")
+    parser.add_argument("app", nargs="?", default="main:app", help="Application ASGI (module:attribut)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("ESSAYAGE_WORKERS", 2)))
+    parser.add_argument("--max-requests", type=int, default=int(os.environ.get("ESSAYAGE_MAX_REQUESTS", 0)),
+                        help="Requêtes traitées par un worker avant son recyclage (0 : jamais)")
+    parser.add_argument("--max-requests-jitter", type=int,
+                        default=int(os.environ.get("ESSAYAGE_MAX_REQUESTS_JITTER", 0)))
+    parser.add_argument("--report-interval", type=float, default=60.0,
+                        help="Délai (s) entre deux journalisations de la mémoire des workers (0 : jamais)")
+    parser.add_argument("--graceful-timeout", type=float, default=30.0)
+    parser.add_argument("--preload", nargs="*", default=list(DEFAULT_PRELOAD), help="Modules importés avant le fork")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    # Inférence dans chaque worker : des processus lancés par spawn ne partageraient rien
+    os.environ.setdefault("ESSAYAGE_INFERENCE_WORKERS", "0")
+    # Une session reprise peut arriver sur n'importe quel worker
+    os.environ.setdefault("ESSAYAGE_SESSION_STORE", "sqlite")
+    app = preload(args.app, args.preload)
+    sock = bind_socket(args.host, args.port)
+    supervisor = WorkerSupervisor(
+        serve_uvicorn(app, lifespan="on"), args.workers, args.max_requests, args.max_requests_jitter,
+        args.report_interval, args.graceful_timeout
+    )
+    logger.info("Écoute sur %s:%d avec %d workers", args.host, args.port, args.workers)
+    supervisor.run(sock)
+
+
+if __name__ == "__main__":
+    main()
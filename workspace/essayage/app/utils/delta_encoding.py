@@ -0,0 +1,180 @@
+"""
+Encodage différentiel des poses envoyées sur le WebSocket d'essayage.
+
+D'une image à l'autre, la position des lunettes et les points de repère varient peu.
+En mode delta, le serveur envoie périodiquement une image clé complète, puis seulement
+les valeurs qui ont changé depuis le dernier message. Les valeurs sont quantifiées à une
+précision configurable : un tremblement inférieur à cette précision n'est pas transmis,
+et le client reconstruit exactement l'état connu de l'encodeur.
+
+Les points de repère bougent presque tous dès que la tête bouge : leurs variations sont
+transmises en nombre entier de pas de précision (``d``), quelques caractères par
+coordonnée, pour toutes les coordonnées ou seulement celles qui ont changé (``i``) selon
+la forme la plus courte. La position des lunettes (neuf valeurs) est transmise en
+valeurs absolues.
+
+Chaque message porte un numéro ``n`` consécutif. Un client qui constate un saut de
+numérotation (messages perdus ou ignorés) demande une nouvelle image clé par le message
+de contrôle ``{"type": "resync"}``.
+
+Image clé ::
+
+    {"type": "keyframe", "n": 12, "measured": true,
+     "landmarks": {"format": "compact", "dims": 2, "count": 478, ..., "precision": 0.5,
+                   "points": [...]},
+     "glasses_position": {"position": {"x": ..., "y": ..., "z": ...}, ...}}
+
+Delta (seuls les champs modifiés sont présents) ::
+
+    {"type": "delta", "n": 13, "measured": true,
+     "landmarks": {"i": [4, 5], "d": [1, -2]},
+     "glasses_position": {"rotation": {"y": 0.124}}}
+
+Dans ``landmarks``, ``i`` désigne des positions dans la liste à plat
+[x0, y0, x1, y1, ...] de l'image clé (toutes si ``i`` est absent) et ``d`` la variation
+de chacune, en pas de ``precision`` : ``points[i[k]] += d[k] * precision``.
+
+Classes:
+    DeltaEncoder: Encodeur différentiel d'un flux de poses.
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+from ..models.face import LANDMARK_FORMAT_COMPACT, CompactLandmarks, GlassesPosition
+
+MESSAGE_KEYFRAME = "keyframe"
+MESSAGE_DELTA = "delta"
+
+# Ordre des composantes de la position des lunettes
+POSE_FIELDS = ("position", "rotation", "scale")
+POSE_AXES = ("x", "y", "z")
+
+# Décimales conservées lors de la conversion des valeurs quantifiées (bruit flottant)
+VALUE_DECIMALS = 6
+
+# Part des coordonnées modifiées au-delà de laquelle toutes les variations sont envoyées
+DENSE_DELTA_RATIO = 1 / 3
+
+
+class DeltaEncoder:
+    """
+    Encodeur différentiel d'un flux de poses.
+
+    Une image clé est émise au premier message, tous les ``keyframe_interval``
+    messages, sur demande (``request_keyframe``) et lorsque la disposition des points
+    change (taille de l'image, projection, nombre de points).
+
+    Attributes:
+        keyframe_interval: Nombre de messages entre deux images clés
+        landmark_precision: Précision (pixels) des points de repère transmis
+        pose_precision: Précision de la position des lunettes transmise
+        sequence: Numéro du dernier message émis
+    """
+
+    def __init__(self, keyframe_interval: int = 30, landmark_precision: float = 0.5,
+                 pose_precision: float = 0.001):
+        """
+        Initialise l'encodeur.
+
+        Args:
+            keyframe_interval: Nombre de messages entre deux images clés
+            landmark_precision: Précision (pixels) des points de repère transmis
+            pose_precision: Précision de la position des lunettes transmise
+
+        Raises:
+            ValueError: Si une précision ou l'intervalle n'est pas strictement positif
+        """
+        if keyframe_interval < 1 or landmark_precision <= 0 or pose_precision <= 0:
+            raise ValueError("Keyframe interval and precisions must be positive")
+        self.keyframe_interval = keyframe_interval
+        self.landmark_precision = landmark_precision
+        self.pose_precision = pose_precision
+        self.sequence = 0
+        self._since_keyframe = 0
+        self._layout: Optional[tuple] = None
+        self._landmarks: Optional[np.ndarray] = None
+        self._pose: Optional[np.ndarray] = None
+
+    def request_keyframe(self) -> None:
+        """Force une image clé au prochain message (demande de resynchronisation)."""
+        self._layout = None
+
+    def encode(self, landmarks: CompactLandmarks, glasses_position: GlassesPosition,
+               indices: Optional[Sequence[int]] = None) -> dict:
+        """
+        Encode la pose d'une image.
+
+        Args:
+            landmarks: Points de repère du visage
+            glasses_position: Position des lunettes
+            indices: Indices des points de repère transmis (None pour tous)
+
+        Returns:
+            Le message (image clé ou delta), sans numéro de séquence d'image
+        """
+        points = landmarks.select(indices)[:, :2] if indices is None or len(indices) else np.empty((0, 2))
+        layout = (landmarks.image_width, landmarks.image_height, len(points),
+                  None if indices is None else tuple(indices))
+        quantized_points = _quantize(points.ravel(), self.landmark_precision)
+        quantized_pose = _quantize(_pose_vector(glasses_position), self.pose_precision)
+
+        self.sequence += 1
+        self._since_keyframe += 1
+        keyframe = layout != self._layout or self._since_keyframe >= self.keyframe_interval
+        message = {
+            "type": MESSAGE_KEYFRAME if keyframe else MESSAGE_DELTA,
+            "n": self.sequence,
+            "measured": landmarks.measured,
+        }
+        if keyframe:
+            self._since_keyframe = 0
+            if len(points):
+                serialized = landmarks.metadata(indices=indices)
+                serialized["format"] = LANDMARK_FORMAT_COMPACT
+                serialized["precision"] = self.landmark_precision
+                serialized["points"] = _values(quantized_points, self.landmark_precision)
+                message["landmarks"] = serialized
+            else:
+                message["landmarks"] = None
+            message["glasses_position"] = _pose_dict(
+                quantized_pose, self.pose_precision, np.arange(len(quantized_pose))
+            )
+        else:
+            steps = quantized_points - self._landmarks
+            changed = np.flatnonzero(steps)
+            if len(changed) > DENSE_DELTA_RATIO * len(steps):
+                message["landmarks"] = {"d": steps.tolist()}
+            elif len(changed):
+                message["landmarks"] = {"i": changed.tolist(), "d": steps[changed].tolist()}
+            changed = np.flatnonzero(quantized_pose != self._pose)
+            if len(changed):
+                message["glasses_position"] = _pose_dict(quantized_pose, self.pose_precision, changed)
+        self._layout = layout
+        self._landmarks = quantized_points
+        self._pose = quantized_pose
+        return message
+
+
+def _quantize(values: np.ndarray, precision: float) -> np.ndarray:
+    return np.round(np.asarray(values, dtype=np.float64) / precision).astype(np.int64)
+
+
+def _values(quantized: np.ndarray, precision: float) -> list:
+    return np.round(quantized * precision, VALUE_DECIMALS).tolist()
+
+
+def _pose_vector(glasses_position: GlassesPosition) -> np.ndarray:
+    return np.array([getattr(getattr(glasses_position, field), axis)
+                     for field in POSE_FIELDS for axis in POSE_AXES])
+
+
+def _pose_dict(quantized: np.ndarray, precision: float, indices: np.ndarray) -> dict:
+    """Composantes de la position des lunettes désignées par ``indices``, imbriquées par champ."""
+    values = _values(quantized[indices], precision)
+    result = {}
+    for index, value in zip(indices.tolist(), values):
+        field, axis = divmod(index, len(POSE_AXES))
+        result.setdefault(POSE_FIELDS[field], {})[POSE_AXES[axis]] = value
+    return result
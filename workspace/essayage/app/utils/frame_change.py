@@ -0,0 +1,139 @@
+"""
+Détection des images inchangées du flux d'essayage.
+
+Les caméras de borne envoient en continu des images presque identiques lorsque
+personne ne bouge. Avant toute analyse, chaque image est réduite à une vignette en
+niveaux de gris de 32x24 pixels : les JPEG sont décodés au huitième de leur résolution
+(transformée en cosinus tronquée, environ 1 ms pour 640x480 contre 7 ms pour un
+décodage complet), les images brutes sous-échantillonnées sur leur luminance. Si
+aucune case de la vignette ne s'écarte de plus du seuil de celle de la dernière image
+analysée, le résultat de cette dernière est réutilisé sans décodage complet ni passage
+dans Face Mesh. La vignette ne conservant ni la taille ni le format de l'image, ceux-ci
+sont retenus avec la référence : une image redimensionnée est toujours analysée, ses
+points de repère n'étant pas exprimés dans les mêmes dimensions.
+
+Chaque case moyenne une zone d'environ 20x20 pixels, ce qui efface le bruit du capteur
+et de la compression (écart de 1 niveau sur une image fixe) ; l'écart maximal, plutôt
+que moyen, détecte un visage qui bouge d'un demi-pixel (écart de 5 niveaux) même s'il
+n'occupe qu'une petite partie du champ.
+
+Seuls les JPEG et les images brutes sont comparés : OpenCV ne réduit les PNG et WebP
+qu'après les avoir décodés entièrement (environ 450 ms pour un PNG de 8000x6000), et
+ces images sont toujours analysées. La vignette est calculée dans un thread, hors de la
+boucle d'événements, qui reste disponible pour les autres connexions.
+
+Classes:
+    StaticFrameDetector: Décide si une image peut réutiliser le résultat précédent.
+
+Functions:
+    frame_thumbnail: Vignette en niveaux de gris d'une image reçue.
+"""
+
+import time
+from typing import Callable, Hashable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .frame_protocol import ENCODED_FORMATS, FrameDescriptor, FrameFormat
+
+# Taille (largeur, hauteur) de la vignette comparée
+THUMBNAIL_SIZE = (32, 24)
+
+_JPEG_MAGIC = b"\xff\xd8\xff"
+
+# Canal de luminance approchée (vert) des formats bruts entrelacés
+_GREEN_CHANNEL = 1
+_CHANNELS = {FrameFormat.RGB24: 3, FrameFormat.BGR24: 3, FrameFormat.RGBA32: 4}
+
+
+def frame_thumbnail(buffer, frame: Optional[FrameDescriptor] = None,
+                    size: Tuple[int, int] = THUMBNAIL_SIZE) -> np.ndarray:
+    """
+    Vignette en niveaux de gris d'une image reçue, sans la décoder entièrement.
+
+    Args:
+        buffer: Octets de l'image (bytes ou memoryview)
+        frame: Description de l'image (image encodée par défaut)
+        size: Taille (largeur, hauteur) de la vignette
+
+    Returns:
+        La vignette, de forme (hauteur, largeur), en entiers 16 bits
+
+    Raises:
+        ValueError: Si l'image n'est ni un JPEG ni une image brute, ou ne peut pas être décodée
+    """
+    data = np.frombuffer(buffer, np.uint8)
+    fmt = FrameFormat.JPEG if frame is None else frame.format
+    if fmt in ENCODED_FORMATS:
+        if bytes(data[:3]) != _JPEG_MAGIC:
+            raise ValueError("Thumbnails require a JPEG or raw frame")
+        gray = cv2.imdecode(data, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if gray is None:
+            raise ValueError("Invalid image data")
+    else:
+        width, height = frame.width, frame.height
+        # Sous-échantillonnage préalable : la réduction porte sur quelques milliers de pixels
+        step = max(1, min(width // size[0], height // size[1]) // 4)
+        if fmt in _CHANNELS:
+            gray = data.reshape(height, width, _CHANNELS[fmt])[::step, ::step, _GREEN_CHANNEL]
+        else:
+            # I420 et NV12 : le plan de luminance précède la chrominance
+            gray = data[:width * height].reshape(height, width)[::step, ::step]
+        gray = np.ascontiguousarray(gray)
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+
+class StaticFrameDetector:
+    """
+    Décide si une image peut réutiliser le résultat de la dernière image analysée.
+
+    Attributes:
+        threshold: Écart maximal (niveaux de gris) d'une case de la vignette en deçà
+            duquel l'image est considérée inchangée (0 : jamais)
+        max_age: Âge maximum (s) d'un résultat réutilisé
+    """
+
+    def __init__(self, threshold: float = 3.0, max_age: float = 0.5,
+                 clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.max_age = max_age
+        self._clock = clock
+        self._reference: Optional[np.ndarray] = None
+        self._reference_key: Hashable = None
+        self._reference_time = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        """Indique si des résultats peuvent être réutilisés."""
+        return self.threshold > 0 and self.max_age > 0
+
+    def is_static(self, thumbnail: np.ndarray, key: Hashable = None) -> bool:
+        """
+        Compare une vignette à celle de la dernière image analysée.
+
+        Args:
+            thumbnail: Vignette de l'image
+            key: Format et dimensions de l'image, tuple (format, largeur, hauteur)
+
+        Returns:
+            True si l'image est inchangée et le résultat de référence assez récent
+        """
+        if self._reference is None or self._reference.shape != thumbnail.shape:
+            return False
+        if key != self._reference_key:
+            return False
+        if self._clock() - self._reference_time > self.max_age:
+            return False
+        return int(np.abs(thumbnail - self._reference).max()) < self.threshold
+
+    def update(self, thumbnail: np.ndarray, key: Hashable = None) -> None:
+        """Retient la vignette, le format et les dimensions d'une image qui vient d'être analysée."""
+        self._reference = thumbnail
+        self._reference_key = key
+        self._reference_time = self._clock()
+
+    def reset(self) -> None:
+        """Oublie l'image de référence (analyse en échec, changement de configuration)."""
+        self._reference = None
+        self._reference_key = None
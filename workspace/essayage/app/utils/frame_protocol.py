@@ -0,0 +1,206 @@
+"""
+Protocole binaire des images envoyées sur le WebSocket d'essayage.
+
+Un client négocie le protocole binaire à la connexion (sous-protocole WebSocket
+``essayage.binary.v1`` ou paramètre ``?protocol=binary``). Il peut alors envoyer :
+
+- une image JPEG ou WebP brute, sans en-tête ;
+- une image précédée d'un en-tête de 10 octets (petit-boutiste) :
+
+    ======  ======  ==========================================
+    Octets  Type    Champ
+    ======  ======  ==========================================
+    0       uint8   Version du protocole (1)
+    1       uint8   Format (voir ``FrameFormat``)
+    2-3     uint16  Largeur en pixels (0 pour les formats encodés)
+    4-5     uint16  Hauteur en pixels (0 pour les formats encodés)
+    6-9     uint32  Numéro de séquence de l'image
+    ======  ======  ==========================================
+
+Les clients historiques continuent d'envoyer une data URL base64 en texte.
+
+Avec le format de points de repère ``binary``, chaque résultat est renvoyé dans un
+message binaire : longueur du JSON (uint32 petit-boutiste), JSON UTF-8, puis les
+coordonnées en float32 petit-boutiste.
+
+Classes:
+    FrameFormat: Formats d'image acceptés.
+    FrameDescriptor: Description d'une image reçue.
+
+Functions:
+    negotiate_protocol: Détermine le protocole demandé par le client.
+    parse_binary_frame: Analyse un message binaire.
+    decode_frame: Convertit les octets d'une image en tableau RGB (voir ``image_decoding``).
+    encode_binary_result: Construit un message de résultat binaire.
+"""
+
+import json
+import struct
+import time
+from enum import IntEnum
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .image_decoding import MAX_IMAGE_PIXELS, DecodedImage, decode_image
+from .metrics import STAGE_SECONDS
+
+PROTOCOL_TEXT = "text"
+PROTOCOL_BINARY = "binary"
+BINARY_SUBPROTOCOL = "essayage.binary.v1"
+PROTOCOL_VERSION = 1
+
+HEADER = struct.Struct("<BBHHI")
+RESULT_HEADER = struct.Struct("<I")
+
+_JPEG_MAGIC = b"\xff\xd8\xff"
+_RIFF_MAGIC = b"RIFF"
+_WEBP_MAGIC = b"WEBP"
+
+
+class FrameFormat(IntEnum):
+    JPEG = 1
+    WEBP = 2
+    PNG = 3
+    RGB24 = 16
+    BGR24 = 17
+    RGBA32 = 18
+    I420 = 32
+    NV12 = 33
+
+
+ENCODED_FORMATS = {FrameFormat.JPEG, FrameFormat.WEBP, FrameFormat.PNG}
+
+# Conversion vers RGB des formats bruts
+_RAW_CONVERSIONS = {
+    FrameFormat.BGR24: cv2.COLOR_BGR2RGB,
+    FrameFormat.RGBA32: cv2.COLOR_RGBA2RGB,
+    FrameFormat.I420: cv2.COLOR_YUV2RGB_I420,
+    FrameFormat.NV12: cv2.COLOR_YUV2RGB_NV12,
+}
+
+
+class FrameDescriptor(NamedTuple):
+    format: FrameFormat
+    width: int = 0
+    height: int = 0
+    sequence: Optional[int] = None
+
+
+def negotiate_protocol(subprotocols: Sequence[str], requested: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """
+    Détermine le protocole demandé par le client à la connexion.
+
+    Args:
+        subprotocols: Sous-protocoles proposés par le client
+        requested: Valeur du paramètre de requête ``protocol``
+
+    Returns:
+        Tuple (protocole retenu, sous-protocole à accepter)
+    """
+    if BINARY_SUBPROTOCOL in subprotocols:
+        return PROTOCOL_BINARY, BINARY_SUBPROTOCOL
+    if requested == PROTOCOL_BINARY:
+        return PROTOCOL_BINARY, None
+    return PROTOCOL_TEXT, None
+
+
+def raw_frame_size(fmt: FrameFormat, width: int, height: int) -> int:
+    """Retourne la taille attendue (octets) d'une image brute."""
+    if fmt in (FrameFormat.RGB24, FrameFormat.BGR24):
+        return width * height * 3
+    if fmt == FrameFormat.RGBA32:
+        return width * height * 4
+    return width * height * 3 // 2
+
+
+def parse_binary_frame(message: bytes) -> Tuple[FrameDescriptor, memoryview]:
+    """
+    Analyse un message binaire reçu sur le WebSocket.
+
+    Args:
+        message: Message binaire complet
+
+    Returns:
+        Tuple (description de l'image, vue sur les octets de l'image)
+
+    Raises:
+        ValueError: Si l'en-tête est invalide ou la taille incohérente
+    """
+    view = memoryview(message)
+    if message[:3] == _JPEG_MAGIC:
+        return FrameDescriptor(FrameFormat.JPEG), view
+    if message[:4] == _RIFF_MAGIC and message[8:12] == _WEBP_MAGIC:
+        return FrameDescriptor(FrameFormat.WEBP), view
+    if len(message) < HEADER.size:
+        raise ValueError("Binary frame too short")
+
+    version, fmt, width, height, sequence = HEADER.unpack_from(message)
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported protocol version: {version}")
+    try:
+        fmt = FrameFormat(fmt)
+    except ValueError:
+        raise ValueError(f"Unsupported frame format: {fmt}")
+    payload = view[HEADER.size:]
+    if fmt not in ENCODED_FORMATS:
+        if width == 0 or height == 0 or (fmt in (FrameFormat.I420, FrameFormat.NV12) and (width | height) & 1):
+            raise ValueError("Invalid frame dimensions")
+        if len(payload) != raw_frame_size(fmt, width, height):
+            raise ValueError("Frame size does not match its header")
+    return FrameDescriptor(fmt, width, height, sequence), payload
+
+
+def decode_frame(buffer, fmt: FrameFormat = FrameFormat.JPEG, width: int = 0, height: int = 0,
+                 target_side: int = 0, max_pixels: int = MAX_IMAGE_PIXELS) -> DecodedImage:
+    """
+    Convertit les octets d'une image en tableau RGB.
+
+    Les images RGB brutes sont renvoyées sans copie ; les images JPEG peuvent être
+    décodées à une résolution réduite (voir ``decode_image``).
+
+    Args:
+        buffer: Octets de l'image (bytes ou memoryview)
+        fmt: Format de l'image
+        width: Largeur (formats bruts)
+        height: Hauteur (formats bruts)
+        target_side: Plus grand côté (pixels) à conserver lors d'un décodage réduit
+            (0 : pleine résolution)
+        max_pixels: Nombre maximum de pixels d'une image encodée
+
+    Returns:
+        L'image RGB de forme (hauteur, largeur, 3) et les dimensions de l'image d'origine
+
+    Raises:
+        ValueError: Si l'image est trop grande ou ne peut pas être décodée
+    """
+    if fmt in ENCODED_FORMATS:
+        return decode_image(buffer, target_side, max_pixels, STAGE_SECONDS.observe)
+    data = np.frombuffer(buffer, np.uint8)
+    if fmt == FrameFormat.RGB24:
+        return DecodedImage(data.reshape(height, width, 3), width, height)
+    started = time.perf_counter()
+    if fmt == FrameFormat.RGBA32:
+        rgb_image = cv2.cvtColor(data.reshape(height, width, 4), _RAW_CONVERSIONS[fmt])
+    elif fmt == FrameFormat.BGR24:
+        rgb_image = cv2.cvtColor(data.reshape(height, width, 3), _RAW_CONVERSIONS[fmt])
+    else:
+        rgb_image = cv2.cvtColor(data.reshape(height * 3 // 2, width), _RAW_CONVERSIONS[fmt])
+    STAGE_SECONDS.observe("cvtcolor", time.perf_counter() - started)
+    return DecodedImage(rgb_image, width, height)
+
+
+def encode_binary_result(result: dict, points: bytes) -> bytes:
+    """
+    Construit un message de résultat binaire.
+
+    Args:
+        result: Résultat sérialisable en JSON (sans les coordonnées)
+        points: Coordonnées des points de repère en float32
+
+    Returns:
+        Message binaire à envoyer au client
+    """
+    encoded = json.dumps(result, separators=(",", ":")).encode("utf-8")
+    return b"".join((RESULT_HEADER.pack(len(encoded)), encoded, points))
@@ -0,0 +1,221 @@
+"""
+Décodage des images encodées (JPEG, PNG, WebP) en tableau RGB.
+
+Face Mesh n'analyse qu'une image réduite (plus grand côté, ou région du visage, de
+quelques centaines de pixels) : décoder en pleine résolution une image de 1920x1080
+coûte le double d'un décodage à moitié de sa taille. Le décodeur JPEG sait produire
+directement une image réduite au 1/2, 1/4 ou 1/8 (``IMREAD_REDUCED_COLOR_*``, la
+transformée inverse étant calculée sur moins de coefficients) : le facteur retenu est le
+plus grand qui conserve ``target_side`` pixels sur le plus grand côté. Les autres formats
+sont décodés en pleine résolution, OpenCV ne les réduisant qu'après décodage.
+
+Les dimensions sont lues dans l'en-tête avant tout décodage : une image dont le nombre
+de pixels dépasse ``max_pixels`` est refusée sans allouer son tampon. L'orientation
+EXIF est appliquée par OpenCV, et la conversion BGR vers RGB est faite sur place dans
+le tampon décodé, sans seconde copie de l'image.
+
+Les coordonnées calculées sur une image réduite doivent être ramenées aux dimensions de
+l'image d'origine (``DecodedImage.width`` et ``height``).
+
+Classes:
+    DecodedImage: Image décodée et dimensions de l'image d'origine.
+
+Functions:
+    check_image_bytes: Refuse une image encodée trop volumineuse.
+    check_image_pixels: Refuse une image de trop de pixels, d'après son en-tête.
+    image_dimensions: Lit les dimensions d'une image dans son en-tête.
+    reduction_factor: Choisit le facteur de réduction du décodage JPEG.
+    decode_image: Décode une image encodée en tableau RGB.
+"""
+
+import struct
+import time
+from typing import Callable, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Taille (octets) et nombre de pixels maximum d'une image, par défaut
+MAX_IMAGE_BYTES = 16 * 1024 * 1024
+MAX_IMAGE_PIXELS = 40_000_000
+
+# Drapeaux de décodage JPEG, par facteur de réduction
+_REDUCED_COLOR = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+_JPEG_MAGIC = b"\xff\xd8\xff"
+_PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+# Marqueurs SOF portant les dimensions (hors DHT, JPG et DAC)
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Marqueurs JPEG sans segment
+_JPEG_STANDALONE = {0x01, *range(0xD0, 0xD9)}
+
+
+class DecodedImage(NamedTuple):
+    """Image décodée et dimensions (pixels) de l'image d'origine, orientation appliquée."""
+    rgb: np.ndarray
+    width: int
+    height: int
+
+    @property
+    def reduced(self) -> bool:
+        """Indique si l'image a été décodée à une résolution réduite."""
+        return self.rgb.shape[1::-1] != (self.width, self.height)
+
+
+def check_image_bytes(size: int, max_bytes: int = MAX_IMAGE_BYTES) -> None:
+    """
+    Refuse une image encodée trop volumineuse, avant de la décoder.
+
+    Raises:
+        ValueError: Si l'image dépasse ``max_bytes`` octets
+    """
+    if size > max_bytes:
+        raise ValueError(f"Image larger than {max_bytes} bytes")
+
+
+def check_image_pixels(buffer, max_pixels: int = MAX_IMAGE_PIXELS) -> Optional[Tuple[int, int]]:
+    """
+    Refuse une image de trop de pixels, d'après les dimensions lues dans son en-tête.
+
+    Returns:
+        Les dimensions lues (largeur, hauteur), ou None si l'en-tête n'est pas reconnu
+
+    Raises:
+        ValueError: Si l'image dépasse ``max_pixels`` pixels
+    """
+    size = image_dimensions(buffer)
+    if size is not None and size[0] * size[1] > max_pixels:
+        raise ValueError(f"Image larger than {max_pixels} pixels")
+    return size
+
+
+def image_dimensions(buffer) -> Optional[Tuple[int, int]]:
+    """
+    Lit les dimensions d'une image JPEG, PNG ou WebP dans son en-tête.
+
+    Les dimensions sont celles de l'image stockée, avant application de l'orientation EXIF.
+
+    Args:
+        buffer: Octets de l'image (bytes ou memoryview)
+
+    Returns:
+        Tuple (largeur, hauteur), ou None si le format n'est pas reconnu ou l'en-tête tronqué
+    """
+    data = memoryview(buffer).cast("B")
+    try:
+        if data[:3] == _JPEG_MAGIC:
+            return _jpeg_dimensions(data)
+        if data[:8] == _PNG_MAGIC and data[12:16] == b"IHDR":
+            return struct.unpack_from(">II", data, 16)
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            return _webp_dimensions(data)
+    except struct.error:
+        pass
+    return None
+
+
+def _jpeg_dimensions(data: memoryview) -> Optional[Tuple[int, int]]:
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            # Octet de remplissage
+            offset += 1
+            continue
+        if marker in _JPEG_STANDALONE:
+            offset += 2
+            continue
+        if marker in _JPEG_SOF:
+            height, width = struct.unpack_from(">HH", data, offset + 5)
+            return width, height
+        offset += 2 + struct.unpack_from(">H", data, offset + 2)[0]
+    return None
+
+
+def _webp_dimensions(data: memoryview) -> Optional[Tuple[int, int]]:
+    chunk = data[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack_from("<HH", data, 26)
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        bits = struct.unpack_from("<I", data, 21)[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def reduction_factor(width: int, height: int, target_side: int) -> int:
+    """
+    Choisit le facteur de réduction du décodage JPEG.
+
+    Args:
+        width: Largeur de l'image
+        height: Hauteur de l'image
+        target_side: Plus grand côté (pixels) à conserver (0 : pleine résolution)
+
+    Returns:
+        Le plus grand facteur (1, 2, 4 ou 8) laissant au moins ``target_side`` pixels
+        sur le plus grand côté
+    """
+    if target_side <= 0:
+        return 1
+    factor = 1
+    while factor < 8 and max(width, height) // (factor * 2) >= target_side:
+        factor *= 2
+    return factor
+
+
+def decode_image(buffer, target_side: int = 0, max_pixels: int = MAX_IMAGE_PIXELS,
+                 observe: Optional[Callable[[str, float], None]] = None) -> DecodedImage:
+    """
+    Décode une image encodée en tableau RGB, réduit si le format JPEG le permet.
+
+    Args:
+        buffer: Octets de l'image (bytes ou memoryview)
+        target_side: Plus grand côté (pixels) à conserver lors d'un décodage réduit
+            (0 : pleine résolution)
+        max_pixels: Nombre maximum de pixels de l'image
+        observe: Reçoit le nom (``imdecode``, ``cvtcolor``) et la durée (s) de chaque étape
+
+    Returns:
+        L'image RGB et les dimensions de l'image d'origine
+
+    Raises:
+        ValueError: Si l'image est trop grande ou ne peut pas être décodée
+    """
+    size = check_image_pixels(buffer, max_pixels)
+    factor = 1
+    if size is not None and memoryview(buffer)[:3] == _JPEG_MAGIC:
+        factor = reduction_factor(*size, target_side)
+
+    started = time.perf_counter()
+    image = cv2.imdecode(np.frombuffer(buffer, np.uint8), _REDUCED_COLOR[factor])
+    if image is None:
+        raise ValueError("Invalid image data")
+    decoded = time.perf_counter()
+    # Conversion sur place : le tampon décodé devient l'image RGB
+    cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+    if observe is not None:
+        observe("imdecode", decoded - started)
+        observe("cvtcolor", time.perf_counter() - decoded)
+
+    height, width = image.shape[:2]
+    if factor > 1:
+        # Le décodeur arrondit au supérieur ; une orientation EXIF d'un quart de tour
+        # échange largeur et hauteur
+        stored_width, stored_height = size
+        if (width, height) == (-(-stored_width // factor), -(-stored_height // factor)):
+            width, height = stored_width, stored_height
+        else:
+            width, height = stored_height, stored_width
+    return DecodedImage(image, width, height)
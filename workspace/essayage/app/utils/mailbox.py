@@ -0,0 +1,72 @@
+"""
+Boîte aux lettres à un emplacement : la dernière image reçue remplace la précédente.
+
+Lorsque l'inférence est plus lente que la caméra, les images en attente deviennent
+obsolètes. Plutôt que de les traiter dans l'ordre, seule la plus récente est conservée
+et les autres sont comptées comme abandonnées.
+
+Classes:
+    MailboxClosed: Levée lorsque la boîte est fermée et vide.
+    LatestFrameMailbox: Boîte aux lettres « la plus récente gagne ».
+"""
+
+import asyncio
+from typing import Any, Optional
+
+
+class MailboxClosed(Exception):
+    """Levée par ``get`` lorsque la boîte est fermée et vide."""
+
+
+class LatestFrameMailbox:
+    """
+    Boîte aux lettres à un seul emplacement.
+
+    Attributes:
+        received: Nombre d'éléments déposés
+        dropped: Nombre d'éléments remplacés avant d'avoir été lus
+    """
+
+    def __init__(self):
+        self._item: Optional[Any] = None
+        self._has_item = False
+        self._closed = False
+        self._event = asyncio.Event()
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, item: Any) -> bool:
+        """
+        Dépose un élément, en remplaçant celui qui attendait éventuellement.
+
+        Returns:
+            True si un élément plus ancien a été abandonné
+        """
+        dropped = self._has_item
+        if dropped:
+            self.dropped += 1
+        self._item = item
+        self._has_item = True
+        self.received += 1
+        self._event.set()
+        return dropped
+
+    async def get(self) -> Any:
+        """
+        Retire l'élément le plus récent, en attendant qu'il y en ait un.
+
+        Raises:
+            MailboxClosed: Si la boîte est fermée et vide
+        """
+        while not self._has_item:
+            if self._closed:
+                raise MailboxClosed()
+            self._event.clear()
+            await self._event.wait()
+        item, self._item, self._has_item = self._item, None, False
+        return item
+
+    def close(self) -> None:
+        """Ferme la boîte : ``get`` lèvera ``MailboxClosed`` une fois vide."""
+        self._closed = True
+        self._event.set()
@@ -0,0 +1,235 @@
+"""
+Métriques du service d'essayage, au format texte Prometheus.
+
+Chaque étape du traitement d'une image (décodage, Face Mesh, géométrie, filtre de
+Kalman, sérialisation) alimente un histogramme de durées, et les échecs de détection
+un compteur. Une mesure coûte deux appels à ``time.perf_counter`` et une recherche
+dichotomique dans les seuils : l'instrumentation reste active en production.
+
+Les processus d'inférence tiennent leurs propres métriques et en renvoient
+périodiquement les variations avec leurs résultats (``drain``) ; le processus
+principal les cumule (``merge``) et les expose sur ``/metrics``.
+
+Classes:
+    Counter: Compteur, éventuellement ventilé selon une étiquette.
+    Histogram: Histogramme de durées, éventuellement ventilé selon une étiquette.
+    MetricsRegistry: Ensemble de métriques et rendu au format Prometheus.
+"""
+
+import bisect
+import threading
+from typing import Dict, Optional, Sequence
+
+# Type MIME du format texte Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seuils (s) des histogrammes de durées
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Counter:
+    """
+    Compteur, éventuellement ventilé selon une étiquette.
+
+    Attributes:
+        name: Nom Prometheus du compteur
+        help: Description du compteur
+        label: Nom de l'étiquette de ventilation (None : aucune)
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._values: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value: str = "", amount: float = 1.0) -> None:
+        """Incrémente le compteur (de la valeur d'étiquette donnée)."""
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0.0) + amount
+
+    def value(self, label_value: str = "") -> float:
+        """Valeur courante du compteur."""
+        return self._values.get(label_value, 0.0)
+
+    def drain(self) -> dict:
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: dict) -> None:
+        with self._lock:
+            for label_value, amount in values.items():
+                self._values[label_value] = self._values.get(label_value, 0.0) + amount
+
+    def render(self) -> list:
+        values = self._values if self._values or self.label is not None else {"": 0.0}
+        return [f"{self.name}{_labels(self.label, label_value)} {_number(amount)}"
+                for label_value, amount in sorted(values.items())]
+
+
+class Histogram:
+    """
+    Histogramme de durées, éventuellement ventilé selon une étiquette.
+
+    Attributes:
+        name: Nom Prometheus de l'histogramme
+        help: Description de l'histogramme
+        label: Nom de l'étiquette de ventilation (None : aucune)
+        buckets: Seuils (s) des classes, croissants
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None,
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        # Par valeur d'étiquette : effectifs par classe (dernière : +Inf), somme
+        self._values: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, value: float) -> None:
+        """Enregistre une durée (s)."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_value)
+            if entry is None:
+                entry = self._values[label_value] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def count(self, label_value: str = "") -> int:
+        """Nombre de durées enregistrées."""
+        entry = self._values.get(label_value)
+        return sum(entry[0]) if entry is not None else 0
+
+    def drain(self) -> dict:
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: dict) -> None:
+        with self._lock:
+            for label_value, (counts, total) in values.items():
+                entry = self._values.get(label_value)
+                if entry is None:
+                    entry = self._values[label_value] = [[0] * (len(self.buckets) + 1), 0.0]
+                entry[0] = [current + added for current, added in zip(entry[0], counts)]
+                entry[1] += total
+
+    def render(self) -> list:
+        lines = []
+        for label_value, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.label, label_value, le=le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label, label_value)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label, label_value)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Ensemble des métriques d'un processus."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, help: str, label: Optional[str] = None) -> Counter:
+        """Déclare un compteur."""
+        return self._register(Counter(name, help, label))
+
+    def histogram(self, name: str, help: str, label: Optional[str] = None,
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """Déclare un histogramme de durées."""
+        return self._register(Histogram(name, help, label, buckets))
+
+    def drain(self) -> dict:
+        """
+        Retire les valeurs accumulées depuis le dernier appel.
+
+        Returns:
+            Les variations de chaque métrique modifiée, à transmettre à ``merge``
+        """
+        drained = {name: metric.drain() for name, metric in self._metrics.items()}
+        return {name: values for name, values in drained.items() if values}
+
+    def merge(self, delta: dict) -> None:
+        """Cumule les variations renvoyées par ``drain`` (par exemple d'un autre processus)."""
+        for name, values in delta.items():
+            metric = self._metrics.get(name)
+            if metric is not None:
+                metric.merge(values)
+
+    def render(self, gauges: Optional[Dict[str, dict]] = None) -> str:
+        """
+        Rendu des métriques au format texte Prometheus.
+
+        Args:
+            gauges: Jauges supplémentaires, par préfixe : chaque valeur numérique du
+                dictionnaire devient la jauge ``<préfixe>_<clé>``
+
+        Returns:
+            Le texte à servir sur ``/metrics``
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for prefix, values in (gauges or {}).items():
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                lines.append(f"# TYPE {prefix}_{key} gauge")
+                lines.append(f"{prefix}_{key} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+def _labels(label: Optional[str], label_value: str, **extra: str) -> str:
+    pairs = ([(label, label_value)] if label is not None else []) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "essayage_stage_seconds", "Durée (s) de chaque étape du traitement d'une image", label="stage"
+)
+DETECTION_FAILURES = registry.counter(
+    "essayage_detection_failures_total", "Images sans visage exploitable, par motif", label="reason"
+)
+FALLBACK_RESPONSES = registry.counter(
+    "essayage_fallback_responses_total", "Réponses construites à partir de la dernière position connue"
+)
+PREDICTED_FRAMES = registry.counter(
+    "essayage_predicted_frames_total", "Images servies avec la pose prédite par le filtre de Kalman"
+)
+STREAM_FRAMES = registry.counter(
+    "essayage_stream_frames_total",
+    "Images du flux d'essayage, analysées ou servies avec le résultat de l'image précédente", label="outcome"
+)
+SESSION_RESUMES = registry.counter(
+    "essayage_session_resumes_total",
+    "Connexions WebSocket ouvertes avec une clé de reprise, selon que l'état de suivi a été retrouvé",
+    label="outcome"
+)
@@ -0,0 +1,75 @@
+"""
+Mémoire occupée par les processus du service.
+
+Le RSS compte toutes les pages résidentes d'un processus, y compris celles qu'il
+partage avec d'autres : additionné sur plusieurs workers issus d'un même parent, il
+surestime la mémoire réellement occupée. Le PSS répartit chaque page partagée entre
+les processus qui la partagent, et l'USS ne compte que les pages propres au processus :
+la somme des PSS est la mémoire consommée par le groupe de workers, l'USS ce que libère
+l'arrêt d'un worker.
+
+Les valeurs sont lues dans ``/proc/<pid>/smaps_rollup`` (Linux 4.14 et suivants), à
+défaut ``/proc/<pid>/status`` (RSS seul).
+
+Functions:
+    process_memory: RSS, PSS et USS d'un processus.
+    total_memory: Mémoire cumulée d'un ensemble de processus.
+"""
+
+import os
+from typing import Dict, Iterable, Optional
+
+# Champs de smaps_rollup (en kio) retenus, et clés correspondantes
+_ROLLUP_FIELDS = {"Rss": "rss_bytes", "Pss": "pss_bytes", "Private_Clean": "uss_bytes",
+                  "Private_Dirty": "uss_bytes"}
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, int]:
+    """
+    Mémoire occupée par un processus.
+
+    Args:
+        pid: Processus mesuré (None : processus courant)
+
+    Returns:
+        ``rss_bytes``, et si disponibles ``pss_bytes`` et ``uss_bytes`` ; un
+        dictionnaire vide si le processus n'existe plus ou si ``/proc`` est absent
+    """
+    pid = os.getpid() if pid is None else pid
+    memory: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as rollup:
+            for line in rollup:
+                field, _, value = line.partition(":")
+                key = _ROLLUP_FIELDS.get(field)
+                if key is not None:
+                    memory[key] = memory.get(key, 0) + int(value.split()[0]) * 1024
+        return memory
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return {"rss_bytes": int(line.split()[1]) * 1024}
+    except (OSError, ValueError):
+        pass
+    return {}
+
+
+def total_memory(pids: Iterable[int]) -> Dict[str, int]:
+    """
+    Mémoire cumulée d'un ensemble de processus (processus disparus ignorés).
+
+    Returns:
+        Somme de chaque grandeur de ``process_memory``, et le nombre de processus mesurés
+    """
+    total = {"processes": 0}
+    for pid in pids:
+        memory = process_memory(pid)
+        if not memory:
+            continue
+        total["processes"] += 1
+        for key, value in memory.items():
+            total[key] = total.get(key, 0) + value
+    return total
@@ -1,7 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routers import face_detection
+from app.routers import face_detection, health
 
 app = FastAPI(
     title="Service Essayage",
@@ -20,6 +20,7 @@ app.add_middleware(
 
 # Inclusion des routers
 app.include_router(face_detection.router, prefix="/api/v1/face", tags=["Face Detection"])
+app.include_router(health.router, tags=["Health Check"])
 
 @app.get("/", tags=["Health Check"])
 def read_root():
@@ -0,0 +1,56 @@
+"""
+Doublures partagées par les tests unitaires.
+
+Classes:
+    FakeClock: Horloge avancée à la main.
+    FakeFaceMesh: Face Mesh simulé.
+"""
+
+
+class FakeClock:
+    """Horloge avancée à la main (attribut ``now``)."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeFaceMesh:
+    """
+    Face Mesh simulé : renvoie toujours le(s) même(s) visage(s), en coordonnées normalisées.
+
+    Sans ``points``, ou lorsque ``detect`` est faux, aucun visage n'est détecté. Les
+    paramètres positionnels sont ceux de ``create_face_mesh``, ce qui permet de
+    l'utiliser comme fabrique d'un ``FaceMeshPool`` ou d'un ``SessionManager``.
+    """
+
+    def __init__(self, max_num_faces=1, static_image_mode=False, refine_landmarks=True, *, points=None):
+        self.points = points
+        self.max_num_faces = max_num_faces
+        self.static_image_mode = static_image_mode
+        self.refine_landmarks = refine_landmarks
+        self.detect = True
+        self.inputs = []
+        self.processed = 0
+        self.resets = 0
+        self.closed = False
+
+    def process(self, image):
+        self.processed += 1
+        # Les tests du pool passent des images factices, sans dimensions
+        self.inputs.append(getattr(image, "shape", None))
+        if not self.detect or self.points is None:
+            return type("Results", (), {"multi_face_landmarks": None})()
+        faces = []
+        for points in (self.points if self.points.ndim == 3 else [self.points]):
+            landmarks = [type("Landmark", (), {"x": x, "y": y, "z": z})() for x, y, z in points]
+            faces.append(type("Face", (), {"landmark": landmarks})())
+        return type("Results", (), {"multi_face_landmarks": faces})()
+
+    def reset(self):
+        self.resets += 1
+
+    def close(self):
+        self.closed = True
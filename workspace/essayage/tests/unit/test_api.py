@@ -9,18 +9,28 @@ Tests couverts :
 - Endpoint racine (GET /)
 - Endpoint de détection de visage (POST /api/v1/face/detect)
 - Endpoint de test (GET /api/v1/face/test)
-- Endpoint WebSocket (/api/v1/face/ws)
+- Métriques Prometheus (GET /metrics)
+- Sonde de disponibilité (GET /ready), après le préchauffage
+- Endpoint WebSocket (/api/v1/face/ws), en texte et en binaire, mode delta
+- Reprise d'une session WebSocket par sa clé
 
 Cas d'erreur testés :
 - Requête sans fichier image
 - Image sans visage détecté
 - Connexion WebSocket invalide
+- Image binaire sur le protocole texte, data URL invalide
+- Image annonçant trop de pixels sur le WebSocket
 """
 
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from app.services.quality_tiers import QUALITY_TIERS
+from app.utils.frame_protocol import BINARY_SUBPROTOCOL, HEADER, FrameFormat
+import base64
 import io
+import struct
+import time
 import cv2
 import numpy as np
 
@@ -53,6 +63,29 @@ def test_face_detection_endpoint_with_file(client, test_image):
     assert response.status_code == 400  # Pas de visage détecté dans l'image test
     assert not response.json()["success"]
 
+def test_metrics_endpoint(client, test_image):
+    files = {"image": ("test.jpg", test_image, "image/jpeg")}
+    client.post("/api/v1/face/detect", files=files)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE essayage_stage_seconds histogram" in response.text
+    assert "essayage_inference_sessions" in response.text
+
+def test_ready_after_warm_up():
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 120
+        response = client.get("/ready")
+        while response.status_code == 503 and time.monotonic() < deadline:
+            assert not response.json()["ready"]
+            time.sleep(0.2)
+            response = client.get("/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ready"]
+    assert body["cold_start_seconds"] >= body["warm_up_seconds"] > 0
+    assert all(worker["tiers"] == {name: 1 for name in QUALITY_TIERS} for worker in body["workers"])
+
 def test_face_detection_test_endpoint(client):
     response = client.get("/api/v1/face/test")
     assert response.status_code == 200
@@ -66,4 +99,73 @@ def test_websocket_endpoint_accessible(client):
         # Vérifier que la connexion est établie en envoyant un message
         websocket.send_text("test")
         response = websocket.receive_json()
-        assert "success" in response 
\ No newline at end of file
+        assert "success" in response 
+
+def test_websocket_protocol_mismatch(client):
+    """
+    Une image binaire sur le protocole texte, ou une data URL invalide, reçoit une erreur explicite.
+    """
+    with client.websocket_connect("/api/v1/face/ws") as websocket:
+        websocket.send_bytes(b"\xff\xd8\xff")
+        assert websocket.receive_json()["error"] == "Binary frames require the binary protocol"
+        websocket.send_text("test")
+        assert websocket.receive_json()["error"] == "Invalid data URL"
+        websocket.send_text("data:image/jpeg;base64,@@@")
+        assert websocket.receive_json()["error"] == "Invalid data URL"
+
+def test_websocket_rejects_oversized_dimensions(client):
+    """
+    Une petite image PNG annonçant plus de pixels que la limite est refusée avant son décodage.
+    """
+    _, png = cv2.imencode(".png", np.zeros((8, 8, 3), dtype=np.uint8))
+    png = bytearray(png.tobytes())
+    png[16:24] = struct.pack(">II", 20000, 20000)
+    with client.websocket_connect("/api/v1/face/ws") as websocket:
+        websocket.send_text("data:image/png;base64," + base64.b64encode(bytes(png)).decode())
+        assert websocket.receive_json()["error"].startswith("Image larger than")
+    frame = HEADER.pack(1, FrameFormat.PNG, 0, 0, 3) + bytes(png)
+    with client.websocket_connect("/api/v1/face/ws", subprotocols=[BINARY_SUBPROTOCOL]) as websocket:
+        websocket.send_bytes(frame)
+        response = websocket.receive_json()
+        assert response["seq"] == 3 and response["error"].startswith("Image larger than")
+
+def test_websocket_binary_protocol(client):
+    """
+    Test du protocole binaire : le numéro de séquence de l'en-tête est renvoyé.
+    """
+    frame = HEADER.pack(1, FrameFormat.RGB24, 64, 48, 7) + bytes(64 * 48 * 3)
+    with client.websocket_connect("/api/v1/face/ws", subprotocols=[BINARY_SUBPROTOCOL]) as websocket:
+        websocket.send_bytes(frame)
+        response = websocket.receive_json()
+        assert response["seq"] == 7
+        assert not response["success"]
+
+def test_websocket_delta_mode_control(client):
+    """
+    Le mode delta s'active par message de contrôle, sauf en format binaire.
+    """
+    with client.websocket_connect("/api/v1/face/ws?landmark_format=compact") as websocket:
+        websocket.send_text('{"type": "config", "delta": true}')
+        assert websocket.receive_json() == {"type": "config", "success": True}
+    with client.websocket_connect("/api/v1/face/ws?landmark_format=binary",
+                                  subprotocols=[BINARY_SUBPROTOCOL]) as websocket:
+        websocket.send_text('{"type": "config", "delta": true}')
+        response = websocket.receive_json()
+        assert not response["success"]
+
+def test_websocket_session_resume(client):
+    """
+    Une connexion ouverte avec la même clé reprend l'état de suivi de la précédente.
+    """
+    frame = HEADER.pack(1, FrameFormat.RGB24, 64, 48, 1) + bytes(64 * 48 * 3)
+    url = "/api/v1/face/ws?session=resume-0123456789abcdef"
+    with client.websocket_connect(url, subprotocols=[BINARY_SUBPROTOCOL]) as websocket:
+        assert websocket.receive_json() == {"type": "session", "session": "resume-0123456789abcdef",
+                                            "resumed": False}
+        websocket.send_bytes(frame)
+        assert not websocket.receive_json()["success"]
+    with client.websocket_connect(url, subprotocols=[BINARY_SUBPROTOCOL]) as websocket:
+        assert websocket.receive_json()["resumed"]
+    with pytest.raises(Exception):
+        with client.websocket_connect("/api/v1/face/ws?session=short") as websocket:
+            websocket.receive_json()
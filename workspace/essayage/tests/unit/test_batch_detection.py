@@ -0,0 +1,96 @@
+"""
+Tests unitaires pour l'analyse par lot de portraits.
+
+Tests couverts :
+- Lecture des images d'un envoi multipart et d'une archive zip
+- Nombre borné d'analyses simultanées et résultats dans l'ordre de fin
+- Endpoint POST /api/v1/face/detect/batch (flux NDJSON)
+
+Cas d'erreur testés :
+- Archive zip invalide
+- Lot ou image trop volumineux
+- Échec de l'analyse d'une image
+"""
+
+import asyncio
+import io
+import json
+import zipfile
+
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.batch_detection import analyze_concurrently, iter_uploaded_images
+
+
+class FakeUpload:
+    def __init__(self, filename, contents, content_type="image/jpeg"):
+        self.filename = filename
+        self.file = io.BytesIO(contents)
+        self.content_type = content_type
+
+
+def make_zip(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("photos/", b"")
+        for name, contents in entries.items():
+            archive.writestr(name, contents)
+    return buffer.getvalue()
+
+
+def test_iter_uploaded_images():
+    uploads = [
+        FakeUpload("a.jpg", b"a"),
+        FakeUpload("lot.zip", make_zip({"photos/b.jpg": b"b", "photos/c.jpg": b"c" * 10}), "application/zip"),
+        FakeUpload("broken.zip", b"not a zip", "application/zip"),
+        FakeUpload("d.jpg", b"d"),
+    ]
+    items = list(iter_uploaded_images(uploads, max_images=3, max_image_bytes=5))
+    assert [name for name, _ in items] == ["a.jpg", "photos/b.jpg", "photos/c.jpg", "broken.zip", "d.jpg"]
+    assert items[0][1] == b"a" and items[1][1] == b"b"
+    assert "larger than" in str(items[2][1])
+    assert "Invalid zip" in str(items[3][1])
+    assert "limited to 3" in str(items[4][1])
+
+
+@pytest.mark.asyncio
+async def test_analyze_concurrently_bounds_work_in_flight():
+    in_flight = []
+    active = 0
+
+    async def analyze(contents):
+        nonlocal active
+        active += 1
+        in_flight.append(active)
+        # Les images les plus longues à analyser terminent en dernier
+        await asyncio.sleep(0.01 * len(contents))
+        active -= 1
+        if contents == b"bad":
+            raise ValueError("No face detected in the image")
+        return len(contents)
+
+    images = iter([("slow", b"xxxxxx"), ("bad", b"bad"), ("fast", b"x"), ("skipped", ValueError("too big"))])
+    results = [item async for item in analyze_concurrently(images, analyze, concurrency=2)]
+    assert max(in_flight) == 2
+    assert [name for _, name, _, _ in results] == ["bad", "fast", "skipped", "slow"]
+    assert {index: (outcome, str(error) if error else None) for index, _, outcome, error in results} == {
+        0: (6, None), 1: (None, "No face detected in the image"), 2: (1, None), 3: (None, "too big"),
+    }
+
+
+def test_detect_batch_endpoint():
+    _, blank = cv2.imencode('.jpg', np.zeros((120, 160, 3), dtype=np.uint8))
+    files = [
+        ("images", ("blank.jpg", blank.tobytes(), "image/jpeg")),
+        ("images", ("lot.zip", make_zip({"junk.jpg": b"junk"}), "application/zip")),
+    ]
+    response = TestClient(app).post("/api/v1/face/detect/batch", files=files)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = sorted((json.loads(line) for line in response.text.splitlines()), key=lambda line: line["index"])
+    assert [(line["filename"], line["success"]) for line in lines] == [("blank.jpg", False), ("junk.jpg", False)]
+    assert "No face detected" in lines[0]["error"]
+    assert "Invalid image" in lines[1]["error"]
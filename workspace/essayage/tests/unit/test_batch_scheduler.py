@@ -0,0 +1,53 @@
+"""
+Tests unitaires pour le regroupement des images en micro-lots.
+
+Tests couverts :
+- Envoi dès que toutes les sessions attendues ont déposé une image
+- Envoi après l'attente maximale
+- Taille maximale d'un lot
+- Abandon d'un lot en attente
+"""
+
+import asyncio
+import pytest
+from app.services.batch_scheduler import BatchScheduler
+
+
+@pytest.fixture
+def sent():
+    return []
+
+
+@pytest.fixture
+def scheduler(sent):
+    return BatchScheduler(lambda key, batch: sent.append((key, batch)), max_wait=0.01, max_batch_size=3)
+
+
+@pytest.mark.asyncio
+async def test_flushes_when_every_session_is_queued(scheduler, sent):
+    scheduler.submit("w", 1, expected=2)
+    assert sent == []
+    scheduler.submit("w", 2, expected=2)
+    assert sent == [("w", [1, 2])]
+    assert scheduler.stats()["largest_batch"] == 2
+
+
+@pytest.mark.asyncio
+async def test_flushes_after_max_wait(scheduler, sent):
+    scheduler.submit("w", 1, expected=4)
+    scheduler.submit("v", 2, expected=4)
+    assert scheduler.queued == 2
+    await asyncio.sleep(0.03)
+    assert sorted(sent) == [("v", [2]), ("w", [1])]
+    assert scheduler.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_max_batch_size(scheduler, sent):
+    for item in range(4):
+        scheduler.submit("w", item, expected=10)
+    assert sent == [("w", [0, 1, 2])]
+    assert scheduler.discard("w") == [3]
+    await asyncio.sleep(0.03)
+    assert len(sent) == 1
+    assert scheduler.stats()["mean_batch_size"] == 3
@@ -0,0 +1,107 @@
+"""
+Tests unitaires pour l'encodage différentiel des poses du WebSocket.
+
+Tests couverts :
+- Image clé complète puis deltas limités aux valeurs modifiées
+- Variations inférieures à la précision non transmises
+- Images clés périodiques, sur demande et au changement de projection
+- Reconstruction de l'état par un client
+
+Cas d'erreur testés :
+- Précision invalide
+"""
+
+import numpy as np
+import pytest
+from app.models.face import CompactLandmarks, GlassesPosition, Point3D
+from app.utils.delta_encoding import DeltaEncoder
+
+
+def make_pose(points, rotation_y=0.0):
+    landmarks = CompactLandmarks(np.asarray(points, dtype=np.float32), 640, 480)
+    glasses_position = GlassesPosition(
+        position=Point3D(x=320.0, y=200.0, z=0.0),
+        rotation=Point3D(x=0.0, y=rotation_y, z=0.0),
+        scale=Point3D(x=1.0, y=1.0, z=1.0),
+    )
+    return landmarks, glasses_position
+
+
+def apply(state, message):
+    """Reconstruction de l'état côté client."""
+    if message["type"] == "keyframe":
+        landmarks = message["landmarks"]
+        return {"points": list(landmarks["points"]), "precision": landmarks["precision"],
+                "pose": message["glasses_position"]}
+    landmarks = message.get("landmarks")
+    if landmarks:
+        for index, step in zip(landmarks.get("i", range(len(state["points"]))), landmarks["d"]):
+            state["points"][index] += step * state["precision"]
+    for field, axes in message.get("glasses_position", {}).items():
+        state["pose"][field].update(axes)
+    return state
+
+
+@pytest.fixture
+def points():
+    return np.tile(np.arange(12, dtype=np.float32)[:, None] * 10, (1, 3))
+
+
+def test_keyframe_then_changed_values_only(points):
+    encoder = DeltaEncoder(keyframe_interval=30, landmark_precision=0.5, pose_precision=0.01)
+    keyframe = encoder.encode(*make_pose(points))
+    assert keyframe["type"] == "keyframe" and keyframe["n"] == 1
+    assert keyframe["landmarks"]["count"] == 12
+    assert len(keyframe["landmarks"]["points"]) == 24
+    assert keyframe["glasses_position"]["scale"] == {"x": 1.0, "y": 1.0, "z": 1.0}
+
+    moved = points.copy()
+    moved[3, 1] += 2.0
+    delta = encoder.encode(*make_pose(moved, rotation_y=0.25))
+    assert delta["type"] == "delta" and delta["n"] == 2
+    assert delta["landmarks"] == {"i": [7], "d": [4]}
+    assert delta["glasses_position"] == {"rotation": {"y": 0.25}}
+
+
+def test_dense_steps_when_most_points_move(points):
+    encoder = DeltaEncoder(landmark_precision=0.5)
+    encoder.encode(*make_pose(points))
+    delta = encoder.encode(*make_pose(points + 1.0))
+    assert delta["landmarks"] == {"d": [2] * 24}
+
+
+def test_jitter_below_precision_is_not_sent(points):
+    encoder = DeltaEncoder(landmark_precision=0.5, pose_precision=0.01)
+    encoder.encode(*make_pose(points))
+    delta = encoder.encode(*make_pose(points + 0.1, rotation_y=0.001))
+    assert set(delta) == {"type", "n", "measured"}
+
+
+def test_periodic_requested_and_layout_keyframes(points):
+    encoder = DeltaEncoder(keyframe_interval=3)
+    types = [encoder.encode(*make_pose(points))["type"] for _ in range(7)]
+    assert types == ["keyframe", "delta", "delta", "keyframe", "delta", "delta", "keyframe"]
+
+    encoder.request_keyframe()
+    assert encoder.encode(*make_pose(points))["type"] == "keyframe"
+    assert encoder.encode(*make_pose(points))["type"] == "delta"
+    projected = encoder.encode(*make_pose(points), indices=(0, 1))
+    assert projected["type"] == "keyframe"
+    assert projected["landmarks"]["indices"] == [0, 1]
+
+
+def test_client_reconstructs_quantized_state(points):
+    encoder = DeltaEncoder(keyframe_interval=100, landmark_precision=0.25, pose_precision=0.001)
+    rng = np.random.default_rng(0)
+    state = None
+    current = points
+    for step in range(20):
+        current = current + rng.normal(0, 0.5, current.shape).astype(np.float32)
+        state = apply(state, encoder.encode(*make_pose(current, rotation_y=step * 0.01)))
+    np.testing.assert_allclose(state["points"], current[:, :2].ravel(), atol=0.125 + 1e-4)
+    assert state["pose"]["rotation"]["y"] == pytest.approx(0.19)
+
+
+def test_invalid_precision():
+    with pytest.raises(ValueError):
+        DeltaEncoder(landmark_precision=0)
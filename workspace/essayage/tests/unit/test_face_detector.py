@@ -10,6 +10,12 @@ Tests couverts :
 - Calcul de position des lunettes avec landmarks simulés
 - Détection d'absence de visage
 - Validation de la qualité de détection
+- Projection des points de repère
+- Analyse de la région du visage suivi et retour à la détection complète
+- Prédiction de la pose entre deux analyses lorsque la tête est immobile
+- Traitement par lot avec une seule mise à jour des filtres de Kalman
+- Calcul vectorisé de la pose des lunettes pour un lot d'images
+- Suivi de plusieurs visages avec des identifiants stables
 
 Cas d'erreur testés :
 - Image sans visage détecté
@@ -21,7 +27,9 @@ import pytest
 import numpy as np
 from fastapi import UploadFile
 from app.services.face_detector import FaceDetectorService
+from app.services.kalman_filter import KalmanFilterBank, PoseFilter
 from app.models.face import Point2D, Point3D, FaceLandmarks, GlassesPosition
+from fakes import FakeFaceMesh
 import io
 import cv2
 
@@ -88,4 +96,166 @@ async def test_detect_landmarks_no_face(face_detector, mock_image):
     # Test avec une image sans visage clair
     with pytest.raises(ValueError) as exc_info:
         await face_detector.detect_landmarks(mock_image)
-    assert "No face detected" in str(exc_info.value) 
\ No newline at end of file
+    assert "No face detected" in str(exc_info.value) 
+
+def test_resolve_landmark_projection():
+    assert FaceDetectorService.resolve_landmark_projection("full") is None
+    assert FaceDetectorService.resolve_landmark_projection("none") == ()
+    assert FaceDetectorService.LEFT_TEMPLE in FaceDetectorService.resolve_landmark_projection("glasses")
+    assert len(FaceDetectorService.resolve_landmark_projection("contour")) == 36
+    assert FaceDetectorService.resolve_landmark_projection("33,263") == (33, 263)
+    with pytest.raises(ValueError):
+        FaceDetectorService.resolve_landmark_projection("33,abc")
+    with pytest.raises(ValueError):
+        FaceDetectorService.resolve_landmark_projection("999")
+
+
+@pytest.fixture
+def fake_points():
+    rng = np.random.default_rng(0)
+    points = np.column_stack([rng.uniform(0.4, 0.6, 478), rng.uniform(0.35, 0.65, 478), np.zeros(478)])
+    points[FaceDetectorService.LEFT_EYE_OUTER, 0] = 0.42
+    points[FaceDetectorService.LEFT_EYE_INNER, 0] = 0.47
+    points[FaceDetectorService.RIGHT_EYE_OUTER, 0] = 0.58
+    points[FaceDetectorService.RIGHT_EYE_INNER, 0] = 0.53
+    return points
+
+
+def test_roi_tracking_maps_landmarks_to_frame(fake_points):
+    face_mesh = FakeFaceMesh(points=fake_points)
+    detector = FaceDetectorService(face_mesh=face_mesh, roi_size=128, roi_padding=0.25, detection_max_side=320,
+                                   frame_skipping=False)
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    # Première image : détection sur l'image complète réduite
+    landmarks, _ = detector.process_rgb_image(image)
+    assert face_mesh.inputs[-1] == (240, 320, 3)
+    np.testing.assert_allclose(landmarks.points, fake_points * [640, 480, 640], rtol=1e-5)
+
+    # Image suivante : seule la région du visage est analysée
+    x0, y0, x1, y1 = detector.face_box
+    landmarks, _ = detector.process_rgb_image(image)
+    assert face_mesh.inputs[-1] == (128, 128, 3)
+    side = int(max(x1 - x0, y1 - y0) * 1.5)
+    left, top = int((x0 + x1 - side) / 2), int((y0 + y1 - side) / 2)
+    expected = fake_points * side + [left, top, 0]
+    np.testing.assert_allclose(landmarks.points, expected, rtol=1e-5)
+    assert landmarks.image_width == 640 and landmarks.image_height == 480
+
+
+def test_roi_tracking_falls_back_to_full_frame(fake_points):
+    face_mesh = FakeFaceMesh(points=fake_points)
+    detector = FaceDetectorService(face_mesh=face_mesh, roi_size=128, detection_max_side=320,
+                                   frame_skipping=False)
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    detector.process_rgb_image(image)
+
+    # Visage perdu : la région puis l'image complète sont analysées
+    face_mesh.detect = False
+    face_mesh.inputs.clear()
+    detector.process_rgb_image(image)
+    assert face_mesh.inputs == [(128, 128, 3), (240, 320, 3)]
+    assert detector.face_box is None
+
+
+def test_still_face_is_predicted_between_measurements(fake_points):
+    face_mesh = FakeFaceMesh(points=fake_points)
+    # Sans région du visage, le visage simulé reste à la même place dans l'image
+    detector = FaceDetectorService(face_mesh=face_mesh, max_skip_frames=2, roi_tracking=False)
+    image = np.full((480, 640, 3), 128, dtype=np.uint8)
+
+    measured = []
+    for frame in range(7):
+        landmarks, glasses_position = detector.process_rgb_image(image, timestamp=frame / 30, load=1.0)
+        measured.append(landmarks.measured)
+    assert measured == [True, False, False, True, False, False, True]
+    assert len(face_mesh.inputs) == 3
+    assert glasses_position.scale.x > 0
+
+
+def test_moving_face_is_always_measured(fake_points):
+    face_mesh = FakeFaceMesh(points=fake_points)
+    detector = FaceDetectorService(face_mesh=face_mesh, max_skip_frames=2)
+    rng = np.random.default_rng(0)
+
+    for frame in range(4):
+        image = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+        landmarks, _ = detector.process_rgb_image(image, timestamp=frame / 30, load=1.0)
+        assert landmarks.measured
+    assert detector.motion > 1.0
+
+
+def test_process_batch_shares_one_filter_update(fake_points):
+    bank = KalmanFilterBank(3)
+    detectors = [FaceDetectorService(face_mesh=FakeFaceMesh(points=fake_points), pose_filter=PoseFilter(bank))
+                 for _ in range(3)]
+    detectors[1].face_mesh.detect = False
+    images = [np.zeros((480, 640, 3), dtype=np.uint8)] * 3
+
+    results = FaceDetectorService.process_batch(detectors, images, timestamps=[1.0, 1.0, 1.0])
+    assert isinstance(results[1], ValueError)
+    for index in (0, 2):
+        landmarks, glasses_position = results[index]
+        assert landmarks.measured
+        assert glasses_position.position.x == pytest.approx(bank.value[detectors[index].kalman_filter.slot][0])
+    assert list(bank.initialized) == [True, False, True]
+
+
+def test_estimate_glasses_poses_matches_single_frame(face_detector, fake_points):
+    rng = np.random.default_rng(1)
+    batch = np.stack([fake_points, fake_points * 0.9 + 0.05, rng.uniform(0.3, 0.7, (478, 3))])
+    poses, quality = FaceDetectorService.estimate_glasses_poses(batch, [640, 320, 640], [480, 240, 480])
+    assert poses.shape == (3, 9)
+    for row, (width, height) in enumerate([(640, 480), (320, 240), (640, 480)]):
+        glasses_position = face_detector._calculate_glasses_position(batch[row], width, height)
+        assert glasses_position.position.x == pytest.approx(poses[row, 0])
+        assert glasses_position.rotation.z == pytest.approx(poses[row, 5])
+        assert glasses_position.scale.x == pytest.approx(poses[row, 6])
+        assert face_detector._is_detection_quality_good(batch[row]) == quality[row]
+
+    # Trop peu de points : aucune pose exploitable
+    _, quality = FaceDetectorService.estimate_glasses_poses(np.zeros((2, 100, 3)), 640, 480)
+    assert not quality.any()
+
+
+def test_multiple_faces_keep_their_track_ids(fake_points):
+    left, right = fake_points - [0.25, 0, 0], fake_points + [0.25, 0, 0]
+    face_mesh = FakeFaceMesh(points=np.stack([left, right]))
+    detector = FaceDetectorService(face_mesh=face_mesh, max_faces=2)
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    landmarks, _, faces = detector.process_rgb_image(image, timestamp=0.0)
+    assert [face.track_id for face in faces] == [1, 2]
+    assert landmarks is faces[0].landmarks
+    left_x = faces[0].glasses_position.position.x
+
+    # L'ordre de Face Mesh change : chaque piste reste attachée au même visage
+    face_mesh.points = np.stack([right, left])
+    _, _, faces = detector.process_rgb_image(image, timestamp=1 / 30)
+    assert [face.track_id for face in faces] == [1, 2]
+    assert faces[0].glasses_position.position.x == pytest.approx(left_x, rel=1e-3)
+    assert all(face.landmarks.measured for face in faces)
+
+    # Visage gauche perdu : sa pose est prédite tant que la piste est conservée
+    face_mesh.points = right
+    _, _, faces = detector.process_rgb_image(image, timestamp=2 / 30)
+    assert [(face.track_id, face.landmarks.measured) for face in faces] == [(1, False), (2, True)]
+
+    detector.release_filters()
+    assert not detector.kalman_filter.bank.active.any()
+
+
+def test_missed_frame_keeps_tracked_faces(fake_points):
+    left, right = fake_points - [0.25, 0, 0], fake_points + [0.25, 0, 0]
+    face_mesh = FakeFaceMesh(points=np.stack([left, right]))
+    detector = FaceDetectorService(face_mesh=face_mesh, max_faces=2, frame_skipping=False)
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    _, _, faces = detector.process_rgb_image(image, timestamp=0.0)
+    measured_x = [face.glasses_position.position.x for face in faces]
+
+    # Aucun visage dans cette image : les deux pistes restent, poses prédites
+    face_mesh.detect = False
+    landmarks, _, faces = detector.process_rgb_image(image, timestamp=1 / 30)
+    assert [(face.track_id, face.landmarks.measured) for face in faces] == [(1, False), (2, False)]
+    assert landmarks is faces[0].landmarks
+    assert [face.glasses_position.position.x for face in faces] == pytest.approx(measured_x, abs=1.0)
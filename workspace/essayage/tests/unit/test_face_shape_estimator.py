@@ -0,0 +1,153 @@
+"""
+Tests unitaires pour l'estimation de la forme du visage sur le flux d'essayage.
+
+Tests couverts :
+- Convergence sur un flux bruité, forme identique à celle du barème sur les ratios exacts
+- Forme convergée signalée une seule fois, puis à nouveau si elle change
+- Moyennes robustes aux images aberrantes
+- Message du flux, avec un ticket portant l'image la plus proche de l'estimation
+
+Cas d'erreur testés :
+- Images de tête tournée ou aux points incomplets écartées
+- Flux trop instable pour converger
+"""
+
+import asyncio
+import base64
+
+import numpy as np
+import pytest
+from app.models.face import CompactLandmarks, GlassesPosition, Point3D
+from app.services.face_shape import RATIO_NAMES, face_shape_scores
+from app.services.face_shape_estimator import FaceShapeEstimator
+from app.services.landmark_ticket import LandmarkTicketSigner
+from app.services.try_on_stream import TryOnStream
+from app.utils.frame_protocol import PROTOCOL_TEXT
+
+# Ratios d'un visage rectangulaire et d'un visage rond
+LONG_FACE = dict(zip(RATIO_NAMES, (0.84, 0.72, 1.07, 0.07, 0.72)))
+ROUND_FACE = dict(zip(RATIO_NAMES, (1.0, 1.0, 1.0, 1.0, 1.0)))
+
+
+def face_points(ratios, cheekbone_width=200.0):
+    """Points de repère (468, 3), en pixels, dont les mesures donnent ``ratios``."""
+    points = np.zeros((468, 3), dtype=np.float32)
+
+    def pair(first, second, width, y):
+        points[first, :2] = (400 - width / 2, y)
+        points[second, :2] = (400 + width / 2, y)
+
+    pair(123, 352, cheekbone_width, 400)
+    pair(172, 397, ratios["jaw_to_cheekbone"] * cheekbone_width, 480)
+    pair(93, 323, ratios["temple_to_cheekbone"] * cheekbone_width, 360)
+    pair(136, 365, ratios["jaw_corner_to_cheekbone"] * cheekbone_width, 460)
+    points[8, :2] = (400, 300)
+    points[9, :2] = (400, 300 - ratios["forehead_to_cheekbone"] * cheekbone_width)
+    points[10, :2] = (400, 200)
+    points[152, :2] = (400, 200 + cheekbone_width / ratios["face_width_to_height"])
+    return points
+
+
+def pose(yaw=0.0):
+    return GlassesPosition(position=Point3D(x=400, y=330, z=0), rotation=Point3D(x=0, y=yaw, z=0),
+                           scale=Point3D(x=1, y=1, z=1))
+
+
+def frames(ratios, count, noise=1.0, seed=0):
+    rng = np.random.default_rng(seed)
+    points = face_points(ratios)
+    for _ in range(count):
+        yield CompactLandmarks(points + rng.normal(0, noise, points.shape).astype(np.float32), 800, 600)
+
+
+def expected_shape(ratios):
+    scores = face_shape_scores(ratios)
+    return max(scores.items(), key=lambda x: x[1])[0]
+
+
+def test_converges_once():
+    estimator = FaceShapeEstimator(min_samples=30)
+    updates = [estimator.update(landmarks, pose()) for landmarks in frames(LONG_FACE, 120)]
+    emitted = [(index, update) for index, update in enumerate(updates) if update is not None]
+    assert len(emitted) == 1
+    index, estimate = emitted[0]
+    assert index >= 29 and estimate.converged
+    assert estimate.face_shape == expected_shape(LONG_FACE) == "rectangulaire"
+    assert estimate.confidence > 0.8
+    for name, value in LONG_FACE.items():
+        assert estimate.ratios[name] == pytest.approx(value, abs=0.01)
+    message = estimate.to_dict()
+    assert message["samples"] == estimate.samples and "converged" not in message
+
+
+def test_shape_change_is_signalled_again():
+    estimator = FaceShapeEstimator(min_samples=10)
+    shapes = [update.face_shape
+              for landmarks in list(frames(LONG_FACE, 60)) + list(frames(ROUND_FACE, 200, seed=1))
+              for update in [estimator.update(landmarks, pose())] if update is not None]
+    assert shapes == ["rectangulaire", "rond"]
+
+
+def test_outliers_are_clipped():
+    estimator = FaceShapeEstimator()
+    for index, landmarks in enumerate(frames(LONG_FACE, 200)):
+        if index % 10 == 9:
+            # Main devant la mâchoire : mesures très fausses
+            landmarks.points[172, 0] -= 150
+        estimator.update(landmarks, pose())
+    estimate = estimator.estimate()
+    assert estimate.converged
+    assert estimate.ratios["jaw_to_cheekbone"] == pytest.approx(LONG_FACE["jaw_to_cheekbone"], abs=0.02)
+
+
+def test_unusable_frames_are_rejected():
+    estimator = FaceShapeEstimator(max_yaw=0.3)
+    landmarks = next(frames(LONG_FACE, 1))
+    assert estimator.update(landmarks, pose(yaw=0.5)) is None
+    assert estimator.update(CompactLandmarks(landmarks.points[:400], 800, 600), pose()) is None
+    flat = CompactLandmarks(np.zeros((468, 3), dtype=np.float32), 800, 600)
+    assert estimator.update(flat, pose()) is None
+    assert estimator.rejected == 3 and estimator.samples == 0
+    assert estimator.estimate() is None and estimator.representative_landmarks is None
+
+
+def test_unstable_stream_does_not_converge():
+    estimator = FaceShapeEstimator(min_samples=30, tolerance=0.01)
+    assert all(estimator.update(landmarks, pose()) is None for landmarks in frames(LONG_FACE, 29))
+    estimator = FaceShapeEstimator(min_samples=10, tolerance=0.01)
+    assert all(estimator.update(landmarks, pose()) is None for landmarks in frames(LONG_FACE, 100, noise=15.0))
+    assert estimator.standard_error() > 0.01
+
+
+class FakeExecutor:
+    """Exécuteur d'inférence renvoyant les résultats d'une liste."""
+
+    def __init__(self, outcomes):
+        self.outcomes = iter(outcomes)
+
+    async def process(self, session_id, payload, frame=None):
+        return next(self.outcomes)
+
+
+def test_stream_sends_face_shape_with_ticket():
+    signer = LandmarkTicketSigner("secret")
+    executor = FakeExecutor([(landmarks, pose()) for landmarks in frames(LONG_FACE, 40)])
+    stream = TryOnStream(None, executor, "session", PROTOCOL_TEXT, "compact",
+                         face_shape_options={"min_samples": 20}, landmark_tickets=signer)
+    assert stream.face_shape is None
+    stream.set_face_shape(True)
+    message = {"text": "data:image/jpeg;base64," + base64.b64encode(b"frame").decode()}
+
+    async def run():
+        for sequence in range(40):
+            await stream._process(sequence, message)
+            if stream._face_shape_update is not None:
+                return stream._build_face_shape_message(stream._face_shape_update)
+
+    shape_message = asyncio.run(run())
+    assert shape_message["type"] == "face_shape" and shape_message["face_shape"] == "rectangulaire"
+    ticket = signer.verify(shape_message["landmark_ticket"])
+    assert (ticket.image_width, ticket.image_height) == (800, 600)
+    assert ticket.points.shape == (468, 2)
+    # Points normalisés de l'image la plus proche de l'estimation
+    np.testing.assert_allclose(ticket.points[152] * (800, 600), face_points(LONG_FACE)[152, :2], atol=5)
@@ -0,0 +1,59 @@
+"""
+Tests unitaires pour le suivi de plusieurs visages.
+
+Tests couverts :
+- Identifiants stables lorsque les visages se déplacent
+- Nouvelle piste pour un nouveau visage
+- Abandon d'une piste perdue et libération de son filtre
+
+Cas d'erreur testés :
+- Nombre maximum de visages atteint
+"""
+
+import numpy as np
+from app.services.face_tracker import FaceTracker
+from app.services.kalman_filter import KalmanFilterBank
+
+
+def boxes(*corners):
+    return np.array([(x, y, x + 100, y + 100) for x, y in corners], dtype=float)
+
+
+def track_ids(assignments):
+    return {index: track.track_id for index, track in assignments}
+
+
+def test_track_ids_follow_moving_faces():
+    tracker = FaceTracker(KalmanFilterBank(4), max_faces=2)
+    assert track_ids(tracker.update(boxes((0, 0), (300, 0)))) == {0: 1, 1: 2}
+    # Les visages bougent et sont détectés dans l'ordre inverse
+    assert track_ids(tracker.update(boxes((310, 5), (10, 5)))) == {0: 2, 1: 1}
+
+
+def test_new_face_opens_a_new_track():
+    tracker = FaceTracker(KalmanFilterBank(4), max_faces=3)
+    tracker.update(boxes((0, 0)))
+    assert track_ids(tracker.update(boxes((0, 0), (300, 0)))) == {0: 1, 1: 2}
+    assert sorted(tracker.tracks) == [1, 2]
+
+
+def test_lost_track_is_dropped_and_released():
+    bank = KalmanFilterBank(2)
+    tracker = FaceTracker(bank, max_faces=2, max_missed=2)
+    tracker.update(boxes((0, 0), (300, 0)))
+    for _ in range(2):
+        tracker.update(boxes((0, 0)))
+    assert sorted(tracker.tracks) == [1, 2]
+    tracker.update(boxes((0, 0)))
+    assert sorted(tracker.tracks) == [1]
+    assert bank.active.sum() == 1
+
+    tracker.reset()
+    assert not bank.active.any()
+
+
+def test_max_faces_limits_tracks():
+    tracker = FaceTracker(KalmanFilterBank(4), max_faces=2)
+    assignments = tracker.update(boxes((0, 0), (300, 0), (600, 0)))
+    assert track_ids(assignments) == {0: 1, 1: 2}
+    assert len(tracker.tracks) == 2
@@ -0,0 +1,236 @@
+"""
+Tests unitaires pour la détection des images inchangées du flux d'essayage.
+
+Tests couverts :
+- Vignettes des images encodées et brutes (RGB, I420)
+- Image fixe bruitée réutilisée, image décalée d'un demi-pixel analysée
+- Expiration du résultat de référence
+- Image fixe redimensionnée ou d'un autre format analysée
+- Réutilisation du résultat et des erreurs liées à l'image par le flux
+- Vignette calculée hors de la boucle d'événements
+
+Cas d'erreur testés :
+- Image illisible, PNG (jamais décodé pour la vignette)
+- Grande image PNG ne bloquant pas la boucle d'événements
+- Détection désactivée
+"""
+
+import asyncio
+import base64
+import time
+
+import cv2
+import numpy as np
+import pytest
+from app.services import try_on_stream
+from app.services.try_on_stream import TryOnStream
+from app.utils.frame_change import THUMBNAIL_SIZE, StaticFrameDetector, frame_thumbnail
+from app.utils.frame_protocol import PROTOCOL_BINARY, FrameDescriptor, FrameFormat
+from fakes import FakeClock
+
+
+def make_scene(shift: float = 0.0, noise: int = 0, seed: int = 0) -> np.ndarray:
+    """Scène BGR 640x480 avec un petit disque (visage lointain) décalé de ``shift`` pixels."""
+    scene = np.full((480, 640, 3), 90, dtype=np.uint8)
+    cv2.rectangle(scene, (0, 300), (640, 480), (40, 60, 80), -1)
+    matrix = np.float32([[1, 0, shift], [0, 1, 0]])
+    disc = np.zeros_like(scene)
+    cv2.circle(disc, (320, 200), 40, (200, 170, 150), -1)
+    disc = cv2.warpAffine(disc, matrix, (640, 480))
+    scene = np.where(disc > 0, disc, scene)
+    if noise:
+        rng = np.random.default_rng(seed)
+        scene = np.clip(scene + rng.integers(-noise, noise + 1, scene.shape), 0, 255).astype(np.uint8)
+    return scene
+
+
+def jpeg(image: np.ndarray) -> bytes:
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes()
+
+
+def test_thumbnails_of_encoded_and_raw_frames():
+    scene = make_scene()
+    encoded = frame_thumbnail(jpeg(scene))
+    assert encoded.shape == (THUMBNAIL_SIZE[1], THUMBNAIL_SIZE[0])
+    assert encoded.dtype == np.int16
+
+    rgb = cv2.cvtColor(scene, cv2.COLOR_BGR2RGB)
+    raw = frame_thumbnail(rgb.tobytes(), FrameDescriptor(FrameFormat.RGB24, 640, 480))
+    i420 = cv2.cvtColor(scene, cv2.COLOR_BGR2YUV_I420)
+    planar = frame_thumbnail(i420.tobytes(), FrameDescriptor(FrameFormat.I420, 640, 480))
+    assert raw.shape == planar.shape == encoded.shape
+    # Même scène, mêmes zones claires et sombres quel que soit le format
+    assert np.corrcoef(raw.ravel(), planar.ravel())[0, 1] > 0.9
+
+
+def test_invalid_image_data():
+    with pytest.raises(ValueError):
+        frame_thumbnail(b"not an image")
+    # PNG et WebP seraient décodés entièrement : pas de vignette
+    png = cv2.imencode(".png", make_scene())[1].tobytes()
+    with pytest.raises(ValueError):
+        frame_thumbnail(png)
+    with pytest.raises(ValueError):
+        frame_thumbnail(png, FrameDescriptor(FrameFormat.PNG))
+
+
+def test_noisy_still_frame_is_static_and_small_shift_is_not():
+    detector = StaticFrameDetector(threshold=3.0, max_age=0.5, clock=FakeClock())
+    detector.update(frame_thumbnail(jpeg(make_scene(noise=4, seed=1))))
+    assert detector.is_static(frame_thumbnail(jpeg(make_scene(noise=4, seed=2))))
+    assert not detector.is_static(frame_thumbnail(jpeg(make_scene(shift=2.0, noise=4, seed=2))))
+
+
+def test_reference_expires():
+    clock = FakeClock()
+    detector = StaticFrameDetector(threshold=3.0, max_age=0.5, clock=clock)
+    thumbnail = frame_thumbnail(jpeg(make_scene()))
+    assert not detector.is_static(thumbnail)
+    detector.update(thumbnail)
+    clock.now = 0.4
+    assert detector.is_static(thumbnail)
+    clock.now = 0.6
+    assert not detector.is_static(thumbnail)
+    detector.update(thumbnail)
+    detector.reset()
+    assert not detector.is_static(thumbnail)
+
+
+def test_resized_or_reformatted_still_frame_is_not_static():
+    detector = StaticFrameDetector(threshold=3.0, max_age=0.5, clock=FakeClock())
+    thumbnail = frame_thumbnail(jpeg(make_scene()))
+    detector.update(thumbnail, (FrameFormat.JPEG, 640, 480))
+    assert detector.is_static(thumbnail, (FrameFormat.JPEG, 640, 480))
+    assert not detector.is_static(thumbnail, (FrameFormat.JPEG, 320, 240))
+    assert not detector.is_static(thumbnail, (FrameFormat.RGB24, 640, 480))
+
+
+def test_disabled_detector():
+    assert not StaticFrameDetector(threshold=0).enabled
+    assert not StaticFrameDetector(max_age=0).enabled
+    assert StaticFrameDetector().enabled
+
+
+class FakeExecutor:
+    """Exécuteur d'inférence qui compte les analyses et renvoie un résultat fixe."""
+
+    def __init__(self, outcome):
+        self.outcome = outcome
+        self.calls = 0
+
+    async def process(self, session_id, payload, frame=None):
+        self.calls += 1
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+def make_stream(executor, threshold=3.0):
+    return TryOnStream(None, executor, "session", PROTOCOL_BINARY, "compact",
+                       static_frames=StaticFrameDetector(threshold=threshold, clock=FakeClock()))
+
+
+def test_stream_reuses_outcome_of_unchanged_frames():
+    executor = FakeExecutor(("landmarks", "pose"))
+    stream = make_stream(executor)
+    still = jpeg(make_scene())
+    moved = jpeg(make_scene(shift=3.0))
+
+    async def run():
+        return [await stream._analyze(payload, None) for payload in (still, still, moved, moved)]
+
+    results = asyncio.run(run())
+    assert [reused for _, reused in results] == [False, True, False, True]
+    assert executor.calls == 2
+    assert stream.processed == 2 and stream.reused == 2
+
+
+def test_stream_reuses_missing_face_but_not_transient_errors():
+    executor = FakeExecutor(ValueError("No face detected in the image"))
+    stream = make_stream(executor)
+    still = jpeg(make_scene())
+
+    async def run():
+        return [await stream._analyze(still, None) for _ in range(3)]
+
+    outcomes = asyncio.run(run())
+    assert executor.calls == 1
+    assert all(isinstance(outcome, ValueError) for outcome, _ in outcomes)
+
+    executor = FakeExecutor(TimeoutError("Inference timed out"))
+    stream = make_stream(executor)
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            asyncio.run(stream._analyze(still, None))
+    assert executor.calls == 2
+
+
+def test_stream_analyzes_resized_still_frame():
+    executor = FakeExecutor(ValueError("No face detected in the image"))
+    stream = make_stream(executor)
+    # Scène floue agrandie (changement de résolution de la caméra) : même vignette,
+    # seules les dimensions lues dans l'en-tête diffèrent
+    scene = cv2.GaussianBlur(make_scene(), (0, 0), 8)
+    frames = [jpeg(scene), jpeg(scene), jpeg(cv2.resize(scene, (1280, 960), interpolation=cv2.INTER_CUBIC))]
+
+    async def run():
+        for payload in frames:
+            await stream._process(0, {"text": "data:image/jpeg;base64," + base64.b64encode(payload).decode()})
+
+    asyncio.run(run())
+    assert executor.calls == 2
+
+
+def max_loop_stall(coroutine):
+    """Exécute ``coroutine`` et mesure le plus long blocage (s) de la boucle d'événements."""
+    async def run():
+        gaps = []
+        finished = asyncio.Event()
+
+        async def ticker():
+            last = time.perf_counter()
+            while not finished.is_set():
+                await asyncio.sleep(0.005)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        task = asyncio.ensure_future(ticker())
+        await asyncio.sleep(0.01)
+        result = await coroutine
+        finished.set()
+        await task
+        return result, max(gaps)
+
+    return asyncio.run(run())
+
+
+def test_huge_png_does_not_stall_the_loop():
+    executor = FakeExecutor(("landmarks", "pose"))
+    stream = make_stream(executor)
+    png = cv2.imencode(".png", np.zeros((3000, 4000, 3), dtype=np.uint8))[1].tobytes()
+    (outcome, reused), stall = max_loop_stall(stream._analyze(png, None))
+    assert outcome == ("landmarks", "pose") and not reused
+    assert stall < 0.05
+
+
+def test_thumbnail_is_computed_off_the_loop(monkeypatch):
+    def slow_thumbnail(payload, frame):
+        time.sleep(0.2)
+        return frame_thumbnail(payload, frame)
+
+    monkeypatch.setattr(try_on_stream, "frame_thumbnail", slow_thumbnail)
+    executor = FakeExecutor(("landmarks", "pose"))
+    stream = make_stream(executor)
+    _, stall = max_loop_stall(stream._analyze(jpeg(make_scene()), None))
+    assert executor.calls == 1
+    assert stall < 0.1
+
+
+def test_stream_without_detection_always_analyzes():
+    executor = FakeExecutor(("landmarks", "pose"))
+    stream = make_stream(executor, threshold=0)
+    still = jpeg(make_scene())
+    for _ in range(3):
+        asyncio.run(stream._analyze(still, None))
+    assert executor.calls == 3 and stream.reused == 0
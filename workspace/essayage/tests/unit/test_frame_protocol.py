@@ -0,0 +1,61 @@
+"""
+Tests unitaires pour le protocole binaire du WebSocket.
+
+Tests couverts :
+- Négociation du protocole à la connexion
+- Analyse des en-têtes et des images encodées sans en-tête
+- Décodage des formats bruts (RGB, I420) et encodés
+
+Cas d'erreur testés :
+- En-tête tronqué ou de version inconnue
+- Taille de l'image incohérente avec l'en-tête
+"""
+
+import pytest
+import cv2
+import numpy as np
+from app.utils.frame_protocol import (
+    BINARY_SUBPROTOCOL, HEADER, PROTOCOL_BINARY, PROTOCOL_TEXT, FrameFormat,
+    decode_frame, negotiate_protocol, parse_binary_frame
+)
+
+
+def test_negotiate_protocol():
+    assert negotiate_protocol([BINARY_SUBPROTOCOL]) == (PROTOCOL_BINARY, BINARY_SUBPROTOCOL)
+    assert negotiate_protocol([], "binary") == (PROTOCOL_BINARY, None)
+    assert negotiate_protocol([]) == (PROTOCOL_TEXT, None)
+
+
+def test_parse_bare_jpeg():
+    _, buffer = cv2.imencode('.jpg', np.zeros((8, 8, 3), dtype=np.uint8))
+    frame, payload = parse_binary_frame(buffer.tobytes())
+    assert frame.format == FrameFormat.JPEG
+    assert frame.sequence is None
+    assert len(payload) == len(buffer)
+
+
+def test_parse_raw_rgb_frame():
+    pixels = np.arange(4 * 2 * 3, dtype=np.uint8).reshape(2, 4, 3)
+    message = HEADER.pack(1, FrameFormat.RGB24, 4, 2, 42) + pixels.tobytes()
+    frame, payload = parse_binary_frame(message)
+    assert frame == (FrameFormat.RGB24, 4, 2, 42)
+    decoded = decode_frame(payload, frame.format, frame.width, frame.height)
+    assert np.array_equal(decoded.rgb, pixels)
+    assert (decoded.width, decoded.height) == (4, 2)
+
+
+def test_decode_i420_frame():
+    yuv = np.full((6, 4), 128, dtype=np.uint8)
+    rgb = decode_frame(yuv.tobytes(), FrameFormat.I420, 4, 4).rgb
+    assert rgb.shape == (4, 4, 3)
+
+
+def test_invalid_frames():
+    with pytest.raises(ValueError):
+        parse_binary_frame(b"\x01\x10")
+    with pytest.raises(ValueError):
+        parse_binary_frame(HEADER.pack(9, FrameFormat.RGB24, 1, 1, 0) + b"\x00" * 3)
+    with pytest.raises(ValueError):
+        parse_binary_frame(HEADER.pack(1, FrameFormat.RGB24, 4, 4, 0) + b"\x00" * 3)
+    with pytest.raises(ValueError):
+        decode_frame(b"garbage", FrameFormat.JPEG)
@@ -0,0 +1,113 @@
+"""
+Tests unitaires pour le décodage des images encodées.
+
+Tests couverts :
+- Lecture des dimensions dans l'en-tête (JPEG, PNG, WebP)
+- Choix du facteur de réduction du décodage JPEG
+- Décodage réduit, en RGB, avec les dimensions de l'image d'origine
+- Orientation EXIF d'un quart de tour
+- Résultat ramené aux dimensions de l'image d'origine
+
+Cas d'erreur testés :
+- Image trop volumineuse ou de trop de pixels, refusée avant décodage
+- Données illisibles
+"""
+
+import struct
+
+import cv2
+import numpy as np
+import pytest
+from app.models.face import CompactLandmarks, GlassesPosition, Point3D, TrackedFace
+from app.services.face_detector import scale_result
+from app.utils.image_decoding import (
+    check_image_bytes, decode_image, image_dimensions, reduction_factor
+)
+
+
+def encode(image, extension=".jpg"):
+    _, buffer = cv2.imencode(extension, image)
+    return buffer.tobytes()
+
+
+def blue_image(width, height):
+    """Image BGR dont le canal bleu est plein et le rouge nul."""
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    image[..., 0] = 255
+    return image
+
+
+def with_orientation(jpeg: bytes, orientation: int) -> bytes:
+    """Insère un segment EXIF portant l'orientation après le marqueur SOI."""
+    tiff = b"II*\x00" + struct.pack("<IH", 8, 1) + struct.pack("<HHIHH", 0x0112, 3, 1, orientation, 0)
+    tiff += struct.pack("<I", 0)
+    segment = b"Exif\x00\x00" + tiff
+    return jpeg[:2] + b"\xff\xe1" + struct.pack(">H", len(segment) + 2) + segment + jpeg[2:]
+
+
+def test_image_dimensions():
+    image = blue_image(120, 90)
+    assert image_dimensions(encode(image)) == (120, 90)
+    assert image_dimensions(memoryview(encode(image, ".png"))) == (120, 90)
+    webp = encode(image, ".webp")
+    if webp:
+        assert image_dimensions(webp) == (120, 90)
+    assert image_dimensions(b"garbage") is None
+    assert image_dimensions(encode(image)[:20]) is None
+
+
+def test_reduction_factor():
+    assert reduction_factor(1920, 1080, 960) == 2
+    assert reduction_factor(3840, 2160, 960) == 4
+    assert reduction_factor(1280, 720, 960) == 1
+    assert reduction_factor(8000, 6000, 100) == 8
+    assert reduction_factor(1920, 1080, 0) == 1
+
+
+def test_reduced_decoding():
+    payload = encode(blue_image(1001, 601))
+    decoded = decode_image(payload, target_side=250)
+    assert decoded.rgb.shape == (151, 251, 3)
+    assert (decoded.width, decoded.height) == (1001, 601)
+    assert decoded.reduced
+    # Canaux dans l'ordre RGB
+    assert decoded.rgb[..., 2].mean() > 250 and decoded.rgb[..., 0].mean() < 5
+
+    full = decode_image(payload)
+    assert full.rgb.shape == (601, 1001, 3) and not full.reduced
+    # Les autres formats sont décodés en pleine résolution
+    assert decode_image(encode(blue_image(400, 300), ".png"), target_side=100).rgb.shape == (300, 400, 3)
+
+
+def test_exif_orientation():
+    payload = with_orientation(encode(blue_image(400, 200)), 6)
+    decoded = decode_image(payload, target_side=100)
+    assert decoded.rgb.shape == (100, 50, 3)
+    assert (decoded.width, decoded.height) == (200, 400)
+
+
+def test_oversized_images_are_rejected():
+    check_image_bytes(100, max_bytes=100)
+    with pytest.raises(ValueError):
+        check_image_bytes(101, max_bytes=100)
+    with pytest.raises(ValueError):
+        decode_image(encode(blue_image(200, 100)), max_pixels=200 * 100 - 1)
+    with pytest.raises(ValueError):
+        decode_image(b"\xff\xd8\xff garbage")
+
+
+def test_scale_result():
+    points = np.tile(np.array([[10.0, 20.0, -5.0], [30.0, 40.0, 5.0]], dtype=np.float32), (5, 1))
+    position = GlassesPosition(position=Point3D(x=20, y=30, z=-40), rotation=Point3D(x=0.1, y=0.2, z=0.3),
+                               scale=Point3D(x=2, y=0.8, z=1.2))
+    result = (CompactLandmarks(points, 100, 50), position,
+              [TrackedFace(1, CompactLandmarks(points, 100, 50, measured=False), position)])
+    assert scale_result(result, 100, 50) is result
+
+    landmarks, scaled, faces = scale_result(result, 400, 200)
+    assert (landmarks.image_width, landmarks.image_height) == (400, 200)
+    np.testing.assert_allclose(landmarks.points, points * 4)
+    assert (scaled.position.x, scaled.position.y, scaled.position.z) == (80, 120, -40)
+    assert scaled.rotation == position.rotation
+    assert scaled.scale.x == pytest.approx(8)
+    assert not faces[0].landmarks.measured and faces[0].track_id == 1
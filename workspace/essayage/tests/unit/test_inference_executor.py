@@ -0,0 +1,143 @@
+"""
+Tests unitaires pour l'exécuteur d'inférence.
+
+Tests couverts :
+- Traitement dans un processus de travail et dans le thread local
+- Affinité et répartition des sessions entre processus
+- Regroupement des images de sessions simultanées en un lot
+
+Cas d'erreur testés :
+- Image invalide
+- Image sans visage détecté
+- Dépassement du nombre maximum de sessions
+- Processus bloqué remplacé après des requêtes expirées
+- Thread d'inférence bloqué : exécuteur plus prêt, requêtes refusées, arrêt demandé
+"""
+
+import asyncio
+import os
+import signal
+import threading
+
+import pytest
+import cv2
+import numpy as np
+from app.services.inference_executor import InferenceExecutor
+from app.services.session_manager import SessionLimitError
+
+
+@pytest.fixture(params=[0, 1], ids=["inline", "process"])
+def executor(request):
+    executor = InferenceExecutor(num_workers=request.param, max_sessions=2)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.fixture
+def blank_image():
+    _, buffer = cv2.imencode('.jpg', np.zeros((120, 160, 3), dtype=np.uint8))
+    return buffer.tobytes()
+
+
+@pytest.mark.asyncio
+async def test_invalid_image(executor):
+    with pytest.raises(ValueError) as exc_info:
+        await executor.process_once(b"not an image")
+    assert "Invalid image" in str(exc_info.value)
+
+
+@pytest.mark.asyncio
+async def test_no_face_in_session(executor, blank_image):
+    executor.open_session("a")
+    with pytest.raises(ValueError) as exc_info:
+        await executor.process("a", blank_image)
+    assert "No face detected" in str(exc_info.value)
+    executor.close_session("a")
+
+
+def test_session_limit(executor):
+    executor.open_session("a")
+    executor.open_session("b")
+    with pytest.raises(SessionLimitError):
+        executor.open_session("c")
+    executor.close_session("a")
+    executor.open_session("c")
+
+
+def test_sessions_spread_across_workers():
+    executor = InferenceExecutor(num_workers=2, max_sessions=4)
+    try:
+        executor.open_session("a")
+        executor.open_session("b")
+        assert executor._session_workers["a"] is not executor._session_workers["b"]
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sessions_are_batched(executor, blank_image):
+    executor.open_session("a")
+    executor.open_session("b")
+    results = await asyncio.gather(
+        executor.process("a", blank_image), executor.process("b", blank_image), return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+    stats = executor.stats()
+    assert stats["largest_batch"] == 2
+    assert stats["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not hasattr(signal, "SIGSTOP"), reason="SIGSTOP indisponible")
+async def test_hung_worker_is_replaced(blank_image):
+    executor = InferenceExecutor(num_workers=1, max_sessions=1, timeout=0.5, max_timeouts=2)
+    try:
+        await executor.warm_up()
+        worker = executor._workers[0]
+        hung = worker.process
+        slots = len(worker.free_slots)
+        # Processus vivant mais qui ne répond plus
+        os.kill(hung.pid, signal.SIGSTOP)
+        with pytest.raises(RuntimeError, match="timed out"):
+            await executor.process_once(blank_image)
+        assert worker.process is hung and len(worker.free_slots) == slots - 1
+        with pytest.raises(RuntimeError, match="timed out"):
+            await executor.process_once(blank_image)
+        # Deuxième expiration : processus tué et remplacé, emplacements libérés
+        assert worker.process is not hung and not hung.is_alive()
+        assert len(worker.free_slots) == slots and worker.timeouts == 0
+        # Le remplaçant se préchauffe avant de répondre
+        executor.timeout = 120
+        with pytest.raises(ValueError, match="No face detected"):
+            await executor.process_once(blank_image)
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hung_inline_thread_stops_the_worker(blank_image):
+    stopped = []
+    executor = InferenceExecutor(num_workers=0, max_sessions=1, timeout=0.2, max_timeouts=2,
+                                 on_hung=lambda: stopped.append(True))
+    executor.start()
+    executor.ready = True
+    release = threading.Event()
+    # Face Mesh qui ne rend plus la main
+    executor._runner.run_batch = lambda tasks, backlog=0: release.wait() and []
+    try:
+        with pytest.raises(RuntimeError, match="timed out"):
+            await executor.process_once(blank_image)
+        assert not stopped and executor.ready
+        # Requête en file derrière le thread bloqué : elle échoue dès le blocage déclaré
+        queued = asyncio.ensure_future(executor._submit("process_once", None, blank_image, None, None,
+                                                        timeout=60))
+        with pytest.raises(RuntimeError, match="timed out"):
+            await executor.process_once(blank_image)
+        assert stopped == [True] and not executor.ready
+        with pytest.raises(RuntimeError, match="stuck"):
+            await asyncio.wait_for(queued, 1)
+        with pytest.raises(RuntimeError, match="stuck"):
+            await executor.process_once(blank_image)
+    finally:
+        release.set()
+        executor.shutdown()
@@ -0,0 +1,77 @@
+"""
+Tests unitaires pour les filtres de Kalman.
+
+Tests couverts :
+- Initialisation par la première mesure et suivi d'un mouvement uniforme
+- Prise en compte de l'intervalle réel entre deux mesures
+- Mise à jour par lots sans effet sur les emplacements non sélectionnés
+- Continuité des angles autour de ±π
+- Compatibilité de KalmanFilter3D
+
+Cas d'erreur testés :
+- Banque pleine
+"""
+
+import numpy as np
+import pytest
+from app.services.kalman_filter import KalmanFilter3D, KalmanFilterBank, PoseFilter
+
+
+def test_first_measurement_initializes_state():
+    pose_filter = PoseFilter()
+    measurement = np.array([320.0, 240.0, -50.0, 0.1, -0.2, 0.3, 1.5, 0.6, 0.9])
+    np.testing.assert_allclose(pose_filter.update(measurement, 1.0), measurement)
+    np.testing.assert_allclose(pose_filter.velocity, 0.0)
+
+
+def test_tracks_uniform_motion_from_timestamps():
+    pose_filter = PoseFilter(KalmanFilterBank(1, frame_interval=0.1, angular_dims=None))
+    for step in range(60):
+        # Une mesure toutes les 0,2 s, soit deux images de référence
+        filtered = pose_filter.update(np.full(9, 4.0 * step), 0.2 * step)
+    # 4 unités par mesure, donc 2 unités par image de référence
+    np.testing.assert_allclose(pose_filter.velocity, 2.0, rtol=1e-2)
+    np.testing.assert_allclose(filtered, 4.0 * 59, rtol=1e-3)
+    np.testing.assert_allclose(pose_filter.predict(0.2 * 59 + 0.1), 4.0 * 59 + 2.0, rtol=1e-2)
+
+
+def test_batch_update_leaves_other_slots_untouched():
+    bank = KalmanFilterBank(3, angular_dims=None)
+    slots = [bank.allocate() for _ in range(3)]
+    measurements = np.ones((3, 9))
+    bank.update(measurements, np.zeros(3), np.ones(3, dtype=bool))
+
+    measurements[:] = 5.0
+    mask = np.array([True, False, True])
+    values = bank.update(measurements, np.full(3, 0.1), mask)
+    assert (values[slots[0]] > 1.0).all()
+    np.testing.assert_allclose(values[slots[1]], 1.0)
+    assert bank.last_time[slots[1]] == 0.0
+
+
+def test_rotation_wraps_around_pi():
+    pose_filter = PoseFilter()
+    measurement = np.zeros(9)
+    measurement[4] = np.pi - 0.05
+    pose_filter.update(measurement, 0.0)
+    measurement[4] = -np.pi + 0.05
+    filtered = pose_filter.update(measurement, 1 / 30)
+    # Le filtre passe par ±π au lieu de traverser 0
+    assert abs(filtered[4]) > np.pi - 0.1
+
+
+def test_bank_full():
+    bank = KalmanFilterBank(1)
+    PoseFilter(bank)
+    with pytest.raises(RuntimeError):
+        bank.allocate()
+
+
+def test_kalman_filter_3d_compatibility():
+    kalman_filter = KalmanFilter3D()
+    for step in range(20):
+        position = kalman_filter.update(np.array([step, 2.0 * step, 0.0]))
+    assert position.shape == (3,)
+    np.testing.assert_allclose(position, [19, 38, 0], atol=0.5)
+    assert kalman_filter.state.shape == (6,)
+    assert kalman_filter.get_position().x == pytest.approx(position[0])
@@ -0,0 +1,80 @@
+"""
+Tests unitaires pour les tickets de points de repère.
+
+Tests couverts :
+- Émission puis vérification d'un ticket (points et dimensions de l'image)
+- Points de plus de deux colonnes tronqués à (x, y)
+
+Cas d'erreur testés :
+- Signature modifiée ou secret différent
+- Ticket mal formé ou d'une autre version
+- Ticket expiré
+- Secret vide
+"""
+
+import base64
+
+import numpy as np
+import pytest
+from app.services.landmark_ticket import TICKET_HEADER, LandmarkTicketSigner
+from fakes import FakeClock
+
+
+def landmarks(count=468):
+    rng = np.random.default_rng(0)
+    return rng.uniform(0.0, 1.0, size=(count, 3)).astype(np.float32)
+
+
+def test_round_trip():
+    signer = LandmarkTicketSigner("secret", clock=FakeClock())
+    points = landmarks()
+    ticket = signer.issue(points, 1920, 1080)
+    verified = signer.verify(ticket)
+    assert (verified.image_width, verified.image_height) == (1920, 1080)
+    assert verified.points.shape == (468, 2) and verified.points.dtype == np.float32
+    # float16 : environ 0,5 px d'erreur sur une image de 1920 pixels
+    np.testing.assert_allclose(verified.points, points[:, :2], atol=5e-4)
+    assert "=" not in ticket
+
+
+def test_tampered_ticket_is_rejected():
+    clock = FakeClock()
+    signer = LandmarkTicketSigner("secret", clock=clock)
+    ticket = signer.issue(landmarks(), 640, 480)
+    payload, signature = ticket.split(".")
+    forged = bytearray(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    forged[1] ^= 1
+    forged_payload = base64.urlsafe_b64encode(bytes(forged)).rstrip(b"=").decode()
+    with pytest.raises(ValueError, match="signature"):
+        signer.verify(f"{forged_payload}.{signature}")
+    with pytest.raises(ValueError, match="signature"):
+        LandmarkTicketSigner("other", clock=clock).verify(ticket)
+
+
+def test_malformed_ticket_is_rejected():
+    signer = LandmarkTicketSigner("secret", clock=FakeClock())
+    for ticket in ("", "no-separator", "a.b.c", "a!.b"):
+        with pytest.raises(ValueError):
+            signer.verify(ticket)
+    # En-tête signé mais d'une autre version
+    payload = TICKET_HEADER.pack(2, 640, 480, 2e6, 0)
+    encoded = base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+    signature = base64.urlsafe_b64encode(signer._sign(payload)).rstrip(b"=").decode()
+    with pytest.raises(ValueError, match="Unsupported"):
+        signer.verify(f"{encoded}.{signature}")
+
+
+def test_expired_ticket_is_rejected():
+    clock = FakeClock()
+    signer = LandmarkTicketSigner("secret", ttl=60, clock=clock)
+    ticket = signer.issue(landmarks(), 640, 480)
+    clock.now += 59
+    signer.verify(ticket)
+    clock.now += 1
+    with pytest.raises(ValueError, match="expired"):
+        signer.verify(ticket)
+
+
+def test_secret_is_required():
+    with pytest.raises(ValueError):
+        LandmarkTicketSigner("")
@@ -0,0 +1,46 @@
+"""
+Tests unitaires pour la boîte aux lettres « la plus récente gagne ».
+
+Tests couverts :
+- Remplacement et comptage des images obsolètes
+- Attente d'une image par la tâche d'inférence
+- Fermeture de la boîte
+
+Cas d'erreur testés :
+- Lecture d'une boîte fermée et vide
+"""
+
+import asyncio
+import pytest
+from app.utils.mailbox import LatestFrameMailbox, MailboxClosed
+
+
+@pytest.mark.asyncio
+async def test_latest_item_wins():
+    mailbox = LatestFrameMailbox()
+    assert not mailbox.put(1)
+    assert mailbox.put(2)
+    assert mailbox.put(3)
+    assert await mailbox.get() == 3
+    assert mailbox.received == 3
+    assert mailbox.dropped == 2
+
+
+@pytest.mark.asyncio
+async def test_get_waits_for_item():
+    mailbox = LatestFrameMailbox()
+    getter = asyncio.ensure_future(mailbox.get())
+    await asyncio.sleep(0)
+    assert not getter.done()
+    mailbox.put("frame")
+    assert await getter == "frame"
+
+
+@pytest.mark.asyncio
+async def test_close_drains_then_raises():
+    mailbox = LatestFrameMailbox()
+    mailbox.put("last")
+    mailbox.close()
+    assert await mailbox.get() == "last"
+    with pytest.raises(MailboxClosed):
+        await mailbox.get()
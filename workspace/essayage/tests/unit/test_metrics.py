@@ -0,0 +1,64 @@
+"""
+Tests unitaires pour les métriques Prometheus.
+
+Tests couverts :
+- Rendu des compteurs et des histogrammes au format texte Prometheus
+- Transfert des variations d'un registre à un autre (processus de travail)
+- Jauges issues des statistiques du service
+
+Cas d'erreur testés :
+- Métrique déclarée deux fois
+"""
+
+import pytest
+from app.utils.metrics import MetricsRegistry
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    failures = registry.counter("failures_total", "Échecs", label="reason")
+    stages = registry.histogram("stage_seconds", "Durées", label="stage", buckets=(0.01, 0.1))
+    failures.inc("no_face")
+    failures.inc("no_face")
+    for value in (0.005, 0.05, 0.5):
+        stages.observe("face_mesh", value)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE failures_total counter" in lines
+    assert 'failures_total{reason="no_face"} 2' in lines
+    assert "# TYPE stage_seconds histogram" in lines
+    assert 'stage_seconds_bucket{stage="face_mesh",le="0.01"} 1' in lines
+    assert 'stage_seconds_bucket{stage="face_mesh",le="0.1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="face_mesh",le="+Inf"} 3' in lines
+    assert 'stage_seconds_count{stage="face_mesh"} 3' in lines
+    assert 'stage_seconds_sum{stage="face_mesh"} 0.555' in lines
+
+
+def test_drain_and_merge():
+    worker, main = MetricsRegistry(), MetricsRegistry()
+    for registry in (worker, main):
+        registry.counter("fallbacks_total", "Repli")
+        registry.histogram("stage_seconds", "Durées", label="stage")
+    worker._metrics["fallbacks_total"].inc()
+    worker._metrics["stage_seconds"].observe("imdecode", 0.002)
+
+    delta = worker.drain()
+    assert worker.drain() == {}
+    main.merge(delta)
+    main.merge(delta)
+    assert main._metrics["fallbacks_total"].value() == 2
+    assert main._metrics["stage_seconds"].count("imdecode") == 2
+
+
+def test_gauges_from_stats():
+    text = MetricsRegistry().render({"inference": {"sessions": 3, "batch_max_wait_ms": 4.5, "ready": True}})
+    assert "inference_sessions 3" in text
+    assert "inference_batch_max_wait_ms 4.5" in text
+    assert "inference_ready" not in text
+
+
+def test_duplicate_metric():
+    registry = MetricsRegistry()
+    registry.counter("failures_total", "Échecs")
+    with pytest.raises(ValueError):
+        registry.counter("failures_total", "Échecs")
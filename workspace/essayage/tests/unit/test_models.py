@@ -10,6 +10,8 @@ Tests couverts :
 - Création des landmarks faciaux
 - Création de la position des lunettes
 - Validation des contraintes métier
+- Points de repère compacts et leurs sérialisations
+- Réponse de /detect dans chaque format de points de repère
 
 Cas d'erreur testés :
 - Coordonnées invalides
@@ -19,7 +21,11 @@ Cas d'erreur testés :
 """
 
 import pytest
-from app.models.face import Point2D, Point3D, FaceLandmarks, GlassesPosition
+import numpy as np
+from app.models.face import (
+    Point2D, Point3D, FaceLandmarks, GlassesPosition, CompactLandmarks, CompactLandmarksResponse,
+    FaceAnalysisResponse, TrackedFace
+)
 
 def test_point2d_creation():
     point = Point2D(x=1.0, y=2.0)
@@ -83,4 +89,58 @@ def test_invalid_face_landmarks():
             landmarks=[],  # Liste vide non valide
             image_width=-1,  # Largeur négative non valide
             image_height=480
-        ) 
\ No newline at end of file
+        ) 
+
+def test_compact_landmarks_serialization():
+    points = np.arange(30, dtype=np.float32).reshape(10, 3)
+    landmarks = CompactLandmarks(points, image_width=640, image_height=480)
+    compact = landmarks.to_dict()
+    assert compact["count"] == 10
+    assert compact["points"][:4] == [0.0, 1.0, 3.0, 4.0]
+    assert np.frombuffer(landmarks.to_bytes(), dtype="<f4")[2] == 3.0
+
+    legacy = landmarks.to_face_landmarks()
+    assert isinstance(legacy, FaceLandmarks)
+    assert legacy.landmarks[1].x == 3.0
+    assert landmarks.to_legacy_dict() == legacy.dict()
+
+def test_compact_landmarks_projection():
+    points = np.arange(30, dtype=np.float32).reshape(10, 3)
+    landmarks = CompactLandmarks(points, image_width=640, image_height=480)
+    projected = landmarks.serialize("compact", (1, 3))
+    assert projected["indices"] == [1, 3]
+    assert projected["points"] == [3.0, 4.0, 9.0, 10.0]
+    assert len(landmarks.serialize("legacy", (1,))["landmarks"]) == 1
+    assert landmarks.serialize("compact", ()) is None
+    with pytest.raises(ValueError):
+        landmarks.serialize("compact", (12,))
+
+def test_invalid_compact_landmarks():
+    points = np.zeros((10, 3), dtype=np.float32)
+    points[4, 1] = np.nan
+    with pytest.raises(ValueError):
+        CompactLandmarks(points, image_width=640, image_height=480)
+    with pytest.raises(ValueError):
+        CompactLandmarks(np.zeros((5, 3)), image_width=640, image_height=480)
+
+def test_detect_response_covers_landmark_formats():
+    points = np.arange(30, dtype=np.float32).reshape(10, 3)
+    landmarks = CompactLandmarks(points, image_width=640, image_height=480)
+    position = GlassesPosition(position=Point3D(x=0, y=0, z=0), rotation=Point3D(x=0, y=0, z=0),
+                               scale=Point3D(x=1, y=1, z=1))
+    face = TrackedFace(3, landmarks, position)
+    for landmark_format, model in (("compact", CompactLandmarksResponse), ("legacy", FaceLandmarks)):
+        response = FaceAnalysisResponse.parse_obj({
+            "success": True,
+            "message": "ok",
+            "landmarks": landmarks.serialize(landmark_format),
+            "glasses_position": position.dict(),
+            "faces": [face.serialize(landmark_format)],
+            "landmark_ticket": "ticket"
+        })
+        assert isinstance(response.landmarks, model)
+        assert isinstance(response.faces[0].landmarks, model) and response.faces[0].track_id == 3
+    # Projection vide : aucun point renvoyé
+    assert FaceAnalysisResponse(success=True, message="ok", glasses_position=position).landmarks is None
+    with pytest.raises(ValueError):
+        FaceAnalysisResponse(success=True, message="ok", glasses_position=None)
@@ -0,0 +1,81 @@
+"""
+Tests unitaires pour le cache des résultats de /detect.
+
+Tests couverts :
+- Résultat servi depuis le cache et compteurs de succès et d'échecs
+- Éviction du résultat le moins récemment utilisé
+- Expiration des entrées
+- Comptabilité de la mémoire occupée
+
+Cas d'erreur testés :
+- Cache désactivé
+- Résultat plus grand que la mémoire allouée
+"""
+
+import numpy as np
+from app.models.face import CompactLandmarks, GlassesPosition, Point3D
+from app.services.result_cache import ENTRY_OVERHEAD, ResultCache, content_key, result_size
+from fakes import FakeClock
+
+
+def make_result(count=478):
+    point, scale = Point3D(x=0.0, y=0.0, z=0.0), Point3D(x=1.0, y=1.0, z=1.0)
+    glasses_position = GlassesPosition(position=point, rotation=point, scale=scale)
+    return CompactLandmarks(np.zeros((count, 3), dtype=np.float32), 640, 480), glasses_position
+
+
+def test_hit_and_miss_counters():
+    cache = ResultCache()
+    key = content_key(b"image")
+    assert key == content_key(b"image") and key != content_key(b"other")
+    assert cache.get(key) is None
+    result = make_result()
+    cache.put(key, result)
+    assert cache.get(key) is result
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_least_recently_used_is_evicted():
+    cache = ResultCache(max_entries=2)
+    for name in (b"a", b"b"):
+        cache.put(name, make_result())
+    cache.get(b"a")
+    cache.put(b"c", make_result())
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") is not None and cache.get(b"c") is not None
+    assert cache.evictions == 1
+
+
+def test_entries_expire():
+    clock = FakeClock()
+    cache = ResultCache(ttl=10.0, clock=clock)
+    cache.put(b"a", make_result())
+    clock.now = 9.0
+    assert cache.get(b"a") is not None
+    clock.now = 10.0
+    assert cache.get(b"a") is None
+    assert len(cache) == 0 and cache.size_bytes == 0
+
+
+def test_memory_accounting():
+    size = result_size(make_result())
+    assert size == ENTRY_OVERHEAD + 478 * 3 * 4
+    cache = ResultCache(max_bytes=2 * size)
+    for name in (b"a", b"b", b"c"):
+        cache.put(name, make_result())
+    assert len(cache) == 2 and cache.size_bytes == 2 * size
+    cache.put(b"c", make_result())
+    assert cache.size_bytes == 2 * size
+
+
+def test_disabled_or_oversized_results_are_not_stored():
+    cache = ResultCache(max_entries=0)
+    assert not cache.enabled
+    cache.put(b"a", make_result())
+    assert len(cache) == 0
+
+    cache = ResultCache(max_bytes=1000)
+    cache.put(b"a", make_result())
+    assert len(cache) == 0
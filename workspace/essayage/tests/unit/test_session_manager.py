@@ -0,0 +1,156 @@
+"""
+Tests unitaires pour le gestionnaire de sessions de suivi.
+
+Tests couverts :
+- Isolation de l'état de suivi entre sessions
+- Réutilisation des instances Face Mesh du pool
+- Éviction des sessions inactives
+- Filtres de Kalman réservés aux pistes en mode multi-visages
+- Pool et paramètres propres au niveau de qualité d'une session
+- Nombre total de graphes Face Mesh borné, tous niveaux confondus
+
+Cas d'erreur testés :
+- Dépassement du nombre maximum de sessions
+- Pool Face Mesh épuisé
+- Niveau de qualité inconnu
+"""
+
+import pytest
+from app.services.session_manager import FaceMeshPool, SessionManager, SessionLimitError
+from fakes import FakeFaceMesh
+
+
+@pytest.fixture
+def manager():
+    return SessionManager(max_sessions=2, idle_timeout=10.0, pool=FaceMeshPool(3, factory=FakeFaceMesh))
+
+
+def test_sessions_have_independent_tracking_state(manager):
+    first = manager.open_session("a")
+    second = manager.open_session("b")
+    assert first.detector is not second.detector
+    assert first.detector.face_mesh is not second.detector.face_mesh
+    assert first.detector.kalman_filter is not second.detector.kalman_filter
+
+    first.detector.consecutive_failures = 2
+    assert second.detector.consecutive_failures == 0
+
+
+def test_session_limit(manager):
+    manager.open_session("a")
+    manager.open_session("b")
+    with pytest.raises(SessionLimitError):
+        manager.open_session("c")
+
+
+def test_face_mesh_reused_after_close(manager):
+    face_mesh = manager.open_session("a").detector.face_mesh
+    manager.close_session("a")
+    assert face_mesh.resets == 1
+    assert manager.open_session("b").detector.face_mesh is face_mesh
+
+
+def test_idle_sessions_evicted(manager):
+    session = manager.open_session("a")
+    manager.open_session("b")
+    evicted = manager.evict_idle_sessions(now=session.last_activity + 5.0)
+    assert evicted == []
+    evicted = manager.evict_idle_sessions(now=session.last_activity + 60.0)
+    assert sorted(evicted) == ["a", "b"]
+    assert session.closed
+    assert len(manager) == 0
+
+
+def test_acquire_reopens_evicted_session(manager):
+    manager.open_session("a")
+    manager.evict_idle_sessions(now=float("inf"))
+    session = manager.acquire("a")
+    assert not session.closed
+    assert len(manager) == 1
+
+
+def test_pool_exhausted():
+    pool = FaceMeshPool(1, factory=FakeFaceMesh)
+    pool.acquire()
+    with pytest.raises(SessionLimitError):
+        pool.acquire()
+
+
+def test_prefill_warms_idle_meshes():
+    pool = FaceMeshPool(3, factory=FakeFaceMesh)
+    busy = pool.acquire()
+    assert pool.prefill(5, frames=[object(), object()]) == 2
+    assert pool.available == 2
+    warmed = [pool.acquire(), pool.acquire()]
+    assert [face_mesh.processed for face_mesh in warmed] == [2, 2]
+    assert busy.processed == 0
+
+
+def test_sessions_share_the_filter_bank(manager):
+    first = manager.open_session("a")
+    second = manager.open_session("b")
+    assert first.detector.kalman_filter.bank is manager.filter_bank
+    assert first.detector.kalman_filter.slot != second.detector.kalman_filter.slot
+    slot = first.detector.kalman_filter.slot
+    manager.close_session("a")
+    assert not manager.filter_bank.active[slot]
+
+
+def test_multi_face_sessions_reserve_track_filters():
+    manager = SessionManager(max_sessions=1, pool=FaceMeshPool(2, factory=FakeFaceMesh),
+                             detector_options={"max_faces": 3})
+    assert manager.filter_bank.capacity == 2 * 4
+    session = manager.open_session("a")
+    assert session.detector.tracker.max_faces == 3
+    manager.close_session("a")
+    assert not manager.filter_bank.active.any()
+
+
+def test_quality_tiers_use_their_own_pool_and_options():
+    manager = SessionManager(max_sessions=2, face_mesh_factory=FakeFaceMesh,
+                             detector_options={"roi_size": 256, "detection_max_side": 640})
+    lite = manager.open_session("lite", tier="lite")
+    precise = manager.open_session("precise")
+    assert lite.tier == "lite" and precise.tier == "precise"
+    assert not lite.detector.face_mesh.refine_landmarks
+    assert precise.detector.face_mesh.refine_landmarks
+    assert (lite.detector.roi_size, lite.detector.detection_max_side) == (192, 320)
+    assert (precise.detector.roi_size, precise.detector.detection_max_side) == (256, 640)
+    manager.close_session("lite")
+    # Trois graphes au plus, dont un utilisé par la session « precise »
+    assert manager.pools["lite"].available == 2
+    assert manager.pools["precise"].available == 2
+
+
+def test_graphs_stay_within_budget_across_tiers():
+    meshes = []
+
+    def factory(*args, **kwargs):
+        meshes.append(FakeFaceMesh(*args, **kwargs))
+        return meshes[-1]
+
+    manager = SessionManager(max_sessions=2, face_mesh_factory=factory)
+    for tier in ("lite", "standard", "precise", "lite", "precise"):
+        manager.open_session("a", tier=tier)
+        manager.open_session("b", tier=tier)
+        manager.close_session("a")
+        manager.close_session("b")
+        assert manager.budget.created <= 3
+        assert sum(not mesh.closed for mesh in meshes) <= 3
+    # Les graphes inactifs des autres niveaux ont été fermés pour laisser leur place
+    assert any(mesh.closed for mesh in meshes)
+    # Deux sessions ouvertes : la requête ponctuelle reprend le graphe inactif restant
+    manager.open_session("a", tier="lite")
+    manager.open_session("b", tier="standard")
+    with manager.one_shot():
+        assert sum(not mesh.closed for mesh in meshes) <= 3
+
+
+def test_declared_tier_survives_eviction():
+    manager = SessionManager(max_sessions=2, face_mesh_factory=FakeFaceMesh)
+    manager.set_tier("a", "standard")
+    assert manager.acquire("a").tier == "standard"
+    manager.evict_idle_sessions(now=float("inf"))
+    assert manager.acquire("a").tier == "standard"
+    with pytest.raises(ValueError):
+        manager.set_tier("b", "ultra")
@@ -0,0 +1,129 @@
+"""
+Tests unitaires pour la reprise des sessions de suivi.
+
+Tests couverts :
+- Export et restauration de l'état de suivi d'un détecteur
+- Restauration différée à l'ouverture d'une session
+- Stockage en mémoire : expiration et éviction
+- Stockage SQLite partagé entre deux connexions
+
+Cas d'erreur testés :
+- État tronqué ou d'une autre version
+- Mode multi-visages
+- Stockage inconnu
+"""
+
+import time
+
+import numpy as np
+import pytest
+from app.services.face_detector import TRACKING_STATE_HEADER, FaceDetectorService
+from app.services.session_manager import FaceMeshPool, SessionManager
+from app.services.session_store import (
+    RESUME_KEY_PATTERN, MemorySessionStore, SQLiteSessionStore, create_session_store
+)
+from fakes import FakeClock, FakeFaceMesh
+
+
+def tracked_detector():
+    detector = FaceDetectorService(face_mesh=FakeFaceMesh())
+    detector.kalman_filter.update(np.linspace(0.1, 0.9, 9), time.monotonic() - 0.2)
+    detector.kalman_filter.update(np.linspace(0.2, 1.0, 9), time.monotonic() - 0.1)
+    detector.face_box = (200.0, 150.0, 320.0, 300.0)
+    detector.consecutive_failures = 1
+    detector.last_detection_time = time.time() - 0.1
+    return detector
+
+
+def test_state_round_trip():
+    source = tracked_detector()
+    state = source.export_state()
+    assert len(state) == TRACKING_STATE_HEADER.size + 5 * 9 * 4
+
+    target = FaceDetectorService(face_mesh=FakeFaceMesh())
+    target.restore_state(state)
+    np.testing.assert_allclose(target.kalman_filter.value, source.kalman_filter.value, rtol=1e-6)
+    np.testing.assert_allclose(target.kalman_filter.velocity, source.kalman_filter.velocity, rtol=1e-6)
+    assert target.kalman_filter.initialized
+    assert target.face_box == source.face_box
+    assert target.consecutive_failures == 1
+    # Les âges sont conservés, quelle que soit l'horloge du processus
+    assert time.monotonic() - target.kalman_filter.last_time == pytest.approx(0.1, abs=0.05)
+    assert time.time() - target.last_detection_time == pytest.approx(0.1, abs=0.05)
+    # Pas de points de repère : la reprise analyse d'abord la région du visage
+    assert target.last_landmarks is None
+
+
+def test_fresh_detector_state():
+    target = tracked_detector()
+    target.restore_state(FaceDetectorService(face_mesh=FakeFaceMesh()).export_state())
+    assert not target.kalman_filter.initialized
+    assert target.face_box is None
+
+
+def test_invalid_states():
+    state = tracked_detector().export_state()
+    detector = FaceDetectorService(face_mesh=FakeFaceMesh())
+    with pytest.raises(ValueError):
+        detector.restore_state(state[:-4])
+    with pytest.raises(ValueError):
+        detector.restore_state(b"\x02" + state[1:])
+    multi_face = FaceDetectorService(face_mesh=FakeFaceMesh(), max_faces=2)
+    assert multi_face.export_state() is None
+    with pytest.raises(ValueError):
+        multi_face.restore_state(state)
+
+
+def test_session_manager_restores_state_on_open():
+    manager = SessionManager(max_sessions=2, pool=FaceMeshPool(3, factory=FakeFaceMesh))
+    state = tracked_detector().export_state()
+    manager.restore_state("a", state)
+    manager.restore_state("b", b"garbage")
+    assert manager.export_state("a") is None
+    assert manager.acquire("a").detector.face_box == (200.0, 150.0, 320.0, 300.0)
+    # Un état illisible est ignoré
+    assert manager.acquire("b").detector.face_box is None
+    assert len(manager.export_state("a")) == len(state)
+
+
+def test_memory_store_expiry_and_eviction():
+    clock = FakeClock()
+    store = MemorySessionStore(ttl=10.0, max_entries=2, clock=clock)
+    store.save("a", b"1")
+    store.save("b", b"2")
+    store.save("c", b"3")
+    assert store.load("a") is None
+    assert store.load("b") == b"2"
+    clock.now = 10.0
+    assert store.load("c") is None
+    assert len(store) == 1
+
+
+def test_sqlite_store_is_shared(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    clock = FakeClock()
+    writer = SQLiteSessionStore(path, ttl=10.0, clock=clock)
+    reader = SQLiteSessionStore(path, ttl=10.0, clock=clock)
+    try:
+        writer.save("key", b"\x00state")
+        assert reader.load("key") == b"\x00state"
+        writer.save("key", b"newer")
+        assert reader.load("key") == b"newer"
+        clock.now = 10.0
+        assert reader.load("key") is None
+        writer.delete("key")
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_create_session_store(tmp_path):
+    assert create_session_store("none") is None
+    assert isinstance(create_session_store("memory"), MemorySessionStore)
+    store = create_session_store("sqlite", str(tmp_path / "sessions.sqlite3"))
+    assert isinstance(store, SQLiteSessionStore)
+    store.close()
+    with pytest.raises(ValueError):
+        create_session_store("redis")
+    assert RESUME_KEY_PATTERN.match("0123456789abcdef")
+    assert not RESUME_KEY_PATTERN.match("short")
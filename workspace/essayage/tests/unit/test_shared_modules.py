@@ -0,0 +1,38 @@
+"""
+Tests unitaires des modules communs aux services d'essayage et de recommandation.
+
+Les deux services sont construits en images distinctes, chacune avec son propre
+contexte : le décodage des images, les tickets de points de repère et la
+classification de la forme du visage y sont donc recopiés. Ces tests vérifient que
+les copies du service de recommandation sont identiques à celles de ce service.
+
+Tests couverts :
+- Empreinte SHA-256 de chaque module commun identique dans les deux services
+"""
+
+import hashlib
+from pathlib import Path
+
+import pytest
+
+SERVICE = Path(__file__).resolve().parents[2]
+OTHER_SERVICE = SERVICE.parent / "recommandation"
+
+# Module de ce service -> copie du service de recommandation
+SHARED_MODULES = {
+    "app/utils/image_decoding.py": "app/services/image_decoding.py",
+    "app/services/landmark_ticket.py": "app/services/landmark_ticket.py",
+    "app/services/face_shape.py": "app/services/face_shape.py",
+}
+
+
+def digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+@pytest.mark.skipif(not OTHER_SERVICE.is_dir(), reason="Service de recommandation absent (image Docker)")
+@pytest.mark.parametrize("module, copy", SHARED_MODULES.items())
+def test_shared_module_is_identical(module, copy):
+    assert digest(SERVICE / module) == digest(OTHER_SERVICE / copy), (
+        f"{module} et recommandation/{copy} ont divergé : reporter la modification dans les deux services"
+    )
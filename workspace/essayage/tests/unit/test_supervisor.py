@@ -0,0 +1,112 @@
+"""
+Tests unitaires pour le superviseur des workers et la mesure de leur mémoire.
+
+Tests couverts :
+- Workers créés par fork, acceptant les connexions sur le socket partagé
+- Recyclage des workers arrivés au bout de leur nombre de requêtes
+- Rapport de mémoire (RSS, PSS) de chaque worker
+
+Cas d'erreur testés :
+- Worker arrêté sur une erreur, remplacé
+- Worker ignorant SIGTERM, arrêté de force
+"""
+
+import os
+import signal
+import socket
+import time
+
+import pytest
+from app import supervisor
+from app.supervisor import WorkerSupervisor, bind_socket
+from app.utils.process_memory import process_memory, total_memory
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="fork indisponible")
+
+
+def reply_pid(sock, max_requests):
+    """Worker de test : répond à une connexion par son pid et sa limite de requêtes, puis s'arrête."""
+    connection, _ = sock.accept()
+    connection.sendall(f"{os.getpid()} {max_requests}".encode())
+    connection.close()
+
+
+def request(port):
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as connection:
+        pid, max_requests = connection.recv(64).decode().split()
+    return int(pid), int(max_requests)
+
+
+def wait_for(condition, supervisor_, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        supervisor_.reap()
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def listening_socket():
+    sock = bind_socket("127.0.0.1", 0)
+    yield sock
+    sock.close()
+
+
+def test_process_memory():
+    memory = process_memory()
+    if not memory:
+        pytest.skip("/proc indisponible")
+    assert memory["rss_bytes"] > 0
+    if "pss_bytes" in memory:
+        assert 0 < memory["pss_bytes"] <= memory["rss_bytes"]
+        assert memory["uss_bytes"] <= memory["pss_bytes"]
+    total = total_memory([os.getpid(), 2 ** 22 + 1])
+    assert total["processes"] == 1
+
+
+def test_workers_share_socket_and_are_recycled(listening_socket):
+    port = listening_socket.getsockname()[1]
+    workers = WorkerSupervisor(reply_pid, num_workers=2, max_requests=100, max_requests_jitter=10)
+    workers.start(listening_socket)
+    try:
+        first = set(workers.workers)
+        assert len(first) == 2
+        assert [row["index"] for row in workers.report()] == [0, 1]
+        pid, max_requests = request(port)
+        assert pid in first
+        assert 100 <= max_requests <= 110
+        # Le worker qui a servi sa requête s'arrête et est remplacé
+        wait_for(lambda: workers.recycled == 1, workers)
+        assert len(workers.workers) == 2 and pid not in workers.workers
+        assert workers.spawned == 3
+    finally:
+        workers.stop()
+    assert not workers.workers
+
+
+def test_crashed_worker_is_replaced(listening_socket, monkeypatch):
+    monkeypatch.setattr(supervisor, "CRASH_BACKOFF", 0.0)
+
+    def crash(sock, max_requests):
+        raise RuntimeError("startup failed")
+
+    workers = WorkerSupervisor(crash, num_workers=1)
+    workers.start(listening_socket)
+    try:
+        wait_for(lambda: workers.recycled >= 2, workers)
+    finally:
+        workers.stop()
+
+
+def test_stubborn_worker_is_killed(listening_socket):
+    def stubborn(sock, max_requests):
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        time.sleep(30)
+
+    workers = WorkerSupervisor(stubborn, num_workers=1, graceful_timeout=0.2)
+    workers.start(listening_socket)
+    time.sleep(0.2)
+    started = time.monotonic()
+    workers.stop()
+    assert not workers.workers
+    assert time.monotonic() - started < 5
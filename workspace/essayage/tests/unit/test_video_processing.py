@@ -0,0 +1,108 @@
+"""
+Tests unitaires pour le traitement des vidéos enregistrées.
+
+Tests couverts :
+- Lecture avec pas, reprise à une image donnée et limite de résolution
+- Instants des images dans la vidéo
+- Fermeture pendant une lecture en cours dans un autre thread
+- Endpoint POST /api/v1/face/detect/video (flux NDJSON)
+
+Cas d'erreur testés :
+- Vidéo trop volumineuse
+- Fichier vidéo invalide
+"""
+
+import io
+import json
+import os
+import threading
+
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.video_processing import VideoReader, spool_upload
+
+
+@pytest.fixture
+def clip(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 20, (160, 120))
+    for frame in range(10):
+        writer.write(np.full((120, 160, 3), frame * 20, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def test_reader_stride_resume_and_resolution(clip):
+    reader = VideoReader(clip, stride=3, max_side=80, start_frame=2)
+    frames = []
+    while (item := reader.read()) is not None:
+        frame, timestamp, image = item
+        frames.append((frame, timestamp))
+        assert image.shape == (60, 80, 3)
+    reader.close()
+    assert frames == [(2, 0.1), (5, 0.25), (8, 0.4)]
+    assert reader.metadata()["fps"] == 20
+
+
+def test_close_waits_for_pending_read(clip):
+    reader = VideoReader(clip)
+    capture, decoding, resume = reader.capture, threading.Event(), threading.Event()
+    released = []
+
+    class SlowCapture:
+        def read(self):
+            decoding.set()
+            resume.wait(5)
+            return capture.read()
+
+        def release(self):
+            released.append(True)
+            capture.release()
+
+        def __getattr__(self, name):
+            return getattr(capture, name)
+
+    reader.capture = SlowCapture()
+    items = []
+    reading = threading.Thread(target=lambda: items.append(reader.read()))
+    reading.start()
+    assert decoding.wait(5)
+    closing = threading.Thread(target=reader.close)
+    closing.start()
+    closing.join(0.2)
+    # Le décodeur n'est pas libéré tant que l'image est en cours de lecture
+    assert closing.is_alive() and not released
+    resume.set()
+    reading.join(5)
+    closing.join(5)
+    assert items[0][0] == 0 and released == [True]
+    assert reader.read() is None
+
+
+def test_spool_upload_limit(tmp_path):
+    path = spool_upload(io.BytesIO(b"x" * 10), max_bytes=10, suffix=".mp4")
+    assert path.endswith(".mp4") and os.path.getsize(path) == 10
+    os.unlink(path)
+    with pytest.raises(ValueError):
+        spool_upload(io.BytesIO(b"x" * 11), max_bytes=10)
+
+
+def test_invalid_video(tmp_path):
+    path = tmp_path / "broken.mp4"
+    path.write_bytes(b"not a video")
+    with pytest.raises(ValueError):
+        VideoReader(str(path))
+
+
+def test_detect_video_endpoint(clip):
+    with open(clip, "rb") as video:
+        files = {"video": ("clip.avi", video.read(), "video/x-msvideo")}
+    response = TestClient(app).post("/api/v1/face/detect/video?stride=4", files=files)
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["type"] == "metadata" and lines[0]["stride"] == 4
+    assert [(line["frame"], line["success"]) for line in lines[1:-1]] == [(0, False), (4, False), (8, False)]
+    assert lines[-1] == {"type": "end", "frames": 3, "next_frame": 12}
@@ -30,6 +30,18 @@ class FaceAnalysis(BaseModel):
                     raise ValueError(f"Probabilité invalide pour {shape}: {v[shape]}. Doit être entre 0 et 100")
         return v
 
+class LandmarkInput(BaseModel):
+    """Points de repère Face Mesh déjà détectés, transmis à la place de la photo."""
+    image_width: int = Field(..., gt=0, description="Largeur de l'image analysée")
+    image_height: int = Field(..., gt=0, description="Hauteur de l'image analysée")
+    points: List[float] = Field(..., description="Coordonnées normalisées à plat [x0, y0, x1, y1, ...]")
+
+    @validator('points')
+    def validate_points(cls, v):
+        if len(v) % 2:
+            raise ValueError("Les coordonnées doivent former des paires (x, y)")
+        return v
+
 class GlassesRecommendation(BaseModel):
     id: int = Field(..., gt=0, description="Identifiant unique des lunettes")
     ref: str = Field(..., min_length=1, description="Référence des lunettes")
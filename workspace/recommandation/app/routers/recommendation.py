@@ -1,10 +1,13 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 from sqlalchemy.orm import Session
-import numpy as np
-import cv2
-from typing import List
+from typing import List, Optional
 import logging
-from ..models.recommendation import FaceAnalysis, GlassesRecommendation, RecommendationResponse
+import os
+import numpy as np
+from pydantic import ValidationError
+from ..models.recommendation import FaceAnalysis, GlassesRecommendation, LandmarkInput, RecommendationResponse
+from ..services.image_decoding import MAX_IMAGE_BYTES, check_image_bytes, decode_image
+from ..services.landmark_ticket import LandmarkTicketSigner
 from ..services.recommendation_service import RecommendationService
 from ..database.database import get_db
 from ..database.models import Glasses, Category
@@ -13,6 +16,58 @@ router = APIRouter()
 recommendation_service = RecommendationService()
 logger = logging.getLogger(__name__)
 
+# Plus grand côté conservé lors du décodage réduit d'une photo JPEG
+DECODE_TARGET_SIDE = 1024
+
+# Tickets de points de repère émis par le service d'essayage (secret partagé)
+landmark_tickets = (LandmarkTicketSigner(os.environ["LANDMARK_TICKET_SECRET"])
+                    if os.environ.get("LANDMARK_TICKET_SECRET") else None)
+
+
+async def analyze_request(file: Optional[UploadFile], landmarks: Optional[str],
+                          landmark_ticket: Optional[str]) -> FaceAnalysis:
+    """
+    Analyse le visage d'une requête ``/recommend``.
+
+    Un ticket du service d'essayage ou des points de repère déjà détectés évitent de
+    relancer Face Mesh ; la photo n'est analysée qu'à défaut.
+
+    Raises:
+        HTTPException: 400 si le ticket, les points de repère ou la photo sont invalides
+    """
+    if landmark_ticket:
+        if landmark_tickets is None:
+            raise HTTPException(status_code=400, detail="Tickets de points de repère non configurés")
+        try:
+            ticket = landmark_tickets.verify(landmark_ticket)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Ticket de points de repère refusé : {e}")
+        return _analyze_landmarks(ticket.points, (ticket.image_width, ticket.image_height))
+    if landmarks:
+        try:
+            points = LandmarkInput.parse_raw(landmarks)
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=f"Points de repère invalides : {e}")
+        return _analyze_landmarks(np.array(points.points, dtype=np.float32).reshape(-1, 2),
+                                  (points.image_width, points.image_height))
+    if file is None:
+        raise HTTPException(status_code=400, detail="Une photo, des points de repère ou un ticket sont requis")
+    # Lire l'image, refusée avant décodage si elle est trop volumineuse
+    contents = await file.read(MAX_IMAGE_BYTES + 1)
+    try:
+        check_image_bytes(len(contents))
+        image = decode_image(contents, DECODE_TARGET_SIDE)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Impossible de lire l'image : {e}")
+    return recommendation_service.analyze_face_rgb(image.rgb, (image.width, image.height))
+
+
+def _analyze_landmarks(points: np.ndarray, image_size) -> FaceAnalysis:
+    try:
+        return recommendation_service.analyze_landmarks(points, image_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/glasses", response_model=List[GlassesRecommendation])
 async def get_all_glasses(db: Session = Depends(get_db)):
     """Récupère toutes les lunettes disponibles."""
@@ -70,19 +125,19 @@ async def get_glasses_by_category(category: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/recommend", response_model=RecommendationResponse)
-async def recommend_glasses(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    """Analyse un visage et recommande des lunettes adaptées."""
+async def recommend_glasses(file: Optional[UploadFile] = File(None), landmarks: Optional[str] = Form(None),
+                            landmark_ticket: Optional[str] = Form(None), db: Session = Depends(get_db)):
+    """
+    Analyse un visage et recommande des lunettes adaptées.
+
+    Le visage est décrit par une photo (``file``), par les points de repère Face Mesh
+    normalisés déjà détectés (``landmarks``, JSON ``{"image_width", "image_height",
+    "points": [x0, y0, ...]}``) ou par le ``landmark_ticket`` renvoyé par ``/detect``
+    du service d'essayage ; les deux derniers évitent une nouvelle inférence.
+    """
     try:
-        # Lire l'image
-        contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            raise HTTPException(status_code=400, detail="Impossible de lire l'image")
-        
         # Analyser le visage
-        face_analysis = recommendation_service.analyze_face(image)
+        face_analysis = await analyze_request(file, landmarks, landmark_ticket)
         
         # Générer les recommandations
         recommendations = recommendation_service.recommend_glasses(db, face_analysis)
@@ -102,6 +157,8 @@ async def recommend_glasses(file: UploadFile = File(...), db: Session = Depends(
             recommendations=recommendations
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la génération des recommandations: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,121 @@
+"""
+Tickets de points de repère, transmis par le client au service de recommandation.
+
+Un client envoie d'ordinaire la même photo à ``/detect`` puis au service de
+recommandation, qui relançait Face Mesh sur la même image. Lorsque les deux services
+partagent un secret (``ESSAYAGE_LANDMARK_TICKET_SECRET`` et ``LANDMARK_TICKET_SECRET``),
+la réponse de ``/detect`` porte un ticket : les points de repère normalisés et les
+dimensions de l'image, signés par HMAC-SHA256 et valables ``ttl`` secondes. Le service
+de recommandation vérifie la signature (quelques microsecondes, sans appel réseau ni
+stockage partagé) et analyse la forme du visage sans inférence.
+
+Format du ticket : ``<charge utile>.<signature>``, chacune en base64 URL sans
+remplissage. La charge utile est un en-tête (petit-boutiste) suivi des coordonnées
+normalisées (x, y) de chaque point en float16 :
+
+    ======  =======  ==========================================
+    Octets  Type     Champ
+    ======  =======  ==========================================
+    0       uint8    Version du ticket (1)
+    1-4     uint32   Largeur de l'image (pixels)
+    5-8     uint32   Hauteur de l'image (pixels)
+    9-16    float64  Expiration (secondes depuis l'époque Unix)
+    17-18   uint16   Nombre de points
+    ======  =======  ==========================================
+
+La signature porte sur les 16 premiers octets du HMAC de la charge utile.
+
+Classes:
+    TicketLandmarks: Points de repère portés par un ticket.
+    LandmarkTicketSigner: Émet et vérifie les tickets.
+"""
+
+import base64
+import hashlib
+import hmac
+import struct
+import time
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+TICKET_VERSION = 1
+TICKET_HEADER = struct.Struct("<BIIdH")
+SIGNATURE_BYTES = 16
+
+
+class TicketLandmarks(NamedTuple):
+    """Points de repère normalisés (forme (points, 2)) et dimensions de l'image analysée."""
+    points: np.ndarray
+    image_width: int
+    image_height: int
+
+
+def _encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class LandmarkTicketSigner:
+    """
+    Émet et vérifie les tickets de points de repère.
+
+    Attributes:
+        ttl: Durée de validité (s) d'un ticket
+    """
+
+    def __init__(self, secret: str, ttl: float = 300.0, clock: Callable[[], float] = time.time):
+        if not secret:
+            raise ValueError("A landmark ticket secret is required")
+        self._key = secret.encode("utf-8")
+        self.ttl = ttl
+        self._clock = clock
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self._key, payload, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+    def issue(self, points: np.ndarray, image_width: int, image_height: int) -> str:
+        """
+        Émet un ticket.
+
+        Args:
+            points: Coordonnées normalisées (x, y) des points, de forme (points, 2) ou plus
+                de colonnes (seules les deux premières sont conservées)
+            image_width: Largeur de l'image analysée
+            image_height: Hauteur de l'image analysée
+
+        Returns:
+            Le ticket signé
+        """
+        points = np.asarray(points)[:, :2]
+        payload = TICKET_HEADER.pack(TICKET_VERSION, image_width, image_height, self._clock() + self.ttl,
+                                     len(points))
+        payload += np.ascontiguousarray(points, dtype="<f2").tobytes()
+        return f"{_encode(payload)}.{_encode(self._sign(payload))}"
+
+    def verify(self, ticket: str) -> TicketLandmarks:
+        """
+        Vérifie un ticket et en extrait les points de repère.
+
+        Raises:
+            ValueError: Si le ticket est mal formé, mal signé, d'une autre version ou expiré
+        """
+        try:
+            encoded_payload, encoded_signature = ticket.split(".")
+            payload, signature = _decode(encoded_payload), _decode(encoded_signature)
+        except ValueError:
+            raise ValueError("Malformed landmark ticket")
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            raise ValueError("Invalid landmark ticket signature")
+        if len(payload) < TICKET_HEADER.size:
+            raise ValueError("Malformed landmark ticket")
+        version, width, height, expires_at, count = TICKET_HEADER.unpack_from(payload)
+        if version != TICKET_VERSION or len(payload) != TICKET_HEADER.size + count * 4:
+            raise ValueError("Unsupported landmark ticket")
+        if self._clock() >= expires_at:
+            raise ValueError("Landmark ticket expired")
+        points = np.frombuffer(payload, "<f2", offset=TICKET_HEADER.size).reshape(count, 2).astype(np.float32)
+        return TicketLandmarks(points, width, height)
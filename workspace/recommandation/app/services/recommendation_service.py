@@ -3,14 +3,17 @@ import cv2
 import numpy as np
 import logging
 import mediapipe as mp
-import math
 from typing import List, Optional, Tuple, Dict
 from sqlalchemy.orm import Session
 from app.database.models import Glasses
 from app.models.recommendation import FaceAnalysis, GlassesRecommendation, RecommendationResponse
+from app.services.face_shape import face_measurements, face_ratios, face_shape_scores
 
 logger = logging.getLogger(__name__)
 
+# Nombre de points de repère du maillage Face Mesh
+MIN_LANDMARKS = 468
+
 class RecommendationService:
     def __init__(self):
         """Initialise le service de recommandation avec MediaPipe."""
@@ -23,124 +26,65 @@ class RecommendationService:
         )
         logger.info("Service de recommandation initialisé avec MediaPipe")
 
-    def _calculate_distance(self, point1: Tuple[float, float], point2: Tuple[float, float]) -> float:
-        """Calcule la distance euclidienne entre deux points."""
-        return math.sqrt((point2[0] - point1[0])**2 + (point2[1] - point1[1])**2)
+    def analyze_face(self, image: np.ndarray) -> FaceAnalysis:
+        """Analyse un visage (image BGR) et retourne ses caractéristiques."""
+        return self.analyze_face_rgb(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
 
-    def _get_landmark_coordinates(self, landmarks, index: int, image_shape: Tuple[int, int]) -> Tuple[float, float]:
-        """Convertit les coordonnées normalisées en coordonnées d'image."""
-        landmark = landmarks.landmark[index]
-        return (landmark.x * image_shape[1], landmark.y * image_shape[0])
+    def analyze_face_rgb(self, image_rgb: np.ndarray, image_size: Optional[Tuple[int, int]] = None) -> FaceAnalysis:
+        """
+        Analyse un visage (image RGB) et retourne ses caractéristiques.
 
-    def analyze_face(self, image: np.ndarray) -> FaceAnalysis:
-        """Analyse un visage et retourne ses caractéristiques."""
+        ``image_size`` (largeur, hauteur) est la taille de l'image d'origine lorsque
+        ``image_rgb`` en est une version réduite : les mesures sont exprimées en pixels
+        de l'image d'origine.
+        """
         try:
-            # Convertir l'image en RGB
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            image_shape = image.shape[:2]
-            
             # Détecter les points du visage
             results = self.face_mesh.process(image_rgb)
             if not results.multi_face_landmarks:
                 logger.warning("Aucun visage détecté dans l'image")
                 raise ValueError("Aucun visage détecté dans l'image")
+        except Exception as e:
+            logger.error(f"Erreur lors de l'analyse du visage: {str(e)}")
+            raise ValueError(f"Erreur lors de l'analyse du visage: {str(e)}")
 
-            landmarks = results.multi_face_landmarks[0]
-            
-            # Obtenir les points clés
-            front_top = self._get_landmark_coordinates(landmarks, 10, image_shape)
-            front_left = self._get_landmark_coordinates(landmarks, 8, image_shape)
-            front_right = self._get_landmark_coordinates(landmarks, 9, image_shape)
-            chin = self._get_landmark_coordinates(landmarks, 152, image_shape)
-            left_cheek = self._get_landmark_coordinates(landmarks, 123, image_shape)
-            right_cheek = self._get_landmark_coordinates(landmarks, 352, image_shape)
-            left_jaw = self._get_landmark_coordinates(landmarks, 172, image_shape)
-            right_jaw = self._get_landmark_coordinates(landmarks, 397, image_shape)
-            left_temple = self._get_landmark_coordinates(landmarks, 93, image_shape)
-            right_temple = self._get_landmark_coordinates(landmarks, 323, image_shape)
-            left_jaw_corner = self._get_landmark_coordinates(landmarks, 136, image_shape)
-            right_jaw_corner = self._get_landmark_coordinates(landmarks, 365, image_shape)
-            
-            # Calculer les mesures
-            face_height = self._calculate_distance(front_top, chin)
-            cheekbone_width = self._calculate_distance(left_cheek, right_cheek)
-            jaw_width = self._calculate_distance(left_jaw, right_jaw)
-            temple_width = self._calculate_distance(left_temple, right_temple)
-            forehead_width = self._calculate_distance(front_left, front_right)
-            jaw_corner_width = self._calculate_distance(left_jaw_corner, right_jaw_corner)
+        points = np.array([(landmark.x, landmark.y) for landmark in results.multi_face_landmarks[0].landmark],
+                          dtype=np.float32)
+        if image_size is None:
+            image_size = (image_rgb.shape[1], image_rgb.shape[0])
+        return self.analyze_landmarks(points, image_size)
+
+    def analyze_landmarks(self, points: np.ndarray, image_size: Tuple[int, int]) -> FaceAnalysis:
+        """
+        Analyse un visage à partir de points de repère déjà détectés, sans Face Mesh.
+
+        Args:
+            points: Coordonnées normalisées (x, y) des points de repère Face Mesh, de
+                forme (points, 2) et dans l'ordre de Face Mesh
+            image_size: Largeur et hauteur (pixels) de l'image analysée
+        """
+        try:
+            if points.ndim != 2 or points.shape[1] < 2 or len(points) < MIN_LANDMARKS:
+                raise ValueError(f"Au moins {MIN_LANDMARKS} points de repère (x, y) sont requis")
+            if not np.isfinite(points).all():
+                raise ValueError("Les coordonnées des points de repère doivent être finies")
+            # Calculer les mesures, en pixels de l'image analysée
+            measurements = face_measurements(points[:, :2].astype(np.float64) * image_size)
+            face_height = measurements["face_height"]
+            cheekbone_width = measurements["cheekbone_width"]
+            jaw_width = measurements["jaw_width"]
+            forehead_width = measurements["forehead_width"]
             
             # Calculer les ratios
-            jaw_to_cheekbone_ratio = jaw_width / cheekbone_width
-            face_width_to_height_ratio = cheekbone_width / face_height
-            temple_to_cheekbone_ratio = temple_width / cheekbone_width
-            forehead_to_cheekbone_ratio = forehead_width / cheekbone_width
-            jaw_corner_to_cheekbone_ratio = jaw_corner_width / cheekbone_width
+            ratios = face_ratios(measurements)
+            face_width_to_height_ratio = ratios["face_width_to_height"]
             
             logger.info(f"Mesures brutes: jaw_width={jaw_width:.1f}, cheekbone_width={cheekbone_width:.1f}, face_height={face_height:.1f}")
-            logger.info(f"Ratios: jaw_ratio={jaw_to_cheekbone_ratio:.3f}, face_ratio={face_width_to_height_ratio:.3f}")
-            logger.info(f"Ratios supplémentaires: temple={temple_to_cheekbone_ratio:.3f}, forehead={forehead_to_cheekbone_ratio:.3f}, jaw_corner={jaw_corner_to_cheekbone_ratio:.3f}")
+            logger.info(f"Ratios: jaw_ratio={ratios['jaw_to_cheekbone']:.3f}, face_ratio={face_width_to_height_ratio:.3f}")
+            logger.info(f"Ratios supplémentaires: temple={ratios['temple_to_cheekbone']:.3f}, forehead={ratios['forehead_to_cheekbone']:.3f}, jaw_corner={ratios['jaw_corner_to_cheekbone']:.3f}")
             
             # Calculer les scores pour chaque forme
-            scores = {
-                "rond": 0.0,
-                "ovale": 0.0,
-                "carré": 0.0,
-                "rectangulaire": 0.0
-            }
-            
-            # Score pour rond (visage équilibré)
-            if 0.95 <= jaw_to_cheekbone_ratio <= 1.05:  # Mâchoire et pommettes très similaires
-                scores["rond"] += 20
-            if 0.95 <= face_width_to_height_ratio <= 1.05:  # Ratio largeur/hauteur très proche de 1
-                scores["rond"] += 20
-            if 0.9 <= temple_to_cheekbone_ratio <= 1.1:  # Tempes et pommettes similaires
-                scores["rond"] += 15
-            if 0.9 <= forehead_to_cheekbone_ratio <= 1.1:  # Front et pommettes similaires
-                scores["rond"] += 15
-            if 0.9 <= jaw_corner_to_cheekbone_ratio <= 1.1:  # Coins de mâchoire et pommettes similaires
-                scores["rond"] += 15
-                
-            # Score pour ovale (visage allongé)
-            if 0.8 <= jaw_to_cheekbone_ratio < 0.9:  # Mâchoire légèrement plus étroite
-                scores["ovale"] += 15
-            if 0.8 <= face_width_to_height_ratio < 0.9:  # Visage légèrement plus haut
-                scores["ovale"] += 15
-            if temple_to_cheekbone_ratio < 0.9:  # Tempes plus étroites
-                scores["ovale"] += 15
-            if forehead_to_cheekbone_ratio < 0.9:  # Front plus étroit
-                scores["ovale"] += 15
-            if jaw_corner_to_cheekbone_ratio < 0.9:  # Coins de mâchoire plus étroits
-                scores["ovale"] += 15
-                
-            # Score pour carré (visage anguleux)
-            if 0.95 <= jaw_to_cheekbone_ratio <= 1.05:  # Mâchoire et pommettes très similaires
-                scores["carré"] += 15
-            if 0.7 <= face_width_to_height_ratio < 0.8:  # Visage plus haut que large
-                scores["carré"] += 20
-            if temple_to_cheekbone_ratio > 1.1:  # Tempes plus larges
-                scores["carré"] += 15
-            if forehead_to_cheekbone_ratio > 1.1:  # Front plus large
-                scores["carré"] += 15
-            if jaw_corner_to_cheekbone_ratio > 1.1:  # Coins de mâchoire plus larges
-                scores["carré"] += 15
-                
-            # Score pour rectangulaire (visage très allongé)
-            if jaw_to_cheekbone_ratio < 0.85:  # Mâchoire plus étroite
-                scores["rectangulaire"] += 15
-            if face_width_to_height_ratio < 0.75:  # Visage beaucoup plus haut
-                scores["rectangulaire"] += 20
-            if temple_to_cheekbone_ratio < 0.85:  # Tempes beaucoup plus étroites
-                scores["rectangulaire"] += 15
-            if forehead_to_cheekbone_ratio < 0.85:  # Front beaucoup plus étroit
-                scores["rectangulaire"] += 15
-            if jaw_corner_to_cheekbone_ratio < 0.85:  # Coins de mâchoire beaucoup plus étroits
-                scores["rectangulaire"] += 15
-            
-            # Normaliser les scores
-            total = sum(scores.values())
-            if total > 0:
-                for shape in scores:
-                    scores[shape] = int(round((scores[shape] / total) * 100))
+            scores = face_shape_scores(ratios)
             
             # Déterminer la forme dominante
             face_shape = max(scores.items(), key=lambda x: x[1])[0]
@@ -12,6 +12,7 @@ import numpy as np
 import os
 from app.services.recommendation_service import RecommendationService
 from app.models.recommendation import FaceAnalysis
+from app.services.landmark_ticket import LandmarkTicketSigner
 
 @pytest.fixture
 def recommendation_service():
@@ -61,4 +62,21 @@ def test_no_face_detection(recommendation_service):
     image = np.zeros((100, 100, 3), dtype=np.uint8)
     
     with pytest.raises(ValueError, match="Aucun visage détecté dans l'image"):
-        recommendation_service.analyze_face(image) 
\ No newline at end of file
+        recommendation_service.analyze_face(image)
+
+
+def test_landmark_ticket_analysis(recommendation_service, test_image):
+    """Teste l'analyse à partir d'un ticket de points de repère, sans Face Mesh."""
+    results = recommendation_service.face_mesh.process(cv2.cvtColor(test_image, cv2.COLOR_BGR2RGB))
+    points = np.array([(p.x, p.y) for p in results.multi_face_landmarks[0].landmark], dtype=np.float32)
+    height, width = test_image.shape[:2]
+    signer = LandmarkTicketSigner("secret")
+    ticket = signer.verify(signer.issue(points, width, height))
+
+    analysis = recommendation_service.analyze_landmarks(ticket.points, (ticket.image_width, ticket.image_height))
+    expected = recommendation_service.analyze_face(test_image)
+    assert analysis.face_shape == expected.face_shape
+    assert analysis.face_width == pytest.approx(expected.face_width, abs=2)
+
+    with pytest.raises(ValueError, match="points de repère"):
+        recommendation_service.analyze_landmarks(points[:100], (width, height))
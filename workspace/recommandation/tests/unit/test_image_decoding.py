@@ -0,0 +1,31 @@
+"""
+Tests unitaires pour le décodage des images envoyées à /recommend.
+
+Ce module vérifie le décodage réduit des photos JPEG, les dimensions de l'image
+d'origine et le refus des images trop volumineuses avant décodage.
+"""
+
+import pytest
+import cv2
+import numpy as np
+from app.services.image_decoding import check_image_bytes, decode_image, image_dimensions
+
+
+def test_reduced_decoding():
+    image = np.zeros((1200, 2000, 3), dtype=np.uint8)
+    image[..., 2] = 255
+    _, buffer = cv2.imencode('.jpg', image)
+    assert image_dimensions(buffer.tobytes()) == (2000, 1200)
+    decoded = decode_image(buffer.tobytes(), target_side=1000)
+    assert decoded.rgb.shape == (600, 1000, 3)
+    assert (decoded.width, decoded.height) == (2000, 1200)
+    # Canal rouge en premier : l'image est en RGB
+    assert decoded.rgb[..., 0].mean() > 250
+
+
+def test_oversized_images_are_rejected():
+    _, buffer = cv2.imencode('.png', np.zeros((100, 100, 3), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        decode_image(buffer.tobytes(), max_pixels=9999)
+    with pytest.raises(ValueError):
+        check_image_bytes(17 * 1024 * 1024)
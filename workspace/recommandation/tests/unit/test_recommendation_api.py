@@ -0,0 +1,97 @@
+"""
+Tests unitaires pour l'API de recommandation.
+
+Ce module vérifie que ``/recommend`` refuse les requêtes dont le visage ne peut pas
+être analysé (ticket, points de repère ou absence de données) par une erreur 400,
+avant toute recommandation.
+"""
+
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database.database import get_db
+from app.routers import recommendation
+from app.services.landmark_ticket import LandmarkTicketSigner
+from main import app
+
+RECOMMEND_URL = "/api/v1/recommendation/recommend"
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def client():
+    """Client de test dont les requêtes n'ouvrent pas la base de données."""
+    app.dependency_overrides[get_db] = lambda: None
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def signer(monkeypatch, clock):
+    """Secret partagé avec le service d'essayage configuré."""
+    signer = LandmarkTicketSigner("secret", ttl=60, clock=clock)
+    monkeypatch.setattr(recommendation, "landmark_tickets", signer)
+    return signer
+
+
+def ticket(signer):
+    points = np.random.default_rng(0).uniform(0.0, 1.0, size=(468, 2)).astype(np.float32)
+    return signer.issue(points, 640, 480)
+
+
+def test_ticket_without_secret(client, monkeypatch):
+    """Teste le refus d'un ticket lorsque aucun secret n'est configuré."""
+    monkeypatch.setattr(recommendation, "landmark_tickets", None)
+    response = client.post(RECOMMEND_URL, data={"landmark_ticket": ticket(LandmarkTicketSigner("secret"))})
+    assert response.status_code == 400
+    assert "non configurés" in response.json()["detail"]
+
+
+def test_forged_ticket(client, signer):
+    """Teste le refus d'un ticket signé avec un autre secret."""
+    response = client.post(RECOMMEND_URL, data={"landmark_ticket": ticket(LandmarkTicketSigner("other"))})
+    assert response.status_code == 400
+    assert "signature" in response.json()["detail"]
+
+
+def test_expired_ticket(client, signer, clock):
+    """Teste le refus d'un ticket expiré."""
+    issued = ticket(signer)
+    clock.now += 60
+    response = client.post(RECOMMEND_URL, data={"landmark_ticket": issued})
+    assert response.status_code == 400
+    assert "expired" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("landmarks", [
+    "{not json",
+    json.dumps({"image_width": 640, "image_height": 480}),
+    json.dumps({"image_width": 640, "image_height": 480, "points": [0.5, 0.5, 0.5]}),
+])
+def test_malformed_landmarks(client, landmarks):
+    """Teste le refus de points de repère mal formés."""
+    response = client.post(RECOMMEND_URL, data={"landmarks": landmarks})
+    assert response.status_code == 400
+    assert "Points de repère invalides" in response.json()["detail"]
+
+
+def test_no_input(client):
+    """Teste le refus d'une requête sans photo, points de repère ni ticket."""
+    response = client.post(RECOMMEND_URL)
+    assert response.status_code == 400
+    assert "requis" in response.json()["detail"]
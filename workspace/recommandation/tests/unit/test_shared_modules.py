@@ -0,0 +1,35 @@
+"""
+Tests unitaires des modules communs aux services de recommandation et d'essayage.
+
+Ce module vérifie que les copies des modules communs (décodage des images, tickets
+de points de repère, classification de la forme du visage) sont identiques dans le
+service d'essayage, chaque service étant construit dans sa propre image.
+"""
+
+import hashlib
+from pathlib import Path
+
+import pytest
+
+SERVICE = Path(__file__).resolve().parents[2]
+OTHER_SERVICE = SERVICE.parent / "essayage"
+
+# Module de ce service -> copie du service d'essayage
+SHARED_MODULES = {
+    "app/services/image_decoding.py": "app/utils/image_decoding.py",
+    "app/services/landmark_ticket.py": "app/services/landmark_ticket.py",
+    "app/services/face_shape.py": "app/services/face_shape.py",
+}
+
+
+def digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+@pytest.mark.skipif(not OTHER_SERVICE.is_dir(), reason="Service d'essayage absent (image Docker)")
+@pytest.mark.parametrize("module, copy", SHARED_MODULES.items())
+def test_shared_module_is_identical(module, copy):
+    """Teste que chaque module commun est identique dans le service d'essayage."""
+    assert digest(SERVICE / module) == digest(OTHER_SERVICE / copy), (
+        f"{module} et essayage/{copy} ont divergé : reporter la modification dans les deux services"
+    )